@@ -1,12 +1,21 @@
 import streamlit as st
 import pandas as pd
+from src.core import metrics
 from src.core.bom_generator import BomGenerator
+from src.core.catalog_summary import summary_table, summary_to_bytes
+from src.core.render_executor import RenderJob, get_render_executor
+from src.core.prerender_cache import PrerenderCache
+from src.core.style_browser import StyleBrowser
+import hashlib
 import io
 import zipfile
 
 # 设置页面标题和布局
 st.set_page_config(page_title="BOM表自动生成工具", layout="wide")
 
+# 设置了 BOM_METRICS_TEXTFILE / BOM_METRICS_PORT 时导出批次指标（重复运行脚本时不会重复启动接口）
+metrics.configure()
+
 st.title("🚀 BOM表自动生成工具 (Web版)")
 st.write("---")
 
@@ -22,48 +31,135 @@ if uploaded_file is not None:
     try:
         # Streamlit上传的文件是内存中的字节流，我们需要将其读入BomGenerator
         # BomGenerator的__init__可以直接接收这种字节流对象
-        
-        st.info("正在读取文件并分析内容...")
-        
-        # 将上传的文件内容读入BytesIO对象
-        file_buffer = io.BytesIO(uploaded_file.getvalue())
-        
-        # 实例化我们的核心引擎
-        generator = BomGenerator(file_buffer)
+        # 每次页面交互都会重新运行脚本，解析结果按文件内容缓存在会话中，换了文件才重新解析
+        upload_digest = hashlib.sha256(uploaded_file.getvalue()).hexdigest()
+        if st.session_state.get('source_digest') != upload_digest:
+            # 换了文件后上一文件的生成批次不再需要
+            previous_job = st.session_state.pop('render_job', None)
+            if previous_job is not None:
+                previous_job.cancel()
+            with st.spinner("正在读取文件并分析内容..."):
+                # 实例化我们的核心引擎
+                generator = BomGenerator(io.BytesIO(uploaded_file.getvalue()))
+                st.session_state['generator'] = generator
+                st.session_state['style_browser'] = StyleBrowser(generator)
+                st.session_state['catalog_summary'] = generator.summarize()
+                st.session_state['source_digest'] = upload_digest
+                st.session_state['selected_codes'] = set()
+                st.session_state['selection_version'] = 0
+                st.session_state['bom_zip'] = None
+        generator = st.session_state['generator']
+        browser = st.session_state['style_browser']
+        selected = st.session_state['selected_codes']
         
         st.success("文件读取成功！")
         
         # 从BomGenerator实例中获取所有款式编码
         style_codes = generator.get_all_style_codes()
         
+        # 可选：上传后立即在后台预生成全部款式，点击生成时只需打包
+        # 缓存按上传文件内容区分，换了文件就丢弃旧缓存
+        prerender_enabled = st.checkbox(
+            "上传后立即在后台预生成全部款式（点击生成时只需打包，适合款式较多的文件）",
+            key="prerender_enabled"
+        )
+        cache = st.session_state.get('prerender_cache')
+        if cache is not None and (not prerender_enabled or cache.closed
+                                  or st.session_state.get('prerender_digest') != upload_digest):
+            cache.close()
+            cache = st.session_state['prerender_cache'] = None
+        if prerender_enabled and cache is None:
+            executor = get_render_executor()
+            # 有正式生成任务在运行或排队时暂停预生成，不与其争抢CPU；
+            # 页面每次运行都会访问缓存，会话关闭后超过10分钟无人访问时自动释放
+            cache = PrerenderCache(generator, idle_timeout=600,
+                                   should_pause=lambda: any(executor.stats()[key] > 0 for key in ('running', 'queued')))
+            cache.start(style_codes)
+            st.session_state['prerender_cache'] = cache
+            st.session_state['prerender_digest'] = upload_digest
+        if cache is not None:
+            cache_stats = cache.stats()
+            st.caption(f"后台预生成：已完成 {cache_stats['in_memory'] + cache_stats['spilled']} 个，"
+                       f"剩余 {cache_stats['pending']} 个")
+        
         st.write("---")
-        st.header("2. 文件内容预览")
-        st.write(f"在文件中找到了 **{len(style_codes)}** 个有效的款式编码：")
+        st.header("2. 筛选与预览")
+        st.write(f"在文件中找到了 **{len(style_codes)}** 个有效的款式编码")
+        
+        # 明细表概况只用派生字段表统计，不加载模板，上传后即可查看
+        summary = st.session_state['catalog_summary']
+        with st.expander("明细表概况（按波段、品类统计款式数、颜色数和SKU数）"):
+            totals = summary['totals']
+            total_columns = st.columns(4)
+            total_columns[0].metric("款式数", totals['款式数'])
+            total_columns[1].metric("颜色数", totals['颜色数'])
+            total_columns[2].metric("SKU数", totals['SKU数'])
+            total_columns[3].metric("超过3色的款式", totals['多色款式'])
+            st.dataframe(summary_table(summary), hide_index=True, use_container_width=True)
+            download_columns = st.columns(2)
+            download_columns[0].download_button("下载概况（xlsx）", data=summary_to_bytes(summary, 'xlsx'),
+                                                file_name="明细表概况.xlsx")
+            download_columns[1].download_button("下载概况（CSV）", data=summary_to_bytes(summary, 'csv'),
+                                                file_name="明细表概况.csv", mime="text/csv")
         
-        # 以多列形式展示款式编码，更美观
-        num_columns = 5
-        columns = st.columns(num_columns)
-        for i, code in enumerate(style_codes):
-            with columns[i % num_columns]:
-                st.info(code)
+        # 筛选在服务端完成，页面上只展示当前页，款式再多也不会拖慢浏览器
+        options = browser.options()
+        filter_columns = st.columns(3)
+        with filter_columns[0]:
+            waves = st.multiselect("波段", options=options[BomGenerator.WAVE_COL])
+        with filter_columns[1]:
+            categories = st.multiselect("品类", options=options['二级品类'])
+        with filter_columns[2]:
+            keyword = st.text_input("款式编码包含")
+        filtered_codes = browser.filter(waves=waves, categories=categories, keyword=keyword)
+        
+        page_size = 100
+        page_count = browser.page_count(filtered_codes, page_size)
+        page = st.number_input(f"页码（共 {page_count} 页，{len(filtered_codes)} 个款式）",
+                               min_value=1, max_value=page_count, step=1, key="preview_page_number") - 1
+        page_table = browser.page(filtered_codes, page, page_size)
+        page_table.insert(0, '选择', page_table[BomGenerator.STYLE_CODE_COL].isin(selected))
+        edited = st.data_editor(
+            page_table, hide_index=True, use_container_width=True,
+            disabled=[column for column in page_table.columns if column != '选择'],
+            # 整组选择后表格需要按新的选择重新显示，因此键中包含选择的版本号
+            key=f"preview_{upload_digest}_{st.session_state['selection_version']}_{page}_"
+                f"{'|'.join(waves)}_{'|'.join(categories)}_{keyword}"
+        )
+        # 只把当前页的勾选变化同步回选择集合
+        for code, checked in zip(edited[BomGenerator.STYLE_CODE_COL], edited['选择']):
+            if checked:
+                selected.add(code)
+            else:
+                selected.discard(code)
         
         st.write("---")
         st.header("3. 选择要生成的款式")
         
-        # 全选/全不选的逻辑
-        select_all = st.checkbox("全选所有款式")
+        # 按筛选结果整组选择，例如"秋四波 + 连衣裙"的全部款式
+        group_columns = st.columns(3)
+        with group_columns[0]:
+            if st.button(f"选中当前筛选结果（{len(filtered_codes)} 个）"):
+                selected.update(filtered_codes)
+                st.session_state['selection_version'] += 1
+                st.rerun()
+        with group_columns[1]:
+            if st.button("取消选中当前筛选结果"):
+                selected.difference_update(filtered_codes)
+                st.session_state['selection_version'] += 1
+                st.rerun()
+        with group_columns[2]:
+            if st.button("清空选择"):
+                selected.clear()
+                st.session_state['selection_version'] += 1
+                st.rerun()
         
-        if select_all:
-            selected_codes = st.multiselect(
-                "或取消选择不需要的款式:",
-                options=style_codes,
-                default=style_codes  # 默认全部选中
-            )
-        else:
-            selected_codes = st.multiselect(
-                "请选择一个或多个款式编码:",
-                options=style_codes
-            )
+        with st.expander("按 波段 × 品类 分组统计"):
+            groups = browser.group_counts(filtered_codes, selected=selected)
+            st.dataframe(groups, hide_index=True, use_container_width=True)
+        
+        # 生成顺序与明细表一致
+        selected_codes = [code for code in style_codes if code in selected]
         
         st.write("---")
         st.header("4. 批量生成BOM表")
@@ -74,47 +170,96 @@ if uploaded_file is not None:
         else:
             st.warning("请至少选择一个款式编码")
         
-        # 生成按钮
+        # 生成按钮：批次提交到进程级执行器排队，避免多个会话同时生成时互相拖慢
         if st.button("🚀 开始生成BOM表", type="primary", disabled=len(selected_codes) == 0):
             if not selected_codes:
                 st.warning("⚠️ 请至少选择一个款式编码再进行生成")
             else:
-                # 批量生成逻辑
-                with st.spinner(f"正在生成 {len(selected_codes)} 个BOM文件，请稍候..."):
-                    try:
-                        # 创建内存中的ZIP文件
-                        zip_buffer = io.BytesIO()
-                        
-                        with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
-                            # 进度条
-                            progress_bar = st.progress(0)
-                            
-                            for i, code in enumerate(selected_codes):
-                                # 生成单个BOM文件到内存
-                                excel_bytes = generator.generate_bom_file_to_buffer(code)
-                                
-                                # 添加到ZIP文件
-                                zip_file.writestr(f"{code}.xlsx", excel_bytes)
-                                
-                                # 更新进度条
-                                progress_bar.progress((i + 1) / len(selected_codes))
-                        
-                        # 将ZIP缓冲区指针移到开头
-                        zip_buffer.seek(0)
-                        
-                        st.success(f"✅ 成功生成 {len(selected_codes)} 个BOM文件！")
-                        
-                        # 提供下载按钮
-                        st.download_button(
-                            label="📥 点击下载BOM压缩包 (.zip)",
-                            data=zip_buffer.getvalue(),
-                            file_name="BOM_files.zip",
-                            mime="application/zip",
-                            type="primary"
-                        )
-                        
-                    except Exception as e:
-                        st.error(f"❌ 生成BOM文件时发生错误：{str(e)}")
+                # 运行中的上一批次在当前款式完成后停止，让出执行器的槽位
+                previous_job = st.session_state.get('render_job')
+                if previous_job is not None:
+                    previous_job.cancel()
+                render_codes = selected_codes
+                if cache is not None:
+                    # 取消未选中款式的预生成，尚未开始的选中款式改由正式任务渲染
+                    cache.retain(selected_codes)
+                    render_codes = cache.take_pending(selected_codes)
+                st.session_state['selected_for_zip'] = list(selected_codes)
+                st.session_state['bom_zip'] = None
+                # 页面在等待期间不断调用 job.wait；会话关闭后超过一分钟无人等待，批次自动取消
+                st.session_state['render_job'] = get_render_executor().submit(generator, render_codes,
+                                                                               abandon_after=60)
+        
+        job = st.session_state.get('render_job')
+        if job is not None and job.status == RenderJob.CANCELLED:
+            job = st.session_state['render_job'] = None
+        if job is not None:
+            status_placeholder = st.empty()
+            progress_bar = st.progress(0)
+            
+            # 等待期间显示排队位置和预计完成时间
+            while not job.wait(0.5):
+                eta = job.eta_seconds()
+                eta_text = f"预计 {eta:.0f} 秒后完成" if eta is not None else "正在估算完成时间"
+                position = job.position()
+                if position > 0:
+                    status_placeholder.info(f"⏳ 排队中：前面还有 {position} 个生成任务，{eta_text}")
+                else:
+                    status_placeholder.info(f"正在生成 {job.completed}/{job.total} 个BOM文件，{eta_text}")
+                progress_bar.progress(job.completed / job.total)
+            progress_bar.progress(1.0)
+            status_placeholder.empty()
+            
+            try:
+                # 任务完成后只打包一次（按选择顺序，已预生成的款式直接取自缓存），
+                # 之后翻页、筛选或点击下载引起的重新运行只重新显示下载按钮
+                zip_codes = st.session_state.get('selected_for_zip', job.style_codes)
+                failed = list(job.failed)
+                job_failed = {code for code, _ in failed}
+                written = 0
+                zip_buffer = io.BytesIO()
+                with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
+                    for code in zip_codes:
+                        data = job.results.get(code)
+                        if data is None and cache is not None:
+                            data = cache.get(code, timeout=60)
+                            if data is None and code in cache.errors:
+                                failed.append((code, cache.errors[code]))
+                                continue
+                        if data is None:
+                            if code not in job_failed:
+                                failed.append((code, "未取得生成结果，请重新生成"))
+                            continue
+                        zip_file.writestr(f"{code}.xlsx", data)
+                        written += 1
+                st.session_state['bom_zip'] = {
+                    'data': zip_buffer.getvalue() if written else None,
+                    'written': written,
+                    'failed': failed,
+                }
+            except Exception as e:
+                st.error(f"❌ 生成BOM文件时发生错误：{str(e)}")
+            # 渲染结果已打包（或已报告失败），不再保留在会话中；打包途中页面重新运行时
+            # 不会执行到这里，下一次运行会重新打包
+            job.results.clear()
+            st.session_state['render_job'] = None
+        
+        bom_zip = st.session_state.get('bom_zip')
+        if bom_zip is not None:
+            if bom_zip['written']:
+                st.success(f"✅ 成功生成 {bom_zip['written']} 个BOM文件！")
+            for code, error in bom_zip['failed']:
+                st.error(f"❌ {code}: {error}")
+            
+            if bom_zip['data'] is not None:
+                # 提供下载按钮
+                st.download_button(
+                    label="📥 点击下载BOM压缩包 (.zip)",
+                    data=bom_zip['data'],
+                    file_name="BOM_files.zip",
+                    mime="application/zip",
+                    type="primary"
+                )
                 
     except Exception as e:
         st.error(f"处理文件时发生错误：{e}")
@@ -0,0 +1,665 @@
+# 命令行入口
+#
+# 用法（在项目根目录下执行）：
+#   python -m src.cli diff 旧明细表.xlsx 新明细表.xlsx [--generate 输出目录]
+#   python -m src.cli watch 明细表.xlsx 输出目录 [--initial] [--poll]
+#   python -m src.cli catalog ingest 明细表1.xlsx 明细表2.xlsx ... [--db 索引库]
+#   python -m src.cli catalog find H5A123416 [--db 索引库]
+#   python -m src.cli catalog generate 输出目录 [--wave 秋四波] [--category 连衣裙] [--workers N] [--layout wave_category] [--db 索引库]
+#   python -m src.cli bom-index scan BOM目录 [--db 索引库]
+#   python -m src.cli bom-index query [--code ...] [--sku ...] [--color ...] [--db 索引库]
+#   python -m src.cli audit 明细表.xlsx BOM目录 [--workers N] [--json]
+#   python -m src.cli colors 明细表.xlsx
+#   python -m src.cli merge 一组明细表.xlsx 二组明细表.xlsx ... [--workers N] [--generate 输出目录] [--fail-on-conflict]
+#   python -m src.cli summary 明细表.xlsx [--output 概况.xlsx|概况.csv] [--max-colors 3]
+#   python -m src.cli sku 明细表.xlsx H5A41349215S ... [--file SKU列表.txt] [--csv]
+#   python -m src.cli book 明细表.xlsx 输出目录 [--wave 秋四波] [--split-category]
+#   python -m src.cli export 明细表.xlsx 输出文件|- [--format jsonl|csv] [--per style|sku]
+#   python -m src.cli jobs run 明细表.xlsx 输出目录 [--new] [--workers N] [--layout prefix] [--db 任务库]
+#   python -m src.cli jobs status [批次ID] [--db 任务库]
+#   python -m src.cli jobs retry 批次ID 明细表.xlsx [--code ...] [--db 任务库]
+#   python -m src.cli profile 明细表.xlsx [--limit N] [--top 10]
+#   python -m src.cli soak 明细表.xlsx [--iterations N | --duration 秒] [--batch-size 50]
+#   python -m src.cli backend-check 明细表.xlsx [--limit N]
+#   python -m src.cli serve [--port 8765] [--preload 明细表.xlsx ...]
+#   python -m src.cli benchmark [--styles 40] [--repetitions 5] [--baseline benchmarks/baseline.json] [--update-baseline]
+#
+# 全局选项（写在子命令之前）：--metrics-file / --metrics-port 导出 Prometheus 指标，
+# --backend xlsxwriter 改用 xlsxwriter 写出BOM文件
+
+import argparse
+import json
+import os
+import sys
+from typing import List, Optional
+
+from .core import metrics
+from .core.audit import audit_output_dir, format_audit_report
+from .core.benchmark import (DEFAULT_BASELINE, DEFAULT_TOLERANCE, compare_to_baseline,
+                             load_baseline, run_benchmark, save_baseline)
+from .core.bom_book import generate_bom_books
+from .core.bom_export import FORMATS, GRANULARITIES, export_bom_data
+from .core.bom_generator import BomGenerator
+from .core.catalog_diff import diff_catalogs, format_diff_report
+from .core.bom_index import BomFileIndex
+from .core.bom_service import BomService
+from .core.catalog_index import CatalogIndex, file_sha256
+from .core.catalog_summary import DEFAULT_MAX_COLORS, export_summary, summary_table
+from .core.job_store import JobStore, run_batch
+from .core.memory_profile import StageProfiler, profile_render, run_soak
+from .core.output_layout import LAYOUTS, init_output_layout
+from .core.sku_decoder import SkuDecoder
+from .core.xlsx_backend import BACKENDS, compare_backends
+from .core.watcher import BomWatcher
+
+
+def _print_batch_report(report: dict) -> None:
+    """打印批量生成报告"""
+    print(f"成功生成 {len(report['success'])}/{report['total']} 个BOM文件"
+          f"（渲染 {report['render_seconds']:.1f} 秒，写盘 {report['write_seconds']:.1f} 秒）")
+    for code, error in report['failed']:
+        print(f"失败 {code}: {error}")
+
+
+def _use_backend(generator: BomGenerator, args: argparse.Namespace) -> BomGenerator:
+    """让本次命令创建的生成器使用 --backend 指定的写出后端（未指定时沿用生成器的默认值）"""
+    if args.backend:
+        generator.backend = args.backend
+    return generator
+
+
+def _cmd_diff(args: argparse.Namespace) -> int:
+    """diff 子命令：对比两个版本的明细表，可选只重新生成变化的款式"""
+    old = BomGenerator(args.old)
+    new = _use_backend(BomGenerator(args.new), args)
+    diff = diff_catalogs(old, new)
+
+    if args.json:
+        modified = {
+            code: {field: list(values) for field, values in changes.items()}
+            for code, changes in diff['modified'].items()
+        }
+        print(json.dumps(dict(diff, modified=modified), ensure_ascii=False, indent=2))
+    else:
+        print("\n".join(format_diff_report(diff)))
+
+    if args.generate:
+        report = new.generate_bom_files(diff['changed'], args.generate, max_workers=args.workers)
+        _print_batch_report(report)
+        return 1 if report['failed'] else 0
+    return 0
+
+
+def _cmd_watch(args: argparse.Namespace) -> int:
+    """watch 子命令：监视源文件和资源文件，变化时只重新生成受影响的款式"""
+    generator = _use_backend(BomGenerator(args.source), args)
+    if args.initial:
+        _print_batch_report(generator.generate_bom_files(generator.get_all_style_codes(), args.output_dir))
+
+    def on_report(report: dict) -> None:
+        if 'error' in report:
+            print(f"[{'/'.join(report['changes'])}] 处理失败: {report['error']}", file=sys.stderr)
+            return
+        print(f"[{'/'.join(report['changes'])}] 受影响款式 {len(report['affected'])} 个")
+        if report['batch'] is not None:
+            _print_batch_report(report['batch'])
+
+    watcher = BomWatcher(generator, args.source, args.output_dir,
+                         debounce_seconds=args.debounce, poll_interval=args.poll_interval,
+                         use_inotify=not args.poll, on_report=on_report)
+    print(f"正在监视（{'inotify' if watcher.uses_inotify else '轮询'}），按 Ctrl+C 退出...")
+    try:
+        watcher.run()
+    except KeyboardInterrupt:
+        watcher.stop()
+    return 0
+
+
+def _cmd_catalog_ingest(args: argparse.Namespace) -> int:
+    """catalog ingest 子命令：导入明细表到目录索引（内容未变化的文件跳过）"""
+    with CatalogIndex(args.db) as catalog:
+        for path in args.sources:
+            result = catalog.ingest(path, season=args.season)
+            status = '未变化，跳过' if result['skipped'] else '已导入'
+            print(f"{status}: {result['path']}（{result['season']}，{result['styles']} 款）")
+    return 0
+
+
+def _cmd_catalog_find(args: argparse.Namespace) -> int:
+    """catalog find 子命令：查询款式编码所在的季节和文件"""
+    with CatalogIndex(args.db) as catalog:
+        rows = catalog.find_style(args.style_code)
+    if not rows:
+        print(f"错误：目录索引中未找到款式编码 '{args.style_code}'。", file=sys.stderr)
+        return 1
+    for row in rows:
+        print("  ".join(str(value) for value in row.values()))
+    return 0
+
+
+def _cmd_catalog_generate(args: argparse.Namespace) -> int:
+    """catalog generate 子命令：按查询条件从目录索引直接批量生成BOM"""
+    with CatalogIndex(args.db) as catalog:
+        generator = _use_backend(BomGenerator.from_catalog(catalog, style_codes=args.code, waves=args.wave,
+                                                           categories=args.category, seasons=args.season), args)
+    style_codes = generator.get_all_style_codes()
+    if not style_codes:
+        print("没有符合条件的款式。", file=sys.stderr)
+        return 1
+    init_output_layout(args.output_dir, args.layout, args.prefix_length)
+    report = generator.generate_bom_files(style_codes, args.output_dir, max_workers=args.workers)
+    _print_batch_report(report)
+    return 1 if report['failed'] else 0
+
+
+def _cmd_bom_index_scan(args: argparse.Namespace) -> int:
+    """bom-index scan 子命令：并行扫描已生成的BOM文件并更新索引"""
+    with BomFileIndex(args.db) as index:
+        result = index.scan(args.directory, max_workers=args.workers)
+    print(f"共 {result['scanned']} 个文件：更新 {result['updated']}，未变化 {result['unchanged']}，"
+          f"移除 {result['removed']}")
+    for path, error in result['errors']:
+        print(f"无法读取 {path}: {error}", file=sys.stderr)
+    return 0
+
+
+def _cmd_bom_index_query(args: argparse.Namespace) -> int:
+    """bom-index query 子命令：按款式/SKU/颜色/波段/品类查询已生成的BOM文件"""
+    with BomFileIndex(args.db) as index:
+        result = index.query(style_code=args.code, sku=args.sku, color=args.color,
+                             wave=args.wave, category=args.category)
+    if args.csv:
+        print(result.to_csv(index=False), end='')
+    else:
+        print(result.to_string(index=False) if not result.empty else "没有匹配的BOM文件。")
+    return 0
+
+
+def _cmd_audit(args: argparse.Namespace) -> int:
+    """audit 子命令：按当前明细表和颜色配置审计输出目录，发现问题时返回1"""
+    generator = _use_backend(BomGenerator(args.source), args)
+    result = audit_output_dir(generator, args.output_dir, max_workers=args.workers)
+    if args.json:
+        print(json.dumps(result, ensure_ascii=False, indent=2))
+    else:
+        print("\n".join(format_audit_report(result)))
+    problems = (result['mismatched'] or result['missing'] or result['orphans']
+                or result['errors'] or result['catalog_errors'])
+    return 1 if problems else 0
+
+
+def _cmd_colors(args: argparse.Namespace) -> int:
+    """colors 子命令：一次列出全部无法匹配颜色代码表的开发颜色，存在时返回1"""
+    color_errors = BomGenerator(args.source).get_color_errors()
+    for code, colors in color_errors.items():
+        print(f"{code}: {'、'.join(colors)}")
+    print(f"共 {len(color_errors)} 个款式的开发颜色无法匹配。" if color_errors else "全部开发颜色均可匹配。")
+    return 1 if color_errors else 0
+
+
+def _cmd_merge(args: argparse.Namespace) -> int:
+    """merge 子命令：并行读取多个明细表并合并，列出跨文件重复的款式编码，可选直接生成"""
+    generator = _use_backend(BomGenerator.from_sources(args.sources, max_workers=args.workers), args)
+    styles = generator.df.dropna(subset=[BomGenerator.STYLE_CODE_COL])
+    for source, count in styles.groupby(BomGenerator.SOURCE_FILE_COL, sort=False).size().items():
+        print(f"{source}: {count} 行")
+    conflicts = generator.get_source_conflicts()
+    fields = [BomGenerator.WAVE_COL, BomGenerator.CATEGORY_COL, BomGenerator.DEV_COLOR_COL]
+    for code, entries in conflicts.items():
+        differs = len({tuple(str(entry[field]) for field in fields) for entry in entries}) > 1
+        print(f"重复 {code}{'（内容不同）' if differs else ''}，以 {entries[0][BomGenerator.SOURCE_FILE_COL]} 为准：")
+        for entry in entries:
+            print(f"  {entry[BomGenerator.SOURCE_FILE_COL]}: " + " / ".join(str(entry[field]) for field in fields))
+    print(f"合并后共 {len(generator.get_all_style_codes())} 个款式，"
+          f"{len(conflicts)} 个款式编码出现在多个文件中")
+
+    if args.generate:
+        report = generator.generate_bom_files(generator.get_all_style_codes(), args.generate,
+                                              max_workers=args.workers)
+        _print_batch_report(report)
+        if report['failed']:
+            return 1
+    # 重复的款式编码已按"以前面的文件为准"合并并列出，默认不视为失败
+    return 1 if conflicts and args.fail_on_conflict else 0
+
+
+def _cmd_summary(args: argparse.Namespace) -> int:
+    """summary 子命令：按波段、品类统计款式数、颜色数、SKU数和多色款式，不加载模板"""
+    summary = BomGenerator(args.source).summarize(max_colors=args.max_colors)
+    if args.output:
+        export_summary(summary, args.output)
+        print(f"已导出到 {args.output}", file=sys.stderr)
+    else:
+        print(summary_table(summary).astype(object).fillna('').to_string(index=False))
+    return 0
+
+
+def _cmd_sku(args: argparse.Namespace) -> int:
+    """sku 子命令：把SKU拆回款式编码、颜色和尺码，存在无法解析的SKU时返回1"""
+    skus = list(args.skus)
+    if args.file:
+        with open(args.file, encoding='utf-8') as f:
+            skus += [line.strip() for line in f if line.strip()]
+    if not skus:
+        print("错误：请提供SKU或 --file。", file=sys.stderr)
+        return 2
+
+    result = SkuDecoder(BomGenerator(args.source)).decode_many(skus)
+    if args.csv:
+        print(result.to_csv(index=False), end='')
+    else:
+        print(result.fillna('').to_string(index=False))
+    return 0 if (result['状态'] == SkuDecoder.STATUS_OK).all() else 1
+
+
+def _cmd_book(args: argparse.Namespace) -> int:
+    """book 子命令：按波段（可选再按品类）生成BOM册，每个款式一个工作表"""
+    generator = BomGenerator(args.source)
+    style_codes = generator.get_all_style_codes()
+    if args.wave:
+        waves = set(args.wave)
+        style_codes = [code for code in style_codes
+                       if str(generator.derived_table.at[code, BomGenerator.WAVE_COL]) in waves]
+    report = generate_bom_books(generator, style_codes, args.output_dir, split_by_category=args.split_category)
+    for file_name, codes in report['books'].items():
+        print(f"{file_name}: {len(codes)} 个款式")
+    for code, error in report['failed']:
+        print(f"失败 {code}: {error}")
+    print(f"共 {len(report['books'])} 册，成功 {len(report['success'])}/{report['total']} 个款式"
+          f"（耗时 {report['elapsed_seconds']:.1f} 秒）")
+    return 1 if report['failed'] else 0
+
+
+def _cmd_export(args: argparse.Namespace) -> int:
+    """export 子命令：不生成xlsx，直接把BOM数据流式导出为 JSON Lines 或 CSV"""
+    generator = BomGenerator(args.source)
+    style_codes = generator.get_all_style_codes()
+    if args.output == '-':
+        result = export_bom_data(generator, style_codes, sys.stdout, fmt=args.format, granularity=args.per)
+    else:
+        with open(args.output, 'w', encoding='utf-8', newline='') as output:
+            result = export_bom_data(generator, style_codes, output, fmt=args.format, granularity=args.per)
+    for code, error in result['failed']:
+        print(f"失败 {code}: {error}", file=sys.stderr)
+    print(f"导出 {result['styles']} 个款式，共 {result['rows']} 行", file=sys.stderr)
+    return 1 if result['failed'] else 0
+
+
+def _mb(value: int) -> str:
+    return f"{value / 1024 / 1024:+.1f}MB"
+
+
+def _cmd_profile(args: argparse.Namespace) -> int:
+    """profile 子命令：用 tracemalloc 按阶段统计加载明细表和渲染款式的内存分配"""
+    with StageProfiler(frames=args.frames) as profiler:
+        with profiler.stage('catalog_load'):
+            generator = BomGenerator(args.source)
+        style_codes = generator.get_all_style_codes()[:args.limit]
+        report = profile_render(generator, style_codes, profiler)
+        top_growth = profiler.top_growth(args.top)
+    print(f"{'阶段':<14}{'次数':>6}{'净增内存':>12}{'峰值增量':>12}")
+    for stage, stats in report.items():
+        print(f"{stage:<14}{stats['calls']:>6}{_mb(stats['net_bytes']):>12}{_mb(stats['peak_bytes']):>12}")
+    print("\n净增内存最多的位置：")
+    for item in top_growth:
+        print(f"{_mb(item['size_bytes']):>10} {item['count']:>+8} 个  {item['location']}")
+    return 0
+
+
+def _cmd_soak(args: argparse.Namespace) -> int:
+    """soak 子命令：反复加载和渲染，内存增长超过阈值时退出码为1"""
+    def report_iteration(record: dict) -> None:
+        rss = f"{record['rss_bytes'] / 1024 / 1024:.1f}MB" if record['rss_bytes'] is not None else '未知'
+        growth = ''
+        if record['object_growth'] is not None:
+            rss_growth = _mb(record['rss_growth_bytes']) if record['rss_growth_bytes'] is not None else '未知'
+            growth = f"，较基线 内存 {rss_growth} 对象 {record['object_growth']:+d}"
+        print(f"第 {record['iteration']} 轮：{record['styles']} 个款式 {record['seconds']:.1f} 秒，"
+              f"内存 {rss}，对象 {record['objects']}{growth}", flush=True)
+
+    result = run_soak(args.source, iterations=args.iterations, duration_seconds=args.duration,
+                      batch_size=args.batch_size, warmup=args.warmup,
+                      max_rss_growth_mb=args.max_rss_growth, max_object_growth=args.max_object_growth,
+                      trace=args.trace, iteration_callback=report_iteration, backend=args.backend)
+    for item in result['top_growth']:
+        print(f"{_mb(item['size_bytes']):>10} {item['count']:>+8} 个  {item['location']}")
+    print("通过：内存增长在阈值内" if result['passed'] else "失败：内存增长超过阈值")
+    return 0 if result['passed'] else 1
+
+
+def _cmd_backend_check(args: argparse.Namespace) -> int:
+    """backend-check 子命令：用两个写出后端分别生成并逐项比较，验证 xlsxwriter 后端"""
+    generator = BomGenerator(args.source)
+    style_codes = generator.get_all_style_codes()[:args.limit]
+    differences = compare_backends(generator, style_codes)
+    for code, problems in differences.items():
+        for problem in problems:
+            print(f"{code} {problem}")
+    mismatched = sum(1 for problems in differences.values() if problems)
+    print(f"比较 {len(differences)} 个款式，{mismatched} 个与 openpyxl 输出不一致")
+    return 1 if mismatched else 0
+
+
+def _cmd_serve(args: argparse.Namespace) -> int:
+    """serve 子命令：启动本地HTTP生成服务，接口见 bom_service._Handler"""
+    service = BomService(max_catalogs=args.max_catalogs, backend=args.backend)
+    for source in args.preload or []:
+        result = service.add_catalog_path(source)
+        print(f"已加载 {source}：{result['styles']} 个款式，catalog_id={result['catalog_id']}")
+    server = service.serve(args.host, args.port)
+    print(f"BOM生成服务运行在 http://{args.host}:{server.server_address[1]}（Ctrl+C 停止）")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+def _cmd_benchmark(args: argparse.Namespace) -> int:
+    """benchmark 子命令：运行端到端基准，与基线比较，有阶段明显变慢时返回1"""
+    def report_run(index: int, total: int, is_warmup: bool, timings: dict) -> None:
+        label = '预热' if is_warmup else '计时'
+        print(f"第 {index + 1}/{total} 次（{label}）：整批 {timings['batch']:.2f} 秒", flush=True)
+
+    result = run_benchmark(styles=args.styles, repetitions=args.repetitions, warmup=args.warmup,
+                           cpu=args.cpu, progress_callback=None if args.json else report_run,
+                           backend=args.backend)
+    if args.update_baseline:
+        save_baseline(result, args.baseline)
+        comparison = {'stages': {}, 'regressions': []}
+    else:
+        comparison = compare_to_baseline(result, load_baseline(args.baseline), args.tolerance)
+
+    if args.json:
+        print(json.dumps({'result': result, 'comparison': comparison}, ensure_ascii=False, indent=2))
+    else:
+        print(f"{'阶段':<14}{'中位数':>10}{'基线':>10}{'变化':>9}")
+        for stage, seconds in result['stages'].items():
+            compared = comparison['stages'].get(stage)
+            baseline = f"{compared['baseline']:.3f}s" if compared else '-'
+            change = f"{compared['change']:+.0%}" if compared else '-'
+            print(f"{stage:<16}{seconds:>9.3f}s{baseline:>11}{change:>10}")
+        print(f"吞吐量 {result['throughput']:.1f} 款/秒（{args.styles} 个款式，{args.repetitions} 次取中位数）")
+        if args.update_baseline:
+            print(f"已更新基线：{args.baseline}")
+        for regression in comparison['regressions']:
+            print(f"退化 {regression}")
+        if not args.update_baseline:
+            print("失败：性能明显低于基线" if comparison['regressions'] else "通过：与基线相比无明显退化")
+    return 1 if comparison['regressions'] else 0
+
+
+def _print_job_result(result: dict) -> None:
+    """打印任务队列的运行结果"""
+    progress = result['progress']
+    print(f"批次 {result['batch_id']}：本次完成 {len(result['success'])} 个，"
+          f"累计完成 {progress['done']}/{progress['total']}，失败 {progress['failed']}")
+    for code, error in result['failed']:
+        print(f"失败 {code}: {error}")
+
+
+def _job_progress(i: int, total: int, style_code: str) -> None:
+    print(f"[{i + 1}/{total}] {style_code}", file=sys.stderr)
+
+
+def _cmd_jobs_run(args: argparse.Namespace) -> int:
+    """jobs run 子命令：按任务队列生成，自动恢复同一明细表和输出目录下未完成的批次"""
+    generator = _use_backend(BomGenerator(args.source), args)
+    # 布局写入输出目录的索引，恢复批次和 jobs retry 时自动沿用
+    init_output_layout(args.output_dir, args.layout, args.prefix_length)
+    with JobStore(args.db) as store:
+        batch = store.open_batch(generator.get_all_style_codes(), args.output_dir,
+                                 source_sha256=file_sha256(args.source),
+                                 source_path=os.path.abspath(args.source), resume=not args.new)
+        if batch['resumed']:
+            progress = store.progress(batch['batch_id'])
+            print(f"恢复批次 {batch['batch_id']}：已完成 {progress['done']}/{progress['total']}，"
+                  f"重新排队 {batch['requeued']} 个中断的款式", file=sys.stderr)
+        result = run_batch(generator, store, batch['batch_id'], progress_callback=_job_progress,
+                           claim_size=args.claim_size, max_workers=args.workers)
+    _print_job_result(result)
+    return 1 if result['progress']['failed'] else 0
+
+
+def _cmd_jobs_status(args: argparse.Namespace) -> int:
+    """jobs status 子命令：列出批次进度，或某个批次的失败款式"""
+    with JobStore(args.db) as store:
+        if args.batch_id is None:
+            for batch in store.list_batches():
+                print(f"{batch['id']}  {batch['created_at']}  {batch['output_dir']}  "
+                      f"完成 {batch['done']}/{batch['total']}  失败 {batch['failed']}  "
+                      f"待处理 {batch['pending'] + batch['running']}")
+            return 0
+        store.get_batch(args.batch_id)
+        progress = store.progress(args.batch_id)
+        print("  ".join(f"{state}: {count}" for state, count in progress.items()))
+        for code, error in store.failures(args.batch_id):
+            print(f"失败 {code}: {error}")
+    return 0
+
+
+def _cmd_jobs_retry(args: argparse.Namespace) -> int:
+    """jobs retry 子命令：只重新生成批次中失败的款式"""
+    generator = _use_backend(BomGenerator(args.source), args)
+    with JobStore(args.db) as store:
+        store.get_batch(args.batch_id)
+        print(f"重新排队 {store.retry_failed(args.batch_id, args.code)} 个失败的款式", file=sys.stderr)
+        result = run_batch(generator, store, args.batch_id, progress_callback=_job_progress,
+                           claim_size=args.claim_size, max_workers=args.workers)
+    _print_job_result(result)
+    return 1 if result['progress']['failed'] else 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """构建命令行参数解析器"""
+    parser = argparse.ArgumentParser(prog='python -m src.cli', description='BOM表自动生成工具命令行')
+    parser.add_argument('--metrics-file', metavar='PATH',
+                        help='每个批次结束后写入 Prometheus textfile 指标的文件（或设置 BOM_METRICS_TEXTFILE）')
+    parser.add_argument('--metrics-port', type=int, metavar='PORT',
+                        help='在 127.0.0.1:PORT/metrics 提供指标（或设置 BOM_METRICS_PORT）')
+    parser.add_argument('--backend', choices=BACKENDS,
+                        help='BOM文件的写出后端，默认 openpyxl（或设置 BOM_WRITE_BACKEND）')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    diff_parser = subparsers.add_parser('diff', help='对比两个版本的明细表')
+    diff_parser.add_argument('old', help='旧版本明细表路径')
+    diff_parser.add_argument('new', help='新版本明细表路径')
+    diff_parser.add_argument('--json', action='store_true', help='以JSON格式输出差异')
+    diff_parser.add_argument('--generate', metavar='OUTPUT_DIR',
+                             help='只为新增和修改的款式重新生成BOM到该目录')
+    diff_parser.add_argument('--workers', type=int, help='并行生成的进程数，默认在当前进程生成')
+    diff_parser.set_defaults(func=_cmd_diff)
+
+    watch_parser = subparsers.add_parser('watch', help='监视源文件与模板，变化时自动重新生成')
+    watch_parser.add_argument('source', help='明细表路径')
+    watch_parser.add_argument('output_dir', help='BOM输出目录')
+    watch_parser.add_argument('--initial', action='store_true', help='启动时先生成全部款式')
+    watch_parser.add_argument('--debounce', type=float, default=2.0, help='合并连续保存的静默时间（秒）')
+    watch_parser.add_argument('--poll', action='store_true', help='强制使用轮询（网络共享盘上推荐）')
+    watch_parser.add_argument('--poll-interval', type=float, default=1.0, help='轮询间隔（秒）')
+    watch_parser.set_defaults(func=_cmd_watch)
+
+    catalog_parser = subparsers.add_parser('catalog', help='多季节明细表目录索引')
+    catalog_parser.add_argument('--db', default='bom_catalog.sqlite3', help='索引数据库路径')
+    catalog_subparsers = catalog_parser.add_subparsers(dest='catalog_command', required=True)
+
+    ingest_parser = catalog_subparsers.add_parser('ingest', help='导入明细表文件')
+    ingest_parser.add_argument('sources', nargs='+', help='明细表路径')
+    ingest_parser.add_argument('--season', help='季节标签，默认为文件名')
+    ingest_parser.set_defaults(func=_cmd_catalog_ingest)
+
+    find_parser = catalog_subparsers.add_parser('find', help='查询款式编码所在的季节和文件')
+    find_parser.add_argument('style_code', help='款式编码')
+    find_parser.set_defaults(func=_cmd_catalog_find)
+
+    catalog_generate_parser = catalog_subparsers.add_parser('generate', help='按条件批量生成BOM')
+    catalog_generate_parser.add_argument('output_dir', help='BOM输出目录')
+    for option, help_text in (('--code', '款式编码'), ('--wave', '波段'),
+                              ('--category', '品类'), ('--season', '季节标签')):
+        catalog_generate_parser.add_argument(option, action='append', help=f'{help_text}，可重复指定')
+    catalog_generate_parser.add_argument('--workers', type=int, help='并行生成的进程数，默认在当前进程生成')
+    catalog_generate_parser.set_defaults(func=_cmd_catalog_generate)
+
+    bom_index_parser = subparsers.add_parser('bom-index', help='已生成BOM文件的检索索引')
+    bom_index_parser.add_argument('--db', default='bom_files.sqlite3', help='索引数据库路径')
+    bom_index_subparsers = bom_index_parser.add_subparsers(dest='bom_index_command', required=True)
+
+    scan_parser = bom_index_subparsers.add_parser('scan', help='增量扫描BOM目录')
+    scan_parser.add_argument('directory', help='BOM目录（包含子目录）')
+    scan_parser.add_argument('--workers', type=int, help='读取文件的进程数，默认为CPU核数')
+    scan_parser.set_defaults(func=_cmd_bom_index_scan)
+
+    query_parser = bom_index_subparsers.add_parser('query', help='查询BOM文件')
+    query_parser.add_argument('--code', help='款式编码')
+    query_parser.add_argument('--sku', help='规格码')
+    query_parser.add_argument('--color', help='颜色名称')
+    query_parser.add_argument('--wave', help='波段')
+    query_parser.add_argument('--category', help='品类')
+    query_parser.add_argument('--csv', action='store_true', help='以CSV格式输出')
+    query_parser.set_defaults(func=_cmd_bom_index_query)
+
+    audit_parser = subparsers.add_parser('audit', help='审计已生成的BOM是否与明细表和颜色配置一致')
+    audit_parser.add_argument('source', help='明细表路径')
+    audit_parser.add_argument('output_dir', help='BOM输出目录（包含子目录）')
+    audit_parser.add_argument('--workers', type=int, help='读取文件的进程数，默认为CPU核数')
+    audit_parser.add_argument('--json', action='store_true', help='以JSON格式输出审计结果')
+    audit_parser.set_defaults(func=_cmd_audit)
+
+    colors_parser = subparsers.add_parser('colors', help='检查明细表中无法匹配颜色代码表的开发颜色')
+    colors_parser.add_argument('source', help='明细表路径')
+    colors_parser.set_defaults(func=_cmd_colors)
+
+    merge_parser = subparsers.add_parser('merge', help='并行读取多个明细表并合并，检查跨文件重复的款式编码')
+    merge_parser.add_argument('sources', nargs='+', help='明细表路径，重复的款式以排在前面的文件为准')
+    merge_parser.add_argument('--workers', type=int,
+                              help='读取文件的进程数，默认为CPU核数；--generate 时也作为并行生成的进程数')
+    merge_parser.add_argument('--generate', metavar='OUTPUT_DIR', help='合并后为全部款式生成BOM到该目录')
+    merge_parser.add_argument('--fail-on-conflict', action='store_true',
+                              help='有款式编码出现在多个文件中时退出码为1（用于CI检查）')
+    merge_parser.set_defaults(func=_cmd_merge)
+
+    summary_parser = subparsers.add_parser('summary', help='按波段、品类统计款式数、颜色数和SKU数')
+    summary_parser.add_argument('source', help='明细表路径')
+    summary_parser.add_argument('--output', help='导出到文件，按扩展名为 .xlsx 或 .csv；省略时打印到终端')
+    summary_parser.add_argument('--max-colors', type=int, default=DEFAULT_MAX_COLORS,
+                                help='颜色数超过该值的款式列为多色款式')
+    summary_parser.set_defaults(func=_cmd_summary)
+
+    sku_parser = subparsers.add_parser('sku', help='把SKU拆回款式编码、颜色和尺码')
+    sku_parser.add_argument('source', help='明细表路径')
+    sku_parser.add_argument('skus', nargs='*', help='SKU')
+    sku_parser.add_argument('--file', help='SKU列表文件，每行一个')
+    sku_parser.add_argument('--csv', action='store_true', help='以CSV格式输出')
+    sku_parser.set_defaults(func=_cmd_sku)
+
+    book_parser = subparsers.add_parser('book', help='按波段生成BOM册（一个工作簿，每个款式一个工作表）')
+    book_parser.add_argument('source', help='明细表路径')
+    book_parser.add_argument('output_dir', help='输出目录')
+    book_parser.add_argument('--wave', action='append', help='只生成该波段，可重复指定')
+    book_parser.add_argument('--split-category', action='store_true', help='在波段内再按品类分册')
+    book_parser.set_defaults(func=_cmd_book)
+
+    export_parser = subparsers.add_parser('export', help='不生成xlsx，把BOM数据导出为 JSON Lines 或 CSV')
+    export_parser.add_argument('source', help='明细表路径')
+    export_parser.add_argument('output', help='输出文件路径，- 表示标准输出')
+    export_parser.add_argument('--format', choices=FORMATS, default='jsonl', help='导出格式')
+    export_parser.add_argument('--per', choices=GRANULARITIES, default='style', help='每个款式一行或每个SKU一行')
+    export_parser.set_defaults(func=_cmd_export)
+
+    profile_parser = subparsers.add_parser('profile', help='按渲染阶段统计内存分配（tracemalloc）')
+    profile_parser.add_argument('source', help='明细表路径')
+    profile_parser.add_argument('--limit', type=int, default=50, help='渲染的款式数')
+    profile_parser.add_argument('--top', type=int, default=10, help='列出净增内存最多的代码位置数')
+    profile_parser.add_argument('--frames', type=int, default=1, help='记录的调用栈深度')
+    profile_parser.set_defaults(func=_cmd_profile)
+
+    soak_parser = subparsers.add_parser('soak', help='长时间反复加载和渲染，检查内存是否持续增长')
+    soak_parser.add_argument('source', help='明细表路径')
+    soak_parser.add_argument('--iterations', type=int, help='轮数（含预热轮），默认10')
+    soak_parser.add_argument('--duration', type=float, help='运行时长（秒），如 14400 表示4小时')
+    soak_parser.add_argument('--batch-size', type=int, default=50, help='每轮渲染的款式数')
+    soak_parser.add_argument('--warmup', type=int, default=2, help='预热轮数，不计入增长')
+    soak_parser.add_argument('--max-rss-growth', type=float, default=50.0, help='允许的常驻内存增长（MB）')
+    soak_parser.add_argument('--max-object-growth', type=int, default=20000, help='允许的存活对象数增长')
+    soak_parser.add_argument('--trace', action='store_true', help='开启 tracemalloc 定位增长来源（较慢）')
+    soak_parser.set_defaults(func=_cmd_soak)
+
+    backend_check_parser = subparsers.add_parser('backend-check', help='验证 xlsxwriter 后端与 openpyxl 输出一致')
+    backend_check_parser.add_argument('source', help='明细表路径')
+    backend_check_parser.add_argument('--limit', type=int, default=50, help='比较的款式数')
+    backend_check_parser.set_defaults(func=_cmd_backend_check)
+
+    serve_parser = subparsers.add_parser('serve', help='启动本地HTTP生成服务（明细表和模板常驻内存）')
+    serve_parser.add_argument('--host', default='127.0.0.1', help='监听地址')
+    serve_parser.add_argument('--port', type=int, default=8765, help='监听端口')
+    serve_parser.add_argument('--max-catalogs', type=int, default=4, help='缓存的明细表个数上限')
+    serve_parser.add_argument('--preload', action='append', help='启动时预先加载的明细表，可重复指定')
+    serve_parser.set_defaults(func=_cmd_serve)
+
+    benchmark_parser = subparsers.add_parser('benchmark', help='端到端性能基准，与仓库中的基线比较')
+    benchmark_parser.add_argument('--styles', type=int, default=40, help='合成明细表的款式数')
+    benchmark_parser.add_argument('--repetitions', type=int, default=5, help='计时运行次数，取中位数')
+    benchmark_parser.add_argument('--warmup', type=int, default=1, help='预热次数，不计入结果')
+    benchmark_parser.add_argument('--baseline', default=DEFAULT_BASELINE, help='基线文件路径')
+    benchmark_parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                                  help='允许的相对变慢比例，如 0.25 表示慢 25%% 以内视为正常')
+    benchmark_parser.add_argument('--update-baseline', action='store_true', help='用本次结果覆盖基线文件，不做比较')
+    benchmark_parser.add_argument('--cpu', type=int, help='把进程固定在该编号的CPU上运行（仅Linux）')
+    benchmark_parser.add_argument('--json', action='store_true', help='以JSON格式输出结果和比较')
+    benchmark_parser.set_defaults(func=_cmd_benchmark)
+
+    jobs_parser = subparsers.add_parser('jobs', help='可恢复的批量生成任务队列')
+    jobs_parser.add_argument('--db', default='bom_jobs.sqlite3', help='任务数据库路径')
+    jobs_subparsers = jobs_parser.add_subparsers(dest='jobs_command', required=True)
+
+    jobs_run_parser = jobs_subparsers.add_parser('run', help='生成全部款式，中断后再次运行会从停下的位置继续')
+    jobs_run_parser.add_argument('source', help='明细表路径')
+    jobs_run_parser.add_argument('output_dir', help='BOM输出目录')
+    jobs_run_parser.add_argument('--new', action='store_true', help='不恢复未完成的批次，总是新建批次')
+    jobs_run_parser.set_defaults(func=_cmd_jobs_run)
+
+    jobs_status_parser = jobs_subparsers.add_parser('status', help='查看批次进度和失败款式')
+    jobs_status_parser.add_argument('batch_id', type=int, nargs='?', help='批次ID，省略时列出全部批次')
+    jobs_status_parser.set_defaults(func=_cmd_jobs_status)
+
+    jobs_retry_parser = jobs_subparsers.add_parser('retry', help='只重新生成失败的款式')
+    jobs_retry_parser.add_argument('batch_id', type=int, help='批次ID')
+    jobs_retry_parser.add_argument('source', help='明细表路径')
+    jobs_retry_parser.add_argument('--code', action='append', help='只重试该款式编码，可重复指定')
+    jobs_retry_parser.set_defaults(func=_cmd_jobs_retry)
+
+    for parser_with_workers in (jobs_run_parser, jobs_retry_parser):
+        parser_with_workers.add_argument('--claim-size', type=int, default=20, help='每次领取的款式数')
+        parser_with_workers.add_argument('--workers', type=int, help='并行生成的进程数，默认在当前进程生成')
+
+    for parser_with_layout in (catalog_generate_parser, jobs_run_parser):
+        parser_with_layout.add_argument('--layout', choices=LAYOUTS,
+                                        help='输出目录布局：按波段/品类或编码前缀分子目录，并维护索引 bom_index.json；'
+                                             '默认沿用目录已有的布局')
+        parser_with_layout.add_argument('--prefix-length', type=int, help='prefix 布局的编码前缀长度，默认5')
+
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """命令行主函数
+
+    Args:
+        argv (Optional[List[str]]): 命令行参数，默认读取 sys.argv
+
+    Returns:
+        int: 进程退出码
+    """
+    args = build_parser().parse_args(argv)
+    try:
+        metrics.configure(textfile_path=args.metrics_file, port=args.metrics_port)
+        return args.func(args)
+    except (ValueError, FileNotFoundError, PermissionError) as e:
+        print(str(e), file=sys.stderr)
+        return 2
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,206 @@
+# 已生成BOM文件与源明细表的批量一致性审计
+
+from typing import Dict, Any, List, Optional, Iterable, Tuple
+from concurrent.futures import ProcessPoolExecutor
+import os
+
+import openpyxl
+
+from .bom_generator import BomGenerator, resource_path
+from .bom_index import list_bom_files, read_cell_values
+from .output_layout import OutputIndex
+
+
+def _audited_addresses(generator: BomGenerator) -> List[str]:
+    """生成器可能写入的全部单元格地址（不含随生成时间变化的建单日期J2）"""
+    config = generator.CELL_CONFIG
+    addresses = [config[key] for key in ('style_code', 'order_type', 'designer', 'product_name_b4',
+                                         'wave_info', 'primary_category', 'secondary_category')]
+    for block in generator.PRESET_COLOR_BLOCKS:
+        addresses.append(block['color_cell'])
+        addresses += [f"{column}{block['sku_row']}" for column in generator.SKU_COLUMNS]
+    return addresses
+
+
+def _template_layout(template_path: str, addresses: List[str]
+                     ) -> Tuple[Dict[str, str], Dict[str, Optional[str]]]:
+    """读取模板中各地址实际落点（合并区域左上角）及模板原有的值
+
+    与 BomGenerator._write_to_cell 一致：写入合并区域内的任意单元格都会落到
+    左上角单元格；生成器未写入的单元格保留模板原值。
+
+    Returns:
+        Tuple: (地址到落点的映射, 落点到模板原值的映射)
+    """
+    workbook = openpyxl.load_workbook(template_path)
+    try:
+        sheet = workbook.active
+        anchors: Dict[str, str] = {}
+        for address in addresses:
+            anchors[address] = address
+            for range_ in sheet.merged_cells.ranges:
+                if address in range_:
+                    anchors[address] = sheet.cell(row=range_.min_row, column=range_.min_col).coordinate
+                    break
+        values = {}
+        for anchor in anchors.values():
+            value = sheet[anchor].value
+            values[anchor] = None if value is None else str(value)
+    finally:
+        workbook.close()
+    return anchors, values
+
+
+def _audit_file(task: Tuple[str, str, Dict[str, Optional[str]]]
+                ) -> Tuple[str, List[Tuple[str, Optional[str], Optional[str]]], Optional[str]]:
+    """进程池任务：读取一个BOM文件并与期望值逐格比较
+
+    Returns:
+        Tuple: (款式编码, [(单元格, 期望值, 实际值), ...], 读取错误信息或None)
+    """
+    style_code, path, expected = task
+    try:
+        actual = read_cell_values(path, expected.keys())
+    except Exception as e:
+        return style_code, [], str(e)
+    mismatches = [(address, value, actual[address])
+                  for address, value in expected.items() if actual[address] != value]
+    return style_code, mismatches, None
+
+
+def audit_output_dir(generator: BomGenerator, output_dir: str,
+                     style_codes: Optional[Iterable[str]] = None,
+                     recursive: bool = True,
+                     max_workers: Optional[int] = None) -> Dict[str, Any]:
+    """按当前明细表和颜色/品类配置审计输出目录中的全部BOM文件
+
+    期望值在当前进程中一次性算出（与生成BOM使用同一个 get_cell_values，
+    并按模板的合并区域和原有内容还原），读取和比较文件分发到进程池中流式完成。
+    文件按文件名（不含扩展名）与款式编码对应；目录带有输出索引时以索引记录的
+    位置为准，其他位置的同名文件记为多余。建单日期（J2）随生成时间变化，
+    不参与比较。
+
+    Args:
+        generator (BomGenerator): 已加载明细表的生成器
+        output_dir (str): BOM输出目录
+        style_codes (Optional[Iterable[str]]): 需要审计的款式，默认为明细表中的全部款式
+        recursive (bool): 是否包含子目录
+        max_workers (Optional[int]): 进程数，默认为CPU核数；为1时在当前进程比较
+
+    Returns:
+        Dict[str, Any]: 格式如下：
+            {
+                'checked': int,                       # 实际比较的文件数
+                'ok': List[str],                      # 完全一致的款式
+                'mismatched': {code: [(单元格, 期望值, 实际值), ...]},
+                'missing': List[str],                 # 明细表中有、目录中没有
+                'orphans': List[str],                 # 目录中有、明细表中没有的文件路径
+                'errors': List[Tuple[str, str]],      # 无法读取的文件 (款式编码, 错误信息)
+                'catalog_errors': List[Tuple[str, str]],  # 无法计算期望值的款式（如颜色未定义）
+            }
+
+    Raises:
+        FileNotFoundError: 当输出目录不存在时
+    """
+    if not os.path.isdir(output_dir):
+        raise FileNotFoundError(f"错误：输出目录不存在，路径：{output_dir}")
+
+    catalog_codes = generator.get_all_style_codes()
+    if style_codes is None:
+        style_codes = catalog_codes
+
+    # 始终遍历目录以发现多余的文件；目录带有输出索引时，只有索引中的位置才算
+    # 该款式的文件，同名文件出现在其他位置（如布局之外的根目录）也记为多余
+    indexed = set(list_bom_files(output_dir, recursive)) if OutputIndex.load(output_dir) is not None else None
+    files: Dict[str, str] = {}
+    orphans: List[str] = []
+    known = set(catalog_codes)
+    for path in list_bom_files(output_dir, recursive, use_index=False):
+        code = os.path.splitext(os.path.basename(path))[0]
+        if code not in known or (indexed is not None and path not in indexed):
+            orphans.append(path)
+        else:
+            files.setdefault(code, path)
+
+    addresses = _audited_addresses(generator)
+    layouts: Dict[str, Tuple[Dict[str, str], Dict[str, Optional[str]]]] = {}
+    tasks = []
+    missing: List[str] = []
+    catalog_errors: List[Tuple[str, str]] = []
+    for code in style_codes:
+        if code not in files:
+            missing.append(code)
+            continue
+        try:
+            cell_values = generator.get_cell_values(code)
+        except ValueError as e:
+            catalog_errors.append((code, str(e)))
+            continue
+
+        # 每个模板只读取一次：期望值 = 模板原值 + 生成器写入的值（按落点覆盖）
+        primary_category = cell_values[generator.CELL_CONFIG['primary_category']]
+        template_path = resource_path(f'templates/{primary_category}模板.xlsx')
+        if template_path not in layouts:
+            if not os.path.exists(template_path):
+                catalog_errors.append((code, f"错误：模板文件未找到，路径：{template_path}"))
+                continue
+            layouts[template_path] = _template_layout(template_path, addresses)
+        anchors, template_values = layouts[template_path]
+
+        expected = dict(template_values)
+        for address, value in cell_values.items():
+            expected[anchors[address]] = None if value is None else str(value)
+        tasks.append((code, files[code], expected))
+
+    result: Dict[str, Any] = {
+        'checked': len(tasks),
+        'ok': [],
+        'mismatched': {},
+        'missing': missing,
+        'orphans': orphans,
+        'errors': [],
+        'catalog_errors': catalog_errors,
+    }
+
+    def collect(outcomes) -> None:
+        for code, mismatches, error in outcomes:
+            if error is not None:
+                result['errors'].append((code, error))
+            elif mismatches:
+                result['mismatched'][code] = mismatches
+            else:
+                result['ok'].append(code)
+
+    if max_workers == 1 or len(tasks) < 2:
+        collect(map(_audit_file, tasks))
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            chunksize = max(1, len(tasks) // ((max_workers or os.cpu_count() or 1) * 4))
+            collect(pool.map(_audit_file, tasks, chunksize=chunksize))
+    return result
+
+
+def format_audit_report(result: Dict[str, Any]) -> List[str]:
+    """把审计结果整理为便于阅读的文本行
+
+    Args:
+        result (Dict[str, Any]): audit_output_dir 的返回值
+
+    Returns:
+        List[str]: 报告文本行
+    """
+    lines = [f"审计 {result['checked']} 个文件：一致 {len(result['ok'])}，不一致 {len(result['mismatched'])}，"
+             f"缺失 {len(result['missing'])}，多余 {len(result['orphans'])}"]
+    for code, mismatches in result['mismatched'].items():
+        lines.append(f"不一致 {code}:")
+        for address, expected, actual in mismatches:
+            lines.append(f"  {address}: 期望 {expected!r}，实际 {actual!r}")
+    for code in result['missing']:
+        lines.append(f"缺失 {code}")
+    for path in result['orphans']:
+        lines.append(f"多余 {path}")
+    for code, error in result['errors']:
+        lines.append(f"无法读取 {code}: {error}")
+    for code, error in result['catalog_errors']:
+        lines.append(f"无法计算期望值 {code}: {error}")
+    return lines
@@ -0,0 +1,242 @@
+# 端到端性能基准：固定的合成明细表走完 读取 → 渲染 → 写盘，与仓库中的基线比较
+
+from typing import Dict, Any, List, Optional, Tuple
+from datetime import datetime
+import gc
+import json
+import os
+import platform
+import statistics
+import tempfile
+import time
+
+import openpyxl
+import pandas as pd
+
+from . import metrics
+from .bom_generator import BomGenerator
+from .writer import atomic_write_bytes
+
+
+# 仓库中提交的基线文件（相对项目根目录）
+DEFAULT_BASELINE = 'benchmarks/baseline.json'
+BASELINE_VERSION = 1
+
+# 各阶段均为整批耗时（秒）：load 为读取明细表，template_load/fill/serialize 来自
+# 生成过程中的阶段指标，write 为写盘，batch 为 generate_bom_files 的墙钟时间
+STAGES = ('load', 'template_load', 'fill', 'serialize', 'write', 'batch')
+
+DEFAULT_TOLERANCE = 0.25
+# 低于该绝对差值（秒）的变化视为噪声，避免耗时很短的阶段因几毫秒抖动而报警
+MIN_REGRESSION_SECONDS = 0.05
+
+# 合成明细表的取值：覆盖全部四个模板，颜色数 1~5 个（超过3个时需要插入颜色行）
+_WAVES = ['秋一波', '秋二波', '秋三波', '秋四波']
+_CATEGORIES = ['长袖T恤', '外套', '连衣裙', '马面裙', '长裤']
+_COLORS = ['黑色', '白色', '灰色', '红色', '蓝色', '杏色']
+_COLOR_COUNTS = [1, 2, 3, 4, 5, 2]
+
+# 固定的建单时间，使每次运行的输出逐字节相同
+_TIMESTAMP = datetime(2025, 1, 1, 8, 0)
+
+
+def synthetic_catalog(styles: int) -> pd.DataFrame:
+    """生成固定的合成明细数据，相同的款式数总是得到相同的内容
+
+    Args:
+        styles (int): 款式数
+
+    Returns:
+        pd.DataFrame: 列为 款式编码、波段、品类、开发颜色
+    """
+    rows = []
+    for i in range(styles):
+        count = _COLOR_COUNTS[i % len(_COLOR_COUNTS)]
+        colors = [_COLORS[(i + offset) % len(_COLORS)] for offset in range(count)]
+        rows.append((f"H5B{i:06d}", _WAVES[i % len(_WAVES)], _CATEGORIES[i % len(_CATEGORIES)], '/'.join(colors)))
+    return pd.DataFrame(rows, columns=[BomGenerator.STYLE_CODE_COL, BomGenerator.WAVE_COL,
+                                       BomGenerator.CATEGORY_COL, BomGenerator.DEV_COLOR_COL])
+
+
+def write_synthetic_source(path: str, styles: int) -> str:
+    """把合成明细数据写成与真实《新品研发明细表》相同表头结构的源文件"""
+    workbook = openpyxl.Workbook()
+    sheet = workbook.active
+    sheet.title = BomGenerator.SHEET_NAME
+    sheet.append(['新品研发明细表'])
+    sheet.append(['序号', '基础信息', '基础信息', '基础信息', '基础信息'])
+    sheet.append(['序号', BomGenerator.STYLE_CODE_COL, BomGenerator.WAVE_COL,
+                  BomGenerator.CATEGORY_COL, BomGenerator.DEV_COLOR_COL])
+    for i, row in enumerate(synthetic_catalog(styles).itertuples(index=False, name=None), start=1):
+        sheet.append([i, *row])
+    workbook.save(path)
+    return path
+
+
+def _run_once(source_path: str, output_dir: str, backend: Optional[str]) -> Tuple[Dict[str, float], str]:
+    """完整运行一次：读取明细表并批量生成全部款式，返回各阶段的整批耗时和使用的写出后端"""
+    before = {stage: metrics.STAGE_SECONDS.total(stage=stage) for stage in ('template_load', 'fill', 'serialize')}
+    started = time.perf_counter()
+    generator = BomGenerator(source_path, timestamp=_TIMESTAMP)
+    if backend is not None:
+        generator.backend = backend
+    load_seconds = time.perf_counter() - started
+
+    report = generator.generate_bom_files(generator.get_all_style_codes(), output_dir)
+    if report['failed']:
+        raise ValueError(f"错误：基准运行中有款式生成失败：{report['failed'][0][1]}")
+    timings = {stage: metrics.STAGE_SECONDS.total(stage=stage) - value for stage, value in before.items()}
+    timings.update(load=load_seconds, write=report['write_seconds'], batch=report['elapsed_seconds'])
+    return timings, generator.backend
+
+
+def _environment(backend: str) -> Dict[str, Any]:
+    return {
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'openpyxl': openpyxl.__version__,
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'cpu_count': os.cpu_count(),
+        'backend': backend,
+    }
+
+
+def run_benchmark(styles: int = 40, repetitions: int = 5, warmup: int = 1,
+                  cpu: Optional[int] = None,
+                  progress_callback=None,
+                  backend: Optional[str] = None) -> Dict[str, Any]:
+    """运行端到端基准，返回各阶段耗时的中位数和吞吐量
+
+    使用真实模板和真实的批量生成路径（BomGenerator + generate_bom_files），
+    因此逐款重新加载模板、多余的序列化之类的退化都会体现在结果中。噪声控制：
+    先运行 warmup 次不计入结果；每次运行前做一次完整的垃圾回收，运行期间暂停
+    自动垃圾回收；每次写入新的空目录；取 repetitions 次的中位数；可选把进程
+    固定在一个CPU上（仅Linux）。
+
+    Args:
+        styles (int): 合成明细表的款式数
+        repetitions (int): 计入结果的运行次数
+        warmup (int): 预热次数
+        cpu (Optional[int]): 固定运行的CPU编号，为None时不固定
+        progress_callback: 每次运行结束后调用，参数为 (序号, 总次数, 是否预热, 各阶段耗时)
+        backend (Optional[str]): 写出后端，为None时使用生成器的默认值
+
+    Returns:
+        Dict[str, Any]: 格式如下：
+            {
+                'version': int,
+                'config': {'styles', 'repetitions', 'warmup', 'backend'},
+                'environment': Dict[str, Any],       # Python/库版本、平台、CPU数
+                'stages': Dict[str, float],          # 各阶段整批耗时的中位数（秒）
+                'samples': Dict[str, List[float]],   # 各次运行的原始耗时
+                'throughput': float,                 # 款式数 / batch 中位数（款/秒）
+                'created_at': str
+            }
+
+    Raises:
+        ValueError: 当参数无效或有款式生成失败时
+    """
+    if styles < 1 or repetitions < 1 or warmup < 0:
+        raise ValueError("错误：款式数和运行次数必须是正整数，预热次数不能为负数。")
+    if cpu is not None:
+        if not hasattr(os, 'sched_setaffinity'):
+            raise ValueError("错误：当前平台不支持固定CPU。")
+        os.sched_setaffinity(0, {cpu})
+
+    samples: Dict[str, List[float]] = {stage: [] for stage in STAGES}
+    total = warmup + repetitions
+    with tempfile.TemporaryDirectory(prefix='bom_benchmark_') as work_dir:
+        source_path = write_synthetic_source(os.path.join(work_dir, 'source.xlsx'), styles)
+        for i in range(total):
+            output_dir = os.path.join(work_dir, f'run{i}')
+            gc.collect()
+            gc.disable()
+            try:
+                timings, used_backend = _run_once(source_path, output_dir, backend)
+            finally:
+                gc.enable()
+            is_warmup = i < warmup
+            if not is_warmup:
+                for stage in STAGES:
+                    samples[stage].append(timings[stage])
+            if progress_callback is not None:
+                progress_callback(i, total, is_warmup, timings)
+
+    stages = {stage: statistics.median(values) for stage, values in samples.items()}
+    return {
+        'version': BASELINE_VERSION,
+        'config': {'styles': styles, 'repetitions': repetitions, 'warmup': warmup, 'backend': used_backend},
+        'environment': _environment(used_backend),
+        'stages': stages,
+        'samples': samples,
+        'throughput': styles / stages['batch'] if stages['batch'] > 0 else 0.0,
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+    }
+
+
+def load_baseline(path: str = DEFAULT_BASELINE) -> Dict[str, Any]:
+    """读取基线文件
+
+    Raises:
+        FileNotFoundError: 当基线文件不存在时
+        ValueError: 当基线文件内容无效时
+    """
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+    except FileNotFoundError:
+        raise FileNotFoundError(f"错误：基线文件不存在，路径：{path}（可加 --update-baseline 生成）")
+    except ValueError:
+        raise ValueError(f"错误：基线文件内容无效，路径：{path}")
+    if baseline.get('version') != BASELINE_VERSION:
+        raise ValueError(f"错误：基线文件版本不受支持，路径：{path}")
+    return baseline
+
+
+def save_baseline(result: Dict[str, Any], path: str = DEFAULT_BASELINE) -> None:
+    """原子写入基线文件（键按固定顺序排列，便于在版本库中比较）"""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    atomic_write_bytes(path, (json.dumps(result, ensure_ascii=False, indent=2) + '\n').encode('utf-8'))
+
+
+def compare_to_baseline(result: Dict[str, Any], baseline: Dict[str, Any],
+                        tolerance: float = DEFAULT_TOLERANCE) -> Dict[str, Any]:
+    """把本次结果与基线逐阶段比较
+
+    某个阶段的中位数比基线慢超过 tolerance（相对值）且超过 MIN_REGRESSION_SECONDS
+    （绝对值）时记为退化；吞吐量低于基线的 1 / (1 + tolerance) 时同样记为退化。
+
+    Args:
+        result (Dict[str, Any]): run_benchmark 的结果
+        baseline (Dict[str, Any]): 基线（格式相同）
+        tolerance (float): 允许的相对变慢比例，如 0.25 表示慢 25% 以内视为正常
+
+    Returns:
+        Dict[str, Any]: {'stages': {阶段: {'current', 'baseline', 'change'}},
+                         'regressions': List[str]}   # 退化说明，为空表示通过
+
+    Raises:
+        ValueError: 当两者的款式数或写出后端不同，无法比较时
+    """
+    for key in ('styles', 'backend'):
+        if result['config'].get(key) != baseline['config'].get(key):
+            raise ValueError(f"错误：本次运行与基线的 {key} 不同（{result['config'].get(key)} / "
+                             f"{baseline['config'].get(key)}），请使用相同的参数或更新基线。")
+
+    stages: Dict[str, Dict[str, float]] = {}
+    regressions: List[str] = []
+    for stage in STAGES:
+        current, reference = result['stages'].get(stage), baseline['stages'].get(stage)
+        if current is None or reference is None:
+            continue
+        change = (current - reference) / reference if reference > 0 else 0.0
+        stages[stage] = {'current': current, 'baseline': reference, 'change': change}
+        if change > tolerance and current - reference > MIN_REGRESSION_SECONDS:
+            regressions.append(f"{stage}: {reference:.3f}s → {current:.3f}s（{change:+.0%}）")
+
+    if result['throughput'] < baseline['throughput'] / (1 + tolerance):
+        regressions.append(f"throughput: {baseline['throughput']:.1f} → {result['throughput']:.1f} 款/秒")
+    return {'stages': stages, 'regressions': regressions}
@@ -0,0 +1,238 @@
+# 整波段BOM册：一个工作簿中每个款式一个工作表
+
+from typing import Dict, Any, List, Optional, Callable, Tuple
+from copy import copy
+import io
+import os
+import re
+import time
+
+import openpyxl
+from openpyxl.cell.cell import MergedCell
+import pandas as pd
+
+from . import metrics
+from .bom_generator import BomGenerator
+from .writer import atomic_write_bytes, make_reproducible_xlsx
+
+
+# 文件名与工作表名中不允许出现的字符
+_INVALID_FILE_CHARS = re.compile(r'[\\/:*?"<>|]')
+_INVALID_SHEET_CHARS = re.compile(r'[\[\]:*?/\\]')
+_MAX_SHEET_TITLE = 31
+
+
+def _import_sheet(source, book, title: str):
+    """把另一个工作簿中的模板工作表复制到 book 中
+
+    openpyxl 的 copy_worksheet 只能在同一工作簿内复制，跨工作簿时逐个单元格
+    复制值和样式，并复制合并区域、行高列宽和页面设置。每个模板只需导入一次，
+    之后每个款式都在工作簿内用 copy_worksheet 快速复制。
+    """
+    target = book.create_sheet(title)
+    for row in source.iter_rows():
+        for cell in row:
+            new_cell = target.cell(row=cell.row, column=cell.column)
+            if cell.__class__.__name__ != 'MergedCell':
+                new_cell.value = cell.value
+            if cell.has_style:
+                new_cell.font = copy(cell.font)
+                new_cell.border = copy(cell.border)
+                new_cell.fill = copy(cell.fill)
+                new_cell.number_format = cell.number_format
+                new_cell.protection = copy(cell.protection)
+                new_cell.alignment = copy(cell.alignment)
+
+    for key, dimension in source.column_dimensions.items():
+        target.column_dimensions[key].width = dimension.width
+        target.column_dimensions[key].hidden = dimension.hidden
+    for key, dimension in source.row_dimensions.items():
+        target.row_dimensions[key].height = dimension.height
+        target.row_dimensions[key].hidden = dimension.hidden
+    for merged_range in source.merged_cells.ranges:
+        target.merge_cells(str(merged_range))
+
+    target.sheet_format = copy(source.sheet_format)
+    target.page_margins = copy(source.page_margins)
+    target.page_setup = copy(source.page_setup)
+    target.print_options = copy(source.print_options)
+    return target
+
+
+def _copy_prototype(book, prototype):
+    """在工作簿内复制原型工作表
+
+    copy_worksheet 会把合并区域内的非左上角单元格复制成普通单元格，
+    写入这些地址时就不会再落到合并区域的左上角。这里把它们换回 MergedCell
+    （保留原有样式），使副本与直接加载的模板行为一致。不用 unmerge/merge
+    重新合并，是因为重新合并会逐个单元格重设边框，比复制本身还慢数倍。
+    """
+    sheet = book.copy_worksheet(prototype)
+    for merged_range in sheet.merged_cells.ranges:
+        cells = merged_range.cells
+        next(cells)  # 左上角单元格保持不变
+        for row, column in cells:
+            merged_cell = MergedCell(sheet, row=row, column=column)
+            existing = sheet._cells.get((row, column))
+            if existing is not None:
+                merged_cell._style = copy(existing._style)
+            sheet._cells[(row, column)] = merged_cell
+    return sheet
+
+
+def _sheet_title(style_code: str) -> str:
+    return _INVALID_SHEET_CHARS.sub('_', str(style_code))[:_MAX_SHEET_TITLE]
+
+
+def build_bom_book(generator: BomGenerator, style_codes: List[str],
+                   progress_callback: Optional[Callable[[int, int, str], None]] = None
+                   ) -> Tuple[Optional[openpyxl.Workbook], List[str], List[Tuple[str, str]]]:
+    """把多个款式渲染到同一个工作簿中，每个款式一个以款式编码命名的工作表
+
+    每个模板只加载一次：第一个用到的模板直接作为工作簿的底稿，其余模板
+    导入为原型工作表；每个款式从对应原型复制一个工作表（保留合并区域和样式），
+    再按 generate_bom_file 的同一套单元格映射填充。原型工作表最后删除。
+
+    Args:
+        generator (BomGenerator): 已加载明细表的生成器
+        style_codes (List[str]): 款式编码，工作表按此顺序排列
+        progress_callback (Optional[Callable[[int, int, str], None]]):
+            每个款式渲染前调用，参数为 (序号, 总数, 款式编码)
+
+    Returns:
+        Tuple: (工作簿，没有成功的款式时为None; 成功的款式编码; (款式编码, 错误信息))
+
+    Raises:
+        FileNotFoundError: 当BOM模板文件不存在时
+    """
+    book = None
+    prototypes: Dict[str, Any] = {}
+    success: List[str] = []
+    failed: List[Tuple[str, str]] = []
+
+    for i, style_code in enumerate(style_codes):
+        if progress_callback is not None:
+            progress_callback(i, len(style_codes), style_code)
+        try:
+            cell_values = generator.get_cell_values(style_code)
+        except Exception as e:
+            failed.append((style_code, str(e)))
+            continue
+
+        template_path = generator._template_path(style_code, cell_values)
+        if template_path not in prototypes:
+            started = time.perf_counter()
+            try:
+                template = openpyxl.load_workbook(template_path)
+            except FileNotFoundError:
+                raise FileNotFoundError(f"错误：BOM模板文件未找到，路径：{template_path}")
+            metrics.TEMPLATE_LOAD_SECONDS.observe(time.perf_counter() - started,
+                                                  template=os.path.splitext(os.path.basename(template_path))[0])
+            if book is None:
+                book = template
+                prototypes[template_path] = template.active
+            else:
+                prototypes[template_path] = _import_sheet(template.active, book, f"_模板{len(prototypes)}")
+
+        sheet = _copy_prototype(book, prototypes[template_path])
+        sheet.title = _sheet_title(style_code)
+        generator._fill_sheet(sheet, cell_values)
+        success.append(style_code)
+
+    if book is not None:
+        for prototype in prototypes.values():
+            book.remove(prototype)
+        book.active = 0
+    return book, success, failed
+
+
+def _book_file_name(key: Tuple[str, ...]) -> str:
+    return _INVALID_FILE_CHARS.sub('_', '_'.join(key)) + '.xlsx'
+
+
+def generate_bom_books(generator: BomGenerator, style_codes: List[str], output_dir: str,
+                       split_by_category: bool = False,
+                       progress_callback: Optional[Callable[[int, int, str], None]] = None) -> Dict[str, Any]:
+    """按波段（可选再按品类）生成BOM册，每册一个xlsx文件、每个款式一个工作表
+
+    与逐个生成 {款式编码}.xlsx 相比，每册只加载一次模板、只保存一次，
+    便于整波段分发给工厂。文件名为 {波段}.xlsx 或 {波段}_{品类}.xlsx。
+
+    Args:
+        generator (BomGenerator): 已加载明细表的生成器
+        style_codes (List[str]): 要生成的款式编码
+        output_dir (str): 输出目录，不存在时自动创建
+        split_by_category (bool): 是否在波段内再按品类（二级品类）分册
+        progress_callback (Optional[Callable[[int, int, str], None]]):
+            每个款式渲染前调用，参数为 (序号, 总数, 款式编码)，序号按全部款式累计
+
+    Returns:
+        Dict[str, Any]: {
+            'total': int,
+            'books': Dict[str, List[str]],     # 文件名 -> 册中的款式编码
+            'success': List[str],
+            'failed': List[Tuple[str, str]],
+            'elapsed_seconds': float
+        }
+
+    Example:
+        >>> report = generate_bom_books(generator, generator.get_all_style_codes(), './books')
+        >>> list(report['books'])
+        ['秋四波.xlsx', '秋三波.xlsx']
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    started = time.perf_counter()
+
+    groups: Dict[Tuple[str, ...], List[str]] = {}
+    failed: List[Tuple[str, str]] = []
+    for style_code in style_codes:
+        # 明细表中的款式直接取预先算好的波段和品类，其余款式逐个查找
+        derived = generator._derived_records.get(style_code)
+        if derived is not None:
+            wave, category = derived[BomGenerator.WAVE_COL], derived['二级品类']
+        else:
+            try:
+                info = generator.find_style_info(style_code)
+            except ValueError as e:
+                failed.append((style_code, str(e)))
+                continue
+            wave, category = info[BomGenerator.WAVE_COL], info[BomGenerator.CATEGORY_COL]
+        key = ('未分波段' if pd.isna(wave) else str(wave),)
+        if split_by_category:
+            key += (str(category),)
+        groups.setdefault(key, []).append(style_code)
+
+    books: Dict[str, List[str]] = {}
+    success: List[str] = []
+    done = 0
+    for key, codes in groups.items():
+        def callback(i: int, total: int, style_code: str, offset: int = done) -> None:
+            if progress_callback is not None:
+                progress_callback(offset + i, len(style_codes), style_code)
+
+        book, book_success, book_failed = build_bom_book(generator, codes, progress_callback=callback)
+        done += len(codes)
+        failed.extend(book_failed)
+        if book is None:
+            continue
+
+        buffer = io.BytesIO()
+        book.save(buffer)
+        data = buffer.getvalue()
+        if generator.timestamp is not None:
+            data = make_reproducible_xlsx(data, generator.timestamp)
+        file_name = _book_file_name(key)
+        atomic_write_bytes(os.path.join(output_dir, file_name), data)
+        metrics.BYTES_WRITTEN.inc(len(data))
+        books[file_name] = book_success
+        success.extend(book_success)
+
+    report = {
+        'total': len(style_codes),
+        'books': books,
+        'success': success,
+        'failed': failed,
+        'elapsed_seconds': time.perf_counter() - started,
+    }
+    metrics.record_batch(report)
+    return report
@@ -0,0 +1,164 @@
+# 不经过工作簿的BOM数据导出：JSON Lines / CSV
+
+from typing import Dict, Any, List, Optional, Iterator, Iterable, TextIO, Tuple
+from datetime import datetime
+import csv
+import json
+
+import pandas as pd
+
+from .bom_generator import BomGenerator
+
+
+# CELL_CONFIG 中各表头字段在导出数据中的字段名（不含生成时清空的设计师字段）
+HEADER_FIELDS = {
+    'timestamp': '建单时间',
+    'style_code': '款式编码',
+    'order_type': '订单类型',
+    'product_name_b4': '品名',
+    'wave_info': '波段',
+    'primary_category': '一级品类',
+    'secondary_category': '二级品类',
+}
+
+FORMATS = ('jsonl', 'csv')
+GRANULARITIES = ('style', 'sku')
+
+
+def _header(generator: BomGenerator, style_code: str, derived: Dict[str, Any], timestamp: str) -> Dict[str, Any]:
+    """与BOM表头单元格相同的字段值，见 BomGenerator.get_cell_values"""
+    values = {
+        'timestamp': timestamp,
+        'style_code': style_code,
+        'order_type': '首单',
+        'product_name_b4': derived['品名'],
+        'wave_info': derived[generator.WAVE_COL],
+        'primary_category': derived['一级品类'],
+        'secondary_category': derived['二级品类'],
+    }
+    # 明细表中的空单元格（NaN）导出为空值，保证JSON合法
+    return {HEADER_FIELDS[key]: None if pd.isna(value) else value for key, value in values.items()}
+
+
+def iter_bom_records(generator: BomGenerator, style_codes: Iterable[str],
+                     failed: Optional[List[Tuple[str, str]]] = None) -> Iterator[Dict[str, Any]]:
+    """逐个产出款式的BOM数据，内容与生成的xlsx相同
+
+    直接使用加载时算好的派生字段，不加载模板、不创建工作簿。颜色块与xlsx
+    一样最多 len(PRESET_COLOR_BLOCKS) 个。
+
+    Args:
+        generator (BomGenerator): 已加载明细表的生成器
+        style_codes (Iterable[str]): 款式编码
+        failed (Optional[List[Tuple[str, str]]]): 提供时，无法生成的款式以
+            (款式编码, 错误信息) 追加到该列表并跳过；否则直接抛出异常
+
+    Yields:
+        Dict[str, Any]: 表头字段（见 HEADER_FIELDS）加上
+            '颜色': [{'序号': int, '颜色': str, '颜色代码': str, 'SKU': {尺码: SKU}}, ...]
+
+    Raises:
+        ValueError: 当款式无法生成且未提供 failed 时
+    """
+    timestamp = (generator.timestamp or datetime.now()).strftime("%Y/%m/%d %H:%M")
+    for style_code in style_codes:
+        try:
+            derived = generator._derived_records.get(style_code)
+            if derived is None:
+                derived = generator._derive_style(style_code)
+            if derived['错误']:
+                raise ValueError(derived['错误'])
+        except ValueError as e:
+            if failed is None:
+                raise
+            failed.append((style_code, str(e)))
+            continue
+
+        record = _header(generator, style_code, derived, timestamp)
+        record['颜色'] = [
+            {'序号': position, '颜色': color_info['color'],
+             '颜色代码': generator.color_codes.get(color_info['color']), 'SKU': dict(color_info['skus'])}
+            for position, color_info in enumerate(derived['SKU'][:len(generator.PRESET_COLOR_BLOCKS)])
+        ]
+        yield record
+
+
+def _style_row(record: Dict[str, Any], sizes: List[str], blocks: int) -> Dict[str, Any]:
+    """每个款式一行的CSV：颜色块展开为 颜色1、颜色代码1、颜色1_S ... 列"""
+    row = {key: value for key, value in record.items() if key != '颜色'}
+    for i in range(blocks):
+        color = record['颜色'][i] if i < len(record['颜色']) else None
+        row[f'颜色{i + 1}'] = color['颜色'] if color else None
+        row[f'颜色代码{i + 1}'] = color['颜色代码'] if color else None
+        for size in sizes:
+            row[f'颜色{i + 1}_{size}'] = color['SKU'][size] if color else None
+    return row
+
+
+def _sku_rows(record: Dict[str, Any], sizes: List[str]) -> Iterator[Dict[str, Any]]:
+    """每个SKU一行：表头字段 + 序号、颜色、颜色代码、尺码、SKU"""
+    header = {key: value for key, value in record.items() if key != '颜色'}
+    for color in record['颜色']:
+        for size in sizes:
+            yield dict(header, 序号=color['序号'], 颜色=color['颜色'], 颜色代码=color['颜色代码'],
+                       尺码=size, SKU=color['SKU'][size])
+
+
+def export_bom_data(generator: BomGenerator, style_codes: Iterable[str], output: TextIO,
+                    fmt: str = 'jsonl', granularity: str = 'style') -> Dict[str, Any]:
+    """把一批款式的BOM数据流式写为 JSON Lines 或 CSV
+
+    每处理一个款式就写出对应的行，内存占用与批次大小无关。适合只给下游
+    系统读取、不需要人看的批次，比渲染xlsx再解析回来便宜得多。
+
+    Args:
+        generator (BomGenerator): 已加载明细表的生成器
+        style_codes (Iterable[str]): 款式编码
+        output (TextIO): 文本输出流（CSV需以 newline='' 打开）
+        fmt (str): 'jsonl' 或 'csv'
+        granularity (str): 'style' 每个款式一行，'sku' 每个SKU一行
+
+    Returns:
+        Dict[str, Any]: {'styles': int, 'rows': int, 'failed': List[Tuple[str, str]]}
+
+    Raises:
+        ValueError: 当 fmt 或 granularity 不受支持时
+
+    Example:
+        >>> with open('bom.jsonl', 'w', encoding='utf-8') as f:
+        ...     export_bom_data(generator, generator.get_all_style_codes(), f, granularity='sku')
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"错误：不支持的导出格式 '{fmt}'，可选：{'、'.join(FORMATS)}")
+    if granularity not in GRANULARITIES:
+        raise ValueError(f"错误：不支持的导出粒度 '{granularity}'，可选：{'、'.join(GRANULARITIES)}")
+
+    sizes = list(generator.SIZES)
+    blocks = len(generator.PRESET_COLOR_BLOCKS)
+    header_columns = list(HEADER_FIELDS.values())
+    if granularity == 'style':
+        columns = list(header_columns)
+        for i in range(1, blocks + 1):
+            columns += [f'颜色{i}', f'颜色代码{i}'] + [f'颜色{i}_{size}' for size in sizes]
+    else:
+        columns = header_columns + ['序号', '颜色', '颜色代码', '尺码', 'SKU']
+
+    writer = csv.DictWriter(output, fieldnames=columns) if fmt == 'csv' else None
+    if writer is not None:
+        writer.writeheader()
+
+    failed: List[Tuple[str, str]] = []
+    styles = rows = 0
+    for record in iter_bom_records(generator, style_codes, failed=failed):
+        styles += 1
+        if granularity == 'style':
+            lines = [record if fmt == 'jsonl' else _style_row(record, sizes, blocks)]
+        else:
+            lines = _sku_rows(record, sizes)
+        for line in lines:
+            if writer is not None:
+                writer.writerow(line)
+            else:
+                output.write(json.dumps(line, ensure_ascii=False) + '\n')
+            rows += 1
+    return {'styles': styles, 'rows': rows, 'failed': failed}
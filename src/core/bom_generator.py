@@ -1,14 +1,23 @@
 # 核心逻辑，处理并生成文件
 
-from typing import Dict, Any, List, Union
+from typing import Dict, Any, List, Union, Optional, Callable, Tuple
+from concurrent.futures import ProcessPoolExecutor
 import pandas as pd
+import hashlib
 import json
 import openpyxl
 import os
 import sys
-from datetime import datetime
+import time
+from datetime import datetime, timezone
 import io
 
+from . import metrics
+from .color_matcher import ColorMatcher
+from .output_layout import OutputIndex
+from .writer import AsyncFileWriter, atomic_write_bytes, make_reproducible_xlsx
+from .xlsx_backend import BACKENDS, BACKEND_ENV, render_with_xlsxwriter
+
 
 def resource_path(relative_path: str) -> str:
     """
@@ -36,6 +45,12 @@ class BomGenerator:
     - 根据款式编码、开发颜色和尺码生成对应的SKU列表
     - 基于BOM模板生成完整的Excel BOM文件，支持动态颜色数量
     
+    线程安全：加载完成后，读取路径（find_style_info、get_cell_values、
+    generate_bom_file_to_buffer、generate_bom_file 等）不修改实例状态，每次渲染
+    都加载独立的模板工作簿，可以在多个线程中同时调用。reload_* 方法先构建好
+    新的数据再整体替换属性，并发读取看到的要么是旧数据、要么是新数据；
+    需要严格隔离时（如监视模式）应在 copy.copy 出的副本上重新加载。
+    
     Example:
         >>> generator = BomGenerator('product_details.xlsx')
         >>> info = generator.find_style_info('H5A123416')
@@ -50,6 +65,7 @@ class BomGenerator:
     WAVE_COL = '波段'
     CATEGORY_COL = '品类'
     DEV_COLOR_COL = '开发颜色'
+    SOURCE_FILE_COL = '来源文件'  # 目录索引/多源文件合并时记录每行的来源
     
     # BOM模板单元格位置配置
     CELL_CONFIG = {
@@ -57,6 +73,7 @@ class BomGenerator:
         'timestamp': 'J2',           # 当前时间
         'style_code': 'B3',          # 款式编码
         'order_type': 'H3',          # 订单类型（固定"首单"）
+        'designer': 'E3',            # 设计师（生成时清空）
         'product_name_b4': 'B4',     # 品名（B4位置）
         'wave_info': 'F4',           # 波段信息
         'primary_category': 'J4',    # 一级品类信息
@@ -79,7 +96,12 @@ class BomGenerator:
         }
     ]
     
-    def __init__(self, source_path: Union[str, io.BytesIO]) -> None:
+    # 尺码及其规格码（SKU）所在的列，与颜色块的 sku_row 组合得到单元格地址
+    SIZES = ['S', 'M', 'L', 'XL']
+    SKU_COLUMNS = ['B', 'C', 'D', 'E']
+    
+    def __init__(self, source_path: Union[str, io.BytesIO],
+                 timestamp: Optional[datetime] = None) -> None:
         """初始化BomGenerator实例
         
         读取指定的Excel文件或字节流，解析产品明细数据并存储在内存中供后续查询使用。
@@ -87,6 +109,10 @@ class BomGenerator:
         
         Args:
             source_path (Union[str, io.BytesIO]): 源Excel文件的完整路径或字节流对象
+            timestamp (Optional[datetime]): 固定的建单时间。指定后进入可复现模式：
+                J2写入该时间，且xlsx的zip元数据也固定为该时间，相同输入生成
+                逐字节相同的文件。未指定时读取环境变量 SOURCE_DATE_EPOCH
+                （Unix秒），仍未设置则使用当前时间
             
         Raises:
             FileNotFoundError: 当指定的Excel文件不存在时
@@ -95,45 +121,17 @@ class BomGenerator:
         Note:
             Excel文件应包含复杂的多行表头结构，该方法会自动处理表头解析。
         """
-        # 使用简单的相对路径 - 复杂的路径处理交给.spec文件
-        self.template_path = 'src/resources/bom_template.xlsx'
-        self.color_codes_path = 'src/resources/color_codes.json'
+        self._init_settings(timestamp)
         
         try:
-            # 读取指定Excel文件或字节流中的"明细表"Sheet，手动处理复杂表头
-            temp_df = pd.read_excel(source_path, sheet_name=self.SHEET_NAME, header=1)
-            
-            # 使用第0行（现在是DataFrame的第一行）作为列名
-            new_columns = temp_df.iloc[0].values
-            self.df = temp_df.iloc[1:].copy()
-            self.df.columns = new_columns
-            
-            # 验证必要的列是否存在
-            required_columns = [self.STYLE_CODE_COL, self.WAVE_COL, 
-                              self.CATEGORY_COL, self.DEV_COLOR_COL]
-            missing_columns = [col for col in required_columns if col not in self.df.columns]
-            
-            if missing_columns:
-                raise ValueError(f"Excel文件缺少必要的列: {missing_columns}")
+            # 读取源文件中的明细数据
+            self.df = self._read_source(source_path)
             
             # 加载颜色代码映射表
-            try:
-                with open(self.color_codes_path, 'r', encoding='utf-8') as f:
-                    self.color_codes = json.load(f)
-            except FileNotFoundError:
-                raise FileNotFoundError(f"错误：颜色代码文件未找到，路径：{self.color_codes_path}")
-            except json.JSONDecodeError as e:
-                raise ValueError(f"错误：颜色代码文件格式不正确：{str(e)}")
+            self.reload_color_codes()
             
             # 加载品类映射
-            self.category_mapping_path = 'src/resources/category_mapping.json'
-            try:
-                with open(self.category_mapping_path, 'r', encoding='utf-8') as f:
-                    self.category_mapping = json.load(f)
-            except FileNotFoundError:
-                raise FileNotFoundError("错误：品类映射文件 'category_mapping.json' 未找到。")
-            except json.JSONDecodeError:
-                raise ValueError("错误：品类映射文件 'category_mapping.json' 格式不正确。")
+            self.reload_category_mapping()
                 
         except FileNotFoundError as e:
             if "颜色代码文件" in str(e):
@@ -144,6 +142,369 @@ class BomGenerator:
                 raise ValueError(f"错误：Excel文件中未找到工作表 '{self.SHEET_NAME}'")
             raise ValueError(f"读取Excel文件时发生错误: {str(e)}")
     
+    def _init_settings(self, timestamp: Optional[datetime]) -> None:
+        """初始化资源文件路径、可复现模式的固定时间与写出后端
+        
+        Args:
+            timestamp (Optional[datetime]): 固定的建单时间，见 __init__
+
+        Raises:
+            ValueError: 当环境变量 BOM_WRITE_BACKEND 不是受支持的后端时
+        """
+        # 使用简单的相对路径 - 复杂的路径处理交给.spec文件
+        self.template_path = 'src/resources/bom_template.xlsx'
+        self.color_codes_path = 'src/resources/color_codes.json'
+        self.category_mapping_path = 'src/resources/category_mapping.json'
+        
+        # 可复现模式的固定时间
+        if timestamp is None and os.environ.get('SOURCE_DATE_EPOCH'):
+            timestamp = datetime.fromtimestamp(int(os.environ['SOURCE_DATE_EPOCH']), tz=timezone.utc).replace(tzinfo=None)
+        self.timestamp = timestamp
+
+        # 写出后端：'openpyxl'（默认）或 'xlsxwriter'（见 xlsx_backend），可按需修改该属性
+        self.backend = os.environ.get(BACKEND_ENV) or 'openpyxl'
+        if self.backend not in BACKENDS:
+            raise ValueError(f"错误：不支持的写出后端 '{self.backend}'，可选：{'、'.join(BACKENDS)}")
+
+        # 模板文件内容缓存（模板路径 → xlsx字节）。为None时每次渲染都从磁盘读取模板；
+        # 常驻进程（如 bom_service）设为字典后每个模板只读取一次，但仍按款式解析
+        self.template_cache: Optional[Dict[str, bytes]] = None
+
+        # 多个源文件合并时出现在不同文件中的款式编码（见 from_sources），单个源文件时为空
+        self.source_conflicts: Dict[str, List[Dict[str, Any]]] = {}
+    
+    @classmethod
+    def from_dataframe(cls, df: pd.DataFrame, timestamp: Optional[datetime] = None) -> 'BomGenerator':
+        """直接从已整理好的明细数据构建生成器，不读取任何源文件
+        
+        用于从目录索引查询结果、多个源文件合并结果等构建生成器。
+        
+        Args:
+            df (pd.DataFrame): 至少包含款式编码、波段、品类、开发颜色列的明细数据。
+                同一款式编码出现多次时以第一行为准
+            timestamp (Optional[datetime]): 固定的建单时间，见 __init__
+            
+        Returns:
+            BomGenerator: 生成器实例
+            
+        Raises:
+            ValueError: 当缺少必要的列或资源文件格式不正确时
+            FileNotFoundError: 当资源文件不存在时
+        """
+        required_columns = [cls.STYLE_CODE_COL, cls.WAVE_COL, cls.CATEGORY_COL, cls.DEV_COLOR_COL]
+        missing_columns = [col for col in required_columns if col not in df.columns]
+        if missing_columns:
+            raise ValueError(f"明细数据缺少必要的列: {missing_columns}")
+        
+        generator = cls.__new__(cls)
+        generator._init_settings(timestamp)
+        generator.df = df.copy()
+        generator.reload_color_codes()
+        generator.reload_category_mapping()
+        return generator
+    
+    @classmethod
+    def from_catalog(cls, catalog, timestamp: Optional[datetime] = None, **filters) -> 'BomGenerator':
+        """从目录索引的查询结果构建生成器
+        
+        Args:
+            catalog: 提供 query(**filters) -> pd.DataFrame 的目录索引，如 CatalogIndex
+            timestamp (Optional[datetime]): 固定的建单时间，见 __init__
+            **filters: 传给 catalog.query 的筛选条件，如 waves=['秋四波']
+            
+        Returns:
+            BomGenerator: 只包含查询结果款式的生成器
+            
+        Example:
+            >>> catalog = CatalogIndex('bom_catalog.sqlite3')
+            >>> generator = BomGenerator.from_catalog(catalog, waves=['秋四波'], categories=['连衣裙'])
+        """
+        return cls.from_dataframe(catalog.query(**filters), timestamp=timestamp)
+    
+    @classmethod
+    def from_sources(cls, sources: List[Union[str, io.BytesIO]], timestamp: Optional[datetime] = None,
+                     max_workers: Optional[int] = None) -> 'BomGenerator':
+        """并行读取多个源文件（如各设计组各自的明细表），合并为一个生成器
+
+        每个源文件在进程池中单独解析，工作进程只传回必要的列。合并后每行的
+        来源记录在 SOURCE_FILE_COL 列；同一款式编码出现在多个文件中时以排在
+        前面的文件为准，并记录在 source_conflicts 中（见 get_source_conflicts）。
+
+        Args:
+            sources (List[Union[str, io.BytesIO]]): 源文件路径或字节流，按优先级排列。
+                字节流以其 name 属性作为来源名称
+            timestamp (Optional[datetime]): 固定的建单时间，见 __init__
+            max_workers (Optional[int]): 进程数，默认为CPU核数；为1时在当前进程依次读取
+
+        Returns:
+            BomGenerator: 包含全部源文件款式的生成器
+
+        Raises:
+            FileNotFoundError: 当某个源文件不存在时
+            ValueError: 当没有提供源文件，或某个源文件无法解析时（列出全部失败的文件）
+
+        Example:
+            >>> generator = BomGenerator.from_sources(['设计一组.xlsx', '设计二组.xlsx'], max_workers=8)
+            >>> generator.get_source_conflicts()
+        """
+        if not sources:
+            raise ValueError("错误：至少需要提供一个源文件。")
+        names = [source if isinstance(source, str) else getattr(source, 'name', None) or f"字节流{i + 1}"
+                 for i, source in enumerate(sources)]
+        for source in sources:
+            if isinstance(source, str) and not os.path.exists(source):
+                raise FileNotFoundError(f"错误：源文件未找到，路径：{source}")
+
+        workers = min(len(sources), max_workers or os.cpu_count() or 1)
+        if workers < 2:
+            results = [_read_source_columns(source) for source in sources]
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                results = list(pool.map(_read_source_columns, sources))
+
+        errors = [f"{name}: {error}" for name, (_, error) in zip(names, results) if error is not None]
+        if errors:
+            raise ValueError("错误：以下源文件读取失败：\n" + "\n".join(errors))
+
+        merged = pd.concat([df.assign(**{cls.SOURCE_FILE_COL: name}) for name, (df, _) in zip(names, results)],
+                           ignore_index=True)
+        generator = cls.from_dataframe(merged, timestamp=timestamp)
+        generator.source_conflicts = cls._find_source_conflicts(merged)
+        return generator
+
+    @classmethod
+    def _find_source_conflicts(cls, df: pd.DataFrame) -> Dict[str, List[Dict[str, Any]]]:
+        """找出出现在多个源文件中的款式编码，按来源列出每个文件中的取值"""
+        rows = df[df[cls.STYLE_CODE_COL].notna()]
+        rows = rows.drop_duplicates([cls.STYLE_CODE_COL, cls.SOURCE_FILE_COL], keep='first')
+        repeated = rows[rows.duplicated(cls.STYLE_CODE_COL, keep=False)]
+        fields = [cls.SOURCE_FILE_COL, cls.WAVE_COL, cls.CATEGORY_COL, cls.DEV_COLOR_COL]
+        conflicts: Dict[str, List[Dict[str, Any]]] = {}
+        for code, *values in repeated[[cls.STYLE_CODE_COL] + fields].itertuples(index=False, name=None):
+            conflicts.setdefault(code, []).append(dict(zip(fields, values)))
+        return conflicts
+
+    def get_source_conflicts(self) -> Dict[str, List[Dict[str, Any]]]:
+        """列出在多个源文件中重复出现的款式编码
+
+        Returns:
+            Dict[str, List[Dict[str, Any]]]: 款式编码到各来源的取值列表（生效的来源在前），如
+                {'H5A123416': [{'来源文件': '一组.xlsx', '波段': '秋四波', '品类': '长袖T恤', '开发颜色': '黑色'},
+                               {'来源文件': '二组.xlsx', '波段': '秋三波', '品类': '长袖T恤', '开发颜色': '黑色'}]}
+        """
+        return {code: [dict(entry) for entry in entries] for code, entries in self.source_conflicts.items()}
+
+    @classmethod
+    def _read_source(cls, source_path: Union[str, io.BytesIO]) -> pd.DataFrame:
+        """读取源文件的"明细表"并整理为以真实列名为表头的DataFrame
+        
+        Args:
+            source_path (Union[str, io.BytesIO]): 源Excel文件路径或字节流
+            
+        Returns:
+            pd.DataFrame: 明细数据
+            
+        Raises:
+            ValueError: 当缺少必要的列时
+        """
+        # 读取指定Excel文件或字节流中的"明细表"Sheet，手动处理复杂表头
+        temp_df = pd.read_excel(source_path, sheet_name=cls.SHEET_NAME, header=1)
+        
+        # 使用第0行（现在是DataFrame的第一行）作为列名
+        new_columns = temp_df.iloc[0].values
+        df = temp_df.iloc[1:].copy()
+        df.columns = new_columns
+        
+        # 验证必要的列是否存在
+        required_columns = [cls.STYLE_CODE_COL, cls.WAVE_COL, 
+                          cls.CATEGORY_COL, cls.DEV_COLOR_COL]
+        missing_columns = [col for col in required_columns if col not in df.columns]
+        
+        if missing_columns:
+            raise ValueError(f"Excel文件缺少必要的列: {missing_columns}")
+        
+        return df
+    
+    def reload_source(self, source_path: Union[str, io.BytesIO]) -> None:
+        """重新读取源文件，替换已加载的明细数据
+        
+        颜色代码和品类映射保持不变，用于源文件被编辑后的增量刷新。
+        
+        Args:
+            source_path (Union[str, io.BytesIO]): 源Excel文件路径或字节流
+            
+        Raises:
+            FileNotFoundError: 当源文件不存在时
+            ValueError: 当源文件格式不正确时
+        """
+        try:
+            self.df = self._read_source(source_path)
+        except FileNotFoundError:
+            raise FileNotFoundError(f"错误：源文件未找到，路径：{source_path}")
+        except Exception as e:
+            if "No sheet named" in str(e):
+                raise ValueError(f"错误：Excel文件中未找到工作表 '{self.SHEET_NAME}'")
+            raise ValueError(f"读取Excel文件时发生错误: {str(e)}")
+        self._normalize_dev_colors()
+    
+    def reload_color_codes(self) -> None:
+        """从 color_codes.json 重新加载颜色代码映射表
+        
+        Raises:
+            FileNotFoundError: 当颜色代码文件不存在时
+            ValueError: 当颜色代码文件格式不正确时
+        """
+        try:
+            with open(self.color_codes_path, 'r', encoding='utf-8') as f:
+                self.color_codes = json.load(f)
+        except FileNotFoundError:
+            raise FileNotFoundError(f"错误：颜色代码文件未找到，路径：{self.color_codes_path}")
+        except json.JSONDecodeError as e:
+            raise ValueError(f"错误：颜色代码文件格式不正确：{str(e)}")
+        self.color_matcher = ColorMatcher(self.color_codes)
+        self._normalize_dev_colors()
+    
+    def _normalize_dev_colors(self) -> None:
+        """把每个款式的开发颜色一次性规范化为标准颜色名列表
+        
+        结果保存在 style_colors（款式编码 → 标准颜色名列表）和 color_errors
+        （款式编码 → 无法匹配的颜色名）中；匹配器同时缓存了每个开发颜色字符串
+        的拆分结果，之后逐款生成SKU时不再需要解析字符串。与 find_style_info 一致，
+        重复的款式编码以第一行为准。
+        """
+        style_colors: Dict[str, List[str]] = {}
+        color_errors: Dict[str, List[str]] = {}
+        if getattr(self, 'df', None) is not None and hasattr(self, 'color_matcher'):
+            rows = self.df[[self.STYLE_CODE_COL, self.DEV_COLOR_COL]]
+            rows = rows[rows[self.STYLE_CODE_COL].notna()].drop_duplicates(self.STYLE_CODE_COL, keep='first')
+            for style_code, dev_colors in rows.itertuples(index=False, name=None):
+                if not isinstance(dev_colors, str):
+                    style_colors[style_code] = []
+                    continue
+                colors, unresolved = self.color_matcher.split(dev_colors)
+                style_colors[style_code] = colors
+                if unresolved:
+                    color_errors[style_code] = unresolved
+        
+        # 构建完成后再整体替换，并发读取不会看到一半的结果
+        self.style_colors = style_colors
+        self.color_errors = color_errors
+        self._build_derived_table()
+    
+    def _build_derived_table(self) -> None:
+        """为整个明细表一次性计算渲染所需的派生字段
+        
+        在源文件、颜色代码或品类映射（重新）加载后调用。结果为两张按列存放的表：
+        
+        - derived_table：每个款式一行（索引为款式编码），列为 波段、二级品类、
+          一级品类、模板、品名、颜色、颜色代码、错误。错误列记录该款式无法生成的
+          原因（品类未定义、颜色未定义或开发颜色为空），生成时直接抛出
+        - sku_grid：每个款式的每个颜色一行，列为 款式编码、序号、颜色、颜色代码
+          以及每个尺码的SKU
+        
+        逐款渲染时只需把这些值写入单元格，不再做任何查找或字符串拼接；
+        向进程池传递这两张表也比传递整个明细表小得多。
+        """
+        if getattr(self, 'df', None) is None or not hasattr(self, 'category_mapping') \
+                or not hasattr(self, 'color_matcher'):
+            self.derived_table = None
+            self.sku_grid = None
+            self._derived_records: Dict[str, Dict[str, Any]] = {}
+            return
+        
+        rows = self.df[[self.STYLE_CODE_COL, self.WAVE_COL, self.CATEGORY_COL]]
+        rows = rows[rows[self.STYLE_CODE_COL].notna()].drop_duplicates(self.STYLE_CODE_COL, keep='first')
+        rows = rows.set_index(self.STYLE_CODE_COL)
+        secondary = rows[self.CATEGORY_COL]
+        primary = secondary.map(lambda category: self.category_mapping.get(category))
+        templates = {category: resource_path(f'templates/{category}模板.xlsx')
+                     for category in primary.dropna().unique()}
+        colors = [self.style_colors.get(code, []) for code in rows.index]
+        
+        errors = []
+        for code, category, primary_category, style_colors in zip(rows.index, secondary, primary, colors):
+            if pd.isna(primary_category):
+                errors.append(f"错误：未定义的品类 '{category}'，请在category_mapping.json中配置。")
+            elif code in self.color_errors:
+                errors.append(f"错误：在颜色代码字典中未找到颜色 '{'、'.join(self.color_errors[code])}'。")
+            elif not style_colors:
+                errors.append(f"错误：款式 '{code}' 的开发颜色为空。")
+            else:
+                errors.append(None)
+        
+        table = pd.DataFrame({
+            self.WAVE_COL: rows[self.WAVE_COL],
+            '二级品类': secondary,
+            '一级品类': primary,
+            '模板': primary.map(templates),
+            '品名': 'HECO' + rows[self.WAVE_COL].astype(str) + secondary.astype(str) + rows.index.astype(str),
+            '颜色': colors,
+            '颜色代码': [[self.color_codes[color] for color in style_colors] for style_colors in colors],
+            '错误': errors,
+        }, index=rows.index)
+        
+        grid = pd.DataFrame(
+            [(code, position, color, self.color_codes[color])
+             for code, style_colors, error in zip(table.index, colors, errors) if error is None
+             for position, color in enumerate(style_colors)],
+            columns=[self.STYLE_CODE_COL, '序号', '颜色', '颜色代码']
+        )
+        for size in self.SIZES:
+            grid[size] = grid[self.STYLE_CODE_COL].astype(str) + grid['颜色代码'].astype(str) + size
+        
+        sku_lists: Dict[str, List[Dict[str, Any]]] = {}
+        for code, color, *skus in grid[[self.STYLE_CODE_COL, '颜色', *self.SIZES]].itertuples(index=False, name=None):
+            sku_lists.setdefault(code, []).append({'color': color, 'skus': dict(zip(self.SIZES, skus))})
+        records = table.to_dict('index')
+        for (code, record), error in zip(records.items(), errors):
+            record['错误'] = error   # DataFrame中的None会变为NaN，这里保留原始值
+            record['SKU'] = sku_lists.get(code, [])
+        
+        self.derived_table = table
+        self.sku_grid = grid
+        self._derived_records = records
+    
+    def get_color_errors(self) -> Dict[str, List[str]]:
+        """批量列出开发颜色中无法匹配 color_codes.json 的款式
+        
+        在开始批量生成之前调用，可以一次看到全部需要修正的颜色，
+        而不是在生成到一半时逐个失败。
+        
+        Returns:
+            Dict[str, List[str]]: 款式编码到无法匹配的颜色名列表，如 {'H5A123416': ['酒红']}
+        """
+        return {style_code: list(colors) for style_code, colors in self.color_errors.items()}
+
+    def summarize(self, max_colors: int = 3) -> Dict[str, Any]:
+        """按波段和品类统计款式数、颜色数、SKU数、模板使用情况和多色款式
+
+        只用派生字段表做按列统计，不加载模板，详见 catalog_summary.summarize_catalog。
+
+        Args:
+            max_colors (int): 颜色数超过该值的款式列入多色款式
+
+        Returns:
+            Dict[str, Any]: 包含 totals、by_wave、by_category、templates、outliers
+        """
+        from .catalog_summary import summarize_catalog
+        return summarize_catalog(self, max_colors=max_colors)
+
+    def reload_category_mapping(self) -> None:
+        """从 category_mapping.json 重新加载品类映射
+        
+        Raises:
+            FileNotFoundError: 当品类映射文件不存在时
+            ValueError: 当品类映射文件格式不正确时
+        """
+        try:
+            with open(self.category_mapping_path, 'r', encoding='utf-8') as f:
+                self.category_mapping = json.load(f)
+        except FileNotFoundError:
+            raise FileNotFoundError("错误：品类映射文件 'category_mapping.json' 未找到。")
+        except json.JSONDecodeError:
+            raise ValueError("错误：品类映射文件 'category_mapping.json' 格式不正确。")
+        self._build_derived_table()
+    
     def find_style_info(self, style_code: str) -> Dict[str, Any]:
         """根据款式编码查找对应的产品样式信息
         
@@ -209,8 +570,9 @@ class BomGenerator:
         
         Args:
             style_code (str): 产品款式编码，如 'H5A413492'
-            dev_colors_str (str): 开发颜色字符串，多个颜色用'/'分隔，
-                                如 '灰色/黑色/杏色'
+            dev_colors_str (str): 开发颜色字符串，如 '灰色/黑色/杏色'。也接受全角斜杠、
+                                顿号、逗号、空格分隔以及省略或多写"色"字的写法，
+                                匹配规则见 ColorMatcher
             sizes (List[str]): 产品尺码列表，如 ['S', 'M', 'L', 'XL']
             
         Returns:
@@ -224,7 +586,7 @@ class BomGenerator:
                 ]
                 
         Raises:
-            ValueError: 当颜色名称在颜色代码字典中找不到时
+            ValueError: 当开发颜色为空或颜色名称在颜色代码字典中找不到时
             
         Example:
             >>> generator = BomGenerator('data.xlsx')
@@ -241,37 +603,22 @@ class BomGenerator:
                 }
             ]
         """
-        # 初始化结果列表
-        result_list = []
-        
-        # 根据 '/' 分割颜色字符串
-        color_names = [color.strip() for color in dev_colors_str.split('/')]
-        
-        # 遍历每种颜色
-        for color_name in color_names:
-            try:
-                # 从颜色代码字典中查找对应的代码
-                color_code = self.color_codes[color_name]
-            except KeyError:
-                raise ValueError(f"错误：在颜色代码字典中未找到颜色 '{color_name}'。")
-            
-            # 创建该颜色的SKU字典
-            skus_dict = {}
-            
-            # 遍历每个尺码
-            for size in sizes:
-                # 生成SKU字符串
-                sku = self._create_sku(style_code, color_code, size)
-                # 存入字典
-                skus_dict[size] = sku
-            
-            # 将该颜色的完整信息添加到结果列表
-            result_list.append({
+        # 拆分并匹配为标准颜色名（加载时已缓存，同一字符串不会重复解析）
+        color_names, unresolved = (self.color_matcher.split(dev_colors_str)
+                                   if isinstance(dev_colors_str, str) else ([], []))
+        if unresolved:
+            raise ValueError(f"错误：在颜色代码字典中未找到颜色 '{'、'.join(unresolved)}'。")
+        if not color_names:
+            raise ValueError(f"错误：款式 '{style_code}' 的开发颜色为空。")
+        
+        return [
+            {
                 'color': color_name,
-                'skus': skus_dict
-            })
-        
-        return result_list
+                'skus': {size: self._create_sku(style_code, self.color_codes[color_name], size)
+                         for size in sizes}
+            }
+            for color_name in color_names
+        ]
     
     def _create_sku(self, style_code: str, color_code: str, size: str) -> str:
         """创建单个SKU编码
@@ -295,246 +642,392 @@ class BomGenerator:
     
     def generate_bom_file(self, style_code: str, output_dir: str) -> None:
         """生成完整的BOM Excel文件
-        
+
         基于预定义的BOM模板，为指定的款式编码生成包含所有颜色和SKU信息的
         完整Excel BOM文件。该方法支持动态数量的颜色，当颜色超过3种时会
         自动插入新行来容纳额外的颜色信息。
-        
+
         处理流程：
         1. 确保输出目录存在
-        2. 加载BOM模板文件
-        3. 查找并填充产品基本信息（品名等）
-        4. 生成所有颜色的SKU信息
-        5. 如果颜色数量超过3种，动态插入新行
-        6. 填充所有颜色和SKU信息到对应位置
-        7. 保存为新的Excel文件
-        
+        2. 渲染工作簿并序列化为字节流（见 _render_workbook）
+        3. 以"临时文件 + 重命名"的方式原子写入 {款式编码}.xlsx；输出目录已有
+           索引（bom_index.json）时按其布局写入子目录并更新索引
+
         Args:
             style_code (str): 产品款式编码，如 'H5A123416'
             output_dir (str): 输出目录的完整路径。如果目录不存在会自动创建
-            
+
         Raises:
             ValueError: 当款式编码在源数据中不存在时
             FileNotFoundError: 当BOM模板文件不存在时
             PermissionError: 当无法创建输出目录或写入文件时
-            
+
         Example:
             >>> generator = BomGenerator('source.xlsx')
             >>> generator.generate_bom_file('H5A123416', './output')
             # 将在 ./output/ 目录下生成 H5A123416.xlsx 文件
-            
+
         Note:
             - 生成的文件名格式为: {款式编码}.xlsx
             - 支持任意数量的颜色，超过3种会自动扩展表格行数
             - 品名格式为: HECO{波段}{品类}{款式编码}
             - SKU生成规则: {款式编码}{颜色代码}{尺码}
+            - 批量生成请使用 generate_bom_files，渲染与写盘会重叠进行
         """
         # 1. 确保输出目录存在
         os.makedirs(output_dir, exist_ok=True)
-        
-        # 2. 获取产品基本信息
-        style_info = self.find_style_info(style_code)
-        
-        # 3. 动态模板选择逻辑（与generate_bom_file_to_buffer保持一致）
-        # a. 获取当前处理款式的二级品类（secondary_category）
-        secondary_category = style_info[self.CATEGORY_COL]
-        
-        # b. 使用self.category_mapping字典，根据secondary_category查找对应的一级品类（primary_category）
-        if secondary_category not in self.category_mapping:
-            raise ValueError(f"错误：未定义的品类 '{secondary_category}'，请在category_mapping.json中配置。")
-        
-        primary_category = self.category_mapping[secondary_category]
-        
-        # c. 根据primary_category构建模板文件的路径
-        template_path = resource_path(f'templates/{primary_category}模板.xlsx')
-        
-        # d. 加载这个动态确定的模板文件
-        try:
-            workbook = openpyxl.load_workbook(template_path)
-            sheet = workbook.active
-        except FileNotFoundError:
-            raise FileNotFoundError(f"错误：BOM模板文件未找到，路径：{template_path}")
-        
-        # e. 填充一级品类和二级品类
-        sheet['J4'] = primary_category
-        sheet['J5'] = secondary_category
-        
-        # 4. 生成品名（HECO + 波段 + 品类 + 款式编码）
-        product_name = f"HECO{style_info[self.WAVE_COL]}{style_info[self.CATEGORY_COL]}{style_code}"
-        
-        # 5. 填充静态/半静态字段内容
-        config = self.CELL_CONFIG
-        
-        # 当前时间格式化为 YYYY/MM/DD HH:MM
-        current_time = datetime.now().strftime("%Y/%m/%d %H:%M")
-        self._write_to_cell(sheet, config['timestamp'], current_time)
-        
-        # 款式编码
-        self._write_to_cell(sheet, config['style_code'], style_code)
-        
-        # 固定写入 "首单"
-        self._write_to_cell(sheet, config['order_type'], "首单")
-        
-        # 清空设计师字段 E3（清除模板预填充内容）
-        sheet['E3'].value = None
-        
-        # 品名（B4位置）
-        self._write_to_cell(sheet, config['product_name_b4'], product_name)
-        
-        # 波段信息
-        self._write_to_cell(sheet, config['wave_info'], style_info[self.WAVE_COL])
-        
-        # 6. 生成SKU列表
-        dev_colors = style_info[self.DEV_COLOR_COL]
-        sizes = ['S', 'M', 'L', 'XL']
-        sku_list = self.generate_skus(style_code, dev_colors, sizes)
-        
-        # 7. 使用精确位置映射填充颜色和SKU信息（最多处理前3个颜色）
-        for i, color_info in enumerate(sku_list):
-            if i >= len(self.PRESET_COLOR_BLOCKS):
-                break  # 暂时不处理超过3个的颜色
-            
-            try:
-                block_config = self.PRESET_COLOR_BLOCKS[i]
-                color_cell_addr = block_config['color_cell']
-                sku_target_row = block_config['sku_row']
-                
-                # 1. 写入颜色名称
-                self._write_to_cell(sheet, color_cell_addr, color_info['color'])
-                
-                # 2. 写入规格码 (SKU) - 使用_write_to_cell方法处理合并单元格
-                # SKU从B列开始，行号由 sku_target_row 决定
-                self._write_to_cell(sheet, f'B{sku_target_row}', color_info['skus']['S'])  # B列
-                self._write_to_cell(sheet, f'C{sku_target_row}', color_info['skus']['M'])  # C列
-                self._write_to_cell(sheet, f'D{sku_target_row}', color_info['skus']['L'])  # D列
-                self._write_to_cell(sheet, f'E{sku_target_row}', color_info['skus']['XL']) # E列
-                
-            except Exception as e:
-                # 提供详细的错误信息
-                raise ValueError(f"填充第{i+1}个颜色块时出错 (颜色: {color_info['color']}): {str(e)}")
-        
-        # 9. 保存文件
-        output_file_path = os.path.join(output_dir, f"{style_code}.xlsx")
+
+        # 2. 渲染并序列化
+        excel_bytes = self.generate_bom_file_to_buffer(style_code)
+
+        # 3. 原子写入文件（目录已有索引时按其布局存放并更新索引）
+        index = OutputIndex.open(output_dir)
+        if index is None:
+            output_file_path = os.path.join(output_dir, f"{style_code}.xlsx")
+        else:
+            relative_path = index.relative_path(style_code, self._derived_records.get(style_code))
+            output_file_path = os.path.join(output_dir, *relative_path.split('/'))
+            os.makedirs(os.path.dirname(output_file_path), exist_ok=True)
         try:
-            workbook.save(output_file_path)
+            atomic_write_bytes(output_file_path, excel_bytes)
         except PermissionError:
             raise PermissionError(f"错误：无法保存文件到 {output_file_path}，请检查目录权限。")
-    
+        if index is not None:
+            index.record_batch({style_code: {'path': relative_path,
+                                             'sha256': hashlib.sha256(excel_bytes).hexdigest()}},
+                               self.timestamp or datetime.now())
+
+    def generate_bom_files(self, style_codes: List[str], output_dir: str,
+                           progress_callback: Optional[Callable[[int, int, str], None]] = None,
+                           max_pending_writes: int = 8,
+                           skip_unchanged: bool = False,
+                           max_workers: Optional[int] = None,
+                           layout: Optional[str] = None,
+                           prefix_length: Optional[int] = None) -> Dict[str, Any]:
+        """批量生成BOM文件，渲染与写盘两阶段流水线并行
+
+        当前线程负责渲染每个款式并序列化为字节流，后台写入线程通过有界队列
+        接收字节流并原子写入磁盘。网络盘上写文件的等待时间因此与下一个款式
+        的渲染重叠，而不是串行累加。单个款式失败不会中断整个批次。
+
+        Args:
+            style_codes (List[str]): 要生成的款式编码列表
+            output_dir (str): 输出目录，不存在时自动创建
+            progress_callback (Optional[Callable[[int, int, str], None]]):
+                每个款式渲染前调用，参数为 (序号, 总数, 款式编码)，序号从0开始
+            max_pending_writes (int): 等待写入的文件数上限，用于限制内存占用
+            skip_unchanged (bool): 已有文件内容哈希一致时跳过写入。需配合可复现
+                模式（timestamp）使用，否则时间戳使每次输出都不同
+            max_workers (Optional[int]): 大于1时改为在进程池中并行渲染和写盘，
+                工作进程通过共享内存挂载派生字段表（见 shared_catalog），
+                此时进度回调在每个款式完成后调用
+            layout (Optional[str]): 输出布局，见 output_layout.LAYOUTS。指定后按波段/品类
+                或编码前缀分子目录存放，并在输出目录下维护索引文件 bom_index.json；
+                为None时沿用目录已有索引的布局，没有索引则平铺输出
+            prefix_length (Optional[int]): prefix 布局使用的编码前缀长度
+
+        Returns:
+            Dict[str, Any]: 批次报告，格式如下：
+                {
+                    'total': int,                      # 款式总数
+                    'success': List[str],              # 成功的款式编码（含跳过的）
+                    'skipped': List[str],              # 内容未变化而未重写的款式编码
+                    'failed': List[Tuple[str, str]],   # (款式编码, 错误信息)
+                    'render_seconds': float,           # 渲染+序列化累计耗时
+                    'write_seconds': float,            # 写盘累计耗时
+                    'elapsed_seconds': float,          # 批次总耗时（墙钟时间）
+                    'bytes_written': int               # 写入的总字节数
+                }
+
+        Raises:
+            ValueError: 当布局无效或与输出目录已有的布局不同时
+
+        Example:
+            >>> report = generator.generate_bom_files(['H5A123416', 'H5A413492'], './output')
+            >>> report['failed']
+            []
+        """
+        index = OutputIndex.open(output_dir, layout, prefix_length)
+        if max_workers is not None and max_workers > 1 and len(style_codes) > 1:
+            from .shared_catalog import generate_bom_files_parallel
+            # 各阶段耗时记录在工作进程中，这里只记录批次结果
+            report = generate_bom_files_parallel(self, style_codes, output_dir, max_workers=max_workers,
+                                                 progress_callback=progress_callback,
+                                                 skip_unchanged=skip_unchanged, index=index)
+        else:
+            report = self._generate_sequential(style_codes, output_dir, progress_callback=progress_callback,
+                                               max_pending_writes=max_pending_writes,
+                                               skip_unchanged=skip_unchanged, index=index)
+        # 每个顶层批次只记录一次指标（并行生成中回退到本进程生成的款式不单独计为批次）
+        metrics.record_batch(report)
+        return report
+
+    def _generate_sequential(self, style_codes: List[str], output_dir: str,
+                             progress_callback: Optional[Callable[[int, int, str], None]] = None,
+                             max_pending_writes: int = 8,
+                             skip_unchanged: bool = False,
+                             index: Optional[OutputIndex] = None) -> Dict[str, Any]:
+        """在当前进程中渲染、后台线程写盘，返回批次报告但不记录批次指标
+
+        参数和返回值见 generate_bom_files，index 为已打开的输出索引（平铺输出时为None）。
+        """
+        os.makedirs(output_dir, exist_ok=True)
+
+        started = time.perf_counter()
+        render_seconds = 0.0
+        rendered = []
+        failed = []
+        indexed: Dict[str, Dict[str, str]] = {}
+        created_dirs = set()
+        total = len(style_codes)
+
+        with AsyncFileWriter(max_pending=max_pending_writes, skip_unchanged=skip_unchanged) as writer:
+            for i, style_code in enumerate(style_codes):
+                if progress_callback is not None:
+                    progress_callback(i, total, style_code)
+
+                render_started = time.perf_counter()
+                try:
+                    excel_bytes = self.generate_bom_file_to_buffer(style_code)
+                except Exception as e:
+                    failed.append((style_code, str(e)))
+                    continue
+                finally:
+                    render_seconds += time.perf_counter() - render_started
+
+                if index is None:
+                    output_file_path = os.path.join(output_dir, f"{style_code}.xlsx")
+                else:
+                    relative_path = index.relative_path(style_code, self._derived_records.get(style_code))
+                    output_file_path = os.path.join(output_dir, *relative_path.split('/'))
+                    directory = os.path.dirname(output_file_path)
+                    if directory not in created_dirs:
+                        os.makedirs(directory, exist_ok=True)
+                        created_dirs.add(directory)
+                    indexed[style_code] = {'path': relative_path,
+                                           'sha256': hashlib.sha256(excel_bytes).hexdigest()}
+                writer.submit(style_code, output_file_path, excel_bytes)
+                rendered.append(style_code)
+
+        # 写入线程中失败的款式同样记为失败
+        write_errors = dict(writer.errors)
+        failed.extend(writer.errors)
+
+        report = {
+            'total': total,
+            'success': [code for code in rendered if code not in write_errors],
+            'skipped': list(writer.skipped),
+            'failed': failed,
+            'render_seconds': render_seconds,
+            'write_seconds': writer.stats['write_seconds'],
+            'elapsed_seconds': time.perf_counter() - started,
+            'bytes_written': writer.stats['bytes_written'],
+        }
+        if index is not None:
+            # 整个批次只重写一次索引
+            index.record_batch({code: indexed[code] for code in report['success']},
+                               self.timestamp or datetime.now())
+        return report
+
     def generate_bom_file_to_buffer(self, style_code: str) -> bytes:
         """
         生成单个BOM Excel文件，并将其作为字节流返回。
-        
+
         基于动态选择的BOM模板，为指定的款式编码生成包含所有颜色和SKU信息的
         完整Excel BOM文件，并返回文件的字节内容而不是保存到磁盘。
-        
+
         Args:
             style_code (str): 产品款式编码，如 'H5A123416'
-            
+
         Returns:
             bytes: Excel文件的字节内容
-            
+
         Raises:
             ValueError: 当款式编码在源数据中不存在时或未定义的品类时
             FileNotFoundError: 当BOM模板文件不存在时
-            
+
         Example:
             >>> generator = BomGenerator('source.xlsx')
             >>> excel_bytes = generator.generate_bom_file_to_buffer('H5A123416')
             >>> len(excel_bytes)  # 返回文件字节长度
-            
+
         Note:
             - 支持任意数量的颜色，超过3种会自动扩展表格行数
             - 品名格式为: HECO{波段}{品类}{款式编码}
             - SKU生成规则: {款式编码}{颜色代码}{尺码}
             - 动态选择模板：根据二级品类映射到一级品类，选择对应模板
+            - backend 为 'xlsxwriter' 时按预先提取的模板格式直接写出，不加载模板
+        """
+        if self.backend == 'xlsxwriter':
+            return render_with_xlsxwriter(self, style_code)
+
+        workbook = self._render_workbook(style_code)
+
+        # 将工作簿保存在内存中的字节流中
+        started = time.perf_counter()
+        buffer = io.BytesIO()
+        workbook.save(buffer)
+        data = buffer.getvalue()
+
+        # 可复现模式下固定zip与文档属性中的时间
+        if self.timestamp is not None:
+            data = make_reproducible_xlsx(data, self.timestamp)
+
+        metrics.STAGE_SECONDS.observe(time.perf_counter() - started, stage='serialize')
+        return data
+
+    def _derive_style(self, style_code: str) -> Dict[str, Any]:
+        """逐项计算单个款式的派生字段，格式与 derived_table 的一行相同
+
+        只用于不在已加载明细表中的款式；明细表中的款式在加载时已批量算好。
+
+        Raises:
+            ValueError: 当款式编码不存在、品类未定义或颜色未定义时
         """
-        # 1. 获取产品基本信息
         style_info = self.find_style_info(style_code)
-        
-        # 2. 动态模板选择逻辑
-        # a. 获取当前处理款式的二级品类（secondary_category）
         secondary_category = style_info[self.CATEGORY_COL]
-        
-        # b. 使用self.category_mapping字典，根据secondary_category查找对应的一级品类（primary_category）
         if secondary_category not in self.category_mapping:
             raise ValueError(f"错误：未定义的品类 '{secondary_category}'，请在category_mapping.json中配置。")
-        
         primary_category = self.category_mapping[secondary_category]
-        
-        # c. 根据primary_category构建模板文件的路径
-        template_path = resource_path(f'templates/{primary_category}模板.xlsx')
-        
-        # d. 加载这个动态确定的模板文件
-        try:
-            workbook = openpyxl.load_workbook(template_path)
-            sheet = workbook.active
-        except FileNotFoundError:
-            raise FileNotFoundError(f"错误：BOM模板文件未找到，路径：{template_path}")
-        
-        # 3. 填充一级品类和二级品类
-        sheet['J4'] = primary_category
-        sheet['J5'] = secondary_category
-        
-        # 4. 生成品名（HECO + 波段 + 品类 + 款式编码）
-        product_name = f"HECO{style_info[self.WAVE_COL]}{style_info[self.CATEGORY_COL]}{style_code}"
-        
-        # 4. 填充静态/半静态字段内容
+        sku_list = self.generate_skus(style_code, style_info[self.DEV_COLOR_COL], self.SIZES)
+        return {
+            self.WAVE_COL: style_info[self.WAVE_COL],
+            '二级品类': secondary_category,
+            '一级品类': primary_category,
+            '模板': resource_path(f'templates/{primary_category}模板.xlsx'),
+            '品名': f"HECO{style_info[self.WAVE_COL]}{secondary_category}{style_code}",
+            '颜色': [color_info['color'] for color_info in sku_list],
+            '颜色代码': [self.color_codes.get(color_info['color']) for color_info in sku_list],
+            '错误': None,
+            'SKU': sku_list,
+        }
+
+    def get_cell_values(self, style_code: str) -> Dict[str, Any]:
+        """计算单个款式在BOM中由生成器写入的全部单元格值
+
+        渲染（_render_workbook）与审计（audit）共用这一份单元格映射，
+        保证两者对"正确的BOM"有同一个定义。不包含随生成时间变化的建单日期（J2）。
+
+        Args:
+            style_code (str): 产品款式编码
+
+        Returns:
+            Dict[str, Any]: 单元格地址到值的有序映射，如 {'B3': 'H5A123416', 'B6': 'H5A12341610S', ...}。
+                只包含实际使用的颜色块（最多 len(PRESET_COLOR_BLOCKS) 个）
+
+        Raises:
+            ValueError: 当款式编码不存在、品类未定义、颜色未定义或颜色块数据不完整时
+        """
+        # 1. 取预先计算好的派生字段；不在明细表中的款式（如通过 find_style_info 注入）逐项计算
+        derived = self._derived_records.get(style_code)
+        if derived is None:
+            derived = self._derive_style(style_code)
+        if derived['错误']:
+            raise ValueError(derived['错误'])
+
+        # 2. 静态/半静态字段
         config = self.CELL_CONFIG
-        
-        # 当前时间格式化为 YYYY/MM/DD HH:MM
-        current_time = datetime.now().strftime("%Y/%m/%d %H:%M")
-        self._write_to_cell(sheet, config['timestamp'], current_time)
-        
-        # 款式编码
-        self._write_to_cell(sheet, config['style_code'], style_code)
-        
-        # 固定写入 "首单"
-        self._write_to_cell(sheet, config['order_type'], "首单")
-        
-        # 清空设计师字段 E3（清除模板预填充内容）
-        sheet['E3'].value = None
-        
-        # 品名（B4位置）
-        self._write_to_cell(sheet, config['product_name_b4'], product_name)
-        
-        # 波段信息
-        self._write_to_cell(sheet, config['wave_info'], style_info[self.WAVE_COL])
-        
-        # 5. 生成SKU列表
-        dev_colors = style_info[self.DEV_COLOR_COL]
-        sizes = ['S', 'M', 'L', 'XL']
-        sku_list = self.generate_skus(style_code, dev_colors, sizes)
-        
-        # 6. 使用精确位置映射填充颜色和SKU信息（最多处理前3个颜色）
-        for i, color_info in enumerate(sku_list):
+        cell_values = {
+            config['style_code']: style_code,
+            config['order_type']: "首单",           # 固定写入 "首单"
+            config['designer']: None,               # 清空设计师字段（清除模板预填充内容）
+            config['product_name_b4']: derived['品名'],
+            config['wave_info']: derived[self.WAVE_COL],
+            config['primary_category']: derived['一级品类'],
+            config['secondary_category']: derived['二级品类'],
+        }
+
+        # 3. 颜色与SKU，使用精确位置映射（最多处理前3个颜色）
+        for i, color_info in enumerate(derived['SKU']):
             if i >= len(self.PRESET_COLOR_BLOCKS):
                 break  # 暂时不处理超过3个的颜色
-            
+
             try:
                 block_config = self.PRESET_COLOR_BLOCKS[i]
-                color_cell_addr = block_config['color_cell']
-                sku_target_row = block_config['sku_row']
-                
-                # 1. 写入颜色名称
-                self._write_to_cell(sheet, color_cell_addr, color_info['color'])
-                
-                # 2. 写入规格码 (SKU) - 使用_write_to_cell方法处理合并单元格
-                # SKU从B列开始，行号由 sku_target_row 决定
-                self._write_to_cell(sheet, f'B{sku_target_row}', color_info['skus']['S'])  # B列
-                self._write_to_cell(sheet, f'C{sku_target_row}', color_info['skus']['M'])  # C列
-                self._write_to_cell(sheet, f'D{sku_target_row}', color_info['skus']['L'])  # D列
-                self._write_to_cell(sheet, f'E{sku_target_row}', color_info['skus']['XL']) # E列
-                
+                cell_values[block_config['color_cell']] = color_info['color']
+                # SKU从B列开始（见 SKU_COLUMNS），行号由 sku_row 决定
+                for size, column in zip(self.SIZES, self.SKU_COLUMNS):
+                    cell_values[f"{column}{block_config['sku_row']}"] = color_info['skus'][size]
             except Exception as e:
                 # 提供详细的错误信息
                 raise ValueError(f"填充第{i+1}个颜色块时出错 (颜色: {color_info['color']}): {str(e)}")
-        
-        # 7. 将工作簿保存在内存中的字节流中
-        buffer = io.BytesIO()
-        workbook.save(buffer)
-        buffer.seek(0)  # 将指针移回开头
-        
-        return buffer.getvalue()
+
+        return cell_values
+
+    def _render_workbook(self, style_code: str):
+        """加载对应品类的模板并填充单个款式的全部动态内容
+
+        generate_bom_file 与 generate_bom_file_to_buffer 共用的渲染阶段，
+        只做CPU工作，不涉及任何输出文件。
+
+        Args:
+            style_code (str): 产品款式编码
+
+        Returns:
+            openpyxl.Workbook: 填充完成、尚未保存的工作簿
+
+        Raises:
+            ValueError: 当款式编码不存在、品类未定义或填充颜色块出错时
+            FileNotFoundError: 当BOM模板文件不存在时
+        """
+        # 1. 计算所有要写入的单元格值
+        cell_values = self.get_cell_values(style_code)
+
+        # 2. 加载一级品类对应的模板
+        template_path = self._template_path(style_code, cell_values)
+        started = time.perf_counter()
+        try:
+            workbook = openpyxl.load_workbook(self._template_source(template_path))
+            sheet = workbook.active
+        except FileNotFoundError:
+            raise FileNotFoundError(f"错误：BOM模板文件未找到，路径：{template_path}")
+        loaded = time.perf_counter()
+        metrics.STAGE_SECONDS.observe(loaded - started, stage='template_load')
+        metrics.TEMPLATE_LOAD_SECONDS.observe(loaded - started,
+                                              template=os.path.splitext(os.path.basename(template_path))[0])
+
+        # 3. 填充建单时间与全部动态内容
+        self._fill_sheet(sheet, cell_values)
+        metrics.STAGE_SECONDS.observe(time.perf_counter() - loaded, stage='fill')
+        return workbook
+
+    def _template_source(self, template_path: str) -> Union[str, io.BytesIO]:
+        """load_workbook 的读取来源：未启用 template_cache 时为模板路径，否则为缓存的文件内容
+
+        openpyxl 的工作簿无法可靠地复制（深拷贝会丢失样式表），因此缓存的是文件字节，
+        省去磁盘读取，解析仍在每次渲染时进行。
+        """
+        if self.template_cache is None:
+            return template_path
+        data = self.template_cache.get(template_path)
+        metrics.TEMPLATE_CACHE.inc(result='hit' if data is not None else 'miss')
+        if data is None:
+            with open(template_path, 'rb') as f:
+                data = f.read()
+            self.template_cache[template_path] = data
+        return io.BytesIO(data)
+
+    def _template_path(self, style_code: str, cell_values: Dict[str, Any]) -> str:
+        """款式使用的模板路径（明细表中的款式已随派生字段预先算好）"""
+        derived = self._derived_records.get(style_code)
+        if derived is not None:
+            return derived['模板']
+        return resource_path(f'templates/{cell_values[self.CELL_CONFIG["primary_category"]]}模板.xlsx')
+
+    def _fill_sheet(self, sheet, cell_values: Dict[str, Any]) -> None:
+        """向模板工作表写入建单时间和 get_cell_values 给出的全部单元格
+
+        Args:
+            sheet: 模板工作表（或其副本）
+            cell_values (Dict[str, Any]): get_cell_values 的结果
+        """
+        # 当前时间（可复现模式下为固定时间）格式化为 YYYY/MM/DD HH:MM
+        current_time = (self.timestamp or datetime.now()).strftime("%Y/%m/%d %H:%M")
+        self._write_to_cell(sheet, self.CELL_CONFIG['timestamp'], current_time)
+
+        # 写入其余单元格 - 使用_write_to_cell方法处理合并单元格
+        for cell_address, value in cell_values.items():
+            self._write_to_cell(sheet, cell_address, value)
     
     def _write_to_cell(self, sheet, cell_address: str, value: str) -> None:
         """向Excel单元格写入值，处理合并单元格情况
@@ -649,3 +1142,15 @@ class BomGenerator:
                     column = sku_columns[size]
                     sku_cell_address = f"{column}{sku_row}"
                     self._write_to_cell(sheet, sku_cell_address, sku)
+
+
+def _read_source_columns(source: Union[str, io.BytesIO]) -> Tuple[Optional[pd.DataFrame], Optional[str]]:
+    """进程池任务：读取一个源文件的必要列，失败时返回错误信息而不是抛出异常"""
+    columns = [BomGenerator.STYLE_CODE_COL, BomGenerator.WAVE_COL,
+               BomGenerator.CATEGORY_COL, BomGenerator.DEV_COLOR_COL]
+    try:
+        return BomGenerator._read_source(source)[columns].reset_index(drop=True), None
+    except Exception as e:
+        if "No sheet named" in str(e):
+            return None, f"错误：Excel文件中未找到工作表 '{BomGenerator.SHEET_NAME}'"
+        return None, str(e)
@@ -0,0 +1,340 @@
+# 已生成BOM文件的并行扫描与检索索引
+
+from typing import Dict, Any, List, Optional, Iterable, Tuple
+from concurrent.futures import ProcessPoolExecutor
+import os
+import sqlite3
+
+import openpyxl
+from openpyxl.utils.cell import coordinate_to_tuple
+import pandas as pd
+
+from .bom_generator import BomGenerator
+from .output_layout import OutputIndex
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS bom_files (
+    path TEXT PRIMARY KEY,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    style_code TEXT,
+    product_name TEXT,
+    wave TEXT,
+    primary_category TEXT,
+    secondary_category TEXT,
+    created_at TEXT,
+    error TEXT
+);
+CREATE TABLE IF NOT EXISTS bom_skus (
+    path TEXT NOT NULL REFERENCES bom_files(path) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    color TEXT,
+    size TEXT,
+    sku TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_bom_files_style_code ON bom_files(style_code);
+CREATE INDEX IF NOT EXISTS idx_bom_files_wave ON bom_files(wave);
+CREATE INDEX IF NOT EXISTS idx_bom_files_category ON bom_files(secondary_category);
+CREATE INDEX IF NOT EXISTS idx_bom_skus_path ON bom_skus(path);
+CREATE INDEX IF NOT EXISTS idx_bom_skus_sku ON bom_skus(sku);
+CREATE INDEX IF NOT EXISTS idx_bom_skus_color ON bom_skus(color);
+"""
+
+# 头部字段在索引中的列名 -> CELL_CONFIG 中的键
+_HEADER_FIELDS = {
+    'style_code': 'style_code',
+    'product_name': 'product_name_b4',
+    'wave': 'wave_info',
+    'primary_category': 'primary_category',
+    'secondary_category': 'secondary_category',
+    'created_at': 'timestamp',
+}
+
+
+def _cell_position(address: str) -> Tuple[int, int]:
+    """把 'B3' 这样的地址转换为从0开始的 (行, 列) 下标"""
+    row, column = coordinate_to_tuple(address)
+    return row - 1, column - 1
+
+
+def read_cell_values(file_path: str, addresses: Iterable[str]) -> Dict[str, Optional[str]]:
+    """以只读模式读取BOM文件中指定单元格的值
+
+    只按行顺序读取到最后一个需要的行为止，不加载样式。合并单元格的值
+    位于左上角单元格，与 BomGenerator._write_to_cell 的写入位置一致。
+
+    Args:
+        file_path (str): BOM文件路径
+        addresses (Iterable[str]): 单元格地址，如 ['B3', 'B6']
+
+    Returns:
+        Dict[str, Optional[str]]: 地址到值（统一转为字符串，空单元格为None）的映射
+
+    Raises:
+        Exception: 文件不是有效的xlsx时由openpyxl抛出
+    """
+    positions = {address: _cell_position(address) for address in addresses}
+    last_row = max(row for row, _ in positions.values())
+
+    workbook = openpyxl.load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        sheet = workbook.active
+        rows = [tuple(row) for row in sheet.iter_rows(min_row=1, max_row=last_row + 1, values_only=True)]
+    finally:
+        workbook.close()
+
+    values: Dict[str, Optional[str]] = {}
+    for address, (row, column) in positions.items():
+        value = rows[row][column] if row < len(rows) and column < len(rows[row]) else None
+        values[address] = None if value is None else str(value)
+    return values
+
+
+def read_bom_fields(file_path: str) -> Dict[str, Any]:
+    """以只读模式读取一个BOM文件中由生成器写入的字段
+
+    读取位置与 BomGenerator 的 CELL_CONFIG、PRESET_COLOR_BLOCKS、SKU_COLUMNS
+    完全一致。顶层函数，便于在进程池中调用。
+
+    Args:
+        file_path (str): BOM文件路径
+
+    Returns:
+        Dict[str, Any]: 格式如下：
+            {
+                'style_code': str, 'product_name': str, 'wave': str,
+                'primary_category': str, 'secondary_category': str, 'created_at': str,
+                'colors': [{'color': str, 'skus': {'S': str, ...}}, ...]
+            }
+
+    Raises:
+        Exception: 文件不是有效的xlsx时由openpyxl抛出
+    """
+    config = BomGenerator.CELL_CONFIG
+    header_addresses = {field: config[key] for field, key in _HEADER_FIELDS.items()}
+    blocks = [(block['color_cell'],
+               {size: f"{column}{block['sku_row']}"
+                for size, column in zip(BomGenerator.SIZES, BomGenerator.SKU_COLUMNS)})
+              for block in BomGenerator.PRESET_COLOR_BLOCKS]
+
+    addresses = list(header_addresses.values())
+    for color_address, sku_addresses in blocks:
+        addresses += [color_address, *sku_addresses.values()]
+    values = read_cell_values(file_path, addresses)
+
+    fields: Dict[str, Any] = {field: values[address] for field, address in header_addresses.items()}
+    fields['colors'] = []
+    for color_address, sku_addresses in blocks:
+        color = values[color_address]
+        skus = {size: values[address] for size, address in sku_addresses.items()}
+        if color is None and not any(skus.values()):
+            continue
+        fields['colors'].append({'color': color, 'skus': skus})
+    return fields
+
+
+def _read_bom_fields_safe(file_path: str) -> Tuple[str, Optional[Dict[str, Any]], Optional[str]]:
+    """进程池任务：读取失败时返回错误信息而不是抛出异常"""
+    try:
+        return file_path, read_bom_fields(file_path), None
+    except Exception as e:
+        return file_path, None, str(e)
+
+
+def list_bom_files(directory: str, recursive: bool = True, use_index: bool = True) -> List[str]:
+    """列出目录下的BOM文件（跳过Excel锁文件和原子写入的临时文件）
+
+    目录带有输出索引（bom_index.json，见 output_layout）时返回索引中仍存在于磁盘上
+    的路径，不遍历分层的子目录；此时不在索引中的文件（如手工放入的文件）不会列出，
+    需要发现这类多余文件时传 use_index=False（audit 即如此）。
+
+    Args:
+        directory (str): 目录路径
+        recursive (bool): 是否包含子目录
+        use_index (bool): 是否优先使用输出索引
+
+    Returns:
+        List[str]: 绝对路径列表，已排序
+    """
+    if use_index and recursive:
+        index = OutputIndex.load(directory)
+        if index is not None:
+            return [path for path in index.paths() if os.path.exists(path)]
+    paths = []
+    for root, dirs, files in os.walk(os.path.abspath(directory)):
+        dirs.sort()
+        for name in files:
+            if name.endswith('.xlsx') and not name.startswith(('~$', '.')):
+                paths.append(os.path.join(root, name))
+        if not recursive:
+            break
+    return sorted(paths)
+
+
+class BomFileIndex:
+    """已生成BOM文件的检索索引
+
+    并行读取目录中的BOM文件，把款式编码、品名、波段、品类、颜色和SKU
+    写入SQLite，之后按款式、SKU、颜色、波段、品类即可直接查询。
+    重新扫描时只读取修改时间或大小有变化的文件，并清理已删除文件的记录。
+
+    Example:
+        >>> with BomFileIndex('bom_files.sqlite3') as index:
+        ...     index.scan('file/test')
+        ...     index.query(sku='H5A12341610S')
+    """
+
+    def __init__(self, db_path: str) -> None:
+        """打开（必要时创建）索引数据库
+
+        Args:
+            db_path (str): SQLite数据库文件路径
+        """
+        self.db_path = db_path
+        self._conn = sqlite3.connect(db_path)
+        self._conn.execute('PRAGMA foreign_keys = ON')
+        self._conn.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        """关闭数据库连接"""
+        self._conn.close()
+
+    def __enter__(self) -> 'BomFileIndex':
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+    def scan(self, directory: str, recursive: bool = True,
+             max_workers: Optional[int] = None) -> Dict[str, Any]:
+        """增量扫描目录并更新索引
+
+        Args:
+            directory (str): BOM输出目录
+            recursive (bool): 是否包含子目录
+            max_workers (Optional[int]): 读取文件的进程数，默认为CPU核数；为1时在当前进程读取
+
+        Returns:
+            Dict[str, Any]: {'scanned': int, 'updated': int, 'unchanged': int,
+                             'removed': int, 'errors': List[Tuple[str, str]]}
+        """
+        directory = os.path.abspath(directory)
+        known = {path: (mtime_ns, size) for path, mtime_ns, size in
+                 self._conn.execute('SELECT path, mtime_ns, size FROM bom_files')}
+
+        current: Dict[str, Tuple[int, int]] = {}
+        for path in list_bom_files(directory, recursive):
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            current[path] = (stat.st_mtime_ns, stat.st_size)
+
+        pending = [path for path, signature in current.items() if known.get(path) != signature]
+        prefix = directory.rstrip(os.sep) + os.sep
+        vanished = [path for path in known if path.startswith(prefix) and path not in current
+                    and (recursive or os.path.dirname(path) == directory)]
+
+        if max_workers == 1 or len(pending) < 2:
+            results = map(_read_bom_fields_safe, pending)
+            self._store(results, current, vanished)
+        else:
+            with ProcessPoolExecutor(max_workers=max_workers) as pool:
+                chunksize = max(1, len(pending) // ((max_workers or os.cpu_count() or 1) * 4))
+                results = pool.map(_read_bom_fields_safe, pending, chunksize=chunksize)
+                self._store(results, current, vanished)
+
+        pending_set = set(pending)
+        errors = [(path, error) for path, error in self._conn.execute(
+            'SELECT path, error FROM bom_files WHERE error IS NOT NULL') if path in pending_set]
+        return {
+            'scanned': len(current),
+            'updated': len(pending),
+            'unchanged': len(current) - len(pending),
+            'removed': len(vanished),
+            'errors': errors,
+        }
+
+    def _store(self, results: Iterable[Tuple[str, Optional[Dict[str, Any]], Optional[str]]],
+               signatures: Dict[str, Tuple[int, int]], vanished: List[str]) -> None:
+        """把读取结果写入数据库（单个事务）"""
+        with self._conn:
+            self._conn.executemany('DELETE FROM bom_files WHERE path = ?', ((path,) for path in vanished))
+            for path, fields, error in results:
+                mtime_ns, size = signatures[path]
+                fields = fields or {}
+                self._conn.execute('DELETE FROM bom_files WHERE path = ?', (path,))
+                self._conn.execute(
+                    'INSERT INTO bom_files (path, mtime_ns, size, style_code, product_name, wave, '
+                    'primary_category, secondary_category, created_at, error) '
+                    'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                    (path, mtime_ns, size, *(fields.get(field) for field in _HEADER_FIELDS), error)
+                )
+                self._conn.executemany(
+                    'INSERT INTO bom_skus (path, position, color, size, sku) VALUES (?, ?, ?, ?, ?)',
+                    ((path, position, block['color'], size, sku)
+                     for position, block in enumerate(fields.get('colors', []))
+                     for size, sku in block['skus'].items())
+                )
+
+    def query(self, style_code: Optional[str] = None, sku: Optional[str] = None,
+              color: Optional[str] = None, wave: Optional[str] = None,
+              category: Optional[str] = None) -> pd.DataFrame:
+        """按条件查询BOM文件
+
+        Args:
+            style_code (Optional[str]): 款式编码
+            sku (Optional[str]): 规格码
+            color (Optional[str]): 颜色名称
+            wave (Optional[str]): 波段
+            category (Optional[str]): 品类（一级或二级品类均可）
+
+        Returns:
+            pd.DataFrame: 每个匹配文件一行，列为 path、style_code、product_name、wave、
+                primary_category、secondary_category、created_at、colors（'/'连接）
+        """
+        conditions = ['f.error IS NULL']
+        params: List[Any] = []
+        if style_code is not None:
+            conditions.append('f.style_code = ?')
+            params.append(style_code)
+        if wave is not None:
+            conditions.append('f.wave = ?')
+            params.append(wave)
+        if category is not None:
+            conditions.append('(f.secondary_category = ? OR f.primary_category = ?)')
+            params.extend([category, category])
+        if sku is not None:
+            conditions.append('f.path IN (SELECT path FROM bom_skus WHERE sku = ?)')
+            params.append(sku)
+        if color is not None:
+            conditions.append('f.path IN (SELECT path FROM bom_skus WHERE color = ?)')
+            params.append(color)
+
+        sql = (
+            "SELECT f.path, f.style_code, f.product_name, f.wave, f.primary_category, "
+            "f.secondary_category, f.created_at, "
+            "(SELECT group_concat(color, '/') FROM (SELECT DISTINCT position, color FROM bom_skus s "
+            " WHERE s.path = f.path ORDER BY position)) AS colors "
+            f"FROM bom_files f WHERE {' AND '.join(conditions)} ORDER BY f.style_code, f.path"
+        )
+        cursor = self._conn.execute(sql, params)
+        columns = [description[0] for description in cursor.description]
+        return pd.DataFrame(cursor.fetchall(), columns=columns)
+
+    def get_skus(self, path: str) -> List[Dict[str, Any]]:
+        """读取某个已索引文件的颜色与SKU
+
+        Args:
+            path (str): BOM文件路径
+
+        Returns:
+            List[Dict[str, Any]]: 与 read_bom_fields 的 'colors' 相同的结构
+        """
+        colors: Dict[int, Dict[str, Any]] = {}
+        for position, color, size, sku in self._conn.execute(
+                'SELECT position, color, size, sku FROM bom_skus WHERE path = ? ORDER BY position',
+                (os.path.abspath(path),)):
+            colors.setdefault(position, {'color': color, 'skus': {}})['skus'][size] = sku
+        return [colors[position] for position in sorted(colors)]
@@ -0,0 +1,388 @@
+# 本地HTTP生成服务：常驻进程中缓存已解析的明细表和模板文件，按需生成BOM
+
+from typing import Dict, Any, List, Optional, Tuple
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import quote, unquote
+import hashlib
+import io
+import json
+import re
+import threading
+import time
+import zipfile
+
+from .bom_generator import BomGenerator
+from .render_executor import RenderExecutor, RenderJob, get_render_executor
+
+
+XLSX_CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+
+class BomService:
+    """常驻的BOM生成服务，供桌面版以外的系统（如PLM）通过HTTP调用
+
+    明细表按内容的SHA-256缓存（最近使用的 max_catalogs 个），重复上传或登记
+    同一文件不会重新解析。每个明细表加载后立即按其用到的模板各预热渲染一次：
+    xlsxwriter 后端提取好的模板格式常驻内存，之后的请求不再加载模板；openpyxl
+    后端的模板文件内容由全部明细表共用一份缓存，请求不再读磁盘，但每次仍需解析
+    模板（约占单个款式耗时的大部分，需要更低延迟时可改用 xlsxwriter 后端）。
+    批量任务通过进程内共享的 RenderExecutor 排队执行。
+
+    Example:
+        >>> service = BomService()
+        >>> catalog = service.add_catalog_path('明细表.xlsx')
+        >>> excel_bytes = service.render(catalog['catalog_id'], 'H5A123416')
+        >>> server = service.serve(port=8765)
+    """
+
+    def __init__(self, max_catalogs: int = 4, max_jobs: int = 100,
+                 executor: Optional[RenderExecutor] = None, backend: Optional[str] = None) -> None:
+        """
+        Args:
+            max_catalogs (int): 缓存的明细表个数上限
+            max_jobs (int): 保留的已结束批量任务个数上限（超出后最早结束的任务被清除）
+            executor (Optional[RenderExecutor]): 批量任务的执行器，默认为进程内共享的执行器
+            backend (Optional[str]): 写出后端，默认沿用 BomGenerator 的设置（见 xlsx_backend）
+        """
+        if max_catalogs < 1 or max_jobs < 1:
+            raise ValueError("错误：max_catalogs 和 max_jobs 必须是正整数")
+        self.max_catalogs = max_catalogs
+        self.max_jobs = max_jobs
+        self.executor = executor or get_render_executor()
+        self.backend = backend
+        self._catalogs: 'OrderedDict[str, BomGenerator]' = OrderedDict()
+        # openpyxl 后端的模板文件内容，全部明细表共用（见 BomGenerator.template_cache）
+        self._templates: Dict[str, bytes] = {}
+        self._jobs: 'OrderedDict[str, Tuple[RenderJob, str]]' = OrderedDict()
+        self._next_job = 1
+        self._lock = threading.Lock()
+
+    # ---- 明细表 ----
+
+    def add_catalog_bytes(self, data: bytes) -> Dict[str, Any]:
+        """上传明细表内容；内容相同的明细表直接复用已解析的结果
+
+        Returns:
+            Dict[str, Any]: {'catalog_id': str, 'styles': int, 'cached': bool, 'load_seconds': float}
+
+        Raises:
+            ValueError: 当内容不是有效的明细表时
+        """
+        catalog_id = hashlib.sha256(data).hexdigest()
+        with self._lock:
+            generator = self._catalogs.get(catalog_id)
+            if generator is not None:
+                self._catalogs.move_to_end(catalog_id)
+                return {'catalog_id': catalog_id, 'styles': len(generator.get_all_style_codes()),
+                        'cached': True, 'load_seconds': 0.0}
+
+        started = time.perf_counter()
+        generator = BomGenerator(io.BytesIO(data))
+        if self.backend is not None:
+            generator.backend = self.backend
+        generator.template_cache = self._templates
+        self._warm(generator)
+        with self._lock:
+            self._catalogs[catalog_id] = generator
+            while len(self._catalogs) > self.max_catalogs:
+                self._catalogs.popitem(last=False)
+        return {'catalog_id': catalog_id, 'styles': len(generator.get_all_style_codes()),
+                'cached': False, 'load_seconds': time.perf_counter() - started}
+
+    def add_catalog_path(self, path: str) -> Dict[str, Any]:
+        """登记服务所在机器上的明细表文件，见 add_catalog_bytes
+
+        Raises:
+            FileNotFoundError: 当文件不存在时
+        """
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+        except FileNotFoundError:
+            raise FileNotFoundError(f"错误：源文件未找到，路径：{path}")
+        return self.add_catalog_bytes(data)
+
+    def catalogs(self) -> List[Dict[str, Any]]:
+        """已缓存的明细表，最近使用的在后"""
+        with self._lock:
+            return [{'catalog_id': catalog_id, 'styles': len(generator.get_all_style_codes())}
+                    for catalog_id, generator in self._catalogs.items()]
+
+    def _generator(self, catalog_id: str) -> BomGenerator:
+        with self._lock:
+            generator = self._catalogs.get(catalog_id)
+            if generator is None:
+                raise KeyError(f"错误：未找到明细表 {catalog_id}，请先上传")
+            self._catalogs.move_to_end(catalog_id)
+            return generator
+
+    def _warm(self, generator: BomGenerator) -> None:
+        """按明细表用到的每个模板各渲染一个款式，预先缓存模板（或其格式）和相关模块"""
+        warmed = set()
+        for style_code in generator.get_all_style_codes():
+            record = generator._derived_records.get(style_code)
+            if record is None or record['错误'] or record['模板'] in warmed:
+                continue
+            warmed.add(record['模板'])
+            try:
+                generator.generate_bom_file_to_buffer(style_code)
+            except (ValueError, FileNotFoundError):
+                pass
+
+    # ---- 生成 ----
+
+    def render(self, catalog_id: str, style_code: str) -> bytes:
+        """同步生成单个款式的BOM
+
+        Raises:
+            KeyError: 当明细表不存在时
+            ValueError: 当款式无法生成时
+        """
+        return self._generator(catalog_id).generate_bom_file_to_buffer(style_code)
+
+    def style_codes(self, catalog_id: str, codes: Optional[List[str]] = None) -> List[str]:
+        """请求中的款式编码，未指定时为明细表中的全部款式"""
+        generator = self._generator(catalog_id)
+        if codes is None:
+            return generator.get_all_style_codes()
+        if not isinstance(codes, list) or not all(isinstance(code, str) for code in codes):
+            raise ValueError("错误：codes 必须是款式编码字符串的列表")
+        return codes
+
+    def submit(self, catalog_id: str, codes: Optional[List[str]] = None) -> str:
+        """提交批量任务，返回任务ID"""
+        generator = self._generator(catalog_id)
+        job = self.executor.submit(generator, self.style_codes(catalog_id, codes))
+        with self._lock:
+            job_id = str(self._next_job)
+            self._next_job += 1
+            self._jobs[job_id] = (job, catalog_id)
+            finished = [key for key, (item, _) in self._jobs.items()
+                        if item.status in (RenderJob.DONE, RenderJob.CANCELLED)]
+            for key in finished[:max(0, len(self._jobs) - self.max_jobs)]:
+                del self._jobs[key]
+        return job_id
+
+    def job(self, job_id: str) -> RenderJob:
+        with self._lock:
+            item = self._jobs.get(job_id)
+        if item is None:
+            raise KeyError(f"错误：未找到任务 {job_id}")
+        return item[0]
+
+    def job_status(self, job_id: str) -> Dict[str, Any]:
+        """任务状态：{'job_id', 'status', 'total', 'completed', 'position', 'eta_seconds', 'failed'}"""
+        job = self.job(job_id)
+        return {
+            'job_id': job_id,
+            'status': job.status,
+            'total': job.total,
+            'completed': job.completed,
+            'position': job.position(),
+            'eta_seconds': job.eta_seconds(),
+            'failed': [{'style_code': code, 'error': error} for code, error in job.failed],
+        }
+
+    def cancel(self, job_id: str) -> bool:
+        """取消任务（运行中的任务在当前款式完成后停止），或释放已结束任务的结果
+
+        Returns:
+            bool: 任务被取消时返回True；任务已结束时返回False（结果同时被释放）
+        """
+        job = self.job(job_id)
+        cancelled = job.cancel()
+        if cancelled or job.status in (RenderJob.DONE, RenderJob.CANCELLED):
+            with self._lock:
+                self._jobs.pop(job_id, None)
+        return cancelled
+
+    def health(self) -> Dict[str, Any]:
+        with self._lock:
+            catalogs, jobs = len(self._catalogs), len(self._jobs)
+        return {'catalogs': catalogs, 'jobs': jobs, 'executor': self.executor.stats()}
+
+    def serve(self, host: str = '127.0.0.1', port: int = 8765) -> ThreadingHTTPServer:
+        """创建HTTP服务器（调用 serve_forever 开始处理请求），接口见 _Handler"""
+        server = ThreadingHTTPServer((host, port), _Handler)
+        server.daemon_threads = True
+        server.service = self
+        server.max_upload_bytes = 200 * 1024 * 1024
+        return server
+
+
+class _ChunkedWriter:
+    """把 zipfile 的输出以 HTTP 分块传输编码写出，ZIP 边生成边发送"""
+
+    def __init__(self, wfile) -> None:
+        self._wfile = wfile
+
+    def write(self, data: bytes) -> int:
+        if data:
+            self._wfile.write(b'%x\r\n%s\r\n' % (len(data), bytes(data)))
+        return len(data)
+
+    def flush(self) -> None:
+        self._wfile.flush()
+
+    def close(self) -> None:
+        self._wfile.write(b'0\r\n\r\n')
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """HTTP接口（请求和响应均为JSON，另有说明的除外）：
+
+    GET    /health                                     服务状态
+    GET    /catalogs                                   已缓存的明细表
+    POST   /catalogs                                   上传明细表（请求体为xlsx内容），
+                                                       或登记本机文件（JSON {"path": ...}）
+    GET    /catalogs/{id}/styles/{款式编码}.xlsx         单个款式的BOM（xlsx）
+    POST   /catalogs/{id}/zip                          {"codes": [...]}，边生成边返回ZIP，
+                                                       无法生成的款式列在 失败清单.txt 中
+    POST   /catalogs/{id}/jobs                         {"codes": [...]}，提交批量任务
+    GET    /jobs/{id}                                  任务状态、排队位置和预计剩余时间
+    GET    /jobs/{id}/result.zip                       已完成任务的ZIP
+    DELETE /jobs/{id}                                  取消排队中的任务或释放已完成任务的结果
+    """
+
+    protocol_version = 'HTTP/1.1'
+
+    _ROUTES = [
+        ('GET', re.compile(r'^/health$'), '_health'),
+        ('GET', re.compile(r'^/catalogs$'), '_list_catalogs'),
+        ('POST', re.compile(r'^/catalogs$'), '_add_catalog'),
+        ('GET', re.compile(r'^/catalogs/([0-9a-f]+)/styles/([^/]+)\.xlsx$'), '_render'),
+        ('POST', re.compile(r'^/catalogs/([0-9a-f]+)/zip$'), '_stream_zip'),
+        ('POST', re.compile(r'^/catalogs/([0-9a-f]+)/jobs$'), '_submit'),
+        ('GET', re.compile(r'^/jobs/(\d+)$'), '_job_status'),
+        ('GET', re.compile(r'^/jobs/(\d+)/result\.zip$'), '_job_zip'),
+        ('DELETE', re.compile(r'^/jobs/(\d+)$'), '_cancel'),
+    ]
+
+    def do_GET(self) -> None:
+        self._dispatch('GET')
+
+    def do_POST(self) -> None:
+        self._dispatch('POST')
+
+    def do_DELETE(self) -> None:
+        self._dispatch('DELETE')
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+    @property
+    def service(self) -> BomService:
+        return self.server.service
+
+    def _dispatch(self, method: str) -> None:
+        path = unquote(self.path.split('?')[0])
+        for route_method, pattern, handler in self._ROUTES:
+            match = pattern.match(path)
+            if match and route_method == method:
+                break
+        else:
+            self._send_json(404, {'error': f'错误：未知的接口 {method} {path}'})
+            return
+        try:
+            getattr(self, handler)(*match.groups())
+        except KeyError as e:
+            self._send_json(404, {'error': e.args[0]})
+        except (ValueError, FileNotFoundError) as e:
+            self._send_json(400, {'error': str(e)})
+
+    def _read_body(self) -> bytes:
+        length = int(self.headers.get('Content-Length') or 0)
+        if length > self.server.max_upload_bytes:
+            raise ValueError(f"错误：请求体过大（{length} 字节）")
+        return self.rfile.read(length)
+
+    def _read_json(self) -> Dict[str, Any]:
+        body = self._read_body()
+        if not body:
+            return {}
+        try:
+            payload = json.loads(body)
+        except ValueError:
+            raise ValueError("错误：请求体不是有效的JSON")
+        if not isinstance(payload, dict):
+            raise ValueError("错误：请求体必须是JSON对象")
+        return payload
+
+    def _send_json(self, status: int, payload: Any) -> None:
+        self._send_bytes(status, json.dumps(payload, ensure_ascii=False).encode('utf-8'),
+                         'application/json; charset=utf-8')
+
+    def _send_bytes(self, status: int, body: bytes, content_type: str, file_name: Optional[str] = None) -> None:
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        if file_name is not None:
+            self.send_header('Content-Disposition', f"attachment; filename*=UTF-8''{quote(file_name)}")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _health(self) -> None:
+        self._send_json(200, self.service.health())
+
+    def _list_catalogs(self) -> None:
+        self._send_json(200, self.service.catalogs())
+
+    def _add_catalog(self) -> None:
+        if self.headers.get('Content-Type', '').startswith('application/json'):
+            payload = self._read_json()
+            if not isinstance(payload.get('path'), str):
+                raise ValueError("错误：登记本机文件时需提供 path")
+            result = self.service.add_catalog_path(payload['path'])
+        else:
+            result = self.service.add_catalog_bytes(self._read_body())
+        self._send_json(200 if result['cached'] else 201, result)
+
+    def _render(self, catalog_id: str, style_code: str) -> None:
+        self._send_bytes(200, self.service.render(catalog_id, style_code), XLSX_CONTENT_TYPE,
+                         file_name=f'{style_code}.xlsx')
+
+    def _stream_zip(self, catalog_id: str) -> None:
+        codes = self.service.style_codes(catalog_id, self._read_json().get('codes'))
+        generator = self.service._generator(catalog_id)
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/zip')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.send_header('Content-Disposition', "attachment; filename*=UTF-8''BOMs.zip")
+        self.end_headers()
+
+        stream = _ChunkedWriter(self.wfile)
+        failed = []
+        with zipfile.ZipFile(stream, 'w', zipfile.ZIP_DEFLATED) as archive:
+            for style_code in codes:
+                try:
+                    data = generator.generate_bom_file_to_buffer(style_code)
+                except (ValueError, FileNotFoundError) as e:
+                    failed.append(f'{style_code}\t{e}')
+                    continue
+                archive.writestr(f'{style_code}.xlsx', data)
+            if failed:
+                archive.writestr('失败清单.txt', '\n'.join(failed) + '\n')
+        stream.close()
+
+    def _submit(self, catalog_id: str) -> None:
+        job_id = self.service.submit(catalog_id, self._read_json().get('codes'))
+        self._send_json(202, {'job_id': job_id, 'status_url': f'/jobs/{job_id}'})
+
+    def _job_status(self, job_id: str) -> None:
+        self._send_json(200, self.service.job_status(job_id))
+
+    def _job_zip(self, job_id: str) -> None:
+        job = self.service.job(job_id)
+        if job.status != RenderJob.DONE:
+            self._send_json(409, {'error': f'错误：任务 {job_id} 尚未完成（{job.status}）'})
+            return
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+            for style_code in job.style_codes:
+                if style_code in job.results:
+                    archive.writestr(f'{style_code}.xlsx', job.results[style_code])
+        self._send_bytes(200, buffer.getvalue(), 'application/zip', file_name=f'BOMs_{job_id}.zip')
+
+    def _cancel(self, job_id: str) -> None:
+        self._send_json(200, {'job_id': job_id, 'cancelled': self.service.cancel(job_id)})
@@ -0,0 +1,111 @@
+# 两个版本明细表之间的款式差异对比
+
+from typing import Dict, Any, List, Tuple
+import pandas as pd
+
+from .bom_generator import BomGenerator
+
+
+# 参与对比的字段（款式编码之外）
+DIFF_FIELDS = [BomGenerator.WAVE_COL, BomGenerator.CATEGORY_COL, BomGenerator.DEV_COLOR_COL]
+
+
+def _style_table(generator: BomGenerator) -> pd.DataFrame:
+    """提取按款式编码去重后的对比用数据表
+
+    与 find_style_info 一致，同一款式编码出现多次时以第一行为准。
+
+    Args:
+        generator (BomGenerator): 已加载源文件的生成器
+
+    Returns:
+        pd.DataFrame: 以款式编码为列、包含 DIFF_FIELDS 的数据表
+    """
+    code_col = BomGenerator.STYLE_CODE_COL
+    table = generator.df[[code_col] + DIFF_FIELDS].dropna(subset=[code_col])
+    table = table.drop_duplicates(subset=[code_col], keep='first')
+    # 统一空值，避免 NaN != NaN 被误判为修改
+    return table.astype(object).where(table.notna(), None)
+
+
+def diff_catalogs(old: BomGenerator, new: BomGenerator) -> Dict[str, Any]:
+    """对比两个版本的明细表，找出新增、删除和修改的款式
+
+    以款式编码做外连接，逐字段向量化比较波段、品类、开发颜色，
+    不逐行循环DataFrame。
+
+    Args:
+        old (BomGenerator): 旧版本明细表的生成器
+        new (BomGenerator): 新版本明细表的生成器
+
+    Returns:
+        Dict[str, Any]: 差异报告，格式如下：
+            {
+                'added': List[str],      # 仅新版本中存在的款式编码
+                'removed': List[str],    # 仅旧版本中存在的款式编码
+                'modified': Dict[str, Dict[str, Tuple[Any, Any]]],
+                                         # 款式编码 -> {字段: (旧值, 新值)}
+                'changed': List[str]     # 需要重新生成的款式（新增+修改），按新版本顺序
+            }
+
+    Example:
+        >>> diff = diff_catalogs(BomGenerator('v1.xlsx'), BomGenerator('v2.xlsx'))
+        >>> diff['modified']['H5A123416']
+        {'开发颜色': ('黑色/红色', '黑色/红色/白色')}
+        >>> new_generator.generate_bom_files(diff['changed'], './output')
+    """
+    code_col = BomGenerator.STYLE_CODE_COL
+    merged = _style_table(old).merge(
+        _style_table(new), on=code_col, how='outer',
+        suffixes=('_old', '_new'), indicator=True, sort=False
+    )
+
+    added = merged.loc[merged['_merge'] == 'right_only', code_col].tolist()
+    removed = merged.loc[merged['_merge'] == 'left_only', code_col].tolist()
+
+    both = merged[merged['_merge'] == 'both']
+    field_changed = pd.DataFrame({
+        field: both[f'{field}_old'].ne(both[f'{field}_new']) for field in DIFF_FIELDS
+    }, index=both.index)
+
+    modified: Dict[str, Dict[str, Tuple[Any, Any]]] = {}
+    changed_rows = both[field_changed.any(axis=1)]
+    for index, row in changed_rows.iterrows():
+        modified[row[code_col]] = {
+            field: (row[f'{field}_old'], row[f'{field}_new'])
+            for field in DIFF_FIELDS if field_changed.at[index, field]
+        }
+
+    # 按新版本中的顺序给出需要重新生成的款式
+    changed_set = set(added) | set(modified)
+    changed = [code for code in _style_table(new)[code_col] if code in changed_set]
+
+    return {
+        'added': added,
+        'removed': removed,
+        'modified': modified,
+        'changed': changed,
+    }
+
+
+def format_diff_report(diff: Dict[str, Any]) -> List[str]:
+    """将差异报告格式化为便于阅读的文本行
+
+    Args:
+        diff (Dict[str, Any]): diff_catalogs 的返回值
+
+    Returns:
+        List[str]: 文本行列表
+    """
+    lines = [
+        f"新增 {len(diff['added'])} 款，删除 {len(diff['removed'])} 款，"
+        f"修改 {len(diff['modified'])} 款"
+    ]
+    for code in diff['added']:
+        lines.append(f"+ {code}")
+    for code in diff['removed']:
+        lines.append(f"- {code}")
+    for code, changes in diff['modified'].items():
+        details = "；".join(f"{field}: {old} → {new}" for field, (old, new) in changes.items())
+        lines.append(f"* {code}  {details}")
+    return lines
@@ -0,0 +1,227 @@
+# 基于SQLite的多季节明细表目录索引
+
+from typing import Dict, Any, List, Optional, Iterable
+from datetime import datetime
+import hashlib
+import json
+import os
+import sqlite3
+
+import pandas as pd
+
+from .bom_generator import BomGenerator
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS source_files (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE,
+    season TEXT NOT NULL,
+    sha256 TEXT NOT NULL,
+    style_count INTEGER NOT NULL,
+    ingested_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS styles (
+    file_id INTEGER NOT NULL REFERENCES source_files(id) ON DELETE CASCADE,
+    row_no INTEGER NOT NULL,
+    style_code TEXT NOT NULL,
+    wave TEXT,
+    category TEXT,
+    dev_colors TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_styles_style_code ON styles(style_code);
+CREATE INDEX IF NOT EXISTS idx_styles_wave ON styles(wave);
+CREATE INDEX IF NOT EXISTS idx_styles_category ON styles(category);
+CREATE INDEX IF NOT EXISTS idx_styles_file ON styles(file_id);
+"""
+
+
+def file_sha256(file_path: str) -> str:
+    """分块计算文件的SHA-256摘要
+
+    Args:
+        file_path (str): 文件路径
+
+    Returns:
+        str: 十六进制摘要
+    """
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class CatalogIndex:
+    """持久化的多季节明细表目录索引
+
+    把多个《新品研发明细表》的款式编码、波段、品类、开发颜色写入一个
+    SQLite数据库，并在款式编码、波段、品类上建立索引。按款式编码或波段/品类
+    查询时无需重新解析任何xlsx。重复导入时按文件SHA-256判断，内容未变的
+    文件直接跳过。
+
+    Example:
+        >>> catalog = CatalogIndex('bom_catalog.sqlite3')
+        >>> catalog.ingest('2025秋季明细表.xlsx', season='2025秋')
+        >>> catalog.find_style('H5A123416')[0]['季节']
+        '2025秋'
+        >>> generator = BomGenerator.from_catalog(catalog, waves=['秋四波'])
+    """
+
+    SEASON_COL = '季节'
+
+    def __init__(self, db_path: str) -> None:
+        """打开（必要时创建）索引数据库
+
+        Args:
+            db_path (str): SQLite数据库文件路径
+        """
+        self.db_path = db_path
+        self._conn = sqlite3.connect(db_path)
+        self._conn.execute('PRAGMA foreign_keys = ON')
+        self._conn.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        """关闭数据库连接"""
+        self._conn.close()
+
+    def __enter__(self) -> 'CatalogIndex':
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+    def ingest(self, source_path: str, season: Optional[str] = None) -> Dict[str, Any]:
+        """导入一个明细表文件，内容未变化时跳过
+
+        Args:
+            source_path (str): 明细表文件路径
+            season (Optional[str]): 季节标签，默认为文件名（不含扩展名）
+
+        Returns:
+            Dict[str, Any]: {'path': str, 'season': str, 'skipped': bool, 'styles': int}
+
+        Raises:
+            FileNotFoundError: 当文件不存在时
+            ValueError: 当文件格式不正确时
+        """
+        path = os.path.abspath(source_path)
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"错误：源文件未找到，路径：{source_path}")
+        if season is None:
+            season = os.path.splitext(os.path.basename(path))[0]
+
+        sha256 = file_sha256(path)
+        existing = self._conn.execute(
+            'SELECT id, sha256, season, style_count FROM source_files WHERE path = ?', (path,)
+        ).fetchone()
+        if existing is not None and existing[1] == sha256 and existing[2] == season:
+            return {'path': path, 'season': season, 'skipped': True, 'styles': existing[3]}
+
+        try:
+            df = BomGenerator._read_source(path)
+        except Exception as e:
+            raise ValueError(f"读取Excel文件时发生错误: {str(e)}")
+        rows = df[[BomGenerator.STYLE_CODE_COL, BomGenerator.WAVE_COL,
+                   BomGenerator.CATEGORY_COL, BomGenerator.DEV_COLOR_COL]]
+        rows = rows[rows[BomGenerator.STYLE_CODE_COL].notna()]
+        rows = rows.astype(object).where(rows.notna(), None)
+
+        with self._conn:
+            if existing is not None:
+                # 文件内容已变化：整体替换该文件的数据
+                self._conn.execute('DELETE FROM source_files WHERE id = ?', (existing[0],))
+            cursor = self._conn.execute(
+                'INSERT INTO source_files (path, season, sha256, style_count, ingested_at) '
+                'VALUES (?, ?, ?, ?, ?)',
+                (path, season, sha256, len(rows), datetime.now().isoformat(timespec='seconds'))
+            )
+            file_id = cursor.lastrowid
+            self._conn.executemany(
+                'INSERT INTO styles (file_id, row_no, style_code, wave, category, dev_colors) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                ((file_id, row_no, str(code), wave, category, colors)
+                 for row_no, (code, wave, category, colors) in enumerate(rows.itertuples(index=False, name=None)))
+            )
+        return {'path': path, 'season': season, 'skipped': False, 'styles': len(rows)}
+
+    def ingest_many(self, source_paths: Iterable[str]) -> List[Dict[str, Any]]:
+        """依次导入多个明细表文件
+
+        Args:
+            source_paths (Iterable[str]): 文件路径列表
+
+        Returns:
+            List[Dict[str, Any]]: 每个文件的 ingest 结果
+        """
+        return [self.ingest(path) for path in source_paths]
+
+    def remove(self, source_path: str) -> bool:
+        """从索引中移除一个明细表文件及其全部款式
+
+        Returns:
+            bool: 文件在索引中存在并被移除时返回True
+        """
+        with self._conn:
+            cursor = self._conn.execute('DELETE FROM source_files WHERE path = ?',
+                                        (os.path.abspath(source_path),))
+        return cursor.rowcount > 0
+
+    def list_files(self) -> List[Dict[str, Any]]:
+        """列出已导入的明细表文件"""
+        cursor = self._conn.execute(
+            'SELECT path, season, sha256, style_count, ingested_at FROM source_files ORDER BY season, path'
+        )
+        columns = [description[0] for description in cursor.description]
+        return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+    def query(self, style_codes: Optional[Iterable[str]] = None,
+              waves: Optional[Iterable[str]] = None,
+              categories: Optional[Iterable[str]] = None,
+              seasons: Optional[Iterable[str]] = None) -> pd.DataFrame:
+        """按条件查询款式，返回可直接交给 BomGenerator.from_dataframe 的明细数据
+
+        各条件之间为"且"关系，同一条件内为"或"关系；未指定的条件不做筛选。
+        同一款式编码出现在多个文件中时，最近导入的文件排在前面。
+
+        Args:
+            style_codes (Optional[Iterable[str]]): 款式编码
+            waves (Optional[Iterable[str]]): 波段
+            categories (Optional[Iterable[str]]): 品类（二级品类）
+            seasons (Optional[Iterable[str]]): 季节标签
+
+        Returns:
+            pd.DataFrame: 列为 款式编码、波段、品类、开发颜色、季节、来源文件
+        """
+        conditions = []
+        params: List[Any] = []
+        for column, values in (('s.style_code', style_codes), ('s.wave', waves),
+                               ('s.category', categories), ('f.season', seasons)):
+            if values is None:
+                continue
+            # 以JSON数组传参，避免大批量款式编码超出SQLite的参数个数上限
+            conditions.append(f"{column} IN (SELECT value FROM json_each(?))")
+            params.append(json.dumps([str(value) for value in values], ensure_ascii=False))
+
+        sql = ('SELECT s.style_code, s.wave, s.category, s.dev_colors, f.season, f.path '
+               'FROM styles s JOIN source_files f ON f.id = s.file_id')
+        if conditions:
+            sql += ' WHERE ' + ' AND '.join(conditions)
+        sql += ' ORDER BY f.ingested_at DESC, f.id DESC, s.row_no'
+
+        rows = self._conn.execute(sql, params).fetchall()
+        return pd.DataFrame(rows, columns=[
+            BomGenerator.STYLE_CODE_COL, BomGenerator.WAVE_COL, BomGenerator.CATEGORY_COL,
+            BomGenerator.DEV_COLOR_COL, self.SEASON_COL, BomGenerator.SOURCE_FILE_COL
+        ])
+
+    def find_style(self, style_code: str) -> List[Dict[str, Any]]:
+        """查找某个款式编码出现在哪些季节/文件中
+
+        Args:
+            style_code (str): 款式编码
+
+        Returns:
+            List[Dict[str, Any]]: 每个出现位置的完整信息，最近导入的在前
+        """
+        return self.query(style_codes=[style_code]).to_dict('records')
@@ -0,0 +1,161 @@
+# 明细表概况：按波段、品类统计款式数、颜色数和SKU数，不加载任何模板
+
+from typing import Dict, Any
+import io
+import os
+
+import pandas as pd
+
+from .bom_generator import BomGenerator
+from .writer import atomic_write_bytes
+
+
+# 颜色数超过该值的款式列为多色款式，BOM中需要额外插入颜色行
+DEFAULT_MAX_COLORS = 3
+
+SUMMARY_COLUMNS = ['分组', '名称', '款式数', '颜色数', '颜色种类', 'SKU数', '无法生成']
+
+
+def summarize_catalog(generator: BomGenerator, max_colors: int = DEFAULT_MAX_COLORS) -> Dict[str, Any]:
+    """根据派生字段表统计明细表概况
+
+    全部为 groupby / explode 等按列运算，5万个款式的明细表约需0.1秒；
+    不加载模板、不渲染任何款式。颜色数按"款式 × 颜色"计，颜色种类为组内
+    不同颜色的个数（无法匹配颜色代码表的颜色不计入）；SKU数只统计可以生成的
+    款式（颜色数 × 尺码数）。没有波段的款式归入"未分波段"。
+
+    Args:
+        generator (BomGenerator): 已加载明细表的生成器
+        max_colors (int): 颜色数超过该值的款式列入多色款式
+
+    Returns:
+        Dict[str, Any]: 格式如下：
+            {
+                'totals': Dict[str, int],       # 款式数、颜色数、颜色种类、SKU数、无法生成、多色款式
+                'by_wave': pd.DataFrame,        # 按波段统计
+                'by_category': pd.DataFrame,    # 按 一级品类 × 二级品类 统计
+                'templates': pd.DataFrame,      # 各模板使用的款式数和SKU数
+                'outliers': pd.DataFrame        # 多色款式：款式编码、波段、二级品类、颜色数、颜色
+            }
+
+    Raises:
+        ValueError: 当生成器尚未加载明细表时
+
+    Example:
+        >>> summary = summarize_catalog(generator)
+        >>> summary['by_wave']
+    """
+    derived = generator.derived_table
+    if derived is None:
+        raise ValueError("错误：生成器尚未加载明细表，无法统计概况。")
+
+    # 分组列先转为分类类型，每列只做一次取值编码，之后各次 groupby 直接使用编码；
+    # 使用默认的整数索引，explode 后按位置对齐，不做字符串索引的哈希对齐
+    derived = derived.reset_index()
+    valid = derived['错误'].isna()
+    # 没有款式行时颜色列不是对象类型，不能用 .str 访问器
+    color_counts = derived['颜色'].map(len, na_action='ignore').fillna(0).astype(int)
+    frame = pd.DataFrame({
+        BomGenerator.STYLE_CODE_COL: derived[BomGenerator.STYLE_CODE_COL],
+        BomGenerator.WAVE_COL: derived[BomGenerator.WAVE_COL].fillna('未分波段').astype('category'),
+        '一级品类': derived['一级品类'].fillna('').astype('category'),
+        '二级品类': derived['二级品类'].fillna('').astype('category'),
+        '模板': derived['模板'].astype('category'),
+        '颜色数': color_counts,
+        'SKU数': color_counts.where(valid, 0) * len(generator.SIZES),
+        '无法生成': ~valid,
+    })
+    exploded = derived['颜色'].explode()
+    colors = frame.loc[exploded.index, [BomGenerator.WAVE_COL, '一级品类', '二级品类']]
+    colors['颜色'] = exploded.astype('category')
+
+    def group(keys):
+        counts = frame.groupby(keys, observed=True, sort=False).agg(
+            款式数=('颜色数', 'size'), 颜色数=('颜色数', 'sum'), SKU数=('SKU数', 'sum'), 无法生成=('无法生成', 'sum'))
+        counts.insert(2, '颜色种类', colors.groupby(keys, observed=True, sort=False)['颜色'].nunique())
+        return counts.reset_index().astype({key: str for key in keys})
+
+    templates = frame[valid].groupby('模板', observed=True, sort=False).agg(
+        款式数=('颜色数', 'size'), SKU数=('SKU数', 'sum')).reset_index()
+    templates['模板'] = templates['模板'].astype(str).map(os.path.basename)
+
+    outliers = frame[frame['颜色数'] > max_colors]
+    outliers = pd.DataFrame({
+        BomGenerator.STYLE_CODE_COL: outliers[BomGenerator.STYLE_CODE_COL].astype(str),
+        BomGenerator.WAVE_COL: outliers[BomGenerator.WAVE_COL].astype(str),
+        '二级品类': outliers['二级品类'].astype(str),
+        '颜色数': outliers['颜色数'],
+        '颜色': derived.loc[outliers.index, '颜色'].map('/'.join),
+    }).sort_values('颜色数', ascending=False, kind='stable').reset_index(drop=True)
+
+    totals = {
+        '款式数': len(frame),
+        '颜色数': int(frame['颜色数'].sum()),
+        '颜色种类': int(colors['颜色'].nunique()),
+        'SKU数': int(frame['SKU数'].sum()),
+        '无法生成': int(frame['无法生成'].sum()),
+        '多色款式': len(outliers),
+    }
+    return {
+        'totals': totals,
+        'by_wave': group([BomGenerator.WAVE_COL]),
+        'by_category': group(['一级品类', '二级品类']),
+        'templates': templates,
+        'outliers': outliers,
+    }
+
+
+def summary_table(summary: Dict[str, Any]) -> pd.DataFrame:
+    """把概况合并为一张表，列为 分组、名称、款式数、颜色数、颜色种类、SKU数、无法生成
+
+    分组依次为 合计、波段、品类、模板、多色款式，用于导出CSV和界面展示。
+    """
+    totals = summary['totals']
+    parts = [pd.DataFrame([dict(totals, 分组='合计', 名称='全部')])]
+    by_wave = summary['by_wave'].rename(columns={BomGenerator.WAVE_COL: '名称'})
+    parts.append(by_wave.assign(分组='波段'))
+    by_category = summary['by_category']
+    parts.append(by_category.drop(columns=['一级品类', '二级品类'])
+                 .assign(分组='品类', 名称=by_category['一级品类'] + '/' + by_category['二级品类']))
+    parts.append(summary['templates'].rename(columns={'模板': '名称'}).assign(分组='模板'))
+    outliers = summary['outliers']
+    parts.append(pd.DataFrame({'分组': '多色款式', '名称': outliers[BomGenerator.STYLE_CODE_COL],
+                               '款式数': 1, '颜色数': outliers['颜色数'], '颜色种类': outliers['颜色数']}))
+    table = pd.concat(parts, ignore_index=True).reindex(columns=SUMMARY_COLUMNS)
+    return table.astype({column: 'Int64' for column in SUMMARY_COLUMNS[2:]})
+
+
+def summary_to_bytes(summary: Dict[str, Any], fmt: str = 'xlsx') -> bytes:
+    """把概况序列化为xlsx或CSV字节流
+
+    xlsx 包含"概况"（summary_table）和"多色款式"（含颜色明细）两个工作表；
+    CSV 为 summary_table，使用带BOM的UTF-8，Excel可直接打开。
+
+    Raises:
+        ValueError: 当格式不是 xlsx 或 csv 时
+    """
+    table = summary_table(summary)
+    if fmt == 'csv':
+        return table.to_csv(index=False).encode('utf-8-sig')
+    if fmt != 'xlsx':
+        raise ValueError(f"错误：不支持的导出格式 '{fmt}'，可选：xlsx、csv")
+    buffer = io.BytesIO()
+    with pd.ExcelWriter(buffer, engine='openpyxl') as writer:
+        table.to_excel(writer, sheet_name='概况', index=False)
+        summary['outliers'].to_excel(writer, sheet_name='多色款式', index=False)
+    return buffer.getvalue()
+
+
+def export_summary(summary: Dict[str, Any], path: str) -> None:
+    """按扩展名（.xlsx 或 .csv）原子写出概况文件
+
+    Raises:
+        ValueError: 当扩展名不是 .xlsx 或 .csv 时
+        PermissionError: 当无法写入文件时（如文件已在Excel中打开）
+    """
+    fmt = os.path.splitext(path)[1].lower().lstrip('.')
+    data = summary_to_bytes(summary, fmt)
+    try:
+        atomic_write_bytes(path, data)
+    except PermissionError:
+        raise PermissionError(f"错误：无法写入文件 '{path}'，可能是文件已被打开，请关闭后重试。")
@@ -0,0 +1,95 @@
+# 开发颜色字符串的预编译匹配与规范化
+
+from typing import Dict, List, Tuple
+import re
+import unicodedata
+
+
+class ColorMatcher:
+    """根据 color_codes.json 预编译的颜色名称匹配器
+
+    明细表中的开发颜色由人工录入，常见的写法差异有：全角斜杠（／）、顿号（、）、
+    逗号或分号分隔，颜色名两侧或中间夹杂空格，以及省略或多写"色"字
+    （如"黑"、"芥末黄色"）。只按明确的分隔符拆分，空格本身不拆分颜色名
+    （"芥末 黄" 是一个颜色"芥末黄"）。匹配器在创建时一次性建立"别名 → 标准颜色名"的
+    字典，之后每个颜色只需一次字典查找。
+
+    别名规则：
+        - 标准颜色名本身
+        - 以"色"结尾的颜色名去掉"色"（"黑色" → "黑"）
+        - 不以"色"结尾的颜色名加上"色"（"芥末黄" → "芥末黄色"）
+    别名与另一个标准颜色名相同，或同时指向两个不同的标准颜色时，该别名不生效。
+
+    Example:
+        >>> matcher = ColorMatcher({'黑色': '10', '红色': '51'})
+        >>> matcher.split('黑／红色、 白色')
+        (['黑色', '红色'], ['白色'])
+    """
+
+    # 分隔符：半角/全角斜杠、顿号、半角/全角逗号和分号，连同其两侧的空白；
+    # 颜色名中间的空白不是分隔符，拆分后由 _clean 去掉
+    SEPARATORS = re.compile(r'\s*[/／、,，;；]+\s*')
+
+    def __init__(self, color_codes: Dict[str, str]) -> None:
+        """根据颜色代码字典建立别名表
+
+        Args:
+            color_codes (Dict[str, str]): 颜色名称到颜色代码的映射
+        """
+        self.aliases: Dict[str, str] = {self._clean(name): name for name in color_codes}
+
+        candidates: Dict[str, set] = {}
+        for name in color_codes:
+            key = self._clean(name)
+            alias = key[:-1] if key.endswith('色') and len(key) > 1 else key + '色'
+            candidates.setdefault(alias, set()).add(name)
+        for alias, names in candidates.items():
+            if alias not in self.aliases and len(names) == 1:
+                self.aliases[alias] = names.pop()
+
+        self._cache: Dict[str, Tuple[List[str], List[str]]] = {}
+
+    @staticmethod
+    def _clean(text: str) -> str:
+        """全角转半角并去掉空白"""
+        return re.sub(r'\s+', '', unicodedata.normalize('NFKC', text))
+
+    def match(self, token: str) -> str:
+        """把单个颜色名匹配为标准颜色名
+
+        Args:
+            token (str): 单个颜色名，如 '黑'
+
+        Returns:
+            str: 标准颜色名；无法匹配时返回空字符串
+        """
+        return self.aliases.get(self._clean(token), '')
+
+    def split(self, dev_colors_str: str) -> Tuple[List[str], List[str]]:
+        """拆分开发颜色字符串并逐个匹配，相同字符串的结果会被缓存
+
+        Args:
+            dev_colors_str (str): 开发颜色字符串，如 '黑色/红色'
+
+        Returns:
+            Tuple[List[str], List[str]]: (按原顺序的标准颜色名, 无法匹配的原始颜色名)；
+                重复录入的颜色与原有行为一致，按录入次数保留
+        """
+        cached = self._cache.get(dev_colors_str)
+        if cached is not None:
+            return cached
+
+        colors: List[str] = []
+        unresolved: List[str] = []
+        for token in self.SEPARATORS.split(unicodedata.normalize('NFKC', dev_colors_str)):
+            key = self._clean(token)
+            if not key:
+                continue
+            name = self.aliases.get(key)
+            if not name:
+                unresolved.append(key)
+            else:
+                colors.append(name)
+
+        self._cache[dev_colors_str] = (colors, unresolved)
+        return colors, unresolved
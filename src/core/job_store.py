@@ -0,0 +1,343 @@
+# 基于SQLite的可恢复批量生成任务队列
+
+from typing import Dict, Any, List, Optional, Callable, Iterable, Iterator, Tuple
+from contextlib import contextmanager
+from datetime import datetime
+import json
+import os
+import socket
+import sqlite3
+
+from .bom_generator import BomGenerator
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS batches (
+    id INTEGER PRIMARY KEY,
+    source_path TEXT,
+    source_sha256 TEXT NOT NULL,
+    output_dir TEXT NOT NULL,
+    created_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS batch_styles (
+    batch_id INTEGER NOT NULL REFERENCES batches(id) ON DELETE CASCADE,
+    seq INTEGER NOT NULL,
+    style_code TEXT NOT NULL,
+    state TEXT NOT NULL DEFAULT 'pending',
+    error TEXT,
+    worker TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    updated_at TEXT,
+    PRIMARY KEY (batch_id, style_code)
+);
+CREATE INDEX IF NOT EXISTS idx_batch_styles_state ON batch_styles(batch_id, state, seq);
+CREATE INDEX IF NOT EXISTS idx_batches_source ON batches(source_sha256, output_dir);
+"""
+
+
+def _now() -> str:
+    return datetime.now().isoformat(timespec='seconds')
+
+
+def default_worker_id() -> str:
+    """当前进程的工作者标识：主机名:进程号"""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class JobStore:
+    """持久化的批量生成任务队列
+
+    每个批次记录源文件摘要、输出目录和全部款式，每个款式的状态为
+    pending → running → done / failed（附错误信息）。状态在每个款式完成后
+    立即落盘，因此程序崩溃、电脑休眠或网页断开后，可以从停下的位置继续，
+    已完成的款式不会重做；失败的款式可以单独重试。
+
+    claim 在一个写事务中把待处理款式标记为 running，多个进程共用同一个
+    数据库文件时不会领到同一个款式。
+
+    Example:
+        >>> with JobStore('bom_jobs.sqlite3') as store:
+        ...     batch = store.open_batch(codes, './output', source_sha256=digest)
+        ...     run_batch(generator, store, batch['batch_id'])
+        ...     store.progress(batch['batch_id'])
+        {'total': 5000, 'pending': 0, 'running': 0, 'done': 4998, 'failed': 2}
+    """
+
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATES = (PENDING, RUNNING, DONE, FAILED)
+
+    def __init__(self, db_path: str) -> None:
+        """打开（必要时创建）任务数据库
+
+        Args:
+            db_path (str): SQLite数据库文件路径
+        """
+        self.db_path = db_path
+        # 由调用方自行管理事务，claim 需要 BEGIN IMMEDIATE 抢占写锁
+        self._conn = sqlite3.connect(db_path, timeout=30, isolation_level=None)
+        self._conn.execute('PRAGMA foreign_keys = ON')
+        self._conn.execute('PRAGMA journal_mode = WAL')
+        self._conn.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        """关闭数据库连接"""
+        self._conn.close()
+
+    def __enter__(self) -> 'JobStore':
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+    def create_batch(self, style_codes: Iterable[str], output_dir: str,
+                     source_sha256: str, source_path: Optional[str] = None) -> int:
+        """新建批次，全部款式的状态为 pending
+
+        Args:
+            style_codes (Iterable[str]): 款式编码，按此顺序领取，重复项只保留第一个
+            output_dir (str): 输出目录
+            source_sha256 (str): 明细表内容摘要，用于判断能否恢复
+            source_path (Optional[str]): 明细表路径，仅作记录
+
+        Returns:
+            int: 批次ID
+        """
+        codes = list(dict.fromkeys(str(code) for code in style_codes))
+        with self._transaction():
+            cursor = self._conn.execute(
+                'INSERT INTO batches (source_path, source_sha256, output_dir, created_at) VALUES (?, ?, ?, ?)',
+                (source_path, source_sha256, os.path.abspath(output_dir), _now())
+            )
+            batch_id = cursor.lastrowid
+            self._conn.executemany(
+                'INSERT INTO batch_styles (batch_id, seq, style_code) VALUES (?, ?, ?)',
+                ((batch_id, seq, code) for seq, code in enumerate(codes))
+            )
+        return batch_id
+
+    def find_unfinished_batch(self, output_dir: str, source_sha256: str) -> Optional[int]:
+        """查找同一明细表、同一输出目录下最近一个未全部完成的批次
+
+        Returns:
+            Optional[int]: 批次ID；不存在时返回None
+        """
+        row = self._conn.execute(
+            "SELECT b.id FROM batches b WHERE b.source_sha256 = ? AND b.output_dir = ? "
+            "AND EXISTS (SELECT 1 FROM batch_styles s WHERE s.batch_id = b.id AND s.state != 'done') "
+            "ORDER BY b.id DESC LIMIT 1",
+            (source_sha256, os.path.abspath(output_dir))
+        ).fetchone()
+        return row[0] if row else None
+
+    def open_batch(self, style_codes: Iterable[str], output_dir: str, source_sha256: str,
+                   source_path: Optional[str] = None, resume: bool = True) -> Dict[str, Any]:
+        """恢复未完成的批次，不存在时新建
+
+        恢复时，上次中断时仍处于 running 的款式重新排队（调用方需确认此时
+        没有其他进程在处理这个批次）；失败的款式保持失败，见 retry_failed。
+
+        Args:
+            style_codes (Iterable[str]): 新建批次时使用的款式编码
+            output_dir (str): 输出目录
+            source_sha256 (str): 明细表内容摘要，内容变化后不会恢复旧批次
+            source_path (Optional[str]): 明细表路径，仅作记录
+            resume (bool): 为False时总是新建批次
+
+        Returns:
+            Dict[str, Any]: {'batch_id': int, 'resumed': bool, 'requeued': int}
+        """
+        batch_id = self.find_unfinished_batch(output_dir, source_sha256) if resume else None
+        if batch_id is None:
+            batch_id = self.create_batch(style_codes, output_dir, source_sha256, source_path)
+            return {'batch_id': batch_id, 'resumed': False, 'requeued': 0}
+        return {'batch_id': batch_id, 'resumed': True, 'requeued': self.requeue_running(batch_id)}
+
+    def get_batch(self, batch_id: int) -> Dict[str, Any]:
+        """读取批次信息
+
+        Raises:
+            ValueError: 当批次不存在时
+        """
+        cursor = self._conn.execute(
+            'SELECT id, source_path, source_sha256, output_dir, created_at FROM batches WHERE id = ?',
+            (batch_id,)
+        )
+        row = cursor.fetchone()
+        if row is None:
+            raise ValueError(f"错误：任务批次 {batch_id} 不存在。")
+        return dict(zip([description[0] for description in cursor.description], row))
+
+    def list_batches(self) -> List[Dict[str, Any]]:
+        """列出全部批次及各状态的款式数，最新的在前"""
+        batches = []
+        for (batch_id,) in self._conn.execute('SELECT id FROM batches ORDER BY id DESC').fetchall():
+            batches.append(dict(self.get_batch(batch_id), **self.progress(batch_id)))
+        return batches
+
+    def claim(self, batch_id: int, limit: int = 1, worker: Optional[str] = None) -> List[str]:
+        """领取待处理的款式并标记为 running
+
+        Args:
+            batch_id (int): 批次ID
+            limit (int): 最多领取的款式数
+            worker (Optional[str]): 工作者标识，默认为 主机名:进程号
+
+        Returns:
+            List[str]: 领取到的款式编码（按批次顺序）；没有待处理款式时为空列表
+        """
+        worker = worker or default_worker_id()
+        with self._transaction():
+            codes = [row[0] for row in self._conn.execute(
+                'SELECT style_code FROM batch_styles WHERE batch_id = ? AND state = ? ORDER BY seq LIMIT ?',
+                (batch_id, self.PENDING, limit)
+            ).fetchall()]
+            self._conn.executemany(
+                'UPDATE batch_styles SET state = ?, worker = ?, attempts = attempts + 1, updated_at = ? '
+                'WHERE batch_id = ? AND style_code = ?',
+                ((self.RUNNING, worker, _now(), batch_id, code) for code in codes)
+            )
+        return codes
+
+    def mark_done(self, batch_id: int, style_codes: Iterable[str]) -> None:
+        """把款式标记为完成"""
+        with self._transaction():
+            self._conn.executemany(
+                'UPDATE batch_styles SET state = ?, error = NULL, updated_at = ? WHERE batch_id = ? AND style_code = ?',
+                ((self.DONE, _now(), batch_id, code) for code in style_codes)
+            )
+
+    def mark_failed(self, batch_id: int, failures: Iterable[Tuple[str, str]]) -> None:
+        """把款式标记为失败并记录错误信息
+
+        Args:
+            batch_id (int): 批次ID
+            failures (Iterable[Tuple[str, str]]): (款式编码, 错误信息)
+        """
+        with self._transaction():
+            self._conn.executemany(
+                'UPDATE batch_styles SET state = ?, error = ?, updated_at = ? WHERE batch_id = ? AND style_code = ?',
+                ((self.FAILED, error, _now(), batch_id, code) for code, error in failures)
+            )
+
+    def requeue_running(self, batch_id: int) -> int:
+        """把中断时仍处于 running 的款式重新排队
+
+        Returns:
+            int: 重新排队的款式数
+        """
+        with self._transaction():
+            cursor = self._conn.execute(
+                'UPDATE batch_styles SET state = ?, worker = NULL, updated_at = ? WHERE batch_id = ? AND state = ?',
+                (self.PENDING, _now(), batch_id, self.RUNNING)
+            )
+        return cursor.rowcount
+
+    def retry_failed(self, batch_id: int, style_codes: Optional[Iterable[str]] = None) -> int:
+        """把失败的款式重新排队，已完成的款式不受影响
+
+        Args:
+            batch_id (int): 批次ID
+            style_codes (Optional[Iterable[str]]): 只重试这些款式，默认重试全部失败款式
+
+        Returns:
+            int: 重新排队的款式数
+        """
+        sql = 'UPDATE batch_styles SET state = ?, updated_at = ? WHERE batch_id = ? AND state = ?'
+        params: List[Any] = [self.PENDING, _now(), batch_id, self.FAILED]
+        if style_codes is not None:
+            sql += ' AND style_code IN (SELECT value FROM json_each(?))'
+            # 以JSON数组传参，避免大批量款式编码超出SQLite的参数个数上限
+            params.append(json.dumps([str(code) for code in style_codes], ensure_ascii=False))
+        with self._transaction():
+            cursor = self._conn.execute(sql, params)
+        return cursor.rowcount
+
+    def progress(self, batch_id: int) -> Dict[str, int]:
+        """各状态的款式数
+
+        Returns:
+            Dict[str, int]: {'total': int, 'pending': int, 'running': int, 'done': int, 'failed': int}
+        """
+        counts = dict.fromkeys(self.STATES, 0)
+        counts.update(self._conn.execute(
+            'SELECT state, COUNT(*) FROM batch_styles WHERE batch_id = ? GROUP BY state', (batch_id,)
+        ).fetchall())
+        return dict(total=sum(counts.values()), **counts)
+
+    def failures(self, batch_id: int) -> List[Tuple[str, str]]:
+        """失败的款式及错误信息（按批次顺序）"""
+        return [tuple(row) for row in self._conn.execute(
+            'SELECT style_code, error FROM batch_styles WHERE batch_id = ? AND state = ? ORDER BY seq',
+            (batch_id, self.FAILED)
+        ).fetchall()]
+
+    @contextmanager
+    def _transaction(self) -> Iterator[None]:
+        """写事务：BEGIN IMMEDIATE 立即获取写锁，其他进程的写入在此期间等待"""
+        self._conn.execute('BEGIN IMMEDIATE')
+        try:
+            yield
+        except BaseException:
+            self._conn.execute('ROLLBACK')
+            raise
+        self._conn.execute('COMMIT')
+
+
+def run_batch(generator: BomGenerator, store: JobStore, batch_id: int,
+              progress_callback: Optional[Callable[[int, int, str], None]] = None,
+              claim_size: int = 20, worker: Optional[str] = None,
+              max_workers: Optional[int] = None) -> Dict[str, Any]:
+    """从队列中领取款式并生成，直到批次中没有待处理的款式
+
+    每次领取 claim_size 个款式交给 BomGenerator.generate_bom_files（渲染与写盘
+    流水线，或 max_workers 大于1时的进程池），完成后立即把结果写回队列。
+    中断时最多只有最后一组款式需要重做。
+
+    Args:
+        generator (BomGenerator): 已加载明细表的生成器
+        store (JobStore): 任务队列
+        batch_id (int): 批次ID
+        progress_callback (Optional[Callable[[int, int, str], None]]):
+            每个款式渲染前调用，参数为 (已处理数, 总数, 款式编码)，已处理数包含之前运行完成的款式
+        claim_size (int): 每次领取的款式数
+        worker (Optional[str]): 工作者标识，默认为 主机名:进程号
+        max_workers (Optional[int]): 传给 generate_bom_files 的并行进程数
+
+    Returns:
+        Dict[str, Any]: {'batch_id': int, 'success': List[str], 'failed': List[Tuple[str, str]],
+                         'progress': Dict[str, int], 'render_seconds': float, 'write_seconds': float}，
+            success/failed 与耗时只统计本次运行处理的款式
+    """
+    output_dir = store.get_batch(batch_id)['output_dir']
+    success: List[str] = []
+    failed: List[Tuple[str, str]] = []
+    render_seconds = write_seconds = 0.0
+
+    while True:
+        codes = store.claim(batch_id, limit=claim_size, worker=worker)
+        if not codes:
+            break
+
+        callback = None
+        if progress_callback is not None:
+            counts = store.progress(batch_id)
+            finished_before = counts['done'] + counts['failed']
+
+            def callback(i: int, total: int, style_code: str) -> None:
+                progress_callback(finished_before + i, counts['total'], style_code)
+
+        report = generator.generate_bom_files(codes, output_dir, progress_callback=callback,
+                                              max_workers=max_workers)
+        store.mark_done(batch_id, report['success'])
+        store.mark_failed(batch_id, report['failed'])
+        success.extend(report['success'])
+        failed.extend(report['failed'])
+        render_seconds += report['render_seconds']
+        write_seconds += report['write_seconds']
+
+    return {'batch_id': batch_id, 'success': success, 'failed': failed,
+            'progress': store.progress(batch_id),
+            'render_seconds': render_seconds, 'write_seconds': write_seconds}
@@ -0,0 +1,279 @@
+# 内存诊断：按渲染阶段统计 tracemalloc 分配，以及长时间运行的浸泡测试
+
+from typing import Dict, Any, List, Optional, Callable, Iterator
+from contextlib import contextmanager
+from datetime import datetime
+import gc
+import io
+import os
+import time
+import tracemalloc
+
+import openpyxl
+
+from .bom_generator import BomGenerator
+from .writer import make_reproducible_xlsx
+
+
+# 渲染流水线的阶段，与 generate_bom_file_to_buffer 的步骤一一对应
+STAGES = ('catalog_load', 'derive', 'template_load', 'fill', 'serialize')
+
+
+def current_rss_bytes() -> Optional[int]:
+    """进程当前的常驻内存（字节）；平台不支持时返回None
+
+    读取 /proc/self/statm（Linux）。峰值内存见 metrics.peak_rss_bytes，
+    但浸泡测试需要的是每轮结束后的当前值。
+    """
+    try:
+        with open('/proc/self/statm') as f:
+            resident_pages = int(f.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+    return resident_pages * os.sysconf('SC_PAGE_SIZE')
+
+
+class StageProfiler:
+    """用 tracemalloc 把内存分配归到渲染流水线的各个阶段
+
+    每个阶段记录调用次数、净增内存（阶段结束时仍未释放的分配，累计）
+    和阶段内的峰值增量。阶段不能嵌套：进入阶段时会重置 tracemalloc 的峰值。
+
+    Example:
+        >>> with StageProfiler() as profiler:
+        ...     with profiler.stage('template_load'):
+        ...         workbook = openpyxl.load_workbook(path)
+        >>> profiler.report()['template_load']['peak_bytes']
+    """
+
+    def __init__(self, frames: int = 1) -> None:
+        """
+        Args:
+            frames (int): 每个分配记录的调用栈深度，越深越慢，定位来源时可调大
+        """
+        self.frames = frames
+        self.stages: Dict[str, Dict[str, int]] = {}
+        self._started_tracing = False
+        self._baseline: Optional[tracemalloc.Snapshot] = None
+
+    def start(self) -> None:
+        """开始跟踪（已在跟踪时沿用现有设置）"""
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+            self._started_tracing = True
+        self._baseline = tracemalloc.take_snapshot()
+
+    def stop(self) -> None:
+        """停止跟踪（只停止由本对象开启的跟踪）"""
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    def __enter__(self) -> 'StageProfiler':
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.stop()
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """统计一个阶段内的内存分配
+
+        Args:
+            name (str): 阶段名，建议使用 STAGES 中的名称
+        """
+        if not tracemalloc.is_tracing():
+            raise ValueError("错误：请先调用 start() 开始跟踪内存分配")
+        before, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        try:
+            yield
+        finally:
+            after, peak = tracemalloc.get_traced_memory()
+            stats = self.stages.setdefault(name, {'calls': 0, 'net_bytes': 0, 'peak_bytes': 0})
+            stats['calls'] += 1
+            stats['net_bytes'] += after - before
+            stats['peak_bytes'] = max(stats['peak_bytes'], peak - before)
+
+    def report(self) -> Dict[str, Dict[str, int]]:
+        """各阶段的统计：{阶段名: {'calls': int, 'net_bytes': int, 'peak_bytes': int}}"""
+        return {name: dict(stats) for name, stats in self.stages.items()}
+
+    def top_growth(self, limit: int = 10) -> List[Dict[str, Any]]:
+        """自 start() 以来净增内存最多的代码位置，用于定位未释放的对象
+
+        Returns:
+            List[Dict[str, Any]]: [{'location': '文件:行号', 'size_bytes': int, 'count': int}, ...]
+        """
+        if self._baseline is None or not tracemalloc.is_tracing():
+            raise ValueError("错误：请先调用 start() 开始跟踪内存分配")
+        # openpyxl 工作簿内部有循环引用，先回收，只留下真正仍被引用的对象
+        gc.collect()
+        snapshot = tracemalloc.take_snapshot().filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+        ])
+        growth = []
+        for diff in snapshot.compare_to(self._baseline, 'lineno')[:limit]:
+            frame = diff.traceback[0]
+            growth.append({'location': f'{frame.filename}:{frame.lineno}',
+                           'size_bytes': diff.size_diff, 'count': diff.count_diff})
+        return growth
+
+
+def profile_render(generator: BomGenerator, style_codes: List[str],
+                   profiler: StageProfiler) -> Dict[str, Dict[str, int]]:
+    """逐个款式按阶段渲染并统计内存分配
+
+    步骤与 generate_bom_file_to_buffer 相同（派生字段 → 加载模板 → 填充 → 序列化），
+    只是拆开以便分别计量。失败的款式跳过。
+
+    Args:
+        generator (BomGenerator): 已加载明细表的生成器
+        style_codes (List[str]): 款式编码
+        profiler (StageProfiler): 已开始跟踪的统计器
+
+    Returns:
+        Dict[str, Dict[str, int]]: 同 StageProfiler.report
+    """
+    for style_code in style_codes:
+        with profiler.stage('derive'):
+            try:
+                cell_values = generator.get_cell_values(style_code)
+            except ValueError:
+                continue
+        with profiler.stage('template_load'):
+            workbook = openpyxl.load_workbook(generator._template_path(style_code, cell_values))
+        with profiler.stage('fill'):
+            generator._fill_sheet(workbook.active, cell_values)
+        with profiler.stage('serialize'):
+            buffer = io.BytesIO()
+            workbook.save(buffer)
+            data = buffer.getvalue()
+            if generator.timestamp is not None:
+                data = make_reproducible_xlsx(data, generator.timestamp)
+        del workbook, buffer, data
+    return profiler.report()
+
+
+def run_soak(source_path: str, iterations: Optional[int] = None, duration_seconds: Optional[float] = None,
+             batch_size: int = 50, warmup: int = 2, max_rss_growth_mb: float = 50.0,
+             max_object_growth: int = 20000, trace: bool = False,
+             iteration_callback: Optional[Callable[[Dict[str, Any]], None]] = None,
+             backend: Optional[str] = None) -> Dict[str, Any]:
+    """浸泡测试：在同一进程中反复加载明细表并渲染批次，检查内存是否持续增长
+
+    每轮模拟一次网页上传：从内存字节流重新加载明细表，渲染 batch_size 个款式
+    （依次轮换，覆盖整个目录）并丢弃结果，然后做一次完整的垃圾回收，记录当前
+    常驻内存和存活的Python对象数。前 warmup 轮用于让缓存、内存池稳定，之后
+    以第 warmup 轮结束时为基线计算增长。
+
+    Args:
+        source_path (str): 明细表路径
+        iterations (Optional[int]): 轮数（含预热轮）；与 duration_seconds 都未提供时为 10
+        duration_seconds (Optional[float]): 运行时长，达到后不再开始新一轮
+        batch_size (int): 每轮渲染的款式数
+        warmup (int): 预热轮数
+        max_rss_growth_mb (float): 允许的常驻内存增长（MB）
+        max_object_growth (int): 允许的存活对象数增长
+        trace (bool): 同时开启 tracemalloc，失败时给出净增内存最多的代码位置（明显变慢）
+        iteration_callback (Optional[Callable[[Dict[str, Any]], None]]): 每轮结束后以该轮记录调用
+        backend (Optional[str]): 写出后端，为None时使用生成器的默认值
+
+    Returns:
+        Dict[str, Any]: {
+            'iterations': List[Dict],    # 每轮：iteration、seconds、styles、rss_bytes、objects、
+                                         #       rss_growth_bytes、object_growth（预热轮增长为None）
+            'rss_growth_bytes': Optional[int],
+            'object_growth': Optional[int],
+            'passed': bool,
+            'top_growth': List[Dict]     # 仅 trace=True 时，见 StageProfiler.top_growth
+        }
+
+    Raises:
+        FileNotFoundError: 当明细表不存在时
+        ValueError: 当参数不合法或明细表中没有款式时
+    """
+    if iterations is None and duration_seconds is None:
+        iterations = 10
+    if batch_size < 1 or warmup < 0:
+        raise ValueError("错误：batch_size 必须是正整数，warmup 不能为负数")
+    if iterations is not None and iterations <= warmup:
+        raise ValueError(f"错误：轮数（{iterations}）必须大于预热轮数（{warmup}）")
+    try:
+        with open(source_path, 'rb') as f:
+            source_bytes = f.read()
+    except FileNotFoundError:
+        raise FileNotFoundError(f"错误：源文件未找到，路径：{source_path}")
+
+    profiler = StageProfiler() if trace else None
+    # 固定时间戳，避免每轮渲染结果随时间变化
+    timestamp = datetime(2000, 1, 1)
+    records: List[Dict[str, Any]] = []
+    baseline: Optional[Dict[str, Any]] = None
+    offset = 0
+    deadline = time.monotonic() + duration_seconds if duration_seconds is not None else None
+    try:
+        while True:
+            i = len(records)
+            if iterations is not None and i >= iterations:
+                break
+            if deadline is not None and i > warmup and time.monotonic() >= deadline:
+                break
+
+            started = time.perf_counter()
+            generator = BomGenerator(io.BytesIO(source_bytes), timestamp=timestamp)
+            if backend is not None:
+                generator.backend = backend
+            codes = generator.get_all_style_codes()
+            if not codes:
+                raise ValueError("错误：明细表中没有款式，无法进行浸泡测试")
+            batch = [codes[(offset + k) % len(codes)] for k in range(min(batch_size, len(codes)))]
+            offset = (offset + len(batch)) % len(codes)
+            rendered = 0
+            for style_code in batch:
+                try:
+                    generator.generate_bom_file_to_buffer(style_code)
+                    rendered += 1
+                except (ValueError, FileNotFoundError):
+                    pass
+            del generator
+            gc.collect()
+
+            record = {
+                'iteration': i + 1,
+                'seconds': time.perf_counter() - started,
+                'styles': rendered,
+                'rss_bytes': current_rss_bytes(),
+                'objects': len(gc.get_objects()),
+                'rss_growth_bytes': None,
+                'object_growth': None,
+            }
+            if i + 1 == warmup or (warmup == 0 and i == 0):
+                baseline = record
+                if profiler is not None:
+                    profiler.start()
+            elif baseline is not None:
+                if record['rss_bytes'] is not None and baseline['rss_bytes'] is not None:
+                    record['rss_growth_bytes'] = record['rss_bytes'] - baseline['rss_bytes']
+                record['object_growth'] = record['objects'] - baseline['objects']
+            records.append(record)
+            if iteration_callback is not None:
+                iteration_callback(record)
+
+        last = records[-1]
+        rss_growth, object_growth = last['rss_growth_bytes'], last['object_growth']
+        passed = ((rss_growth is None or rss_growth <= max_rss_growth_mb * 1024 * 1024)
+                  and (object_growth is None or object_growth <= max_object_growth))
+        top_growth = profiler.top_growth() if profiler is not None and tracemalloc.is_tracing() else []
+    finally:
+        if profiler is not None:
+            profiler.stop()
+
+    return {
+        'iterations': records,
+        'rss_growth_bytes': rss_growth,
+        'object_growth': object_growth,
+        'passed': passed,
+        'top_growth': top_growth,
+    }
@@ -0,0 +1,309 @@
+# 批量生成的运行指标：Prometheus 文本格式导出（textfile collector 文件或本地 /metrics 接口）
+
+from typing import Dict, Any, List, Optional, Sequence, Tuple
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import os
+import sys
+import threading
+import time
+
+
+# 通过环境变量开启指标导出，桌面版、网页版和命令行共用
+TEXTFILE_ENV = 'BOM_METRICS_TEXTFILE'
+PORT_ENV = 'BOM_METRICS_PORT'
+
+# 以秒为单位的耗时分桶
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(zip(names, values))
+    if extra is not None:
+        pairs.append(extra)
+    if not pairs:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in pairs)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + '}'
+
+
+def _format_value(value: float) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class _Metric:
+    """带标签的指标的公共部分：按标签值分别记录，线程安全"""
+
+    TYPE = ''
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        self._lock = threading.Lock()
+        self._values: Dict[Tuple[str, ...], Any] = {}
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        if set(labels) != set(self.label_names):
+            raise ValueError(f"错误：指标 {self.name} 的标签应为 {self.label_names}，实际为 {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.label_names)
+
+    def render(self) -> List[str]:
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.TYPE}']
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.extend(self._render_sample(key, value))
+        return lines
+
+    def _render_sample(self, key: Tuple[str, ...], value: Any) -> List[str]:
+        return [f'{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}']
+
+
+class Counter(_Metric):
+    """只增不减的计数器"""
+
+    TYPE = 'counter'
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels: str) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+
+class Gauge(_Metric):
+    """可任意设置的当前值"""
+
+    TYPE = 'gauge'
+
+    def set(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def value(self, **labels: str) -> Optional[float]:
+        with self._lock:
+            return self._values.get(self._key(labels))
+
+
+class Histogram(_Metric):
+    """按分桶统计的分布（如每个阶段的耗时）"""
+
+    TYPE = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS) -> None:
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = {'buckets': [0] * len(self.buckets), 'sum': 0.0, 'count': 0}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state['buckets'][i] += 1
+            state['sum'] += value
+            state['count'] += 1
+
+    def count(self, **labels: str) -> int:
+        with self._lock:
+            state = self._values.get(self._key(labels))
+            return state['count'] if state else 0
+
+    def total(self, **labels: str) -> float:
+        with self._lock:
+            state = self._values.get(self._key(labels))
+            return state['sum'] if state else 0.0
+
+    def _render_sample(self, key: Tuple[str, ...], state: Dict[str, Any]) -> List[str]:
+        lines = []
+        for bound, cumulative in zip(self.buckets, state['buckets']):
+            labels = _format_labels(self.label_names, key, ('le', _format_value(bound)))
+            lines.append(f'{self.name}_bucket{labels} {cumulative}')
+        labels = _format_labels(self.label_names, key)
+        lines.append(f'{self.name}_bucket{_format_labels(self.label_names, key, ("le", "+Inf"))} {state["count"]}')
+        lines.append(f'{self.name}_sum{labels} {_format_value(state["sum"])}')
+        lines.append(f'{self.name}_count{labels} {state["count"]}')
+        return lines
+
+
+class MetricsRegistry:
+    """指标注册表：创建指标并按 Prometheus 文本格式输出
+
+    不依赖 prometheus_client。输出可以写入 node_exporter 的 textfile collector
+    目录（write_textfile，原子替换），也可以通过本地HTTP接口提供（serve）。
+
+    Example:
+        >>> registry = MetricsRegistry()
+        >>> styles = registry.counter('bom_styles_total', '处理的款式数', ['result'])
+        >>> styles.inc(result='success')
+        >>> registry.write_textfile('/var/lib/node_exporter/bom.prom')
+    """
+
+    def __init__(self) -> None:
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+        self.textfile_path: Optional[str] = None
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    def _register(self, metric: _Metric) -> Any:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, documentation: str, labels: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labels))
+
+    def gauge(self, name: str, documentation: str, labels: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, labels))
+
+    def histogram(self, name: str, documentation: str, labels: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labels, buckets))
+
+    def render(self) -> str:
+        """全部指标的 Prometheus 文本格式"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+    def write_textfile(self, path: Optional[str] = None) -> None:
+        """原子写入 textfile collector 文件（先写临时文件再替换，采集时不会读到半个文件）
+
+        Args:
+            path (Optional[str]): 文件路径，默认为 configure 设置的路径；均未设置时不做任何事
+        """
+        # 写入模块本身也会记录指标，这里延迟导入以避免循环导入
+        from .writer import atomic_write_bytes
+        path = path or self.textfile_path
+        if path:
+            atomic_write_bytes(path, self.render().encode('utf-8'))
+
+    def serve(self, port: int, host: str = '127.0.0.1') -> int:
+        """在后台线程中提供 http://host:port/metrics
+
+        Args:
+            port (int): 端口，0 表示由系统分配
+            host (str): 监听地址，默认只监听本机
+
+        Returns:
+            int: 实际监听的端口
+        """
+        if self._server is not None:
+            return self._server.server_address[1]
+        registry = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:
+                if self.path.split('?')[0] != '/metrics':
+                    self.send_error(404)
+                    return
+                body = registry.render().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format: str, *args: Any) -> None:
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=self._server.serve_forever, name='bom-metrics', daemon=True).start()
+        return self._server.server_address[1]
+
+    def shutdown(self) -> None:
+        """停止 /metrics 接口"""
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+
+REGISTRY = MetricsRegistry()
+
+STYLES = REGISTRY.counter('bom_styles_total', '处理的款式数，按结果（success/failed/skipped）区分', ['result'])
+BATCHES = REGISTRY.counter('bom_batches_total', '完成的批次数')
+BATCH_SECONDS = REGISTRY.histogram('bom_batch_seconds', '批次总耗时（墙钟时间）',
+                                   buckets=(1, 5, 10, 30, 60, 300, 600, 1800, 3600))
+STAGE_SECONDS = REGISTRY.histogram('bom_stage_seconds', '单个款式各阶段耗时（template_load/fill/serialize/write）',
+                                   ['stage'])
+TEMPLATE_LOAD_SECONDS = REGISTRY.histogram('bom_template_load_seconds', '按模板区分的模板加载耗时', ['template'])
+TEMPLATE_CACHE = REGISTRY.counter('bom_template_cache_total', '模板缓存的查找次数，按命中与否（hit/miss）区分',
+                                  ['result'])
+BYTES_WRITTEN = REGISTRY.counter('bom_bytes_written_total', '写入磁盘的BOM文件字节数')
+PEAK_RSS_BYTES = REGISTRY.gauge('bom_peak_rss_bytes', '进程的峰值常驻内存')
+LAST_BATCH_TIMESTAMP = REGISTRY.gauge('bom_last_batch_timestamp_seconds', '最近一个批次完成的时间（Unix时间戳）')
+
+
+def peak_rss_bytes() -> Optional[int]:
+    """进程的峰值常驻内存（字节）；平台不支持时返回None"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 上单位为KB，macOS 上为字节
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def record_batch(report: Dict[str, Any]) -> None:
+    """记录一个批次的结果并刷新 textfile（如已配置）
+
+    Args:
+        report (Dict[str, Any]): generate_bom_files 格式的批次报告，至少包含
+            success、failed，可选 skipped、elapsed_seconds
+    """
+    skipped = len(report.get('skipped', []))
+    STYLES.inc(len(report['success']) - skipped, result='success')
+    STYLES.inc(skipped, result='skipped')
+    STYLES.inc(len(report['failed']), result='failed')
+    BATCHES.inc()
+    if 'elapsed_seconds' in report:
+        BATCH_SECONDS.observe(report['elapsed_seconds'])
+    LAST_BATCH_TIMESTAMP.set(time.time())
+    peak = peak_rss_bytes()
+    if peak is not None:
+        PEAK_RSS_BYTES.set(peak)
+    REGISTRY.write_textfile()
+
+
+def configure(textfile_path: Optional[str] = None, port: Optional[int] = None,
+              host: str = '127.0.0.1') -> Optional[int]:
+    """开启指标导出；未提供的参数从环境变量 BOM_METRICS_TEXTFILE / BOM_METRICS_PORT 读取
+
+    Args:
+        textfile_path (Optional[str]): 每个批次结束后写入的 textfile 路径
+        port (Optional[int]): 提供 /metrics 接口的端口
+        host (str): /metrics 接口的监听地址
+
+    Returns:
+        Optional[int]: /metrics 接口实际监听的端口；未开启时返回None
+
+    Raises:
+        ValueError: 当环境变量中的端口不是整数时
+    """
+    textfile_path = textfile_path or os.environ.get(TEXTFILE_ENV)
+    if textfile_path:
+        REGISTRY.textfile_path = textfile_path
+    if port is None and os.environ.get(PORT_ENV):
+        value = os.environ[PORT_ENV]
+        try:
+            port = int(value)
+        except ValueError:
+            raise ValueError(f"错误：环境变量 {PORT_ENV} 必须是整数，当前值：{value}")
+    if port is None:
+        return None
+    return REGISTRY.serve(port, host)
@@ -0,0 +1,213 @@
+# 输出目录的分层布局与索引文件：大批量输出时按波段/品类或编码前缀分散到子目录
+
+from typing import Dict, Any, List, Optional
+from datetime import datetime
+import json
+import os
+import re
+import threading
+
+import pandas as pd
+
+from .writer import atomic_write_bytes
+
+
+# 索引文件名，位于输出目录根下
+INDEX_FILE = 'bom_index.json'
+INDEX_VERSION = 1
+
+# flat：全部放在输出目录下；wave_category：{波段}/{二级品类}/；prefix：{款式编码前N位}/
+LAYOUTS = ('flat', 'wave_category', 'prefix')
+DEFAULT_PREFIX_LENGTH = 5
+
+_INVALID_PATH_CHARS = re.compile(r'[\\/:*?"<>|]')
+
+# 同一进程内对同一索引文件的读-改-写串行进行
+_index_lock = threading.Lock()
+
+
+def _path_component(value: Any, default: str) -> str:
+    """把波段、品类或编码前缀转为单层目录名/文件名
+
+    替换路径中不允许的字符，并去掉结尾的点和空格（Windows会忽略它们）；
+    结果为空、"." 或 ".." 时使用 default，保证不会写到输出目录之外。
+    """
+    if value is None or pd.isna(value):
+        return default
+    component = _INVALID_PATH_CHARS.sub('_', str(value).strip()).rstrip('. ')
+    return component or default
+
+
+class OutputIndex:
+    """输出目录的索引：款式编码 → 相对路径、内容哈希和生成时间
+
+    索引文件记录目录使用的布局，之后对同一目录的生成（包括监视模式和任务队列）
+    自动沿用该布局。每个批次结束后整体原子替换一次索引文件，读取方看到的
+    要么是旧索引要么是新索引。工具通过索引定位文件，不再遍历共享盘上的
+    数万个文件。
+
+    Example:
+        >>> index = OutputIndex.open('./output', layout='wave_category')
+        >>> index.relative_path('H5A123416', {'波段': '秋四波', '二级品类': '长袖T恤'})
+        '秋四波/长袖T恤/H5A123416.xlsx'
+    """
+
+    def __init__(self, output_dir: str, layout: str = 'flat', prefix_length: int = DEFAULT_PREFIX_LENGTH,
+                 entries: Optional[Dict[str, Dict[str, Any]]] = None) -> None:
+        if layout not in LAYOUTS:
+            raise ValueError(f"错误：不支持的输出布局 '{layout}'，可选：{'、'.join(LAYOUTS)}")
+        if prefix_length < 1:
+            raise ValueError(f"错误：编码前缀长度必须是正整数，当前值：{prefix_length}")
+        self.output_dir = output_dir
+        self.layout = layout
+        self.prefix_length = prefix_length
+        self.entries: Dict[str, Dict[str, Any]] = entries or {}
+
+    @property
+    def path(self) -> str:
+        return os.path.join(self.output_dir, INDEX_FILE)
+
+    @classmethod
+    def load(cls, output_dir: str) -> Optional['OutputIndex']:
+        """读取目录中的索引；没有索引时返回None
+
+        Raises:
+            ValueError: 当索引文件内容无效时
+        """
+        path = os.path.join(output_dir, INDEX_FILE)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return None
+        except ValueError:
+            raise ValueError(f"错误：输出索引文件内容无效，路径：{path}")
+        return cls(output_dir, data.get('layout', 'flat'), data.get('prefix_length', DEFAULT_PREFIX_LENGTH),
+                   data.get('styles', {}))
+
+    @classmethod
+    def open(cls, output_dir: str, layout: Optional[str] = None,
+             prefix_length: Optional[int] = None) -> Optional['OutputIndex']:
+        """取得生成时使用的索引
+
+        目录已有索引时沿用其布局；未指定布局且没有索引时返回None（直接平铺输出，
+        不维护索引，与原有行为相同）。
+
+        Raises:
+            ValueError: 当指定的布局与目录已有的布局不同时
+        """
+        index = cls.load(output_dir)
+        if index is None:
+            if layout is None:
+                return None
+            return cls(output_dir, layout, prefix_length or DEFAULT_PREFIX_LENGTH)
+        if (layout is not None and layout != index.layout) or \
+                (prefix_length is not None and index.layout == 'prefix' and prefix_length != index.prefix_length):
+            raise ValueError(f"错误：输出目录 {output_dir} 已使用 '{index.layout}' 布局，"
+                             f"请换一个输出目录或不指定布局")
+        return index
+
+    def relative_path(self, style_code: str, record: Optional[Dict[str, Any]] = None) -> str:
+        """款式在该布局下的相对路径（以 / 分隔）
+
+        Args:
+            style_code (str): 款式编码
+            record (Optional[Dict[str, Any]]): 派生字段记录，wave_category 布局需要其中的波段和二级品类
+        """
+        file_name = f"{_path_component(style_code, '_')}.xlsx"
+        if self.layout == 'wave_category':
+            record = record or {}
+            return '/'.join([_path_component(record.get('波段'), '未分波段'),
+                             _path_component(record.get('二级品类'), '未分品类'), file_name])
+        if self.layout == 'prefix':
+            return f"{_path_component(style_code[:self.prefix_length], '_')}/{file_name}"
+        return file_name
+
+    def file_path(self, style_code: str, record: Optional[Dict[str, Any]] = None) -> str:
+        """款式在该布局下的完整路径"""
+        return os.path.join(self.output_dir, *self.relative_path(style_code, record).split('/'))
+
+    def find(self, style_code: str) -> Optional[str]:
+        """从索引中查找款式的文件路径，不访问目录"""
+        entry = self.entries.get(style_code)
+        if entry is None:
+            return None
+        return os.path.join(self.output_dir, *entry['path'].split('/'))
+
+    def paths(self) -> List[str]:
+        """索引中的全部文件路径（绝对路径，已排序）"""
+        root = os.path.abspath(self.output_dir)
+        return sorted(os.path.join(root, *entry['path'].split('/')) for entry in self.entries.values())
+
+    def record_batch(self, written: Dict[str, Dict[str, str]], generated_at: datetime) -> None:
+        """把一个批次的结果并入索引并原子写回
+
+        先重新读取磁盘上的索引再合并，同一进程内的并发批次不会互相覆盖。
+        款式因波段或品类变化换了位置时，删除旧位置上的文件。
+
+        Args:
+            written (Dict[str, Dict[str, str]]): 款式编码 → {'path': 相对路径, 'sha256': 内容哈希}
+            generated_at (datetime): 生成时间
+
+        Raises:
+            PermissionError: 当无法写入索引文件时
+        """
+        timestamp = generated_at.isoformat(timespec='seconds')
+        with _index_lock:
+            current = OutputIndex.load(self.output_dir)
+            if current is not None:
+                self.entries = current.entries
+            for style_code, entry in written.items():
+                previous = self.entries.get(style_code)
+                if previous is not None and previous['path'] != entry['path']:
+                    try:
+                        os.remove(os.path.join(self.output_dir, *previous['path'].split('/')))
+                    except OSError:
+                        pass
+                elif previous is not None and previous['sha256'] == entry['sha256']:
+                    # 内容未变化（如 skip_unchanged 跳过的款式），保留原生成时间
+                    continue
+                self.entries[style_code] = {'path': entry['path'], 'sha256': entry['sha256'],
+                                            'generated_at': timestamp}
+            self.save()
+
+    def save(self) -> None:
+        """原子写入索引文件（按款式编码排序，便于比较版本）"""
+        os.makedirs(self.output_dir, exist_ok=True)
+        data = {
+            'version': INDEX_VERSION,
+            'layout': self.layout,
+            'prefix_length': self.prefix_length,
+            'styles': {code: self.entries[code] for code in sorted(self.entries)},
+        }
+        atomic_write_bytes(self.path, json.dumps(data, ensure_ascii=False, indent=1).encode('utf-8'))
+
+
+def init_output_layout(output_dir: str, layout: Optional[str] = None,
+                       prefix_length: Optional[int] = None) -> Optional[OutputIndex]:
+    """为输出目录确定布局：新目录写入空索引，之后对该目录的生成都自动沿用
+
+    Args:
+        output_dir (str): 输出目录
+        layout (Optional[str]): 布局名称，为None时只读取已有索引
+        prefix_length (Optional[int]): prefix 布局的编码前缀长度
+
+    Returns:
+        Optional[OutputIndex]: 目录的索引，未指定布局且没有索引时为None
+
+    Raises:
+        ValueError: 当布局无效或与目录已有的布局不同时
+    """
+    index = OutputIndex.open(output_dir, layout, prefix_length)
+    if index is not None and not os.path.exists(index.path):
+        index.save()
+    return index
+
+
+def find_bom_file(output_dir: str, style_code: str) -> Optional[str]:
+    """查找款式的BOM文件：有索引时查索引，否则为平铺布局下的路径（文件不存在时返回None）"""
+    index = OutputIndex.load(output_dir)
+    if index is not None:
+        return index.find(style_code)
+    path = os.path.join(output_dir, f"{style_code}.xlsx")
+    return path if os.path.exists(path) else None
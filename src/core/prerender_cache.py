@@ -0,0 +1,260 @@
+# 上传后在后台预先渲染全部款式的缓存
+
+from typing import Dict, Any, List, Optional, Callable, Iterable
+from collections import deque
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+from .bom_generator import BomGenerator
+
+
+class PrerenderCache:
+    """在用户挑选款式期间，提前在后台线程中渲染全部款式并缓存字节流
+
+    点击生成时大部分款式已经渲染好，只剩打包ZIP。内存中缓存的字节数超过
+    max_memory_bytes 后，新渲染的款式写入临时目录，读取时再从磁盘加载。
+    用户确定选择后可以调用 retain 取消未选中款式的渲染并释放其缓存，
+    再用 take_pending 取走尚未渲染的款式交给正式的渲染任务，避免重复渲染。
+
+    预渲染是投机性的工作：传入 should_pause 后，每渲染一个款式前都会检查，
+    返回True时暂停（例如有正式生成任务在运行或排队时），不与正式任务争抢CPU。
+
+    网页会话关闭时没有机会调用 close：传入 idle_timeout 后，超过该秒数没有任何
+    调用（start、retain、take_pending、get、stats、touch）时，后台线程自行停止
+    并释放全部缓存，效果与 close 相同。
+
+    Example:
+        >>> cache = PrerenderCache(generator)
+        >>> cache.start(generator.get_all_style_codes())
+        >>> # ... 用户选择款式 ...
+        >>> cache.retain(selected_codes)
+        >>> missing = cache.take_pending(selected_codes)
+        >>> data = cache.get('H5A123416', timeout=10)
+        >>> cache.close()
+    """
+
+    DEFAULT_MAX_MEMORY_BYTES = 64 * 1024 * 1024
+    _PAUSE_SECONDS = 0.2
+
+    def __init__(self, generator: BomGenerator,
+                 max_memory_bytes: int = DEFAULT_MAX_MEMORY_BYTES,
+                 spill_dir: Optional[str] = None,
+                 should_pause: Optional[Callable[[], bool]] = None,
+                 idle_timeout: Optional[float] = None) -> None:
+        """创建缓存（尚未开始渲染）
+
+        Args:
+            generator (BomGenerator): 已加载明细表的生成器
+            max_memory_bytes (int): 内存中缓存的字节数上限，超出部分写入磁盘
+            spill_dir (Optional[str]): 溢出文件目录，默认在首次溢出时创建临时目录
+            should_pause (Optional[Callable[[], bool]]): 返回True时暂停预渲染
+            idle_timeout (Optional[float]): 无人访问超过该秒数后自动关闭；为None时不自动关闭
+        """
+        self.generator = generator
+        self.max_memory_bytes = max_memory_bytes
+        self.should_pause = should_pause
+        self.idle_timeout = idle_timeout
+        self.errors: Dict[str, str] = {}
+
+        self._spill_dir = spill_dir
+        self._owns_spill_dir = spill_dir is None
+        self._memory: Dict[str, bytes] = {}
+        self._spilled: Dict[str, str] = {}
+        self._memory_bytes = 0
+        self._pending: deque = deque()
+        self._in_flight: Optional[str] = None
+        self._closed = False
+        self._condition = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._last_access = time.monotonic()
+
+    def start(self, style_codes: Iterable[str]) -> None:
+        """把款式加入预渲染队列并启动后台线程
+
+        Args:
+            style_codes (Iterable[str]): 款式编码，按顺序渲染
+        """
+        with self._condition:
+            self._last_access = time.monotonic()
+            known = set(self._pending) | set(self._memory) | set(self._spilled) | set(self.errors)
+            self._pending.extend(code for code in style_codes if code not in known)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='bom-prerender', daemon=True)
+                self._thread.start()
+            self._condition.notify_all()
+
+    def retain(self, style_codes: Iterable[str]) -> None:
+        """只保留指定款式：取消其余款式的待渲染工作并释放其缓存
+
+        Args:
+            style_codes (Iterable[str]): 需要保留的款式编码
+        """
+        keep = set(style_codes)
+        with self._condition:
+            self._last_access = time.monotonic()
+            self._pending = deque(code for code in self._pending if code in keep)
+            for code in [code for code in self._memory if code not in keep]:
+                self._memory_bytes -= len(self._memory.pop(code))
+            for code in [code for code in self._spilled if code not in keep]:
+                self._remove_file(self._spilled.pop(code))
+
+    def take_pending(self, style_codes: Iterable[str]) -> List[str]:
+        """取走指定款式中尚未渲染完成的款式，由调用方自行渲染
+
+        除队列中尚未开始的款式外，之前被 retain 取消或从未加入队列的款式同样会
+        被返回，调用方据此渲染的结果加上 get 能取到的缓存覆盖全部指定款式。
+        正在渲染中的款式不会被取走，可通过 get(code, timeout) 等待其完成；
+        预渲染失败的款式也不会被取走，错误见 errors。
+
+        Args:
+            style_codes (Iterable[str]): 款式编码
+
+        Returns:
+            List[str]: 被取走的款式编码（保持传入顺序）
+        """
+        wanted = list(style_codes)
+        with self._condition:
+            self._last_access = time.monotonic()
+            done = set(self._memory) | set(self._spilled) | set(self.errors)
+            if self._in_flight is not None:
+                done.add(self._in_flight)
+            taken = [code for code in wanted if code not in done]
+            taken_set = set(taken)
+            self._pending = deque(code for code in self._pending if code not in taken_set)
+        return taken
+
+    def get(self, style_code: str, timeout: Optional[float] = None) -> Optional[bytes]:
+        """读取已渲染的字节流
+
+        Args:
+            style_code (str): 款式编码
+            timeout (Optional[float]): 该款式正在渲染或仍在队列中时最多等待的秒数；
+                None 表示不等待
+
+        Returns:
+            Optional[bytes]: 字节流；未渲染、已取消或渲染失败（见 errors）时返回None
+        """
+        with self._condition:
+            self._last_access = time.monotonic()
+            if timeout is not None:
+                self._condition.wait_for(
+                    lambda: self._closed or (style_code != self._in_flight and style_code not in self._pending),
+                    timeout)
+            if style_code in self._memory:
+                return self._memory[style_code]
+            path = self._spilled.get(style_code)
+        if path is None:
+            return None
+        with open(path, 'rb') as f:
+            return f.read()
+
+    def stats(self) -> Dict[str, Any]:
+        """缓存状态
+
+        Returns:
+            Dict[str, Any]: {'pending': int, 'in_memory': int, 'spilled': int,
+                             'failed': int, 'memory_bytes': int}
+        """
+        with self._condition:
+            self._last_access = time.monotonic()
+            return {'pending': len(self._pending) + (self._in_flight is not None),
+                    'in_memory': len(self._memory), 'spilled': len(self._spilled),
+                    'failed': len(self.errors), 'memory_bytes': self._memory_bytes}
+
+    def touch(self) -> None:
+        """记录一次访问，推迟 idle_timeout 的自动关闭"""
+        with self._condition:
+            self._last_access = time.monotonic()
+
+    @property
+    def closed(self) -> bool:
+        """已关闭（包括因空闲超时自动关闭）时为True"""
+        return self._closed
+
+    def close(self) -> None:
+        """停止后台线程并删除全部缓存（包括溢出到磁盘的文件）"""
+        with self._condition:
+            self._closed = True
+            self._pending.clear()
+            self._condition.notify_all()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+        self._release()
+
+    def _release(self) -> None:
+        """删除全部缓存（包括溢出到磁盘的文件）"""
+        with self._condition:
+            self._memory.clear()
+            self._memory_bytes = 0
+            for path in self._spilled.values():
+                self._remove_file(path)
+            self._spilled.clear()
+        if self._owns_spill_dir and self._spill_dir is not None:
+            shutil.rmtree(self._spill_dir, ignore_errors=True)
+            self._spill_dir = None
+
+    def __enter__(self) -> 'PrerenderCache':
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+    def _run(self) -> None:
+        """后台线程：按队列顺序渲染，队列为空时等待新的款式"""
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: self._closed or self._pending or self._idle(), self.idle_timeout)
+                if self._closed:
+                    return
+                if self._idle():
+                    break
+                if not self._pending:
+                    continue
+                if self.should_pause is not None and self.should_pause():
+                    self._condition.wait(self._PAUSE_SECONDS)
+                    continue
+                style_code = self._pending.popleft()
+                self._in_flight = style_code
+
+            try:
+                data = self.generator.generate_bom_file_to_buffer(style_code)
+                error = None
+            except Exception as e:
+                data, error = None, str(e)
+
+            with self._condition:
+                self._in_flight = None
+                if error is not None:
+                    self.errors[style_code] = error
+                elif not self._closed:
+                    self._store(style_code, data)
+                self._condition.notify_all()
+        # 空闲超时（会话已被放弃）：与 close 相同地停止并释放缓存
+        self.close()
+
+    def _idle(self) -> bool:
+        """在持有锁时调用：超过 idle_timeout 秒没有访问时返回True"""
+        return self.idle_timeout is not None and time.monotonic() - self._last_access > self.idle_timeout
+
+    def _store(self, style_code: str, data: bytes) -> None:
+        """在持有锁时调用：放入内存，超出上限时写入磁盘"""
+        if self._memory_bytes + len(data) <= self.max_memory_bytes:
+            self._memory[style_code] = data
+            self._memory_bytes += len(data)
+            return
+        if self._spill_dir is None:
+            self._spill_dir = tempfile.mkdtemp(prefix='bom_prerender_')
+        path = os.path.join(self._spill_dir, f"{style_code}.xlsx")
+        with open(path, 'wb') as f:
+            f.write(data)
+        self._spilled[style_code] = path
+
+    @staticmethod
+    def _remove_file(path: str) -> None:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
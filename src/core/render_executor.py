@@ -0,0 +1,284 @@
+# 进程级的BOM渲染执行器：并发上限、排队位置与预计完成时间
+
+from typing import Dict, Any, List, Optional, Tuple
+from collections import deque
+import os
+import threading
+import time
+
+from . import metrics
+from .bom_generator import BomGenerator
+
+
+# 同时运行的批次数上限，可通过环境变量配置
+MAX_CONCURRENT_ENV = 'BOM_MAX_CONCURRENT_RENDERS'
+DEFAULT_MAX_CONCURRENT = 2
+
+
+class RenderJob:
+    """提交给 RenderExecutor 的一个渲染批次（通常对应一个网页会话的一次生成）
+
+    由执行器创建。状态依次为 queued → running → done，或被取消（cancelled）：
+    排队中的批次立即取消，运行中的批次在当前款式渲染完成后停止并释放槽位，
+    已完成的款式保留在 results 中。单个款式失败不会使整个批次失败，见 failed。
+
+    Attributes:
+        style_codes (List[str]): 要渲染的款式编码
+        results (Dict[str, bytes]): 已完成的款式编码到xlsx字节流
+        failed (List[Tuple[str, str]]): (款式编码, 错误信息)
+        status (str): 当前状态
+    """
+
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    CANCELLED = 'cancelled'
+
+    def __init__(self, executor: 'RenderExecutor', generator: BomGenerator, style_codes: List[str],
+                 abandon_after: Optional[float] = None) -> None:
+        self._executor = executor
+        self.abandon_after = abandon_after
+        self.generator = generator
+        self.style_codes = list(style_codes)
+        self.results: Dict[str, bytes] = {}
+        self.failed: List[Tuple[str, str]] = []
+        self.status = self.QUEUED
+        self.submitted_at = time.monotonic()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self._finished = threading.Event()
+        self._cancel_requested = threading.Event()
+        # 调用方最近一次关注该批次（调用 wait）的时间与正在等待的调用数，用于判断批次是否已被放弃
+        self._last_seen = time.monotonic()
+        self._waiting = 0
+        self._waiting_lock = threading.Lock()
+
+    @property
+    def total(self) -> int:
+        return len(self.style_codes)
+
+    @property
+    def completed(self) -> int:
+        """已处理（成功或失败）的款式数"""
+        return len(self.results) + len(self.failed)
+
+    def position(self) -> int:
+        """排队位置：0 表示正在运行或已结束，1 表示下一个开始运行"""
+        return self._executor.queue_position(self)
+
+    def eta_seconds(self) -> Optional[float]:
+        """预计还需多少秒完成（含排队时间）；尚无耗时统计时返回None"""
+        return self._executor.estimate_seconds(self)
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """等待批次结束
+
+        Args:
+            timeout (Optional[float]): 最长等待秒数，None 表示一直等待
+
+        Returns:
+            bool: 批次已结束（完成或取消）时返回True
+        """
+        with self._waiting_lock:
+            self._waiting += 1
+        try:
+            return self._finished.wait(timeout)
+        finally:
+            with self._waiting_lock:
+                self._waiting -= 1
+                self._last_seen = time.monotonic()
+
+    def abandoned(self) -> bool:
+        """设置了 abandon_after 且调用方已超过该秒数没有调用 wait 时返回True"""
+        if self.abandon_after is None:
+            return False
+        with self._waiting_lock:
+            return self._waiting == 0 and time.monotonic() - self._last_seen > self.abandon_after
+
+    def cancel(self) -> bool:
+        """取消批次：排队中的立即取消，运行中的在当前款式渲染完成后停止
+
+        Returns:
+            bool: 已取消或已请求停止时返回True；批次已结束时返回False
+        """
+        return self._executor.cancel(self)
+
+    def _finish(self, status: str) -> None:
+        self.status = status
+        self.finished_at = time.monotonic()
+        self._finished.set()
+
+
+class RenderExecutor:
+    """进程内共享的渲染执行器，限制同时运行的批次数并按提交顺序排队
+
+    openpyxl 渲染是CPU密集型的，多个会话同时生成整季BOM时会互相抢占，
+    所有人都变慢。执行器只允许 max_concurrent 个批次同时运行，其余批次
+    先进先出排队；每个批次可以随时查询自己的排队位置和预计完成时间。
+    预计时间基于最近完成的款式的平均渲染耗时（指数移动平均）。
+
+    BomGenerator 的读取路径是线程安全的，同一个生成器可以被多个批次共用。
+
+    Example:
+        >>> executor = get_render_executor()
+        >>> job = executor.submit(generator, ['H5A123416', 'H5A413492'])
+        >>> while not job.wait(0.5):
+        ...     print(job.position(), job.eta_seconds())
+        >>> job.results.keys()
+    """
+
+    # 平均耗时的平滑系数
+    _SMOOTHING = 0.2
+
+    def __init__(self, max_concurrent: Optional[int] = None) -> None:
+        """创建执行器
+
+        Args:
+            max_concurrent (Optional[int]): 同时运行的批次数上限，默认读取环境变量
+                BOM_MAX_CONCURRENT_RENDERS，未设置时为 2
+
+        Raises:
+            ValueError: 当上限不是正整数时
+        """
+        if max_concurrent is None:
+            value = os.environ.get(MAX_CONCURRENT_ENV, str(DEFAULT_MAX_CONCURRENT))
+            try:
+                max_concurrent = int(value)
+            except ValueError:
+                raise ValueError(f"错误：环境变量 {MAX_CONCURRENT_ENV} 必须是正整数，当前值：{value}")
+        if max_concurrent < 1:
+            raise ValueError(f"错误：并发上限必须是正整数，当前值：{max_concurrent}")
+
+        self.max_concurrent = max_concurrent
+        self._lock = threading.Lock()
+        self._queue: deque = deque()
+        self._running: List[RenderJob] = []
+        self._seconds_per_style: Optional[float] = None
+
+    def submit(self, generator: BomGenerator, style_codes: List[str],
+               abandon_after: Optional[float] = None) -> RenderJob:
+        """提交一个渲染批次
+
+        Args:
+            generator (BomGenerator): 已加载明细表的生成器
+            style_codes (List[str]): 要渲染的款式编码
+            abandon_after (Optional[float]): 调用方超过该秒数没有调用 job.wait 时视为已放弃
+                （如网页会话已关闭），批次在款式之间自动取消；为None时不检查
+
+        Returns:
+            RenderJob: 批次对象，用于查询进度、排队位置和结果
+        """
+        job = RenderJob(self, generator, style_codes, abandon_after=abandon_after)
+        with self._lock:
+            self._queue.append(job)
+            self._start_jobs()
+        return job
+
+    def cancel(self, job: RenderJob) -> bool:
+        """取消批次，见 RenderJob.cancel"""
+        with self._lock:
+            if job in self._running:
+                # 渲染线程在款式之间检查该标志
+                job._cancel_requested.set()
+                return True
+            if job not in self._queue:
+                return False
+            self._queue.remove(job)
+        job._finish(RenderJob.CANCELLED)
+        return True
+
+    def queue_position(self, job: RenderJob) -> int:
+        """批次的排队位置，见 RenderJob.position"""
+        with self._lock:
+            try:
+                return self._queue.index(job) + 1
+            except ValueError:
+                return 0
+
+    def estimate_seconds(self, job: RenderJob) -> Optional[float]:
+        """估算批次还需多少秒完成
+
+        排队中的批次需要等待：运行中批次的剩余款式与排在前面的批次的全部款式，
+        由 max_concurrent 个槽位分摊；再加上自身的全部款式。
+        """
+        with self._lock:
+            per_style = self._seconds_per_style
+            if per_style is None:
+                return None
+            if job.status in (RenderJob.DONE, RenderJob.CANCELLED):
+                return 0.0
+            if job.status == RenderJob.RUNNING:
+                return (job.total - job.completed) * per_style
+            ahead = sum(running.total - running.completed for running in self._running)
+            for queued in self._queue:
+                if queued is job:
+                    break
+                ahead += queued.total
+            return (ahead / self.max_concurrent + job.total) * per_style
+
+    def stats(self) -> Dict[str, Any]:
+        """当前运行与排队情况
+
+        Returns:
+            Dict[str, Any]: {'running': int, 'queued': int, 'max_concurrent': int,
+                             'seconds_per_style': Optional[float]}
+        """
+        with self._lock:
+            return {'running': len(self._running), 'queued': len(self._queue),
+                    'max_concurrent': self.max_concurrent, 'seconds_per_style': self._seconds_per_style}
+
+    def _start_jobs(self) -> None:
+        """在持有锁时调用：空出槽位后按顺序启动排队的批次"""
+        while self._queue and len(self._running) < self.max_concurrent:
+            job = self._queue.popleft()
+            job.status = RenderJob.RUNNING
+            job.started_at = time.monotonic()
+            self._running.append(job)
+            threading.Thread(target=self._run, args=(job,), name='bom-render', daemon=True).start()
+
+    def _run(self, job: RenderJob) -> None:
+        """渲染线程：逐个渲染批次中的款式，结束（或被取消）后启动下一个排队的批次"""
+        try:
+            for style_code in job.style_codes:
+                if job.abandoned():
+                    job._cancel_requested.set()
+                if job._cancel_requested.is_set():
+                    break
+                started = time.perf_counter()
+                try:
+                    job.results[style_code] = job.generator.generate_bom_file_to_buffer(style_code)
+                except Exception as e:
+                    job.failed.append((style_code, str(e)))
+                    continue
+                self._record_duration(time.perf_counter() - started)
+        finally:
+            metrics.record_batch({'success': list(job.results), 'failed': job.failed,
+                                  'elapsed_seconds': time.monotonic() - job.started_at})
+            job._finish(RenderJob.CANCELLED if job._cancel_requested.is_set() else RenderJob.DONE)
+            with self._lock:
+                self._running.remove(job)
+                self._start_jobs()
+
+    def _record_duration(self, seconds: float) -> None:
+        with self._lock:
+            if self._seconds_per_style is None:
+                self._seconds_per_style = seconds
+            else:
+                self._seconds_per_style += self._SMOOTHING * (seconds - self._seconds_per_style)
+
+
+_executor: Optional[RenderExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def get_render_executor() -> RenderExecutor:
+    """获取进程内共享的渲染执行器（首次调用时创建）
+
+    网页版的每个会话运行在各自的脚本线程中，但都应通过这个执行器排队，
+    以保证整个进程同时运行的批次数不超过上限。
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = RenderExecutor()
+        return _executor
@@ -0,0 +1,382 @@
+# 进程池工作进程共享的只读目录（共享内存）
+
+from typing import Dict, Any, List, Optional, Tuple
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from multiprocessing import shared_memory
+import hashlib
+import json
+import os
+import struct
+import time
+
+import numpy as np
+import pandas as pd
+
+from .bom_generator import BomGenerator
+from .output_layout import OutputIndex
+from .writer import atomic_write_bytes, file_content_matches
+
+
+_MAGIC = b'BOMCAT01'
+_PREFIX = struct.Struct('<8sQ')   # 魔数 + 头部JSON长度
+_ALIGN = 8
+
+
+def _align(position: int) -> int:
+    return (position + _ALIGN - 1) // _ALIGN * _ALIGN
+
+
+class SharedCatalog:
+    """发布到共享内存中的只读目录，供进程池中的工作进程按名称挂载
+
+    内容为 BomGenerator.derived_table 与 sku_grid 的投影，布局与 Arrow 的
+    变长字符串列相同：每列由一个 int64 偏移数组、一个 uint8 有效位数组和一段
+    UTF-8 数据组成，按款式编码（UTF-8字节序）排序。工作进程挂载时只解析
+    一个很小的JSON头部，之后按需二分查找并解码单个款式，挂载耗时和内存
+    都不随目录大小增长。
+
+    发布方负责 close() 和 unlink()；挂载方只需 close()。
+
+    Example:
+        >>> with SharedCatalog.publish(generator) as catalog:
+        ...     # 在工作进程中：
+        ...     worker_catalog = SharedCatalog.attach(catalog.name)
+        ...     worker_catalog.get('H5A123416')['品名']
+        'HECO秋四波长袖T恤H5A123416'
+    """
+
+    # 与 derived_table 对应的字符串列；颜色、颜色代码和SKU合并为一个JSON列
+    COLUMNS = [BomGenerator.STYLE_CODE_COL, BomGenerator.WAVE_COL, '二级品类', '一级品类',
+               '模板', '品名', '错误', 'SKU']
+
+    def __init__(self, shm: shared_memory.SharedMemory, owner: bool) -> None:
+        """请使用 publish 或 attach 创建实例"""
+        self._shm = shm
+        self._owner = owner
+        buf = shm.buf
+        magic, header_length = _PREFIX.unpack_from(buf, 0)
+        if magic != _MAGIC:
+            raise ValueError(f"错误：共享内存 '{shm.name}' 不是BOM目录。")
+        header = json.loads(bytes(buf[_PREFIX.size:_PREFIX.size + header_length]).decode('utf-8'))
+        base = _align(_PREFIX.size + header_length)
+        self.rows: int = header['rows']
+        self.sizes: List[str] = header['sizes']
+        self._columns: Dict[str, Tuple[np.ndarray, np.ndarray, int]] = {}
+        for column in header['columns']:
+            offsets = np.frombuffer(buf, dtype='<i8', count=self.rows + 1, offset=base + column['offsets'])
+            validity = np.frombuffer(buf, dtype=np.uint8, count=self.rows, offset=base + column['validity'])
+            self._columns[column['name']] = (offsets, validity, base + column['data'])
+
+    @property
+    def name(self) -> str:
+        """共享内存块名称，传给工作进程用于 attach"""
+        return self._shm.name
+
+    @classmethod
+    def publish(cls, generator: BomGenerator) -> 'SharedCatalog':
+        """把生成器的派生字段表写入一块新的共享内存
+
+        Args:
+            generator (BomGenerator): 已加载明细表的生成器
+
+        Returns:
+            SharedCatalog: 拥有该共享内存的实例
+
+        Raises:
+            ValueError: 当生成器尚未构建派生字段表时
+        """
+        if generator.derived_table is None:
+            raise ValueError("错误：生成器尚未加载明细表，无法发布共享目录。")
+
+        records = generator._derived_records
+        codes = sorted(records, key=lambda code: str(code).encode('utf-8'))
+        columns: Dict[str, List[Optional[bytes]]] = {name: [] for name in cls.COLUMNS}
+        for code in codes:
+            record = records[code]
+            values = {
+                BomGenerator.STYLE_CODE_COL: code,
+                BomGenerator.WAVE_COL: record[BomGenerator.WAVE_COL],
+                '二级品类': record['二级品类'],
+                '一级品类': record['一级品类'],
+                '模板': record['模板'],
+                '品名': record['品名'],
+                '错误': record['错误'],
+                'SKU': json.dumps([[item['color'], generator.color_codes.get(item['color']),
+                                    [item['skus'][size] for size in generator.SIZES]]
+                                   for item in record['SKU']], ensure_ascii=False),
+            }
+            for name, value in values.items():
+                columns[name].append(None if pd.isna(value) else str(value).encode('utf-8'))
+
+        # 先计算布局（位置相对于头部之后的缓冲区起点），再一次性写入
+        rows = len(codes)
+        layout = []
+        position = 0
+        for name, values in columns.items():
+            data_length = sum(len(value) for value in values if value is not None)
+            offsets_at = position
+            validity_at = _align(offsets_at + 8 * (rows + 1))
+            data_at = _align(validity_at + rows)
+            position = _align(data_at + data_length)
+            layout.append({'name': name, 'offsets': offsets_at, 'validity': validity_at, 'data': data_at})
+        header_bytes = json.dumps({'rows': rows, 'sizes': list(generator.SIZES), 'columns': layout},
+                                  ensure_ascii=False).encode('utf-8')
+        base = _align(_PREFIX.size + len(header_bytes))
+
+        shm = shared_memory.SharedMemory(create=True, size=base + position)
+        try:
+            buf = shm.buf
+            _PREFIX.pack_into(buf, 0, _MAGIC, len(header_bytes))
+            buf[_PREFIX.size:_PREFIX.size + len(header_bytes)] = header_bytes
+            for column in layout:
+                values = columns[column['name']]
+                offsets = np.frombuffer(buf, dtype='<i8', count=rows + 1, offset=base + column['offsets'])
+                validity = np.frombuffer(buf, dtype=np.uint8, count=rows, offset=base + column['validity'])
+                cursor = 0
+                offsets[0] = 0
+                for i, value in enumerate(values):
+                    if value is not None:
+                        start = base + column['data'] + cursor
+                        buf[start:start + len(value)] = value
+                        cursor += len(value)
+                    validity[i] = value is not None
+                    offsets[i + 1] = cursor
+                del offsets, validity   # 释放对共享内存的引用，否则无法 close
+            return cls(shm, owner=True)
+        except Exception:
+            shm.close()
+            shm.unlink()
+            raise
+
+    @classmethod
+    def attach(cls, name: str) -> 'SharedCatalog':
+        """以只读方式挂载已发布的共享目录
+
+        Args:
+            name (str): 发布方的 SharedCatalog.name
+
+        Returns:
+            SharedCatalog: 不拥有共享内存的实例
+        """
+        try:
+            shm = shared_memory.SharedMemory(name=name, track=False)   # Python 3.13+
+        except TypeError:
+            # 旧版本挂载时也会向资源跟踪器登记，而跟踪器按名称去重且与发布方共用，
+            # 挂载方事后注销会连发布方的登记一起删掉。因此挂载期间跳过登记
+            from multiprocessing import resource_tracker
+            register = resource_tracker.register
+            resource_tracker.register = lambda name, rtype: None
+            try:
+                shm = shared_memory.SharedMemory(name=name)
+            finally:
+                resource_tracker.register = register
+        return cls(shm, owner=False)
+
+    def _value(self, column: str, row: int) -> Optional[str]:
+        """解码某列第 row 行的字符串"""
+        offsets, validity, data_at = self._columns[column]
+        if not validity[row]:
+            return None
+        start, end = data_at + int(offsets[row]), data_at + int(offsets[row + 1])
+        return bytes(self._shm.buf[start:end]).decode('utf-8')
+
+    def _find_row(self, style_code: str) -> int:
+        """在已排序的款式编码列上二分查找，找不到时返回-1"""
+        key = str(style_code).encode('utf-8')
+        offsets, _, data_at = self._columns[BomGenerator.STYLE_CODE_COL]
+        buf = self._shm.buf
+        low, high = 0, self.rows
+        while low < high:
+            middle = (low + high) // 2
+            value = bytes(buf[data_at + int(offsets[middle]):data_at + int(offsets[middle + 1])])
+            if value < key:
+                low = middle + 1
+            else:
+                high = middle
+        if low < self.rows and bytes(buf[data_at + int(offsets[low]):data_at + int(offsets[low + 1])]) == key:
+            return low
+        return -1
+
+    def __len__(self) -> int:
+        return self.rows
+
+    def __contains__(self, style_code: str) -> bool:
+        return self._find_row(style_code) >= 0
+
+    def get(self, style_code: str, default: Any = None) -> Any:
+        """按款式编码取出一行，格式与 BomGenerator 内部的派生字段记录相同
+
+        Args:
+            style_code (str): 款式编码
+            default (Any): 找不到时的返回值
+
+        Returns:
+            Dict[str, Any]: 包含 波段、二级品类、一级品类、模板、品名、颜色、颜色代码、错误、SKU
+        """
+        row = self._find_row(style_code)
+        if row < 0:
+            return default
+        record = {name: self._value(name, row) for name in self.COLUMNS[1:-1]}
+        grid = json.loads(self._value('SKU', row))
+        record['颜色'] = [color for color, _, _ in grid]
+        record['颜色代码'] = [color_code for _, color_code, _ in grid]
+        record['SKU'] = [{'color': color, 'skus': dict(zip(self.sizes, skus))} for color, _, skus in grid]
+        return record
+
+    def close(self) -> None:
+        """解除映射；发布方同时删除共享内存"""
+        self._columns.clear()
+        self._shm.close()
+        if self._owner:
+            self._shm.unlink()
+
+    def __enter__(self) -> 'SharedCatalog':
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+
+# ---- 进程池工作进程 ----
+
+_worker: Dict[str, Any] = {}
+
+
+def _init_worker(catalog_name: str, timestamp: Optional[datetime], output_dir: str,
+                 skip_unchanged: bool, backend: str, layout: Optional[str], prefix_length: int) -> None:
+    """工作进程初始化：挂载共享目录，构建只读的轻量生成器（不含明细表）"""
+    catalog = SharedCatalog.attach(catalog_name)
+    generator = BomGenerator.__new__(BomGenerator)
+    generator._init_settings(timestamp)
+    generator.backend = backend
+    generator._derived_records = catalog
+    # 工作进程只用索引计算路径，索引文件由主进程在批次结束后统一写入
+    layout_index = OutputIndex(output_dir, layout, prefix_length) if layout is not None else None
+    _worker.update(catalog=catalog, generator=generator, output_dir=output_dir,
+                   skip_unchanged=skip_unchanged, index=layout_index, created_dirs=set())
+
+
+def _generate_in_worker(style_code: str) -> Tuple[str, Optional[str], bool, float, float, int, Optional[Dict[str, str]]]:
+    """工作进程任务：渲染并原子写入一个款式
+
+    Returns:
+        Tuple: (款式编码, 错误信息或None, 是否因内容未变化而跳过, 渲染秒数, 写盘秒数, 写入字节数,
+            索引条目或None)
+    """
+    generator: BomGenerator = _worker['generator']
+    render_started = time.perf_counter()
+    try:
+        excel_bytes = generator.generate_bom_file_to_buffer(style_code)
+    except Exception as e:
+        return style_code, str(e), False, time.perf_counter() - render_started, 0.0, 0, None
+    render_seconds = time.perf_counter() - render_started
+
+    write_started = time.perf_counter()
+    layout_index: Optional[OutputIndex] = _worker['index']
+    entry = None
+    if layout_index is None:
+        path = os.path.join(_worker['output_dir'], f"{style_code}.xlsx")
+    else:
+        relative_path = layout_index.relative_path(style_code, _worker['catalog'].get(style_code))
+        path = os.path.join(_worker['output_dir'], *relative_path.split('/'))
+        entry = {'path': relative_path, 'sha256': hashlib.sha256(excel_bytes).hexdigest()}
+    try:
+        directory = os.path.dirname(path)
+        if layout_index is not None and directory not in _worker['created_dirs']:
+            os.makedirs(directory, exist_ok=True)
+            _worker['created_dirs'].add(directory)
+        if _worker['skip_unchanged'] and file_content_matches(path, excel_bytes):
+            return style_code, None, True, render_seconds, time.perf_counter() - write_started, 0, entry
+        atomic_write_bytes(path, excel_bytes)
+    except PermissionError:
+        error = f"错误：无法写入文件 '{path}'，可能是文件已被打开，请关闭后重试。"
+        return style_code, error, False, render_seconds, time.perf_counter() - write_started, 0, None
+    except Exception as e:
+        return style_code, str(e), False, render_seconds, time.perf_counter() - write_started, 0, None
+    return style_code, None, False, render_seconds, time.perf_counter() - write_started, len(excel_bytes), entry
+
+
+def generate_bom_files_parallel(generator: BomGenerator, style_codes: List[str], output_dir: str,
+                                max_workers: Optional[int] = None,
+                                progress_callback=None,
+                                skip_unchanged: bool = False,
+                                index: Optional[OutputIndex] = None) -> Dict[str, Any]:
+    """通过共享内存目录在进程池中并行生成BOM文件
+
+    目录只发布一次，工作进程按名称挂载，不需要序列化明细表，也不需要在每个
+    进程中重新读取源文件。派生字段中已记录错误的款式不会被分发，直接记为失败；
+    不在明细表中的款式在当前进程中按原方式生成。
+
+    Args:
+        generator (BomGenerator): 已加载明细表的生成器
+        style_codes (List[str]): 要生成的款式编码列表
+        output_dir (str): 输出目录，不存在时自动创建
+        max_workers (Optional[int]): 进程数，默认为CPU核数
+        progress_callback: 每个款式完成后调用，参数为 (序号, 总数, 款式编码)
+        skip_unchanged (bool): 见 BomGenerator.generate_bom_files
+        index (Optional[OutputIndex]): 输出布局与索引，为None时平铺输出且不维护索引
+
+    Returns:
+        Dict[str, Any]: 与 BomGenerator.generate_bom_files 相同格式的批次报告。
+            render_seconds 和 write_seconds 为各进程累计耗时
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    started = time.perf_counter()
+    total = len(style_codes)
+    report: Dict[str, Any] = {'total': total, 'success': [], 'skipped': [], 'failed': [],
+                              'render_seconds': 0.0, 'write_seconds': 0.0, 'elapsed_seconds': 0.0,
+                              'bytes_written': 0}
+
+    dispatched, local = [], []
+    for style_code in style_codes:
+        record = generator._derived_records.get(style_code)
+        if record is None:
+            local.append(style_code)
+        elif record['错误']:
+            report['failed'].append((style_code, record['错误']))
+        else:
+            dispatched.append(style_code)
+
+    done = len(report['failed'])
+    indexed: Dict[str, Dict[str, str]] = {}
+    if dispatched:
+        workers = max_workers or os.cpu_count() or 1
+        with SharedCatalog.publish(generator) as catalog:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                     initargs=(catalog.name, generator.timestamp, output_dir,
+                                               skip_unchanged, generator.backend,
+                                               index.layout if index is not None else None,
+                                               index.prefix_length if index is not None else 0)) as pool:
+                chunksize = max(1, len(dispatched) // (workers * 4))
+                for style_code, error, skipped, render_seconds, write_seconds, size, entry in \
+                        pool.map(_generate_in_worker, dispatched, chunksize=chunksize):
+                    report['render_seconds'] += render_seconds
+                    report['write_seconds'] += write_seconds
+                    report['bytes_written'] += size
+                    if error is not None:
+                        report['failed'].append((style_code, error))
+                    else:
+                        report['success'].append(style_code)
+                        if entry is not None:
+                            indexed[style_code] = entry
+                        if skipped:
+                            report['skipped'].append(style_code)
+                    if progress_callback is not None:
+                        progress_callback(done, total, style_code)
+                    done += 1
+
+    if local:
+        # 不在派生字段表中的款式（如编码不存在）在本进程生成以得到一致的错误信息；
+        # 不单独记录批次指标，由调用方对整个批次记录一次
+        local_report = generator._generate_sequential(local, output_dir, skip_unchanged=skip_unchanged,
+                                                      index=index)
+        for key in ('success', 'skipped', 'failed'):
+            report[key].extend(local_report[key])
+        for key in ('render_seconds', 'write_seconds', 'bytes_written'):
+            report[key] += local_report[key]
+
+    if index is not None and indexed:
+        index.record_batch(indexed, generator.timestamp or datetime.now())
+    report['elapsed_seconds'] = time.perf_counter() - started
+    return report
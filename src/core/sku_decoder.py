@@ -0,0 +1,123 @@
+# SKU反向解析：把规格码拆回款式编码、颜色和尺码
+
+from typing import Dict, Any, List, Optional, Iterable
+
+import pandas as pd
+
+from .bom_generator import BomGenerator
+
+
+class SkuDecoder:
+    """根据明细表和 color_codes.json 把SKU拆分为款式编码、颜色和尺码
+
+    SKU由 BomGenerator._create_sku 按 {款式编码}{颜色代码}{尺码} 拼接而成，
+    颜色代码长度不固定（2~4位），因此同一个SKU可能有多种拆法。解析时对
+    每种"尺码后缀 × 款式编码长度"组合做一次向量化的前缀/后缀截取，
+    只保留款式编码在明细表中、颜色代码在颜色字典中的拆法：
+
+    - 恰好一种拆法：状态为 ok
+    - 多种拆法：优先保留颜色属于该款开发颜色的拆法，仍不唯一时为 ambiguous
+    - 没有拆法：状态为 unknown
+
+    Example:
+        >>> decoder = SkuDecoder(BomGenerator('明细表.xlsx'))
+        >>> decoder.decode('H5A41349215S')['颜色']
+        '灰色'
+        >>> decoder.decode_many(sku_list).query("状态 != 'ok'")
+    """
+
+    STATUS_OK = 'ok'
+    STATUS_AMBIGUOUS = 'ambiguous'
+    STATUS_UNKNOWN = 'unknown'
+
+    COLUMNS = ['SKU', BomGenerator.STYLE_CODE_COL, '颜色', '颜色代码', '尺码', '状态', '说明']
+
+    def __init__(self, generator: BomGenerator, sizes: Optional[List[str]] = None) -> None:
+        """根据生成器当前的明细表和颜色字典建立索引
+
+        Args:
+            generator (BomGenerator): 已加载明细表的生成器
+            sizes (Optional[List[str]]): 可能出现的尺码后缀，默认为 BomGenerator.SIZES
+        """
+        self.sizes = list(sizes or generator.SIZES)
+        self.style_codes = {str(code) for code in generator.get_all_style_codes()}
+        self.style_lengths = sorted({len(code) for code in self.style_codes})
+        self.color_names = {str(code): name for name, code in generator.color_codes.items()}
+
+        # (款式编码, 标准颜色名) 组合，用于在多种拆法中选出属于该款开发颜色的那一种
+        self.style_colors = {(str(code), color) for code, colors in generator.style_colors.items()
+                             for color in colors}
+
+    def decode_many(self, skus: Iterable[str]) -> pd.DataFrame:
+        """批量解析SKU
+
+        Args:
+            skus (Iterable[str]): SKU列表，前后空白会被去掉，顺序和重复项保持不变
+
+        Returns:
+            pd.DataFrame: 每个SKU一行，列为 SKU、款式编码、颜色、颜色代码、尺码、状态、说明。
+                状态不为 ok 时款式编码/颜色/颜色代码/尺码为空，说明中给出原因或全部候选拆法
+        """
+        series = pd.Series(list(skus), dtype=object).astype(str).str.strip().reset_index(drop=True)
+
+        candidates = []
+        for size in self.sizes:
+            ends_with_size = series[series.str.endswith(size)]
+            body = ends_with_size.str[:-len(size)]
+            for style_length in self.style_lengths:
+                style = body.str[:style_length]
+                color_code = body.str[style_length:]
+                valid = style.isin(self.style_codes) & color_code.isin(self.color_names.keys())
+                if valid.any():
+                    candidates.append(pd.DataFrame({
+                        'row': body.index[valid],
+                        BomGenerator.STYLE_CODE_COL: style[valid].values,
+                        '颜色代码': color_code[valid].values,
+                        '尺码': size,
+                    }))
+
+        result = pd.DataFrame({'SKU': series})
+        for column in self.COLUMNS[1:]:
+            result[column] = None
+        result['状态'] = self.STATUS_UNKNOWN
+        result['说明'] = '款式编码或颜色代码不在明细表/颜色字典中'
+        if not candidates:
+            return result[self.COLUMNS]
+
+        matches = pd.concat(candidates, ignore_index=True)
+        matches['颜色'] = matches['颜色代码'].map(self.color_names)
+        matches['in_catalog'] = [pair in self.style_colors for pair in
+                                 zip(matches[BomGenerator.STYLE_CODE_COL], matches['颜色'])]
+
+        # 多种拆法时，只要有属于该款开发颜色的拆法，就丢弃其余拆法
+        has_catalog_match = matches.groupby('row')['in_catalog'].transform('any')
+        matches = matches[matches['in_catalog'] | ~has_catalog_match]
+        counts = matches.groupby('row')['row'].transform('size')
+
+        unique = matches[counts == 1].set_index('row')
+        for column in (BomGenerator.STYLE_CODE_COL, '颜色', '颜色代码', '尺码'):
+            result.loc[unique.index, column] = unique[column]
+        result.loc[unique.index, '状态'] = self.STATUS_OK
+        result.loc[unique.index, '说明'] = [None if in_catalog else '该颜色不在此款的开发颜色中'
+                                          for in_catalog in unique['in_catalog']]
+
+        ambiguous = matches[counts > 1]
+        if not ambiguous.empty:
+            described = (ambiguous[BomGenerator.STYLE_CODE_COL] + '+' + ambiguous['颜色'] + '('
+                         + ambiguous['颜色代码'] + ')+' + ambiguous['尺码'])
+            notes = described.groupby(ambiguous['row']).agg(' | '.join)
+            result.loc[notes.index, '状态'] = self.STATUS_AMBIGUOUS
+            result.loc[notes.index, '说明'] = '存在多种拆法: ' + notes
+        result = result[self.COLUMNS]
+        return result.where(result.notna(), None)
+
+    def decode(self, sku: str) -> Dict[str, Any]:
+        """解析单个SKU
+
+        Args:
+            sku (str): SKU，如 'H5A41349215S'
+
+        Returns:
+            Dict[str, Any]: 与 decode_many 的一行相同的字典
+        """
+        return self.decode_many([sku]).iloc[0].to_dict()
@@ -0,0 +1,125 @@
+# 大批量款式的筛选、分组与分页浏览
+
+from typing import Dict, List, Optional, Iterable
+
+import pandas as pd
+
+from .bom_generator import BomGenerator
+
+
+class StyleBrowser:
+    """基于 derived_table 的款式浏览表，供网页版做服务端筛选和分页
+
+    明细表有上万个款式时，逐个渲染控件会拖慢浏览器和Streamlit的连接。
+    浏览表在创建时把每个款式的波段、品类、颜色数和可否生成整理成一张
+    按列存放的表（波段和品类为分类类型），筛选全部是向量化的布尔运算，
+    页面上只展示当前页的若干行。
+
+    Example:
+        >>> browser = StyleBrowser(generator)
+        >>> codes = browser.filter(waves=['秋四波'], categories=['连衣裙'])
+        >>> browser.page(codes, page=0, page_size=100)
+    """
+
+    COLUMNS = [BomGenerator.STYLE_CODE_COL, BomGenerator.WAVE_COL, '一级品类', '二级品类', '颜色数', '错误']
+
+    def __init__(self, generator: BomGenerator) -> None:
+        """根据生成器的派生表建立浏览表
+
+        Args:
+            generator (BomGenerator): 已加载明细表的生成器
+        """
+        derived = generator.derived_table
+        self.table = pd.DataFrame({
+            BomGenerator.STYLE_CODE_COL: derived.index.astype(str),
+            # 缺少波段或品类的款式归入"未分波段"/"未分品类"（与分目录输出的目录名一致），
+            # 不会在筛选项中显示为 nan
+            BomGenerator.WAVE_COL: derived[BomGenerator.WAVE_COL].fillna('未分波段').astype(str).astype('category'),
+            '一级品类': derived['一级品类'].fillna('').astype(str).astype('category'),
+            '二级品类': derived['二级品类'].fillna('未分品类').astype(str).astype('category'),
+            '颜色数': [len(colors) for colors in derived['颜色']],
+            '错误': derived['错误'].where(derived['错误'].notna(), ''),
+        }).reset_index(drop=True)
+        self._by_code = self.table.set_index(BomGenerator.STYLE_CODE_COL, drop=False)
+
+    def __len__(self) -> int:
+        return len(self.table)
+
+    def options(self) -> Dict[str, List[str]]:
+        """可供筛选的取值（按首次出现的顺序）
+
+        Returns:
+            Dict[str, List[str]]: {'波段': [...], '一级品类': [...], '二级品类': [...]}
+        """
+        return {column: self.table[column].unique().tolist()
+                for column in (BomGenerator.WAVE_COL, '一级品类', '二级品类')}
+
+    def filter(self, waves: Optional[Iterable[str]] = None,
+               categories: Optional[Iterable[str]] = None,
+               primary_categories: Optional[Iterable[str]] = None,
+               keyword: str = '', only_valid: bool = False) -> List[str]:
+        """按条件筛选款式编码，各条件之间为"且"，未提供的条件不参与筛选
+
+        Args:
+            waves (Optional[Iterable[str]]): 波段，如 ['秋四波']
+            categories (Optional[Iterable[str]]): 二级品类，如 ['连衣裙']
+            primary_categories (Optional[Iterable[str]]): 一级品类
+            keyword (str): 款式编码中包含的文本（不区分大小写）
+            only_valid (bool): 是否只保留可以生成（没有错误）的款式
+
+        Returns:
+            List[str]: 符合条件的款式编码，保持明细表中的顺序
+        """
+        mask = pd.Series(True, index=self.table.index)
+        for column, values in ((BomGenerator.WAVE_COL, waves), ('二级品类', categories),
+                               ('一级品类', primary_categories)):
+            if values:
+                mask &= self.table[column].isin(list(values))
+        if keyword:
+            mask &= self.table[BomGenerator.STYLE_CODE_COL].str.contains(keyword.strip(), case=False, regex=False)
+        if only_valid:
+            mask &= self.table['错误'] == ''
+        return self.table.loc[mask, BomGenerator.STYLE_CODE_COL].tolist()
+
+    def group_counts(self, codes: Optional[Iterable[str]] = None,
+                     selected: Optional[Iterable[str]] = None) -> pd.DataFrame:
+        """按 波段 × 二级品类 统计款式数，用于整组选择
+
+        Args:
+            codes (Optional[Iterable[str]]): 只统计这些款式，默认统计全部
+            selected (Optional[Iterable[str]]): 已选择的款式，提供时增加"已选"列
+
+        Returns:
+            pd.DataFrame: 列为 波段、二级品类、款式数（以及已选），只包含款式数大于0的组
+        """
+        table = self.table if codes is None else self._rows(codes)
+        keys = [BomGenerator.WAVE_COL, '二级品类']
+        result = table.groupby(keys, observed=True, sort=False).size().rename('款式数').reset_index()
+        if selected is not None:
+            is_selected = table[BomGenerator.STYLE_CODE_COL].isin(list(selected))
+            picked = is_selected.groupby([table[key] for key in keys], observed=True, sort=False).sum()
+            result['已选'] = picked.reindex(pd.MultiIndex.from_frame(result[keys])).to_numpy()
+        return result
+
+    def page(self, codes: List[str], page: int, page_size: int = 100) -> pd.DataFrame:
+        """取出一页款式的浏览信息
+
+        Args:
+            codes (List[str]): 筛选后的款式编码
+            page (int): 页码，从0开始；超出范围时取最后一页
+            page_size (int): 每页行数
+
+        Returns:
+            pd.DataFrame: 该页各款式的一行，列见 COLUMNS
+        """
+        last_page = max((len(codes) - 1) // page_size, 0)
+        start = min(max(page, 0), last_page) * page_size
+        return self._rows(codes[start:start + page_size])
+
+    def page_count(self, codes: List[str], page_size: int = 100) -> int:
+        """筛选结果的总页数（至少为1）"""
+        return max((len(codes) + page_size - 1) // page_size, 1)
+
+    def _rows(self, codes: Iterable[str]) -> pd.DataFrame:
+        """按给定顺序取出款式的行"""
+        return self._by_code.loc[list(codes)].reset_index(drop=True)
@@ -0,0 +1,328 @@
+# 监视模式：源文件或配置/模板变化时自动重新生成受影响的BOM
+
+from typing import Dict, Any, List, Set, Tuple, Optional, Callable, Iterable
+import copy
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import threading
+import time
+
+import pandas as pd
+
+from .bom_generator import BomGenerator, resource_path
+from .catalog_diff import diff_catalogs
+
+
+# inotify 事件掩码（见 <sys/inotify.h>）
+_IN_MODIFY = 0x00000002
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_FROM = 0x00000040
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_DELETE = 0x00000200
+_IN_WATCH_MASK = _IN_MODIFY | _IN_CLOSE_WRITE | _IN_MOVED_FROM | _IN_MOVED_TO | _IN_CREATE | _IN_DELETE
+_IN_EVENT_HEADER = struct.Struct('iIII')
+
+
+class _InotifyBackend:
+    """基于Linux inotify的目录监视（通过ctypes调用libc，无需第三方库）
+
+    监视的是文件所在目录而不是文件本身：Excel等程序保存时通常先写临时文件
+    再重命名，直接监视文件会在第一次保存后失效。
+    """
+
+    def __init__(self, directories: Iterable[str]) -> None:
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        self._fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 失败")
+        self._directories: Dict[int, str] = {}
+        for directory in directories:
+            wd = libc.inotify_add_watch(self._fd, os.fsencode(directory), _IN_WATCH_MASK)
+            if wd < 0:
+                os.close(self._fd)
+                raise OSError(ctypes.get_errno(), f"无法监视目录 {directory}")
+            self._directories[wd] = directory
+
+    def read(self, timeout: float) -> Set[str]:
+        """等待最多 timeout 秒，返回期间发生变化的文件路径"""
+        readable, _, _ = select.select([self._fd], [], [], timeout)
+        if not readable:
+            return set()
+
+        changed = set()
+        buffer = os.read(self._fd, 64 * 1024)
+        offset = 0
+        while offset < len(buffer):
+            wd, _mask, _cookie, name_length = _IN_EVENT_HEADER.unpack_from(buffer, offset)
+            offset += _IN_EVENT_HEADER.size
+            name = buffer[offset:offset + name_length].rstrip(b'\0')
+            offset += name_length
+            if wd in self._directories and name:
+                changed.add(os.path.join(self._directories[wd], os.fsdecode(name)))
+        return changed
+
+    def close(self) -> None:
+        os.close(self._fd)
+
+
+class BomWatcher:
+    """监视源文件、颜色代码、品类映射和模板目录，自动重新生成受影响的款式
+
+    - 源文件变化：重新读取明细表，与旧版本对比，只重新生成新增和修改的款式
+    - color_codes.json 变化：只重新生成使用了代码有变化的颜色的款式
+    - category_mapping.json 变化：只重新生成映射有变化的品类下的款式
+    - 模板变化：只重新生成使用该模板（一级品类）的款式
+
+    一次保存往往触发多次文件事件，所有变化会在静默 debounce_seconds 秒后
+    合并处理。Linux 下优先使用 inotify，不可用时（其他系统、网络共享盘等）
+    退化为按 poll_interval 轮询文件的修改时间和大小。
+
+    Example:
+        >>> watcher = BomWatcher(BomGenerator('明细表.xlsx'), '明细表.xlsx', './output')
+        >>> watcher.run()  # 阻塞运行，直到 stop() 被调用
+    """
+
+    SOURCE = 'source'
+    COLOR_CODES = 'color_codes'
+    CATEGORY_MAPPING = 'category_mapping'
+    TEMPLATES = 'templates'
+
+    # 单轮变化处理失败时的最大尝试次数
+    MAX_ATTEMPTS = 3
+
+    def __init__(self, generator: BomGenerator, source_path: str, output_dir: str,
+                 debounce_seconds: float = 2.0, poll_interval: float = 1.0,
+                 use_inotify: bool = True,
+                 on_report: Optional[Callable[[Dict[str, Any]], None]] = None) -> None:
+        """初始化监视器
+
+        Args:
+            generator (BomGenerator): 已加载源文件的生成器，变化时会被原地刷新
+            source_path (str): 源明细表文件路径
+            output_dir (str): BOM输出目录
+            debounce_seconds (float): 最后一次变化后等待多久再处理
+            poll_interval (float): 轮询模式下的检查间隔（秒）
+            use_inotify (bool): 是否尝试使用inotify
+            on_report (Optional[Callable[[Dict[str, Any]], None]]): 每轮处理完成后的回调，
+                参数为 apply_changes 的返回值
+        """
+        self.generator = generator
+        self.source_path = os.path.abspath(source_path)
+        self.output_dir = output_dir
+        self.debounce_seconds = debounce_seconds
+        self.poll_interval = poll_interval
+        self.on_report = on_report
+        self.templates_dir = os.path.abspath(resource_path('templates'))
+        self._files = {
+            self.source_path: self.SOURCE,
+            os.path.abspath(generator.color_codes_path): self.COLOR_CODES,
+            os.path.abspath(generator.category_mapping_path): self.CATEGORY_MAPPING,
+        }
+        self._stop_event = threading.Event()
+
+        self._backend = None
+        if use_inotify and sys.platform.startswith('linux'):
+            directories = {os.path.dirname(path) for path in self._files} | {self.templates_dir}
+            try:
+                self._backend = _InotifyBackend(directories)
+            except (OSError, AttributeError):
+                self._backend = None
+        self._snapshot = self._take_snapshot()
+
+    @property
+    def uses_inotify(self) -> bool:
+        """当前是否使用inotify（否则为轮询）"""
+        return self._backend is not None
+
+    def _classify(self, path: str) -> Optional[str]:
+        """判断变化的文件属于哪一类被监视对象"""
+        path = os.path.abspath(path)
+        if path in self._files:
+            return self._files[path]
+        name = os.path.basename(path)
+        if (os.path.dirname(path) == self.templates_dir and name.endswith('模板.xlsx')
+                and not name.startswith('~$')):
+            return self.TEMPLATES
+        return None
+
+    def _take_snapshot(self) -> Dict[str, Tuple[int, int]]:
+        """记录所有被监视文件的 (修改时间, 大小)"""
+        paths = list(self._files)
+        if os.path.isdir(self.templates_dir):
+            paths += [os.path.join(self.templates_dir, name) for name in os.listdir(self.templates_dir)]
+        snapshot = {}
+        for path in paths:
+            if self._classify(path) is None:
+                continue
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            snapshot[path] = (stat.st_mtime_ns, stat.st_size)
+        return snapshot
+
+    def _detect(self, timeout: float) -> Dict[str, Set[str]]:
+        """等待一段时间并返回变化，格式为 {类别: {文件路径}}"""
+        if self._backend is not None:
+            paths = self._backend.read(timeout)
+        else:
+            self._stop_event.wait(timeout)
+            current = self._take_snapshot()
+            paths = {path for path in set(current) | set(self._snapshot)
+                     if current.get(path) != self._snapshot.get(path)}
+            self._snapshot = current
+
+        changes: Dict[str, Set[str]] = {}
+        for path in paths:
+            kind = self._classify(path)
+            if kind is not None:
+                changes.setdefault(kind, set()).add(os.path.abspath(path))
+        return changes
+
+    def wait_for_changes(self) -> Dict[str, Set[str]]:
+        """阻塞直到出现变化，并在静默 debounce_seconds 秒后返回合并的变化
+
+        Returns:
+            Dict[str, Set[str]]: {类别: {文件路径}}；stop() 后返回空字典
+        """
+        changes: Dict[str, Set[str]] = {}
+        quiet_since = None
+        while not self._stop_event.is_set():
+            new_changes = self._detect(self.poll_interval if self._backend is None
+                                       else min(self.poll_interval, self.debounce_seconds))
+            if new_changes:
+                for kind, paths in new_changes.items():
+                    changes.setdefault(kind, set()).update(paths)
+                quiet_since = time.monotonic()
+            elif changes and time.monotonic() - quiet_since >= self.debounce_seconds:
+                return changes
+        return {}
+
+    def apply_changes(self, changes: Dict[str, Set[str]]) -> Dict[str, Any]:
+        """按变化类别增量刷新生成器，并只重新生成受影响的款式
+
+        Args:
+            changes (Dict[str, Set[str]]): {类别: {文件路径}}
+
+        Returns:
+            Dict[str, Any]: 本轮报告，格式如下：
+                {
+                    'changes': List[str],     # 发生变化的类别
+                    'affected': List[str],    # 重新生成的款式编码
+                    'removed': List[str],     # 源文件中已删除的款式（输出文件保留不动）
+                    'batch': Dict[str, Any]   # generate_bom_files 的报告，无受影响款式时为None
+                }
+
+        Raises:
+            ValueError, FileNotFoundError: 重新加载失败时（例如文件仍在保存中），
+                生成器保持旧状态，下一次变化时会重试
+        """
+        # 所有重新加载都在副本上进行，全部成功后才写回生成器；任何一步失败
+        # （如 color_codes.json 仍在保存中）时生成器保持旧状态，重试时仍与旧数据比较
+        current = self.generator
+        generator = copy.copy(current)
+        affected: Set[str] = set()
+        removed: List[str] = []
+
+        if self.SOURCE in changes:
+            generator.reload_source(self.source_path)
+            diff = diff_catalogs(current, generator)
+            affected.update(diff['changed'])
+            removed = diff['removed']
+
+        if self.COLOR_CODES in changes:
+            old_codes, old_style_colors = generator.color_codes, generator.style_colors
+            old_errors = generator.color_errors
+            generator.reload_color_codes()
+            changed_colors = _changed_keys(old_codes, generator.color_codes)
+            affected.update(_styles_using_colors(generator, changed_colors))
+            # 别名匹配结果变化的款式（如新增颜色后原本无法匹配的颜色变为可用）
+            affected.update(code for code, colors in generator.style_colors.items()
+                            if colors != old_style_colors.get(code)
+                            or generator.color_errors.get(code) != old_errors.get(code))
+
+        if self.CATEGORY_MAPPING in changes:
+            old_mapping = generator.category_mapping
+            generator.reload_category_mapping()
+            changed_categories = _changed_keys(old_mapping, generator.category_mapping)
+            affected.update(_styles_in_categories(generator, changed_categories))
+
+        vars(current).update(vars(generator))
+        generator = current
+
+        if self.TEMPLATES in changes:
+            primary_categories = {os.path.basename(path)[:-len('模板.xlsx')]
+                                  for path in changes[self.TEMPLATES]}
+            secondary_categories = {secondary for secondary, primary in generator.category_mapping.items()
+                                    if primary in primary_categories}
+            affected.update(_styles_in_categories(generator, secondary_categories))
+
+        # 按源文件中的顺序生成
+        ordered = [code for code in generator.get_all_style_codes() if code in affected]
+        batch = None
+        if ordered:
+            batch = generator.generate_bom_files(ordered, self.output_dir,
+                                                 skip_unchanged=generator.timestamp is not None)
+        return {
+            'changes': sorted(changes),
+            'affected': ordered,
+            'removed': removed,
+            'batch': batch,
+        }
+
+    def run(self) -> None:
+        """持续监视并处理变化，直到 stop() 被调用
+
+        单轮处理失败时（例如文件仍在保存中）会在 debounce_seconds 后重试，
+        重试 MAX_ATTEMPTS 次仍失败则通过 on_report 报告 {'error': 错误信息}，监视继续进行。
+        """
+        try:
+            while not self._stop_event.is_set():
+                changes = self.wait_for_changes()
+                if not changes:
+                    continue
+                for _ in range(self.MAX_ATTEMPTS):
+                    try:
+                        report = self.apply_changes(changes)
+                        break
+                    except Exception as e:
+                        # 文件可能仍在保存中，稍后重试
+                        report = {'changes': sorted(changes), 'error': str(e)}
+                        if self._stop_event.wait(self.debounce_seconds):
+                            break
+                if self.on_report is not None:
+                    self.on_report(report)
+        finally:
+            if self._backend is not None:
+                self._backend.close()
+                self._backend = None
+
+    def stop(self) -> None:
+        """请求停止监视（run 会在当前等待周期结束后返回）"""
+        self._stop_event.set()
+
+
+def _changed_keys(old: Dict[str, Any], new: Dict[str, Any]) -> Set[str]:
+    """返回新增、删除或取值变化的键"""
+    return {key for key in set(old) | set(new) if old.get(key) != new.get(key)}
+
+
+def _styles_using_colors(generator: BomGenerator, color_names: Set[str]) -> List[str]:
+    """找出规范化后的开发颜色中包含任一指定颜色的款式编码"""
+    if not color_names:
+        return []
+    return [code for code, colors in generator.style_colors.items() if not color_names.isdisjoint(colors)]
+
+
+def _styles_in_categories(generator: BomGenerator, categories: Set[str]) -> List[str]:
+    """找出品类属于指定集合的款式编码"""
+    if not categories:
+        return []
+    df = generator.df
+    mask = df[generator.CATEGORY_COL].isin(categories) & df[generator.STYLE_CODE_COL].notna()
+    return pd.unique(df.loc[mask, generator.STYLE_CODE_COL]).tolist()
@@ -0,0 +1,225 @@
+# 输出文件写入：原子写入与后台I/O线程
+
+from typing import List, Tuple, Dict, Any
+from datetime import datetime
+import hashlib
+import io
+import os
+import queue
+import re
+import secrets
+import tempfile
+import threading
+import time
+import zipfile
+
+from . import metrics
+
+
+def _create_temp_file(directory: str, prefix: str) -> Tuple[int, str]:
+    """在目录中独占地创建临时文件
+
+    与 tempfile.mkstemp（固定为0600）不同，这里以0666创建，由内核按当前
+    umask 计算权限，使原子写入的文件权限与直接写入时一致。
+    """
+    flags = os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, 'O_BINARY', 0)
+    for _ in range(tempfile.TMP_MAX):
+        temp_path = os.path.join(directory, f"{prefix}{secrets.token_hex(4)}.tmp")
+        try:
+            return os.open(temp_path, flags, 0o666), temp_path
+        except FileExistsError:
+            continue
+    raise FileExistsError(f"错误：无法在目录 '{directory}' 中创建临时文件。")
+
+
+def atomic_write_bytes(file_path: str, data: bytes) -> None:
+    """以"临时文件 + 重命名"的方式原子地写入文件
+
+    先在目标目录中创建临时文件并写入全部内容，刷新到磁盘后再用
+    os.replace 覆盖目标文件。读取方（同步工具、Excel等）永远不会
+    看到写了一半的文件。
+
+    Args:
+        file_path (str): 目标文件路径
+        data (bytes): 要写入的完整文件内容
+
+    Raises:
+        PermissionError: 当无法在目标目录创建或替换文件时
+        OSError: 其他磁盘写入错误
+    """
+    directory = os.path.dirname(file_path) or '.'
+    fd, temp_path = _create_temp_file(directory, f".{os.path.basename(file_path)}.")
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, file_path)
+    except BaseException:
+        # 任何失败都不能留下临时文件
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
+
+
+# docProps/core.xml 中由openpyxl在保存时写入的创建/修改时间
+_CORE_TIMESTAMP_PATTERN = re.compile(
+    rb'(<dcterms:(?:created|modified)[^>]*>)[^<]*(</dcterms:(?:created|modified)>)'
+)
+
+
+# zip格式能表示的最早时间
+_ZIP_EPOCH = (1980, 1, 1, 0, 0, 0)
+
+
+def make_reproducible_xlsx(xlsx_bytes: bytes, timestamp: datetime) -> bytes:
+    """将xlsx字节流中随保存时间变化的元数据固定为指定时间
+
+    openpyxl每次保存都会把当前时间写入zip条目的修改时间和
+    docProps/core.xml 的创建/修改时间，导致内容相同的工作簿字节不同。
+    该函数按原顺序重新打包zip，统一条目时间、属性和文档属性时间，
+    使相同输入得到逐字节相同的文件。
+
+    Args:
+        xlsx_bytes (bytes): openpyxl保存得到的xlsx文件内容
+        timestamp (datetime): 要固定的时间；zip条目时间不能早于1980年，更早的
+            时间（如 SOURCE_DATE_EPOCH=0）按1980-01-01处理，文档属性仍使用原时间
+
+    Returns:
+        bytes: 元数据确定的xlsx文件内容
+    """
+    date_time = max(timestamp.timetuple()[:6], _ZIP_EPOCH)
+    iso_time = timestamp.strftime('%Y-%m-%dT%H:%M:%SZ').encode('ascii')
+
+    output = io.BytesIO()
+    with zipfile.ZipFile(io.BytesIO(xlsx_bytes)) as source, \
+            zipfile.ZipFile(output, 'w', zipfile.ZIP_DEFLATED) as target:
+        for info in source.infolist():
+            data = source.read(info.filename)
+            if info.filename == 'docProps/core.xml':
+                data = _CORE_TIMESTAMP_PATTERN.sub(rb'\g<1>' + iso_time + rb'\g<2>', data)
+
+            entry = zipfile.ZipInfo(info.filename, date_time=date_time)
+            entry.compress_type = zipfile.ZIP_DEFLATED
+            entry.external_attr = info.external_attr
+            entry.create_system = 3  # 固定为Unix，避免不同平台打包结果不同
+            target.writestr(entry, data)
+    return output.getvalue()
+
+
+def file_content_matches(file_path: str, data: bytes) -> bool:
+    """判断磁盘上的文件内容是否与给定字节流完全一致
+
+    先比较文件大小，大小相同时再比较SHA-256摘要，避免无谓地读取整个文件。
+
+    Args:
+        file_path (str): 已有文件路径
+        data (bytes): 待写入的内容
+
+    Returns:
+        bool: 文件存在且内容一致时返回True
+    """
+    try:
+        if os.path.getsize(file_path) != len(data):
+            return False
+        with open(file_path, 'rb') as f:
+            existing_digest = hashlib.sha256(f.read()).digest()
+    except OSError:
+        return False
+    return existing_digest == hashlib.sha256(data).digest()
+
+
+class AsyncFileWriter:
+    """后台文件写入线程
+
+    渲染阶段把序列化好的字节流提交到有界队列，由独立的写入线程
+    负责落盘，使CPU渲染与磁盘/网络I/O重叠进行。队列已满时 submit
+    会阻塞，从而限制内存中待写入数据的总量。
+
+    开启 skip_unchanged 后，内容与磁盘上已有文件一致的条目不会被重写，
+    保持其修改时间不变，rsync和备份去重可以直接跳过。
+
+    Example:
+        >>> with AsyncFileWriter(max_pending=8) as writer:
+        ...     writer.submit('H5A123416', './output/H5A123416.xlsx', excel_bytes)
+        >>> writer.stats['write_seconds']
+    """
+
+    # 队列结束标记
+    _STOP = object()
+
+    def __init__(self, max_pending: int = 8, skip_unchanged: bool = False) -> None:
+        """初始化并启动写入线程
+
+        Args:
+            max_pending (int): 队列中最多等待写入的文件数
+            skip_unchanged (bool): 目标文件内容已一致时是否跳过写入
+        """
+        self._queue: queue.Queue = queue.Queue(maxsize=max(1, max_pending))
+        self.skip_unchanged = skip_unchanged
+        self.errors: List[Tuple[str, str]] = []
+        self.skipped: List[str] = []
+        self.stats: Dict[str, Any] = {
+            'files_written': 0,
+            'files_skipped': 0,
+            'bytes_written': 0,
+            'write_seconds': 0.0,
+        }
+        self._thread = threading.Thread(target=self._run, name='bom-writer', daemon=True)
+        self._thread.start()
+
+    def submit(self, key: str, file_path: str, data: bytes) -> None:
+        """提交一个待写入的文件
+
+        Args:
+            key (str): 用于错误报告的标识，通常是款式编码
+            file_path (str): 目标文件路径
+            data (bytes): 文件内容
+        """
+        self._queue.put((key, file_path, data))
+
+    def close(self) -> Dict[str, Any]:
+        """等待所有已提交的文件写完并停止线程
+
+        Returns:
+            Dict[str, Any]: 写入统计信息（文件数、字节数、写入耗时）
+        """
+        if self._thread.is_alive():
+            self._queue.put(self._STOP)
+            self._thread.join()
+        return self.stats
+
+    def __enter__(self) -> 'AsyncFileWriter':
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+    def _run(self) -> None:
+        """写入线程主循环"""
+        while True:
+            item = self._queue.get()
+            if item is self._STOP:
+                break
+            key, file_path, data = item
+            started = time.perf_counter()
+            try:
+                if self.skip_unchanged and file_content_matches(file_path, data):
+                    self.skipped.append(key)
+                    self.stats['files_skipped'] += 1
+                    continue
+                atomic_write_bytes(file_path, data)
+            except PermissionError:
+                self.errors.append((key, f"错误：无法保存文件到 {file_path}，请检查目录权限。"))
+            except Exception as e:
+                self.errors.append((key, f"错误：写入文件 {file_path} 失败：{str(e)}"))
+            else:
+                self.stats['files_written'] += 1
+                self.stats['bytes_written'] += len(data)
+                metrics.BYTES_WRITTEN.inc(len(data))
+            finally:
+                elapsed = time.perf_counter() - started
+                self.stats['write_seconds'] += elapsed
+                metrics.STAGE_SECONDS.observe(elapsed, stage='write')
@@ -0,0 +1,430 @@
+# 基于 xlsxwriter 的快速写出后端：模板格式只解析一次，之后直接写出xlsx
+
+from typing import Dict, Any, List, Optional, Tuple, Iterable
+from datetime import datetime
+import io
+import math
+import os
+import threading
+import time
+
+import openpyxl
+from openpyxl.styles.colors import COLOR_INDEX
+from openpyxl.utils import get_column_letter
+from openpyxl.utils.cell import coordinate_to_tuple
+
+from . import metrics
+from .writer import make_reproducible_xlsx
+
+
+# 可选的写出后端；默认 openpyxl，可通过环境变量或 BomGenerator.backend 切换
+BACKENDS = ('openpyxl', 'xlsxwriter')
+BACKEND_ENV = 'BOM_WRITE_BACKEND'
+
+# openpyxl 样式名称到 xlsxwriter 格式属性的映射
+_BORDER_STYLES = {
+    'thin': 1, 'medium': 2, 'dashed': 3, 'dotted': 4, 'thick': 5, 'double': 6, 'hair': 7,
+    'mediumDashed': 8, 'dashDot': 9, 'mediumDashDot': 10, 'dashDotDot': 11,
+    'mediumDashDotDot': 12, 'slantDashDot': 13,
+}
+_HORIZONTAL = {
+    'left': 'left', 'center': 'center', 'right': 'right', 'fill': 'fill', 'justify': 'justify',
+    'centerContinuous': 'center_across', 'distributed': 'distributed',
+}
+_VERTICAL = {'top': 'top', 'center': 'vcenter', 'bottom': 'bottom', 'justify': 'vjustify',
+             'distributed': 'vdistributed'}
+_PATTERNS = {
+    'solid': 1, 'mediumGray': 2, 'darkGray': 3, 'lightGray': 4, 'darkHorizontal': 5, 'darkVertical': 6,
+    'darkDown': 7, 'darkUp': 8, 'darkGrid': 9, 'darkTrellis': 10, 'lightHorizontal': 11,
+    'lightVertical': 12, 'lightDown': 13, 'lightUp': 14, 'lightGrid': 15, 'lightTrellis': 16,
+    'gray125': 17, 'gray0625': 18,
+}
+_UNDERLINES = {'single': 1, 'double': 2, 'singleAccounting': 33, 'doubleAccounting': 34}
+
+
+def _require_xlsxwriter():
+    try:
+        import xlsxwriter
+    except ImportError:
+        raise ValueError("错误：xlsxwriter 写出后端需要先安装 xlsxwriter（pip install xlsxwriter）")
+    return xlsxwriter
+
+
+def _color(color) -> Optional[str]:
+    """openpyxl 颜色转换为 '#RRGGBB'；主题色和系统色返回None（使用默认颜色）"""
+    if color is None:
+        return None
+    if color.type == 'rgb' and isinstance(color.rgb, str):
+        return '#' + color.rgb[-6:]
+    if color.type == 'indexed' and isinstance(color.indexed, int) and color.indexed < len(COLOR_INDEX):
+        return '#' + COLOR_INDEX[color.indexed][-6:]
+    return None
+
+
+def _format_properties(cell) -> Tuple[Tuple[str, Any], ...]:
+    """单元格样式对应的 xlsxwriter 格式属性（排序后的元组，可作字典键）"""
+    properties: Dict[str, Any] = {}
+    font = cell.font
+    properties.update(font_name=font.name, font_size=font.sz, bold=bool(font.b), italic=bool(font.i))
+    if font.u:
+        properties['underline'] = _UNDERLINES.get(font.u, 1)
+    if font.strike:
+        properties['font_strikeout'] = True
+    if font.vertAlign in ('superscript', 'subscript'):
+        properties['font_script'] = 1 if font.vertAlign == 'superscript' else 2
+    if font.charset is not None:
+        properties['font_charset'] = font.charset
+    if font.family is not None:
+        properties['font_family'] = int(font.family)
+    if font.scheme:
+        properties['font_scheme'] = font.scheme
+    if _color(font.color):
+        properties['font_color'] = _color(font.color)
+
+    if cell.number_format and cell.number_format != 'General':
+        properties['num_format'] = cell.number_format
+
+    alignment = cell.alignment
+    if alignment.horizontal in _HORIZONTAL:
+        properties['align'] = _HORIZONTAL[alignment.horizontal]
+    if alignment.vertical in _VERTICAL:
+        properties['valign'] = _VERTICAL[alignment.vertical]
+    if alignment.wrap_text:
+        properties['text_wrap'] = True
+    if alignment.shrink_to_fit:
+        properties['shrink'] = True
+    if alignment.indent:
+        properties['indent'] = int(alignment.indent)
+    if alignment.text_rotation:
+        properties['rotation'] = int(alignment.text_rotation)
+
+    for side in ('left', 'right', 'top', 'bottom'):
+        border = getattr(cell.border, side)
+        if border is not None and border.style in _BORDER_STYLES:
+            properties[side] = _BORDER_STYLES[border.style]
+            if _color(border.color):
+                properties[f'{side}_color'] = _color(border.color)
+
+    fill = cell.fill
+    if getattr(fill, 'fill_type', None) in _PATTERNS:
+        properties['pattern'] = _PATTERNS[fill.fill_type]
+        if _color(fill.fgColor):
+            properties['fg_color'] = _color(fill.fgColor)
+        if _color(fill.bgColor):
+            properties['bg_color'] = _color(fill.bgColor)
+
+    if not cell.protection.locked:
+        properties['locked'] = False
+    if cell.protection.hidden:
+        properties['hidden'] = True
+    return tuple(sorted(properties.items()))
+
+
+class TemplateSpec:
+    """从模板中一次性提取的格式与静态内容，供 xlsxwriter 反复写出
+
+    包括每个单元格的静态值和样式（字体、边框、填充、对齐、数字格式）、合并区域、
+    列宽、行高、默认字体和打印设置。所有款式共用同一份，渲染时不再解析模板。
+
+    Attributes:
+        path (str): 模板路径
+        formats (List[Tuple]): 去重后的格式属性，单元格按下标引用
+        cells (Dict[Tuple[int, int], Tuple[Any, Optional[int]]]): (行, 列)（从0开始）到 (静态值, 格式下标)
+        merged (List[Tuple[int, int, int, int]]): 合并区域 (首行, 首列, 末行, 末列)
+    """
+
+    def __init__(self, path: str) -> None:
+        """
+        Args:
+            path (str): 模板路径
+
+        Raises:
+            FileNotFoundError: 当模板文件不存在时
+        """
+        try:
+            workbook = openpyxl.load_workbook(path)
+        except FileNotFoundError:
+            raise FileNotFoundError(f"错误：BOM模板文件未找到，路径：{path}")
+        sheet = workbook.active
+        self.path = path
+        self.sheet_name = sheet.title
+
+        default_font = workbook._fonts[0]
+        self.default_format = {'font_name': default_font.name, 'font_size': default_font.sz}
+
+        self.formats: List[Tuple[Tuple[str, Any], ...]] = []
+        format_index: Dict[Tuple[Tuple[str, Any], ...], int] = {}
+        self.cells: Dict[Tuple[int, int], Tuple[Any, Optional[int]]] = {}
+        for row in sheet.iter_rows():
+            for cell in row:
+                value = None if cell.__class__.__name__ == 'MergedCell' else cell.value
+                if value is None and not cell.has_style:
+                    continue
+                index = None
+                if cell.has_style:
+                    properties = _format_properties(cell)
+                    index = format_index.setdefault(properties, len(format_index))
+                    if index == len(self.formats):
+                        self.formats.append(properties)
+                self.cells[(cell.row - 1, cell.column - 1)] = (value, index)
+
+        # 合并区域，以及写入合并区域内任一单元格时实际落到的左上角单元格
+        self.merged: List[Tuple[int, int, int, int]] = []
+        self.anchors: Dict[Tuple[int, int], Tuple[int, int]] = {}
+        for merged_range in sheet.merged_cells.ranges:
+            first_row, first_col = merged_range.min_row - 1, merged_range.min_col - 1
+            last_row, last_col = merged_range.max_row - 1, merged_range.max_col - 1
+            if (first_row, first_col) != (last_row, last_col):
+                self.merged.append((first_row, first_col, last_row, last_col))
+            for row in range(first_row, last_row + 1):
+                for column in range(first_col, last_col + 1):
+                    self.anchors[(row, column)] = (first_row, first_col)
+
+        self.columns = [(dimension.min - 1, dimension.max - 1, dimension.width, bool(dimension.hidden))
+                        for dimension in sheet.column_dimensions.values()
+                        if dimension.min is not None and (dimension.customWidth or dimension.hidden)]
+        self.rows = {key - 1: (dimension.height, bool(dimension.hidden))
+                     for key, dimension in sheet.row_dimensions.items()
+                     if dimension.height is not None or dimension.hidden}
+        self.default_row_height = sheet.sheet_format.defaultRowHeight
+
+        page_setup, margins = sheet.page_setup, sheet.page_margins
+        self.margins = (margins.left, margins.right, margins.top, margins.bottom)
+        self.header_footer_margins = (margins.header, margins.footer)
+        self.orientation = page_setup.orientation
+        self.paper_size = int(page_setup.paperSize) if page_setup.paperSize else None
+        self.print_scale = int(page_setup.scale) if page_setup.scale else None
+        fit_to_page = sheet.sheet_properties.pageSetUpPr is not None and sheet.sheet_properties.pageSetUpPr.fitToPage
+        self.fit_to_pages = (page_setup.fitToWidth or 0, page_setup.fitToHeight or 0) if fit_to_page else None
+        self.center_horizontally = bool(sheet.print_options.horizontalCentered)
+        self.center_vertically = bool(sheet.print_options.verticalCentered)
+
+    def anchor(self, cell_address: str) -> Tuple[int, int]:
+        """单元格地址对应的写入位置：合并区域内的地址落到其左上角，与 _write_to_cell 一致"""
+        row, column = coordinate_to_tuple(cell_address)
+        position = (row - 1, column - 1)
+        return self.anchors.get(position, position)
+
+    def render(self, values: Dict[str, Any], timestamp=None) -> bytes:
+        """以模板格式写出一个工作簿
+
+        Args:
+            values (Dict[str, Any]): 单元格地址到值，覆盖模板中的静态内容
+            timestamp (Optional[datetime]): 可复现模式的固定时间，用作文档创建时间
+
+        Returns:
+            bytes: xlsx文件内容
+        """
+        xlsxwriter = _require_xlsxwriter()
+        cells = dict(self.cells)
+        for cell_address, value in values.items():
+            position = self.anchor(cell_address)
+            cells[position] = (value, cells.get(position, (None, None))[1])
+
+        buffer = io.BytesIO()
+        workbook = xlsxwriter.Workbook(buffer, {'in_memory': True,
+                                                'default_format_properties': dict(self.default_format)})
+        if timestamp is not None:
+            workbook.set_properties({'created': timestamp})
+        worksheet = workbook.add_worksheet(self.sheet_name)
+        formats = [workbook.add_format(dict(properties)) for properties in self.formats]
+        blank = workbook.add_format()
+
+        if self.default_row_height:
+            worksheet.set_default_row(self.default_row_height)
+        for first, last, width, hidden in self.columns:
+            worksheet.set_column(first, min(last, 16383), _column_width(width), None, {'hidden': hidden})
+        for row, (height, hidden) in self.rows.items():
+            worksheet.set_row(row, height, None, {'hidden': hidden})
+
+        # 先合并区域，再逐个单元格写入值和各自的样式（合并区域内的边框可能各不相同）
+        for first_row, first_col, last_row, last_col in self.merged:
+            worksheet.merge_range(first_row, first_col, last_row, last_col, None, blank)
+        for (row, column), (value, index) in sorted(cells.items()):
+            cell_format = formats[index] if index is not None else blank
+            if value is None or (isinstance(value, float) and math.isnan(value)):
+                worksheet.write_blank(row, column, None, cell_format)
+            elif isinstance(value, bool):
+                worksheet.write_boolean(row, column, value, cell_format)
+            elif isinstance(value, (int, float)):
+                worksheet.write_number(row, column, value, cell_format)
+            else:
+                worksheet.write_string(row, column, str(value), cell_format)
+
+        left, right, top, bottom = self.margins
+        worksheet.set_margins(left=left, right=right, top=top, bottom=bottom)
+        header_margin, footer_margin = self.header_footer_margins
+        worksheet.set_header('', {'margin': header_margin})
+        worksheet.set_footer('', {'margin': footer_margin})
+        if self.orientation == 'landscape':
+            worksheet.set_landscape()
+        if self.paper_size:
+            worksheet.set_paper(self.paper_size)
+        if self.fit_to_pages is not None:
+            worksheet.fit_to_pages(*self.fit_to_pages)
+        elif self.print_scale:
+            worksheet.set_print_scale(self.print_scale)
+        if self.center_horizontally:
+            worksheet.center_horizontally()
+        if self.center_vertically:
+            worksheet.center_vertically()
+
+        workbook.close()
+        data = buffer.getvalue()
+        if timestamp is not None:
+            data = make_reproducible_xlsx(data, timestamp)
+        return data
+
+
+def _column_width(width: float) -> float:
+    """openpyxl 读到的是文件中的列宽（含单元格内边距），xlsxwriter 需要不含内边距的宽度"""
+    return max(width - 5 / 7, 0) if width >= 1 else width
+
+
+# 按模板路径缓存的 TemplateSpec；模板文件修改后自动重新提取
+_specs: Dict[str, Tuple[float, TemplateSpec]] = {}
+_specs_lock = threading.Lock()
+
+
+def get_template_spec(path: str) -> TemplateSpec:
+    """取得模板的 TemplateSpec，每个模板（每次修改）只解析一次
+
+    Raises:
+        FileNotFoundError: 当模板文件不存在时
+    """
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        raise FileNotFoundError(f"错误：BOM模板文件未找到，路径：{path}")
+    with _specs_lock:
+        cached = _specs.get(path)
+        if cached is not None and cached[0] == mtime:
+            metrics.TEMPLATE_CACHE.inc(result='hit')
+            return cached[1]
+    metrics.TEMPLATE_CACHE.inc(result='miss')
+    started = time.perf_counter()
+    spec = TemplateSpec(path)
+    elapsed = time.perf_counter() - started
+    metrics.STAGE_SECONDS.observe(elapsed, stage='template_load')
+    metrics.TEMPLATE_LOAD_SECONDS.observe(elapsed, template=os.path.splitext(os.path.basename(path))[0])
+    with _specs_lock:
+        _specs[path] = (mtime, spec)
+    return spec
+
+
+def render_with_xlsxwriter(generator, style_code: str) -> bytes:
+    """用 xlsxwriter 后端渲染单个款式，单元格内容与 openpyxl 后端完全相同
+
+    Args:
+        generator (BomGenerator): 已加载明细表的生成器
+        style_code (str): 款式编码
+
+    Returns:
+        bytes: xlsx文件内容
+
+    Raises:
+        ValueError: 当款式无法生成或未安装 xlsxwriter 时
+        FileNotFoundError: 当BOM模板文件不存在时
+    """
+    _require_xlsxwriter()
+    cell_values = generator.get_cell_values(style_code)
+    spec = get_template_spec(generator._template_path(style_code, cell_values))
+
+    started = time.perf_counter()
+    current_time = (generator.timestamp or datetime.now()).strftime("%Y/%m/%d %H:%M")
+    values = {generator.CELL_CONFIG['timestamp']: current_time}
+    values.update(cell_values)
+    data = spec.render(values, timestamp=generator.timestamp)
+    metrics.STAGE_SECONDS.observe(time.perf_counter() - started, stage='serialize')
+    return data
+
+
+def _style_signature(cell) -> Tuple:
+    """用于比较两个后端输出的样式摘要（颜色统一换算为RGB）"""
+    font, alignment, fill = cell.font, cell.alignment, cell.fill
+    borders = tuple((getattr(cell.border, side).style, _color(getattr(cell.border, side).color))
+                    for side in ('left', 'right', 'top', 'bottom'))
+    fill_signature = (fill.fill_type, _color(fill.fgColor)) if getattr(fill, 'fill_type', None) else None
+    # 水平 general、垂直 bottom 是默认对齐，写明与省略显示相同
+    horizontal = None if alignment.horizontal == 'general' else alignment.horizontal
+    vertical = None if alignment.vertical == 'bottom' else alignment.vertical
+    return (font.name, font.sz, bool(font.b), bool(font.i), font.u, _color(font.color),
+            cell.number_format, horizontal, vertical, bool(alignment.wrap_text),
+            borders, fill_signature)
+
+
+def compare_backends(generator, style_codes: Iterable[str]) -> Dict[str, List[str]]:
+    """分别用两个后端渲染款式并逐项比较，用于验证 xlsxwriter 后端
+
+    比较单元格值、样式（字体、数字格式、对齐、边框、填充）、合并区域、列宽
+    （允许1像素的取整误差）和行高。
+
+    Args:
+        generator (BomGenerator): 已加载明细表的生成器
+        style_codes (Iterable[str]): 款式编码
+
+    Returns:
+        Dict[str, List[str]]: 款式编码到差异描述列表，完全一致时列表为空；
+            无法生成的款式不在结果中
+
+    Raises:
+        ValueError: 当未安装 xlsxwriter 时
+    """
+    _require_xlsxwriter()
+    original_backend = generator.backend
+    differences: Dict[str, List[str]] = {}
+    try:
+        for style_code in style_codes:
+            try:
+                generator.backend = 'openpyxl'
+                expected = openpyxl.load_workbook(io.BytesIO(generator.generate_bom_file_to_buffer(style_code))).active
+            except (ValueError, FileNotFoundError):
+                continue
+            generator.backend = 'xlsxwriter'
+            actual = openpyxl.load_workbook(io.BytesIO(generator.generate_bom_file_to_buffer(style_code))).active
+            differences[style_code] = _compare_sheets(expected, actual)
+    finally:
+        generator.backend = original_backend
+    return differences
+
+
+def _column_width_at(sheet, column: int) -> Optional[float]:
+    """列宽（列宽设置可能覆盖一个列范围）"""
+    for dimension in sheet.column_dimensions.values():
+        if dimension.min is not None and dimension.min <= column <= dimension.max:
+            return dimension.width
+    return None
+
+
+def _compare_sheets(expected, actual) -> List[str]:
+    problems = []
+    max_row = max(expected.max_row, actual.max_row)
+    max_column = max(expected.max_column, actual.max_column)
+    for row in range(1, max_row + 1):
+        for column in range(1, max_column + 1):
+            address = f'{get_column_letter(column)}{row}'
+            expected_cell, actual_cell = expected[address], actual[address]
+            if (expected_cell.value or None) != (actual_cell.value or None):
+                problems.append(f'{address} 值不同：{expected_cell.value!r} / {actual_cell.value!r}')
+            expected_style, actual_style = _style_signature(expected_cell), _style_signature(actual_cell)
+            if expected_cell.__class__.__name__ == 'MergedCell':
+                # 合并区域内的非左上角单元格只有边框会显示；openpyxl 读取时也只还原边框
+                expected_style, actual_style = expected_style[-2], actual_style[-2]
+            if expected_style != actual_style:
+                problems.append(f'{address} 样式不同')
+
+    expected_merges = {str(r) for r in expected.merged_cells.ranges if r.min_row != r.max_row or r.min_col != r.max_col}
+    actual_merges = {str(r) for r in actual.merged_cells.ranges}
+    for merged_range in sorted(expected_merges ^ actual_merges):
+        problems.append(f'合并区域 {merged_range} 仅存在于一方')
+
+    for column in range(1, max_column + 1):
+        expected_width, actual_width = _column_width_at(expected, column), _column_width_at(actual, column)
+        if abs((expected_width or 0) - (actual_width or 0)) > 1 / 7 + 1e-6:
+            problems.append(f'{get_column_letter(column)} 列宽不同：{expected_width} / {actual_width}')
+    for row in range(1, max_row + 1):
+        expected_height = expected.row_dimensions[row].height or expected.sheet_format.defaultRowHeight
+        actual_height = actual.row_dimensions[row].height or actual.sheet_format.defaultRowHeight
+        if abs(expected_height - actual_height) > 1e-6:
+            problems.append(f'第{row}行 行高不同：{expected_height} / {actual_height}')
+    return problems
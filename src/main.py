@@ -4,9 +4,19 @@ import tkinter as tk
 from tkinter import filedialog, messagebox
 import os
 import sys
+import threading
 
 # 简单的导入 - 复杂的路径处理交给.spec文件
+from core import metrics
 from core.bom_generator import BomGenerator
+from core.catalog_summary import export_summary
+from core.catalog_index import file_sha256
+from core.job_store import JobStore, run_batch
+from core.watcher import BomWatcher
+
+
+# 输出目录下的任务库文件名，记录每次批量生成中各款式的状态
+JOB_DB_NAME = '.bom_jobs.sqlite3'
 
 
 class Application(tk.Tk):
@@ -25,9 +35,10 @@ class Application(tk.Tk):
         
         # 设置窗口属性
         self.title("BOM表自动生成工具")
-        self.geometry("500x300")
+        self.geometry("500x390")
         
         # 初始化状态变量
+        self.watcher = None
         self.source_file_path = tk.StringVar()
         self.output_dir_path = tk.StringVar()
         self.status_text = tk.StringVar(value="准备就绪")
@@ -83,6 +94,13 @@ class Application(tk.Tk):
                                        height=2, command=self._start_generation)
         self.generate_button.pack(fill=tk.X)
         
+        self.watch_button = tk.Button(button_frame, text="开始监视（源文件变化时自动重新生成）",
+                                    command=self._toggle_watch)
+        self.watch_button.pack(fill=tk.X, pady=(8, 0))
+        
+        tk.Button(button_frame, text="查看明细表概况（款式/颜色/SKU数）",
+                 command=self._show_summary).pack(fill=tk.X, pady=(8, 0))
+        
         # 状态栏
         status_frame = tk.Frame(main_frame, relief=tk.SUNKEN, bd=1)
         status_frame.pack(fill=tk.X, side=tk.BOTTOM)
@@ -156,32 +174,61 @@ class Application(tk.Tk):
                 messagebox.showwarning("警告", "源文件中没有找到任何款式编码！")
                 return
             
-            # 循环生成每个款式的BOM文件
-            success_count = 0
-            failed_items = []
+            # 生成前一次性列出无法匹配的开发颜色，避免批量生成到一半才逐个失败
+            color_errors = generator.get_color_errors()
+            if color_errors:
+                error_lines = [f"{code}: {'、'.join(colors)}" for code, colors in color_errors.items()]
+                error_msg = "\n".join(error_lines[:10])
+                if len(error_lines) > 10:
+                    error_msg += f"\n... 和其他 {len(error_lines) - 10} 个款式"
+                if not messagebox.askyesno("颜色未定义",
+                    f"以下 {len(color_errors)} 个款式的开发颜色无法在颜色代码表中找到：\n\n"
+                    f"{error_msg}\n\n"
+                    f"是否跳过这些款式，继续生成其余款式？"):
+                    return
+                style_codes = [code for code in style_codes if code not in color_errors]
             
-            for i, style_code in enumerate(style_codes):
-                try:
+            # 批量生成：进度记录在输出目录下的任务库中，程序中断后再次生成会从停下的位置继续
+            store = JobStore(os.path.join(output_path, JOB_DB_NAME))
+            try:
+                source_sha256 = file_sha256(source_path)
+                resume = False
+                unfinished = store.find_unfinished_batch(output_path, source_sha256)
+                if unfinished is not None:
+                    progress = store.progress(unfinished)
+                    resume = messagebox.askyesno("继续上次的生成",
+                        f"该输出目录中有一次未完成的生成（已完成 {progress['done']}/{progress['total']}，"
+                        f"失败 {progress['failed']}）。\n\n"
+                        f"是否从停下的位置继续？选择\"否\"将重新生成全部款式。")
+                batch = store.open_batch(style_codes, output_path, source_sha256,
+                                         source_path=source_path, resume=resume)
+                if batch['resumed']:
+                    # 上次失败的款式也一并重试，已完成的款式不再重复生成
+                    store.retry_failed(batch['batch_id'])
+                
+                def on_progress(i, total, style_code):
                     # 更新进度状态
-                    self.status_text.set(f"正在处理: {style_code} ({i+1}/{len(style_codes)})")
+                    self.status_text.set(f"正在处理: {style_code} ({i+1}/{total})")
                     self.update()  # 强制更新界面
-                    
-                    # 生成BOM文件
-                    generator.generate_bom_file(style_code, output_path)
-                    success_count += 1
-                    
-                except Exception as e:
-                    # 记录失败的款式编码和错误信息
-                    failed_items.append(f"{style_code}: {str(e)}")
-                    continue
+                
+                result = run_batch(generator, store, batch['batch_id'], progress_callback=on_progress)
+                progress = result['progress']
+                failed_items = [f"{code}: {error}" for code, error in store.failures(batch['batch_id'])]
+            finally:
+                store.close()
+            success_count = progress['done']
+            total_count = progress['total']
+            timing_msg = (f"渲染耗时: {result['render_seconds']:.1f} 秒，"
+                          f"写盘耗时: {result['write_seconds']:.1f} 秒")
             
             # 构建结果消息
-            if success_count == len(style_codes):
+            if success_count == total_count:
                 # 全部成功
                 messagebox.showinfo("成功", 
                     f"处理完成！\n\n"
                     f"成功生成 {success_count} 个BOM文件。\n"
-                    f"输出目录: {output_path}")
+                    f"输出目录: {output_path}\n"
+                    f"{timing_msg}")
             elif success_count > 0:
                 # 部分成功
                 failed_msg = "\n".join(failed_items[:5])  # 只显示前5个错误
@@ -191,7 +238,8 @@ class Application(tk.Tk):
                 messagebox.showwarning("部分成功", 
                     f"处理完成（部分成功）！\n\n"
                     f"成功: {success_count} 个\n"
-                    f"失败: {len(failed_items)} 个\n\n"
+                    f"失败: {len(failed_items)} 个\n"
+                    f"{timing_msg}\n\n"
                     f"失败详情:\n{failed_msg}")
             else:
                 # 全部失败
@@ -201,7 +249,7 @@ class Application(tk.Tk):
                 
                 messagebox.showerror("失败", 
                     f"处理失败！\n\n"
-                    f"所有 {len(style_codes)} 个款式编码都处理失败。\n\n"
+                    f"所有 {total_count} 个款式编码都处理失败。\n\n"
                     f"错误详情:\n{failed_msg}")
                     
         except Exception as e:
@@ -213,7 +261,90 @@ class Application(tk.Tk):
             self.status_text.set("准备就绪")
             self.generate_button.config(state="normal")
 
+    
+    def _show_summary(self):
+        """按波段、品类统计源文件的款式数、颜色数和SKU数，可导出为xlsx/CSV"""
+        source_path = self.source_file_path.get().strip()
+        if not source_path:
+            messagebox.showerror("错误", "请先选择源文件！")
+            return
+        
+        try:
+            summary = BomGenerator(source_path).summarize()
+        except Exception as e:
+            messagebox.showerror("发生错误", f"处理失败：\n\n{str(e)}")
+            return
+        
+        totals = summary['totals']
+        lines = [f"共 {totals['款式数']} 个款式，{totals['颜色数']} 个颜色，{totals['SKU数']} 个SKU"
+                 f"（无法生成 {totals['无法生成']} 个，超过3色 {totals['多色款式']} 个）", "", "按波段："]
+        lines += [f"  {row['波段']}: {row['款式数']} 款 / {row['颜色数']} 色 / {row['SKU数']} SKU"
+                  for _, row in summary['by_wave'].iterrows()]
+        lines += ["", "按品类："]
+        category_lines = [f"  {row['二级品类']}: {row['款式数']} 款 / {row['颜色数']} 色 / {row['SKU数']} SKU"
+                          for _, row in summary['by_category'].iterrows()]
+        lines += category_lines[:15]
+        if len(category_lines) > 15:
+            lines.append(f"  ... 和其他 {len(category_lines) - 15} 个品类")
+        
+        if not messagebox.askyesno("明细表概况", "\n".join(lines) + "\n\n是否导出完整概况？"):
+            return
+        file_path = filedialog.asksaveasfilename(
+            title="导出明细表概况",
+            filetypes=[("Excel files", "*.xlsx"), ("CSV files", "*.csv")],
+            defaultextension=".xlsx",
+            initialfile="明细表概况.xlsx"
+        )
+        if not file_path:
+            return
+        try:
+            export_summary(summary, file_path)
+        except Exception as e:
+            messagebox.showerror("发生错误", f"导出失败：\n\n{str(e)}")
+            return
+        self.status_text.set(f"已导出明细表概况: {os.path.basename(file_path)}")
+    
+    def _toggle_watch(self):
+        """开始或停止监视模式的回调方法"""
+        if self.watcher is not None:
+            self.watcher.stop()
+            self.watcher = None
+            self.watch_button.config(text="开始监视（源文件变化时自动重新生成）")
+            self.generate_button.config(state="normal")
+            self.status_text.set("已停止监视")
+            return
+        
+        source_path = self.source_file_path.get().strip()
+        output_path = self.output_dir_path.get().strip()
+        if not source_path or not output_path:
+            messagebox.showerror("错误", "请先选择源文件和输出文件夹！")
+            return
+        
+        try:
+            generator = BomGenerator(source_path)
+        except Exception as e:
+            messagebox.showerror("发生错误", f"处理失败：\n\n{str(e)}")
+            return
+        
+        # 监视线程中不能直接操作Tk控件，通过 after 切回主线程更新状态栏
+        def on_report(report):
+            if 'error' in report:
+                message = f"自动重新生成失败: {report['error']}"
+            else:
+                batch = report['batch']
+                success = len(batch['success']) if batch else 0
+                message = f"检测到变化，已重新生成 {success}/{len(report['affected'])} 个款式"
+            self.after(0, self.status_text.set, message)
+        
+        self.watcher = BomWatcher(generator, source_path, output_path, on_report=on_report)
+        threading.Thread(target=self.watcher.run, name='bom-watcher', daemon=True).start()
+        self.watch_button.config(text="停止监视")
+        self.generate_button.config(state="disabled")
+        self.status_text.set(f"正在监视: {os.path.basename(source_path)}")
+
 
 if __name__ == "__main__":
+    # 设置了 BOM_METRICS_TEXTFILE / BOM_METRICS_PORT 时导出批次指标
+    metrics.configure()
     app = Application()
     app.mainloop()
@@ -0,0 +1,43 @@
+# 测试公共夹具
+
+import openpyxl
+import pytest
+
+
+# 合成明细表的款式数据：(款式编码, 波段, 品类, 开发颜色)
+SAMPLE_STYLES = [
+    ('H5A123416', '秋四波', '长袖T恤', '黑色/红色'),
+    ('H5A413492', '秋四波', '外套', '灰色/黑色/杏色'),
+    ('H5A223415', '秋三波', '连衣裙', '白色'),
+    ('H5A153479', '秋三波', '马面裙', '黑色/蓝色'),
+]
+
+
+def write_source_file(path, styles=SAMPLE_STYLES) -> str:
+    """按真实《新品研发明细表》的表头结构写出一个最小的源文件
+
+    第1行为标题，第2行为分组表头，第3行为真正的列名，之后是数据行。
+
+    Args:
+        path: 输出文件路径
+        styles: (款式编码, 波段, 品类, 开发颜色) 元组列表
+
+    Returns:
+        str: 写出的文件路径
+    """
+    workbook = openpyxl.Workbook()
+    sheet = workbook.active
+    sheet.title = '明细表'
+    sheet.append(['新品研发明细表'])
+    sheet.append(['序号', '基础信息', '基础信息', '基础信息', '基础信息'])
+    sheet.append(['序号', '款式编码', '波段', '品类', '开发颜色'])
+    for i, (style_code, wave, category, colors) in enumerate(styles, start=1):
+        sheet.append([i, style_code, wave, category, colors])
+    workbook.save(path)
+    return str(path)
+
+
+@pytest.fixture
+def source_file(tmp_path):
+    """包含 SAMPLE_STYLES 的合成源文件路径"""
+    return write_source_file(tmp_path / 'source.xlsx')
@@ -0,0 +1,45 @@
+# BOM输出目录审计的测试文件
+
+import os
+import openpyxl
+from src.cli import main
+from src.core.audit import audit_output_dir
+from src.core.bom_generator import BomGenerator
+
+
+def test_audit_reports_mismatched_missing_and_orphan_files(source_file, tmp_path):
+    """测试篡改SKU、删除文件和多余文件都能被审计发现"""
+    generator = BomGenerator(source_file)
+    output_dir = tmp_path / 'output'
+    generator.generate_bom_files(generator.get_all_style_codes(), str(output_dir))
+
+    tampered = output_dir / 'H5A123416.xlsx'
+    workbook = openpyxl.load_workbook(tampered)
+    workbook.active['B6'] = 'H5A12341699S'
+    workbook.save(tampered)
+    os.remove(output_dir / 'H5A153479.xlsx')
+    (output_dir / 'old').mkdir()
+    generator.generate_bom_file('H5A223415', str(output_dir / 'old'))
+    os.rename(output_dir / 'old' / 'H5A223415.xlsx', output_dir / 'old' / 'H5A000000.xlsx')
+
+    result = audit_output_dir(generator, str(output_dir), max_workers=2)
+
+    assert result['checked'] == 3
+    assert sorted(result['ok']) == ['H5A223415', 'H5A413492']
+    assert result['mismatched'] == {'H5A123416': [('B6', 'H5A12341610S', 'H5A12341699S')]}
+    assert result['missing'] == ['H5A153479']
+    assert result['orphans'] == [str(output_dir / 'old' / 'H5A000000.xlsx')]
+
+
+def test_audit_cli_exit_code(source_file, tmp_path, capsys):
+    """测试 audit 命令在输出完全一致时返回0，有缺失时返回1"""
+    generator = BomGenerator(source_file)
+    output_dir = tmp_path / 'output'
+    generator.generate_bom_files(generator.get_all_style_codes(), str(output_dir))
+
+    assert main(['audit', source_file, str(output_dir), '--workers', '1']) == 0
+    assert '一致 4' in capsys.readouterr().out
+
+    os.remove(output_dir / 'H5A413492.xlsx')
+    assert main(['audit', source_file, str(output_dir)]) == 1
+    assert '缺失 H5A413492' in capsys.readouterr().out
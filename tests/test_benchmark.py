@@ -0,0 +1,46 @@
+# 端到端性能基准的测试文件
+
+import copy
+import pytest
+from src.core.benchmark import STAGES, compare_to_baseline, load_baseline, run_benchmark, save_baseline
+
+
+def test_run_benchmark_and_baseline_round_trip(tmp_path):
+    """测试基准结果包含全部阶段的中位数和原始样本，并能原样保存和读回"""
+    runs = []
+    result = run_benchmark(styles=4, repetitions=2, warmup=1,
+                           progress_callback=lambda index, total, is_warmup, timings: runs.append(is_warmup))
+
+    assert runs == [True, False, False]
+    assert set(result['stages']) == set(STAGES)
+    assert all(len(result['samples'][stage]) == 2 for stage in STAGES)
+    assert result['stages']['template_load'] > 0 and result['throughput'] > 0
+    assert result['config'] == {'styles': 4, 'repetitions': 2, 'warmup': 1, 'backend': 'openpyxl'}
+
+    path = str(tmp_path / 'benchmarks' / 'baseline.json')
+    save_baseline(result, path)
+    assert load_baseline(path) == result
+    assert compare_to_baseline(result, load_baseline(path))['regressions'] == []
+    with pytest.raises(FileNotFoundError):
+        load_baseline(str(tmp_path / 'missing.json'))
+
+
+def test_compare_to_baseline_flags_regressions():
+    """测试明显变慢的阶段和吞吐量下降记为退化，小的绝对变化视为噪声，参数不同时报错"""
+    baseline = {
+        'config': {'styles': 40, 'backend': 'openpyxl'},
+        'stages': {'load': 0.02, 'template_load': 1.0, 'fill': 0.1, 'serialize': 0.5, 'write': 0.05, 'batch': 1.7},
+        'throughput': 40 / 1.7,
+    }
+    result = copy.deepcopy(baseline)
+    result['stages'].update(template_load=2.0, load=0.04, batch=2.7)
+    result['throughput'] = 40 / 2.7
+
+    comparison = compare_to_baseline(result, baseline)
+    assert comparison['stages']['template_load']['change'] == pytest.approx(1.0)
+    assert [item.split(':')[0] for item in comparison['regressions']] == ['template_load', 'batch', 'throughput']
+    assert compare_to_baseline(result, baseline, tolerance=2.0)['regressions'] == []
+
+    result['config']['styles'] = 10
+    with pytest.raises(ValueError):
+        compare_to_baseline(result, baseline)
@@ -0,0 +1,44 @@
+# 整波段BOM册的测试文件
+
+import io
+import os
+import openpyxl
+from src.core.bom_generator import BomGenerator
+from src.core.bom_book import generate_bom_books
+
+
+def _values(sheet):
+    """工作表中除建单时间外的全部非空单元格值"""
+    return {cell.coordinate: cell.value for row in sheet.iter_rows() for cell in row
+            if cell.value is not None and cell.coordinate != BomGenerator.CELL_CONFIG['timestamp']}
+
+
+def test_book_sheets_match_single_files(source_file, tmp_path):
+    """测试每个波段一册、每个款式一个工作表，内容与合并区域和单独生成的文件一致"""
+    generator = BomGenerator(source_file)
+    output_dir = tmp_path / 'books'
+    report = generate_bom_books(generator, generator.get_all_style_codes() + ['H5A999999'], str(output_dir))
+
+    assert report['books'] == {'秋四波.xlsx': ['H5A123416', 'H5A413492'],
+                               '秋三波.xlsx': ['H5A223415', 'H5A153479']}
+    assert report['failed'][0][0] == 'H5A999999'
+
+    # 秋三波一册中混合了连衣裙和半身裙两个模板
+    book = openpyxl.load_workbook(output_dir / '秋三波.xlsx')
+    assert book.sheetnames == ['H5A223415', 'H5A153479']
+    for style_code in book.sheetnames:
+        expected = openpyxl.load_workbook(io.BytesIO(generator.generate_bom_file_to_buffer(style_code))).active
+        sheet = book[style_code]
+        assert _values(sheet) == _values(expected)
+        assert sorted(map(str, sheet.merged_cells.ranges)) == sorted(map(str, expected.merged_cells.ranges))
+        assert sheet['A1'].font.sz == expected['A1'].font.sz
+
+
+def test_split_by_category(source_file, tmp_path):
+    """测试按品类分册"""
+    generator = BomGenerator(source_file)
+    output_dir = tmp_path / 'books'
+    report = generate_bom_books(generator, generator.get_all_style_codes(), str(output_dir), split_by_category=True)
+    assert sorted(report['books']) == sorted(['秋四波_长袖T恤.xlsx', '秋四波_外套.xlsx',
+                                              '秋三波_连衣裙.xlsx', '秋三波_马面裙.xlsx'])
+    assert sorted(os.listdir(output_dir)) == sorted(report['books'])
@@ -0,0 +1,36 @@
+# BOM数据导出的测试文件
+
+import csv
+import io
+import json
+from src.core.bom_generator import BomGenerator
+from src.core.bom_export import export_bom_data
+
+
+def test_jsonl_per_style_matches_cell_values(source_file):
+    """测试每款一行的JSON Lines与xlsx写入的单元格内容一致，无法生成的款式单独列出"""
+    generator = BomGenerator(source_file)
+    output = io.StringIO()
+    result = export_bom_data(generator, ['H5A413492', 'H5A999999'], output)
+
+    assert result['styles'] == 1 and result['failed'][0][0] == 'H5A999999'
+    record = json.loads(output.getvalue().splitlines()[0])
+    cells = generator.get_cell_values('H5A413492')
+    config = generator.CELL_CONFIG
+    assert record['品名'] == cells[config['product_name_b4']]
+    assert record['一级品类'] == cells[config['primary_category']]
+    for color, block in zip(record['颜色'], generator.PRESET_COLOR_BLOCKS):
+        assert color['颜色'] == cells[block['color_cell']]
+        assert color['SKU']['S'] == cells[f"B{block['sku_row']}"]
+
+
+def test_csv_per_sku(source_file):
+    """测试每个SKU一行的CSV"""
+    generator = BomGenerator(source_file)
+    output = io.StringIO(newline='')
+    result = export_bom_data(generator, ['H5A123416', 'H5A223415'], output, fmt='csv', granularity='sku')
+
+    rows = list(csv.DictReader(io.StringIO(output.getvalue())))
+    assert result['rows'] == len(rows) == (2 + 1) * len(generator.SIZES)
+    assert rows[0]['款式编码'] == 'H5A123416' and rows[0]['SKU'] == 'H5A12341610S'
+    assert [row['尺码'] for row in rows[:4]] == generator.SIZES
@@ -0,0 +1,38 @@
+# 已生成BOM文件索引的测试文件
+
+import os
+import shutil
+from src.core.bom_index import BomFileIndex, read_bom_fields
+
+
+def test_read_bom_fields_from_generated_file():
+    """测试从已发出的BOM文件中读取生成器写入的字段"""
+    fields = read_bom_fields('file/test/H5A123416.xlsx')
+
+    assert fields['style_code'] == 'H5A123416'
+    assert fields['product_name'] == 'HECO秋四波长袖T恤H5A123416'
+    assert fields['wave'] == '秋四波'
+    assert [block['color'] for block in fields['colors']] == ['黑色', '红色']
+    assert fields['colors'][1]['skus']['XL'] == 'H5A12341650XL'
+
+
+def test_bom_file_index_incremental_scan(tmp_path):
+    """测试并行扫描建立索引、增量重扫以及按SKU/颜色查询"""
+    bom_dir = tmp_path / 'boms'
+    bom_dir.mkdir()
+    for code in ['H5A123416', 'H5A413437', 'H5A223415']:
+        shutil.copy(f'file/test/{code}.xlsx', bom_dir)
+    (bom_dir / 'broken.xlsx').write_bytes(b'not a workbook')
+
+    with BomFileIndex(str(tmp_path / 'index.sqlite3')) as index:
+        first = index.scan(str(bom_dir), max_workers=2)
+        assert (first['scanned'], first['updated']) == (4, 4)
+        assert [os.path.basename(path) for path, _ in first['errors']] == ['broken.xlsx']
+
+        assert index.query(sku='H5A12341650M')['style_code'].tolist() == ['H5A123416']
+        assert index.query(color='红色')['style_code'].tolist() == ['H5A123416', 'H5A223415']
+
+        os.remove(bom_dir / 'H5A413437.xlsx')
+        second = index.scan(str(bom_dir))
+        assert (second['updated'], second['unchanged'], second['removed']) == (0, 3, 1)
+        assert index.query(style_code='H5A413437').empty
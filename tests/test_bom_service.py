@@ -0,0 +1,67 @@
+# 本地HTTP生成服务的测试文件
+
+import io
+import json
+import os
+import threading
+import urllib.error
+import urllib.request
+import zipfile
+import pytest
+from src.core.bom_service import BomService
+from src.core.render_executor import RenderExecutor
+
+
+def test_catalog_cached_by_content_and_jobs(source_file):
+    """测试相同内容的明细表只解析一次，批量任务可查询状态并在完成后释放"""
+    service = BomService(max_catalogs=1, executor=RenderExecutor(max_concurrent=1))
+    first = service.add_catalog_path(source_file)
+    with open(source_file, 'rb') as f:
+        second = service.add_catalog_bytes(f.read())
+    assert not first['cached'] and second['cached'] and first['catalog_id'] == second['catalog_id']
+    # 预热后用到的三个模板都已缓存，之后的请求不再读取模板文件
+    assert sorted(os.path.basename(path) for path in service._templates) == \
+        ['上衣模板.xlsx', '半身裙模板.xlsx', '连衣裙模板.xlsx']
+    assert service.render(first['catalog_id'], 'H5A123416')[:2] == b'PK'
+
+    job_id = service.submit(first['catalog_id'], ['H5A123416', 'H5A999999'])
+    assert service.job(job_id).wait(60)
+    status = service.job_status(job_id)
+    assert status['status'] == 'done' and status['completed'] == 2
+    assert [item['style_code'] for item in status['failed']] == ['H5A999999']
+    assert not service.cancel(job_id)
+    with pytest.raises(KeyError):
+        service.job_status(job_id)
+    with pytest.raises(KeyError):
+        service.render('0' * 64, 'H5A123416')
+
+
+def test_http_endpoints(source_file):
+    """测试通过HTTP上传明细表、获取单个BOM和边生成边返回的ZIP"""
+    service = BomService(executor=RenderExecutor(max_concurrent=1))
+    server = service.serve(port=0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f'http://127.0.0.1:{server.server_address[1]}'
+    try:
+        with open(source_file, 'rb') as f:
+            request = urllib.request.Request(f'{base}/catalogs', data=f.read(), method='POST')
+        with urllib.request.urlopen(request) as response:
+            assert response.status == 201
+            catalog_id = json.loads(response.read())['catalog_id']
+
+        with urllib.request.urlopen(f'{base}/catalogs/{catalog_id}/styles/H5A413492.xlsx') as response:
+            assert response.read()[:2] == b'PK'
+
+        request = urllib.request.Request(f'{base}/catalogs/{catalog_id}/zip', method='POST',
+                                         data=json.dumps({'codes': ['H5A413492', 'H5A999999']}).encode(),
+                                         headers={'Content-Type': 'application/json'})
+        with urllib.request.urlopen(request) as response:
+            archive = zipfile.ZipFile(io.BytesIO(response.read()))
+        assert archive.namelist() == ['H5A413492.xlsx', '失败清单.txt']
+
+        with pytest.raises(urllib.error.HTTPError) as error:
+            urllib.request.urlopen(f'{base}/catalogs/{catalog_id}/styles/H5A999999.xlsx')
+        assert error.value.code == 400
+    finally:
+        server.shutdown()
+        server.server_close()
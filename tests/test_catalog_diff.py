@@ -0,0 +1,42 @@
+# 明细表版本对比的测试文件
+
+import os
+from src.cli import main
+from src.core.bom_generator import BomGenerator
+from src.core.catalog_diff import diff_catalogs
+from tests.conftest import write_source_file
+
+
+def _new_version(tmp_path):
+    """在样例数据基础上：删除一款、修改两款、新增一款"""
+    styles = [
+        ('H5A123416', '秋四波', '长袖T恤', '黑色/红色/白色'),
+        ('H5A413492', '秋四波', '外套', '灰色/黑色/杏色'),
+        ('H5A223415', '秋四波', '半身裙', '白色'),
+        ('H5A999999', '冬一波', '卫衣', '黑色'),
+    ]
+    return write_source_file(tmp_path / 'new.xlsx', styles)
+
+
+def test_diff_catalogs_reports_field_level_changes(source_file, tmp_path):
+    """测试对比结果包含新增、删除和字段级修改"""
+    diff = diff_catalogs(BomGenerator(source_file), BomGenerator(_new_version(tmp_path)))
+
+    assert diff['added'] == ['H5A999999']
+    assert diff['removed'] == ['H5A153479']
+    assert diff['modified'] == {
+        'H5A123416': {'开发颜色': ('黑色/红色', '黑色/红色/白色')},
+        'H5A223415': {'波段': ('秋三波', '秋四波'), '品类': ('连衣裙', '半身裙')},
+    }
+    assert diff['changed'] == ['H5A123416', 'H5A223415', 'H5A999999']
+
+
+def test_diff_cli_generates_only_changed_styles(source_file, tmp_path, capsys):
+    """测试 diff 命令的 --generate 只重新生成变化的款式"""
+    output_dir = tmp_path / 'output'
+
+    exit_code = main(['diff', source_file, _new_version(tmp_path), '--generate', str(output_dir)])
+
+    assert exit_code == 0
+    assert sorted(os.listdir(output_dir)) == ['H5A123416.xlsx', 'H5A223415.xlsx', 'H5A999999.xlsx']
+    assert '修改 2 款' in capsys.readouterr().out
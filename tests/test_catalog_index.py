@@ -0,0 +1,49 @@
+# 明细表目录索引的测试文件
+
+from src.core.bom_generator import BomGenerator
+from src.core.catalog_index import CatalogIndex
+from tests.conftest import write_source_file
+
+
+def test_catalog_index_ingest_and_query(source_file, tmp_path):
+    """测试导入多个季节的明细表后按款式、波段、品类查询"""
+    winter_file = write_source_file(tmp_path / '2025冬.xlsx', [
+        ('H5A999001', '冬一波', '连衣裙', '黑色'),
+        ('H5A123416', '冬一波', '长袖T恤', '白色'),
+    ])
+
+    with CatalogIndex(str(tmp_path / 'catalog.sqlite3')) as catalog:
+        catalog.ingest(source_file, season='2025秋')
+        catalog.ingest(winter_file)
+
+        seasons = [row['季节'] for row in catalog.find_style('H5A123416')]
+        assert seasons == ['2025冬', '2025秋']
+
+        dresses = catalog.query(categories=['连衣裙'], waves=['秋三波'])
+        assert dresses['款式编码'].tolist() == ['H5A223415']
+
+        assert len(catalog.query(seasons=['2025秋'])) == 4
+
+
+def test_catalog_index_skips_unchanged_files(source_file, tmp_path):
+    """测试重复导入时内容未变化的文件被跳过，变化后整体替换"""
+    with CatalogIndex(str(tmp_path / 'catalog.sqlite3')) as catalog:
+        assert catalog.ingest(source_file)['skipped'] is False
+        assert catalog.ingest(source_file)['skipped'] is True
+
+        write_source_file(source_file, [('H5A000001', '秋一波', '衬衫', '白色')])
+        result = catalog.ingest(source_file)
+
+        assert result == dict(result, skipped=False, styles=1)
+        assert catalog.query()['款式编码'].tolist() == ['H5A000001']
+
+
+def test_generator_from_catalog_query(source_file, tmp_path):
+    """测试生成器可以直接由目录查询结果构建并生成BOM"""
+    with CatalogIndex(str(tmp_path / 'catalog.sqlite3')) as catalog:
+        catalog.ingest(source_file)
+        generator = BomGenerator.from_catalog(catalog, waves=['秋四波'])
+
+    assert generator.get_all_style_codes() == ['H5A123416', 'H5A413492']
+    report = generator.generate_bom_files(generator.get_all_style_codes(), str(tmp_path / 'output'))
+    assert report['failed'] == []
@@ -0,0 +1,65 @@
+# 明细表概况统计的测试文件
+
+import io
+import openpyxl
+import pytest
+from src.core.bom_generator import BomGenerator
+from src.core.catalog_summary import export_summary, summarize_catalog, summary_table
+from tests.conftest import write_source_file
+
+
+def test_summary_counts_by_wave_category_and_template(tmp_path):
+    """测试按波段、品类、模板统计款式数、颜色数和SKU数，并列出多色款式和无法生成的款式"""
+    styles = [
+        ('H5A123416', '秋四波', '长袖T恤', '黑色/红色'),
+        ('H5A413492', '秋四波', '外套', '灰色/黑色/杏色/白色'),
+        ('H5A223415', '秋三波', '连衣裙', '白色'),
+        ('H5A153479', '秋三波', '马面裙', '黑色/荧光紫'),
+    ]
+    generator = BomGenerator(write_source_file(tmp_path / 'source.xlsx', styles))
+    summary = summarize_catalog(generator)
+    sizes = len(generator.SIZES)
+
+    assert summary['totals'] == {'款式数': 4, '颜色数': 8, '颜色种类': 5, 'SKU数': 7 * sizes,
+                                 '无法生成': 1, '多色款式': 1}
+    by_wave = summary['by_wave'].set_index('波段')
+    assert by_wave.loc['秋四波', '款式数'] == 2 and by_wave.loc['秋四波', '颜色数'] == 6
+    assert by_wave.loc['秋四波', '颜色种类'] == 5
+    assert by_wave.loc['秋三波', 'SKU数'] == sizes and by_wave.loc['秋三波', '无法生成'] == 1
+    assert dict(zip(summary['templates']['模板'], summary['templates']['款式数'])) == \
+        {'上衣模板.xlsx': 2, '连衣裙模板.xlsx': 1}
+    assert summary['outliers'].to_dict('records') == [
+        {'款式编码': 'H5A413492', '波段': '秋四波', '二级品类': '外套', '颜色数': 4, '颜色': '灰色/黑色/杏色/白色'}]
+    assert generator.summarize()['totals'] == summary['totals']
+
+
+def test_export_summary_xlsx_and_csv(source_file, tmp_path):
+    """测试导出为xlsx（概况 + 多色款式两个工作表）和带BOM的CSV，不支持的扩展名报错"""
+    summary = BomGenerator(source_file).summarize(max_colors=2)
+    table = summary_table(summary)
+    assert table['分组'].tolist()[:3] == ['合计', '波段', '波段']
+    assert table.iloc[-1][['分组', '名称']].tolist() == ['多色款式', 'H5A413492']
+
+    export_summary(summary, str(tmp_path / '概况.xlsx'))
+    workbook = openpyxl.load_workbook(tmp_path / '概况.xlsx')
+    assert workbook.sheetnames == ['概况', '多色款式']
+    assert workbook['概况'].max_row == len(table) + 1
+
+    export_summary(summary, str(tmp_path / '概况.csv'))
+    content = (tmp_path / '概况.csv').read_bytes()
+    assert content.startswith(b'\xef\xbb\xbf')
+    assert io.StringIO(content.decode('utf-8-sig')).readline().strip() == ','.join(table.columns)
+
+    with pytest.raises(ValueError):
+        export_summary(summary, str(tmp_path / '概况.txt'))
+
+
+def test_summary_of_empty_catalog_and_missing_wave(tmp_path):
+    """测试没有款式行的明细表得到全为0的概况，没有波段的款式归入未分波段"""
+    empty = summarize_catalog(BomGenerator(write_source_file(tmp_path / 'empty.xlsx', [])))
+    assert empty['totals'] == {'款式数': 0, '颜色数': 0, '颜色种类': 0, 'SKU数': 0, '无法生成': 0, '多色款式': 0}
+    assert empty['by_wave'].empty and empty['outliers'].empty
+    assert summary_table(empty)['分组'].tolist() == ['合计']
+
+    generator = BomGenerator(write_source_file(tmp_path / 'source.xlsx', [('H5A123416', None, '长袖T恤', '黑色')]))
+    assert generator.summarize()['by_wave']['波段'].tolist() == ['未分波段']
@@ -0,0 +1,38 @@
+# 开发颜色规范化的测试文件
+
+from src.cli import main
+from src.core.bom_generator import BomGenerator
+from src.core.color_matcher import ColorMatcher
+from tests.conftest import write_source_file
+
+
+def test_split_handles_separator_and_suffix_variants():
+    """测试各种分隔符、空格和"色"字写法都能匹配到标准颜色名"""
+    matcher = ColorMatcher({'黑色': '10', '红色': '51', '芥末黄': '23', '灰色': '15'})
+
+    assert matcher.split('黑色/红色') == (['黑色', '红色'], [])
+    assert matcher.split(' 黑／红色、灰 ,芥末黄色；黑色') == (['黑色', '红色', '灰色', '芥末黄', '黑色'], [])
+    assert matcher.split('黑色/酒红/白') == (['黑色'], ['酒红', '白'])
+    # 颜色名中间的空格不拆分颜色
+    assert matcher.split('芥末 黄') == (['芥末黄'], [])
+    assert matcher.split('浅 灰紫 / 黑') == (['黑色'], ['浅灰紫'])
+
+
+def test_generator_normalizes_once_and_reports_in_bulk(tmp_path, capsys):
+    """测试加载时规范化开发颜色，无法匹配的颜色一次性列出"""
+    styles = [
+        ('H5A123416', '秋四波', '长袖T恤', '黑／红色'),
+        ('H5A413492', '秋四波', '外套', '灰色、 酒红/荧光绿'),
+        ('H5A223415', '秋三波', '连衣裙', '白色 / 杏'),
+    ]
+    source = write_source_file(tmp_path / 'source.xlsx', styles)
+    generator = BomGenerator(source)
+
+    assert generator.style_colors['H5A123416'] == ['黑色', '红色']
+    assert generator.get_color_errors() == {'H5A413492': ['荧光绿']}
+    skus = generator.generate_skus('H5A223415', '白色 / 杏', ['S'])
+    assert [(item['color'], item['skus']['S']) for item in skus] == [
+        ('白色', 'H5A22341512S'), ('杏色', f"H5A223415{generator.color_codes['杏色']}S")]
+
+    assert main(['colors', source]) == 1
+    assert 'H5A413492: 荧光绿' in capsys.readouterr().out
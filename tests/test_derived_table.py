@@ -0,0 +1,40 @@
+# 预计算派生字段表的测试文件
+
+from src.core.bom_generator import BomGenerator
+from tests.conftest import SAMPLE_STYLES, write_source_file
+
+
+def test_derived_table_matches_per_style_computation(source_file):
+    """测试批量预计算的派生字段与逐款计算的结果一致"""
+    generator = BomGenerator(source_file)
+
+    table = generator.derived_table
+    assert list(table.index) == generator.get_all_style_codes()
+    assert table.loc['H5A153479', '一级品类'] == '半身裙'
+    assert table.loc['H5A153479', '模板'].endswith('半身裙模板.xlsx')
+    assert table.loc['H5A123416', '品名'] == 'HECO秋四波长袖T恤H5A123416'
+    assert list(generator.sku_grid.loc[generator.sku_grid['款式编码'] == 'H5A413492', 'S']) == [
+        'H5A41349215S', 'H5A41349210S', f"H5A413492{generator.color_codes['杏色']}S"]
+
+    for code in generator.get_all_style_codes():
+        derived = generator._derive_style(code)
+        record = generator._derived_records[code]
+        assert {key: record[key] for key in derived} == derived
+
+
+def test_derived_table_records_errors_and_follows_reloads(tmp_path):
+    """测试无法生成的款式在错误列中记录原因，品类映射重新加载后派生表随之更新"""
+    styles = SAMPLE_STYLES + [('H5A999999', '冬一波', '未知品类', '黑色')]
+    generator = BomGenerator(write_source_file(tmp_path / 'source.xlsx', styles))
+
+    assert generator.derived_table.loc['H5A999999', '错误'].startswith("错误：未定义的品类 '未知品类'")
+    assert generator.derived_table['错误'].drop('H5A999999').isna().all()
+    assert sorted(generator.sku_grid['款式编码'].unique()) == sorted(code for code, *_ in SAMPLE_STYLES)
+
+    mapping_path = tmp_path / 'category_mapping.json'
+    mapping_path.write_text('{"未知品类": "上衣"}', encoding='utf-8')
+    generator.category_mapping_path = str(mapping_path)
+    generator.reload_category_mapping()
+
+    assert generator.derived_table.loc['H5A999999', '一级品类'] == '上衣'
+    assert generator.get_cell_values('H5A999999')['J4'] == '上衣'
@@ -0,0 +1,48 @@
+# 可恢复任务队列的测试文件
+
+import os
+from src.core.bom_generator import BomGenerator
+from src.core.job_store import JobStore, run_batch
+
+
+def test_resume_after_interruption(source_file, tmp_path):
+    """测试中断后恢复：已完成的款式不重做，中断时 running 的款式重新排队"""
+    generator = BomGenerator(source_file)
+    output_dir = str(tmp_path / 'output')
+    codes = ['H5A123416', 'H5A413492', 'H5A223415', 'H5A153479']
+
+    with JobStore(str(tmp_path / 'jobs.sqlite3')) as store:
+        batch = store.open_batch(codes, output_dir, source_sha256='abc')
+        batch_id = batch['batch_id']
+        assert not batch['resumed']
+
+        # 第一次运行：完成一个款式后"崩溃"，另一个款式停在 running
+        assert store.claim(batch_id) == ['H5A123416']
+        store.mark_done(batch_id, ['H5A123416'])
+        assert store.claim(batch_id) == ['H5A413492']
+
+    with JobStore(str(tmp_path / 'jobs.sqlite3')) as store:
+        assert store.open_batch(codes, output_dir, source_sha256='other')['resumed'] is False
+        resumed = store.open_batch(codes, output_dir, source_sha256='abc')
+        assert resumed == {'batch_id': batch_id, 'resumed': True, 'requeued': 1}
+
+        result = run_batch(generator, store, batch_id, claim_size=2)
+        assert result['success'] == ['H5A413492', 'H5A223415', 'H5A153479']
+        assert result['progress'] == {'total': 4, 'pending': 0, 'running': 0, 'done': 4, 'failed': 0}
+        assert not os.path.exists(os.path.join(output_dir, 'H5A123416.xlsx'))
+        assert store.find_unfinished_batch(output_dir, 'abc') is None
+
+
+def test_retry_only_failed_styles(source_file, tmp_path):
+    """测试失败的款式记录错误，并可单独重试"""
+    generator = BomGenerator(source_file)
+    with JobStore(str(tmp_path / 'jobs.sqlite3')) as store:
+        batch_id = store.create_batch(['H5A123416', 'H5A999999'], str(tmp_path / 'output'), 'abc')
+        result = run_batch(generator, store, batch_id)
+        assert result['success'] == ['H5A123416']
+        assert store.failures(batch_id)[0][0] == 'H5A999999'
+        assert 'H5A999999' in store.failures(batch_id)[0][1]
+
+        assert store.retry_failed(batch_id) == 1
+        assert store.progress(batch_id)['pending'] == 1
+        assert store.claim(batch_id, limit=10) == ['H5A999999']
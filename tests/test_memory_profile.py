@@ -0,0 +1,40 @@
+# 内存诊断的测试文件
+
+import pytest
+from src.core.bom_generator import BomGenerator
+from src.core import memory_profile
+from src.core.memory_profile import STAGES, StageProfiler, profile_render, run_soak
+
+
+def test_profile_render_attributes_stages(source_file):
+    """测试按阶段统计内存分配，无法生成的款式只计入派生字段阶段"""
+    generator = BomGenerator(source_file)
+    with StageProfiler() as profiler:
+        report = profile_render(generator, ['H5A123416', 'H5A999999'], profiler)
+        assert isinstance(profiler.top_growth(3), list)
+
+    assert set(report) <= set(STAGES)
+    assert report['derive']['calls'] == 2
+    assert report['template_load']['calls'] == report['serialize']['calls'] == 1
+    assert report['template_load']['peak_bytes'] > 0
+
+
+def test_soak_reports_growth_per_iteration(source_file, monkeypatch):
+    """测试浸泡测试逐轮记录内存和对象数，超过阈值时不通过"""
+    records = []
+    result = run_soak(source_file, iterations=3, batch_size=2, warmup=1, iteration_callback=records.append)
+
+    assert [record['iteration'] for record in result['iterations']] == [1, 2, 3]
+    assert records == result['iterations']
+    assert result['iterations'][0]['object_growth'] is None
+    assert result['object_growth'] is not None and result['passed']
+
+    # 常驻内存每次读取增长1MB，超过阈值0MB，必定不通过
+    rss = iter(range(100 * 1024 * 1024, 200 * 1024 * 1024, 1024 * 1024))
+    monkeypatch.setattr(memory_profile, 'current_rss_bytes', lambda: next(rss))
+    strict = run_soak(source_file, iterations=2, batch_size=1, warmup=1, max_rss_growth_mb=0)
+    assert strict['rss_growth_bytes'] > 0
+    assert not strict['passed']
+
+    with pytest.raises(ValueError):
+        run_soak(source_file, iterations=1, warmup=1)
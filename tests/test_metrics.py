@@ -0,0 +1,67 @@
+# 批次指标导出的测试文件
+
+import urllib.request
+from src.core import metrics
+from src.core.bom_generator import BomGenerator
+from src.core.metrics import MetricsRegistry
+from src.core.xlsx_backend import get_template_spec
+
+
+def test_batch_records_styles_stages_and_textfile(source_file, tmp_path):
+    """测试批量生成后记录成功/失败款式数与各阶段耗时，并原子写出 textfile"""
+    textfile = tmp_path / 'bom.prom'
+    metrics.configure(textfile_path=str(textfile))
+    success = metrics.STYLES.value(result='success')
+    failed = metrics.STYLES.value(result='failed')
+    loads = metrics.STAGE_SECONDS.count(stage='template_load')
+    written = metrics.BYTES_WRITTEN.value()
+    try:
+        generator = BomGenerator(source_file)
+        report = generator.generate_bom_files(['H5A123416', 'H5A413492', 'H5A999999'], str(tmp_path / 'out'))
+    finally:
+        metrics.REGISTRY.textfile_path = None
+
+    assert metrics.STYLES.value(result='success') - success == 2
+    assert metrics.STYLES.value(result='failed') - failed == 1
+    assert metrics.STAGE_SECONDS.count(stage='template_load') - loads == 2
+    assert metrics.BYTES_WRITTEN.value() - written == report['bytes_written']
+    text = textfile.read_text(encoding='utf-8')
+    assert '# TYPE bom_stage_seconds histogram' in text
+    assert 'bom_stage_seconds_bucket{stage="serialize",le="+Inf"}' in text
+    assert 'bom_template_load_seconds_count{template="上衣模板"}' in text
+
+    # 启用模板缓存后，同一模板只在首次查找时未命中
+    hits = metrics.TEMPLATE_CACHE.value(result='hit')
+    misses = metrics.TEMPLATE_CACHE.value(result='miss')
+    generator.template_cache = {}
+    generator.generate_bom_file_to_buffer('H5A123416')
+    generator.generate_bom_file_to_buffer('H5A123416')
+    assert metrics.TEMPLATE_CACHE.value(result='miss') - misses == 1
+    assert metrics.TEMPLATE_CACHE.value(result='hit') - hits == 1
+    # xlsxwriter 后端解析后的模板结构缓存同样计数
+    template = generator._template_path('H5A123416', generator.get_cell_values('H5A123416'))
+    get_template_spec(template)
+    hits = metrics.TEMPLATE_CACHE.value(result='hit')
+    get_template_spec(template)
+    assert metrics.TEMPLATE_CACHE.value(result='hit') - hits == 1
+
+
+def test_registry_render_and_serve():
+    """测试文本格式（标签转义、累计分桶）与本地 /metrics 接口"""
+    registry = MetricsRegistry()
+    registry.counter('demo_total', '示例', ['name']).inc(2, name='a"b')
+    histogram = registry.histogram('demo_seconds', '示例耗时', buckets=(0.1, 1.0))
+    histogram.observe(0.05)
+    histogram.observe(0.5)
+    text = registry.render()
+    assert 'demo_total{name="a\\"b"} 2' in text
+    assert 'demo_seconds_bucket{le="0.1"} 1' in text
+    assert 'demo_seconds_bucket{le="1"} 2' in text
+    assert 'demo_seconds_count 2' in text
+
+    port = registry.serve(0)
+    try:
+        with urllib.request.urlopen(f'http://127.0.0.1:{port}/metrics') as response:
+            assert response.read().decode('utf-8') == registry.render()
+    finally:
+        registry.shutdown()
@@ -0,0 +1,57 @@
+# 多个源文件并行读取与合并的测试文件
+
+import io
+import openpyxl
+import pytest
+from src.cli import main
+from src.core.bom_generator import BomGenerator
+from tests.conftest import write_source_file
+
+
+def test_from_sources_merges_with_provenance_and_conflicts(tmp_path):
+    """测试进程池并行读取多个明细表，记录每行来源，跨文件重复的款式以前面的文件为准"""
+    first = write_source_file(tmp_path / '一组.xlsx', [
+        ('H5A123416', '秋四波', '长袖T恤', '黑色/红色'),
+        ('H5A413492', '秋四波', '外套', '灰色/黑色/杏色'),
+    ])
+    second = write_source_file(tmp_path / '二组.xlsx', [
+        ('H5A223415', '秋三波', '连衣裙', '白色'),
+        ('H5A123416', '秋三波', '长袖T恤', '黑色'),
+    ])
+    with open(second, 'rb') as f:
+        buffer = io.BytesIO(f.read())
+    buffer.name = '三组（上传）'
+
+    generator = BomGenerator.from_sources([first, second, buffer], max_workers=2)
+    assert generator.get_all_style_codes() == ['H5A123416', 'H5A413492', 'H5A223415']
+    assert generator.df[BomGenerator.SOURCE_FILE_COL].tolist() == [first, first, second, second,
+                                                                  '三组（上传）', '三组（上传）']
+    assert generator.find_style_info('H5A123416')[BomGenerator.WAVE_COL] == '秋四波'
+
+    conflicts = generator.get_source_conflicts()
+    assert list(conflicts) == ['H5A123416', 'H5A223415']
+    assert [entry[BomGenerator.SOURCE_FILE_COL] for entry in conflicts['H5A123416']] == \
+        [first, second, '三组（上传）']
+    assert conflicts['H5A123416'][1][BomGenerator.DEV_COLOR_COL] == '黑色'
+    assert BomGenerator(first).get_source_conflicts() == {}
+
+    # 命令行：重复的编码只列出，--fail-on-conflict 时才视为失败
+    assert main(['merge', first, second]) == 0
+    assert main(['merge', first, second, '--fail-on-conflict']) == 1
+
+
+def test_from_sources_reports_unreadable_files(tmp_path):
+    """测试缺失的文件直接报错，无法解析的文件一次全部列出"""
+    good = write_source_file(tmp_path / 'good.xlsx', [('H5A223415', '秋三波', '连衣裙', '白色')])
+    with pytest.raises(FileNotFoundError):
+        BomGenerator.from_sources([good, str(tmp_path / 'missing.xlsx')])
+    with pytest.raises(ValueError):
+        BomGenerator.from_sources([])
+
+    workbook = openpyxl.Workbook()
+    workbook.active.title = '其他'
+    bad = str(tmp_path / 'bad.xlsx')
+    workbook.save(bad)
+    with pytest.raises(ValueError) as error:
+        BomGenerator.from_sources([good, bad], max_workers=1)
+    assert 'bad.xlsx' in str(error.value) and '明细表' in str(error.value)
@@ -0,0 +1,81 @@
+# 输出目录分层布局与索引文件的测试文件
+
+from datetime import datetime
+import hashlib
+import json
+import os
+import pytest
+from src.core.audit import audit_output_dir
+from src.core.bom_generator import BomGenerator
+from src.core.bom_index import list_bom_files
+from src.core.output_layout import INDEX_FILE, OutputIndex, find_bom_file
+
+
+def test_wave_category_layout_writes_index_and_audits(source_file, tmp_path):
+    """测试按波段/品类分目录输出、索引记录路径与哈希，审计通过索引找到文件"""
+    generator = BomGenerator(source_file)
+    output_dir = str(tmp_path / 'output')
+    codes = generator.get_all_style_codes()
+    report = generator.generate_bom_files(codes, output_dir, layout='wave_category')
+    assert sorted(report['success']) == sorted(codes)
+
+    with open(os.path.join(output_dir, INDEX_FILE), encoding='utf-8') as f:
+        index = json.load(f)
+    assert index['layout'] == 'wave_category'
+    entry = index['styles']['H5A123416']
+    assert entry['path'] == '秋四波/长袖T恤/H5A123416.xlsx'
+    path = find_bom_file(output_dir, 'H5A123416')
+    with open(path, 'rb') as f:
+        assert hashlib.sha256(f.read()).hexdigest() == entry['sha256']
+
+    # 不再指定布局时沿用目录已有的布局；与已有布局冲突时报错
+    generator.generate_bom_files(['H5A413492'], output_dir)
+    assert os.path.exists(os.path.join(output_dir, '秋四波', '外套', 'H5A413492.xlsx'))
+    assert not os.path.exists(os.path.join(output_dir, 'H5A413492.xlsx'))
+    with pytest.raises(ValueError):
+        generator.generate_bom_files(['H5A413492'], output_dir, layout='flat')
+
+    # 单个款式生成同样按索引的布局存放并更新索引
+    os.remove(os.path.join(output_dir, '秋三波', '连衣裙', 'H5A223415.xlsx'))
+    generator.generate_bom_file('H5A223415', output_dir)
+    assert find_bom_file(output_dir, 'H5A223415') == os.path.join(output_dir, '秋三波', '连衣裙', 'H5A223415.xlsx')
+    assert os.path.exists(find_bom_file(output_dir, 'H5A223415'))
+    assert not os.path.exists(os.path.join(output_dir, 'H5A223415.xlsx'))
+
+    result = audit_output_dir(generator, output_dir)
+    assert sorted(result['ok']) == sorted(codes) and not result['missing'] and not result['orphans']
+
+    # 从磁盘删除的文件记为缺失；不在索引中的文件（包括布局之外的同名文件）记为多余
+    os.remove(os.path.join(output_dir, '秋四波', '外套', 'H5A413492.xlsx'))
+    for stray in ('H5A000000.xlsx', 'H5A123416.xlsx'):
+        with open(os.path.join(output_dir, stray), 'wb') as f:
+            f.write(b'')
+    assert os.path.abspath(os.path.join(output_dir, '秋四波', '外套', 'H5A413492.xlsx')) \
+        not in list_bom_files(output_dir)
+    result = audit_output_dir(generator, output_dir)
+    assert result['missing'] == ['H5A413492'] and not result['errors']
+    assert sorted(os.path.basename(path) for path in result['orphans']) == ['H5A000000.xlsx', 'H5A123416.xlsx']
+    assert 'H5A123416' in result['ok']
+
+
+def test_prefix_layout_in_parallel_and_moved_style(source_file, tmp_path):
+    """测试进程池生成同样维护索引；款式换了位置时删除旧文件"""
+    generator = BomGenerator(source_file)
+    output_dir = str(tmp_path / 'output')
+    report = generator.generate_bom_files(generator.get_all_style_codes(), output_dir, max_workers=2,
+                                          layout='prefix', prefix_length=4)
+    assert not report['failed']
+    index = OutputIndex.load(output_dir)
+    assert index.prefix_length == 4
+    assert index.entries['H5A223415']['path'] == 'H5A2/H5A223415.xlsx'
+    assert os.path.exists(index.find('H5A223415'))
+
+    old_path = os.path.join(output_dir, 'H5A2', 'H5A223415.xlsx')
+    index.record_batch({'H5A223415': {'path': 'moved/H5A223415.xlsx', 'sha256': 'x'}}, datetime.now())
+    assert not os.path.exists(old_path)
+    assert OutputIndex.load(output_dir).entries['H5A223415']['path'] == 'moved/H5A223415.xlsx'
+
+    # 波段或品类为 . / .. 或以点结尾时不会跳出输出目录
+    layout = OutputIndex(output_dir, 'wave_category')
+    assert layout.relative_path('H5A1', {'波段': '..', '二级品类': '.'}) == '未分波段/未分品类/H5A1.xlsx'
+    assert layout.relative_path('H5A1', {'波段': '秋四波. ', '二级品类': '../外套'}) == '秋四波/.._外套/H5A1.xlsx'
@@ -0,0 +1,57 @@
+# 后台预生成缓存的测试文件
+
+import os
+import threading
+from src.core.bom_generator import BomGenerator
+from src.core.prerender_cache import PrerenderCache
+
+
+def test_prerender_spills_to_disk_and_cleans_up(source_file):
+    """测试超出内存上限的款式写入磁盘，内容与直接生成一致，关闭后删除临时文件"""
+    generator = BomGenerator(source_file)
+    codes = ['H5A123416', 'H5A413492', 'H5A999999']
+    cache = PrerenderCache(generator, max_memory_bytes=0)
+    cache.start(codes)
+
+    assert cache.get('H5A413492', timeout=30) is not None
+    assert cache.get('H5A999999', timeout=30) is None
+    assert 'H5A999999' in cache.errors
+
+    stats = cache.stats()
+    assert stats['in_memory'] == 0 and stats['spilled'] == 2
+    assert stats['pending'] == 0 and stats['failed'] == 1
+    spill_dir = cache._spill_dir
+    assert len(os.listdir(spill_dir)) == 2
+
+    cache.close()
+    assert not os.path.exists(spill_dir)
+
+
+def test_retain_cancels_unselected_and_take_pending(source_file):
+    """测试 retain 取消未选中款式，take_pending 取走的款式（包括之前被取消的）不再由后台渲染"""
+    generator = BomGenerator(source_file)
+    paused = threading.Event()
+    paused.set()
+    cache = PrerenderCache(generator, should_pause=paused.is_set)
+    cache.start(['H5A123416', 'H5A413492', 'H5A223415', 'H5A153479'])
+
+    cache.retain(['H5A413492', 'H5A153479'])
+    # 之后扩大了选择：被 retain 取消的 H5A123416 也要交给调用方渲染
+    assert cache.take_pending(['H5A153479', 'H5A123416']) == ['H5A153479', 'H5A123416']
+    assert cache.stats()['pending'] == 1
+
+    paused.clear()
+    assert cache.get('H5A413492', timeout=30) is not None
+    assert cache.get('H5A153479') is None
+    assert cache.get('H5A123416') is None
+    assert cache.stats()['in_memory'] == 1
+    cache.close()
+
+    # 会话被放弃（超过 idle_timeout 秒无人访问）后，后台线程自行关闭并删除溢出文件
+    cache = PrerenderCache(generator, max_memory_bytes=0, idle_timeout=0.5)
+    cache.start(['H5A123416'])
+    assert cache.get('H5A123416', timeout=30) is not None
+    spill_dir = cache._spill_dir
+    cache._thread.join(10)
+    assert cache.closed and not cache._thread.is_alive()
+    assert cache.stats()['spilled'] == 0 and not os.path.exists(spill_dir)
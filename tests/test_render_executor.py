@@ -0,0 +1,95 @@
+# 渲染执行器的测试文件
+
+import threading
+import pytest
+from src.core.bom_generator import BomGenerator
+from src.core.render_executor import RenderExecutor, RenderJob
+
+
+class _GatedGenerator:
+    """渲染前等待放行的生成器替身，用于控制批次的运行时机"""
+
+    def __init__(self, generator):
+        self.generator = generator
+        self.gate = threading.Event()
+
+    def generate_bom_file_to_buffer(self, style_code):
+        self.gate.wait(5)
+        return self.generator.generate_bom_file_to_buffer(style_code)
+
+
+def test_admission_limit_queues_jobs_in_order(source_file):
+    """测试超出并发上限的批次排队，前面的批次结束后按顺序开始"""
+    generator = BomGenerator(source_file)
+    gated = _GatedGenerator(generator)
+    executor = RenderExecutor(max_concurrent=1)
+
+    first = executor.submit(gated, ['H5A123416', 'H5A999999'])
+    second = executor.submit(generator, ['H5A413492'])
+    third = executor.submit(generator, ['H5A223415'])
+
+    assert (first.position(), second.position(), third.position()) == (0, 1, 2)
+    assert third.cancel() and third.status == RenderJob.CANCELLED
+    assert executor.stats()['queued'] == 1
+
+    gated.gate.set()
+    assert first.wait(10) and second.wait(10)
+    assert list(first.results) == ['H5A123416']
+    assert first.failed[0][0] == 'H5A999999'
+    assert list(second.results) == ['H5A413492']
+    assert second.started_at >= first.finished_at
+    assert executor.estimate_seconds(second) == 0.0
+
+
+def test_cancel_running_job_stops_between_styles(source_file):
+    """测试取消运行中的批次：当前款式完成后停止、状态为已取消，并让出槽位给排队的批次"""
+    generator = BomGenerator(source_file)
+    gated = _GatedGenerator(generator)
+    executor = RenderExecutor(max_concurrent=1)
+
+    running = executor.submit(gated, ['H5A123416', 'H5A413492', 'H5A223415'])
+    queued = executor.submit(generator, ['H5A153479'])
+    assert running.status == RenderJob.RUNNING
+    assert running.cancel()
+
+    gated.gate.set()
+    assert running.wait(10) and queued.wait(10)
+    assert running.status == RenderJob.CANCELLED
+    assert list(running.results) == ['H5A123416']
+    assert queued.status == RenderJob.DONE and list(queued.results) == ['H5A153479']
+    assert not running.cancel()
+
+    # 调用方超过 abandon_after 秒没有等待结果时视为已放弃，批次在款式之间自动取消
+    gated = _GatedGenerator(generator)
+    abandoned = executor.submit(gated, ['H5A123416', 'H5A413492'], abandon_after=0)
+    gated.gate.set()
+    for _ in range(100):
+        if abandoned.status == RenderJob.CANCELLED:
+            break
+        threading.Event().wait(0.1)
+    assert abandoned.status == RenderJob.CANCELLED and 'H5A413492' not in abandoned.results
+
+
+def test_eta_accounts_for_jobs_ahead(source_file):
+    """测试排队批次的预计时间包含前面批次的剩余款式"""
+    generator = BomGenerator(source_file)
+    gated = _GatedGenerator(generator)
+    executor = RenderExecutor(max_concurrent=1)
+    executor._seconds_per_style = 1.0
+
+    running = executor.submit(gated, ['H5A123416', 'H5A413492'])
+    queued = executor.submit(generator, ['H5A223415'])
+
+    assert running.eta_seconds() == 2.0
+    assert queued.eta_seconds() == 3.0
+    gated.gate.set()
+    assert queued.wait(10)
+
+
+def test_max_concurrent_from_environment(monkeypatch):
+    """测试并发上限可由环境变量配置并校验"""
+    monkeypatch.setenv('BOM_MAX_CONCURRENT_RENDERS', '3')
+    assert RenderExecutor().max_concurrent == 3
+    monkeypatch.setenv('BOM_MAX_CONCURRENT_RENDERS', 'abc')
+    with pytest.raises(ValueError):
+        RenderExecutor()
@@ -0,0 +1,47 @@
+# 共享内存目录的测试文件
+
+import os
+from datetime import datetime
+from src.core import metrics
+from src.core.bom_generator import BomGenerator
+from src.core.shared_catalog import SharedCatalog
+from tests.conftest import SAMPLE_STYLES, write_source_file
+
+
+def test_attached_catalog_matches_derived_records(source_file):
+    """测试挂载方读到的每个款式与发布方的派生字段一致"""
+    generator = BomGenerator(source_file)
+
+    with SharedCatalog.publish(generator) as catalog:
+        attached = SharedCatalog.attach(catalog.name)
+        try:
+            assert len(attached) == len(generator.get_all_style_codes())
+            for code in generator.get_all_style_codes():
+                assert attached.get(code) == generator._derived_records[code]
+            assert attached.get('H5A000000') is None
+            assert 'H5A000000' not in attached
+        finally:
+            attached.close()
+
+
+def test_parallel_generation_matches_sequential(tmp_path):
+    """测试进程池并行生成与逐个生成的文件内容完全一致（可复现模式），且每个批次只记录一次指标"""
+    styles = SAMPLE_STYLES + [('H5A999999', '冬一波', '未知品类', '黑色')]
+    generator = BomGenerator(write_source_file(tmp_path / 'source.xlsx', styles),
+                             timestamp=datetime(2025, 1, 1))
+    # NOT_EXIST 不在明细表中，并行生成时回退到本进程生成
+    codes = generator.get_all_style_codes() + ['NOT_EXIST']
+
+    sequential = generator.generate_bom_files(codes, str(tmp_path / 'sequential'))
+    batches, failed = metrics.BATCHES.value(), metrics.STYLES.value(result='failed')
+    parallel = generator.generate_bom_files(codes, str(tmp_path / 'parallel'), max_workers=2)
+    assert metrics.BATCHES.value() - batches == 1
+    assert metrics.STYLES.value(result='failed') - failed == len(parallel['failed']) == 2
+
+    assert sorted(parallel['success']) == sorted(sequential['success'])
+    assert parallel['failed'] == sequential['failed']
+    for code in sequential['success']:
+        with open(tmp_path / 'sequential' / f'{code}.xlsx', 'rb') as a, \
+                open(tmp_path / 'parallel' / f'{code}.xlsx', 'rb') as b:
+            assert a.read() == b.read()
+    assert not os.path.exists(tmp_path / 'parallel' / 'H5A999999.xlsx')
@@ -0,0 +1,46 @@
+# SKU反向解析的测试文件
+
+import json
+from src.cli import main
+from src.core.bom_generator import BomGenerator
+from src.core.sku_decoder import SkuDecoder
+from tests.conftest import SAMPLE_STYLES, write_source_file
+
+
+def test_decode_many_round_trips_generated_skus(source_file):
+    """测试生成器产生的全部SKU都能被唯一地拆回，未知SKU被标出"""
+    generator = BomGenerator(source_file)
+    expected = []
+    for code in generator.get_all_style_codes():
+        info = generator.find_style_info(code)
+        for color in generator.generate_skus(code, info['开发颜色'], generator.SIZES):
+            expected += [(sku, code, color['color'], size) for size, sku in color['skus'].items()]
+
+    result = SkuDecoder(generator).decode_many([sku for sku, *_ in expected] + ['H5A99999910S'])
+
+    assert list(result['状态']) == ['ok'] * len(expected) + ['unknown']
+    decoded = result[['SKU', '款式编码', '颜色', '尺码']].head(len(expected))
+    assert list(decoded.itertuples(index=False, name=None)) == expected
+
+
+def test_decode_flags_ambiguous_split(tmp_path):
+    """测试同一SKU有两种合法拆法时标为 ambiguous"""
+    styles = SAMPLE_STYLES + [('H5A12341', '秋四波', '长袖T恤', '测试色')]
+    generator = BomGenerator(write_source_file(tmp_path / 'source.xlsx', styles))
+    color_codes_path = tmp_path / 'color_codes.json'
+    color_codes_path.write_text(json.dumps(dict(generator.color_codes, 测试色='610'), ensure_ascii=False),
+                                encoding='utf-8')
+    generator.color_codes_path = str(color_codes_path)
+    generator.reload_color_codes()
+
+    result = SkuDecoder(generator).decode('H5A12341610S')
+
+    assert result['状态'] == 'ambiguous'
+    assert 'H5A123416+黑色(10)+S' in result['说明'] and 'H5A12341+测试色(610)+S' in result['说明']
+
+
+def test_sku_cli_exit_code(source_file, capsys):
+    """测试 sku 命令在存在无法解析的SKU时返回1"""
+    assert main(['sku', source_file, 'H5A41349215XL']) == 0
+    assert '灰色' in capsys.readouterr().out
+    assert main(['sku', source_file, 'H5A41349215XL', 'NOPE']) == 1
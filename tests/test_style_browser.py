@@ -0,0 +1,48 @@
+# 款式浏览表的测试文件
+
+from src.core.bom_generator import BomGenerator
+from src.core.style_browser import StyleBrowser
+from tests.conftest import write_source_file
+
+
+def test_filter_and_paginate(source_file):
+    """测试按波段/品类/关键字筛选，并按页取出"""
+    browser = StyleBrowser(BomGenerator(source_file))
+    assert len(browser) == 4
+
+    all_codes = browser.filter()
+    assert all_codes == ['H5A123416', 'H5A413492', 'H5A223415', 'H5A153479']
+    assert browser.filter(keyword='a4134') == ['H5A413492']
+    assert browser.filter(waves=['不存在的波段']) == []
+
+    assert browser.page_count(all_codes, page_size=3) == 2
+    second_page = browser.page(all_codes, page=1, page_size=3)
+    assert second_page[BomGenerator.STYLE_CODE_COL].tolist() == ['H5A153479']
+    assert second_page['颜色数'].tolist() == [2]
+    assert browser.page(all_codes, page=9, page_size=3).equals(second_page)
+
+
+def test_group_counts_with_selection(source_file):
+    """测试按 波段 × 品类 分组统计款式数和已选数"""
+    browser = StyleBrowser(BomGenerator(source_file))
+    groups = browser.group_counts(selected={'H5A123416'})
+    assert groups['款式数'].sum() == 4
+    assert groups['已选'].sum() == 1
+
+    wave, category = groups.iloc[0][[BomGenerator.WAVE_COL, '二级品类']]
+    codes = browser.filter(waves=[wave], categories=[category])
+    assert len(codes) == groups.iloc[0]['款式数']
+
+
+def test_missing_wave_and_category_are_labelled(tmp_path):
+    """测试缺少波段或品类的款式在筛选项中显示为"未分波段"/"未分品类"且可以被筛选"""
+    source = write_source_file(tmp_path / 'source.xlsx', [
+        ('H5A123416', None, '长袖T恤', '黑色'),
+        ('H5A413492', '秋四波', None, '黑色'),
+    ])
+    browser = StyleBrowser(BomGenerator(source))
+    options = browser.options()
+    assert options[BomGenerator.WAVE_COL] == ['未分波段', '秋四波']
+    assert options['二级品类'] == ['长袖T恤', '未分品类']
+    assert browser.filter(waves=['未分波段']) == ['H5A123416']
+    assert browser.filter(categories=['未分品类']) == ['H5A413492']
@@ -0,0 +1,91 @@
+# 监视模式的测试文件
+
+import json
+import os
+import threading
+import time
+import pytest
+from src.core.bom_generator import BomGenerator
+from src.core.watcher import BomWatcher
+from tests.conftest import SAMPLE_STYLES, write_source_file
+
+
+def test_source_change_regenerates_only_modified_styles(source_file, tmp_path):
+    """测试源文件变化后只重新生成被修改的款式"""
+    generator = BomGenerator(source_file)
+    output_dir = tmp_path / 'output'
+    watcher = BomWatcher(generator, source_file, str(output_dir), use_inotify=False)
+
+    styles = list(SAMPLE_STYLES)
+    styles[1] = ('H5A413492', '秋四波', '外套', '灰色/黑色')
+    write_source_file(source_file, styles)
+    report = watcher.apply_changes({BomWatcher.SOURCE: {source_file}})
+
+    assert report['affected'] == ['H5A413492']
+    assert report['batch']['failed'] == []
+    assert os.listdir(output_dir) == ['H5A413492.xlsx']
+    assert generator.find_style_info('H5A413492')['开发颜色'] == '灰色/黑色'
+
+
+def test_color_code_change_regenerates_styles_using_color(source_file, tmp_path):
+    """测试颜色代码变化后只重新生成使用该颜色的款式"""
+    generator = BomGenerator(source_file)
+    color_codes_path = tmp_path / 'color_codes.json'
+    color_codes = dict(generator.color_codes)
+    color_codes_path.write_text(json.dumps(color_codes, ensure_ascii=False), encoding='utf-8')
+    generator.color_codes_path = str(color_codes_path)
+    watcher = BomWatcher(generator, source_file, str(tmp_path / 'output'), use_inotify=False)
+
+    color_codes['红色'] = '59'
+    color_codes_path.write_text(json.dumps(color_codes, ensure_ascii=False), encoding='utf-8')
+    report = watcher.apply_changes({BomWatcher.COLOR_CODES: {str(color_codes_path)}})
+
+    assert report['affected'] == ['H5A123416']
+    assert generator.color_codes['红色'] == '59'
+
+
+def test_failed_reload_keeps_generator_unchanged_for_retry(source_file, tmp_path):
+    """测试源文件和颜色代码同时变化、颜色代码文件第一次读取失败时，生成器保持旧状态，重试时仍能找出修改的款式"""
+    generator = BomGenerator(source_file)
+    color_codes_path = tmp_path / 'color_codes.json'
+    color_codes = dict(generator.color_codes)
+    generator.color_codes_path = str(color_codes_path)
+    watcher = BomWatcher(generator, source_file, str(tmp_path / 'output'), use_inotify=False)
+    changes = {BomWatcher.SOURCE: {source_file}, BomWatcher.COLOR_CODES: {str(color_codes_path)}}
+
+    styles = list(SAMPLE_STYLES)
+    styles[1] = ('H5A413492', '秋四波', '外套', '灰色/黑色')
+    write_source_file(source_file, styles)
+    color_codes_path.write_text('{"红色": ', encoding='utf-8')  # 仍在保存中
+    with pytest.raises(ValueError):
+        watcher.apply_changes(changes)
+    assert generator.find_style_info('H5A413492')['开发颜色'] == '灰色/黑色/杏色'
+
+    color_codes['红色'] = '59'
+    color_codes_path.write_text(json.dumps(color_codes, ensure_ascii=False), encoding='utf-8')
+    report = watcher.apply_changes(changes)
+
+    assert report['affected'] == ['H5A123416', 'H5A413492']
+    assert generator.find_style_info('H5A413492')['开发颜色'] == '灰色/黑色'
+    assert generator.color_codes['红色'] == '59'
+
+
+@pytest.mark.parametrize('use_inotify', [False, True])
+def test_wait_for_changes_debounces_bursts(source_file, use_inotify):
+    """测试连续多次保存只合并为一次变化"""
+    generator = BomGenerator(source_file)
+    watcher = BomWatcher(generator, source_file, 'unused', debounce_seconds=0.3,
+                         poll_interval=0.05, use_inotify=use_inotify)
+
+    def save_three_times():
+        for i in range(3):
+            time.sleep(0.1)
+            with open(source_file, 'ab') as f:
+                f.write(b'\0' * (i + 1))
+
+    writer = threading.Thread(target=save_three_times)
+    writer.start()
+    changes = watcher.wait_for_changes()
+    writer.join()
+
+    assert changes == {BomWatcher.SOURCE: {os.path.abspath(source_file)}}
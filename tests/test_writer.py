@@ -0,0 +1,107 @@
+# 批量生成流水线与原子写入的测试文件
+
+import io
+import os
+import zipfile
+from datetime import datetime
+import openpyxl
+from src.core.bom_generator import BomGenerator
+from src.core.writer import AsyncFileWriter, atomic_write_bytes
+
+
+def test_atomic_write_bytes_replaces_file_without_leftovers(tmp_path):
+    """测试原子写入会覆盖目标文件且不留下临时文件"""
+    target = tmp_path / 'H5A123416.xlsx'
+    target.write_bytes(b'old')
+
+    atomic_write_bytes(str(target), b'new content')
+
+    assert target.read_bytes() == b'new content'
+    assert os.listdir(tmp_path) == ['H5A123416.xlsx']
+
+    # 权限按写入时的umask计算，与直接写入的文件一致
+    previous = os.umask(0o027)
+    try:
+        atomic_write_bytes(str(tmp_path / 'new.xlsx'), b'x')
+    finally:
+        os.umask(previous)
+    assert (tmp_path / 'new.xlsx').stat().st_mode & 0o777 == 0o640
+
+
+def test_async_file_writer_reports_failed_writes(tmp_path):
+    """测试写入线程中的失败会按款式编码记录，而不是中断其余写入"""
+    missing_dir = tmp_path / 'missing'
+
+    with AsyncFileWriter(max_pending=1) as writer:
+        writer.submit('BAD', str(missing_dir / 'BAD.xlsx'), b'x')
+        writer.submit('GOOD', str(tmp_path / 'GOOD.xlsx'), b'abc')
+
+    assert [key for key, _ in writer.errors] == ['BAD']
+    assert writer.stats['files_written'] == 1
+    assert writer.stats['bytes_written'] == 3
+    assert (tmp_path / 'GOOD.xlsx').read_bytes() == b'abc'
+
+
+def test_generate_bom_files_pipeline(source_file, tmp_path):
+    """测试批量流水线生成文件、记录失败款式并分别统计渲染与写盘耗时"""
+    generator = BomGenerator(source_file)
+    output_dir = tmp_path / 'output'
+    progress = []
+
+    report = generator.generate_bom_files(
+        ['H5A123416', 'H5A413492', 'NOT_EXIST'], str(output_dir),
+        progress_callback=lambda i, total, code: progress.append((i, total, code))
+    )
+
+    assert report['total'] == 3
+    assert report['success'] == ['H5A123416', 'H5A413492']
+    assert [code for code, _ in report['failed']] == ['NOT_EXIST']
+    assert report['render_seconds'] > 0
+    assert report['write_seconds'] > 0
+    assert report['bytes_written'] > 0
+    assert progress == [(0, 3, 'H5A123416'), (1, 3, 'H5A413492'), (2, 3, 'NOT_EXIST')]
+
+    sheet = openpyxl.load_workbook(output_dir / 'H5A413492.xlsx').active
+    assert sheet['B3'].value == 'H5A413492'
+    assert sheet['B6'].value == 'H5A41349215S'
+    assert sorted(os.listdir(output_dir)) == ['H5A123416.xlsx', 'H5A413492.xlsx']
+
+
+def test_reproducible_mode_outputs_identical_bytes(source_file):
+    """测试固定时间后两次生成的BOM逐字节相同，且J2为固定时间"""
+    pinned = datetime(2025, 9, 1, 8, 30)
+    first = BomGenerator(source_file, timestamp=pinned).generate_bom_file_to_buffer('H5A123416')
+    second = BomGenerator(source_file, timestamp=pinned).generate_bom_file_to_buffer('H5A123416')
+
+    assert first == second
+    sheet = openpyxl.load_workbook(io.BytesIO(first)).active
+    assert sheet['J2'].value == '2025/09/01 08:30'
+
+
+def test_reproducible_mode_clamps_timestamps_before_1980(source_file, monkeypatch):
+    """测试 SOURCE_DATE_EPOCH 早于1980年时仍能生成，zip条目时间按1980-01-01处理"""
+    monkeypatch.setenv('SOURCE_DATE_EPOCH', '0')
+    data = BomGenerator(source_file).generate_bom_file_to_buffer('H5A123416')
+
+    with zipfile.ZipFile(io.BytesIO(data)) as archive:
+        assert {info.date_time for info in archive.infolist()} == {(1980, 1, 1, 0, 0, 0)}
+    assert openpyxl.load_workbook(io.BytesIO(data)).active['J2'].value == '1970/01/01 00:00'
+
+
+def test_generate_bom_files_skips_unchanged_outputs(source_file, tmp_path):
+    """测试可复现模式下重复生成时未变化的文件不会被重写"""
+    generator = BomGenerator(source_file, timestamp=datetime(2025, 9, 1, 8, 30))
+    output_dir = tmp_path / 'output'
+    codes = ['H5A123416', 'H5A413492']
+
+    generator.generate_bom_files(codes, str(output_dir), skip_unchanged=True)
+    first_mtime = os.stat(output_dir / 'H5A123416.xlsx').st_mtime_ns
+    report = generator.generate_bom_files(codes, str(output_dir), skip_unchanged=True)
+
+    assert report['skipped'] == codes
+    assert report['success'] == codes
+    assert os.stat(output_dir / 'H5A123416.xlsx').st_mtime_ns == first_mtime
+
+    generator.timestamp = datetime(2025, 9, 2, 8, 30)
+    report = generator.generate_bom_files(codes, str(output_dir), skip_unchanged=True)
+    assert report['skipped'] == []
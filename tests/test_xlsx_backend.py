@@ -0,0 +1,48 @@
+# xlsxwriter 写出后端的测试文件
+
+from datetime import datetime
+import os
+import pytest
+from src.cli import main
+from src.core import bom_generator
+from src.core.bom_generator import BomGenerator
+from src.core.xlsx_backend import compare_backends
+
+pytest.importorskip('xlsxwriter')
+
+
+def test_xlsxwriter_output_matches_openpyxl(source_file):
+    """测试 xlsxwriter 后端输出的值、样式、合并区域、列宽和行高与 openpyxl 后端一致"""
+    generator = BomGenerator(source_file)
+    differences = compare_backends(generator, ['H5A123416', 'H5A413492', 'H5A223415', 'H5A153479', 'H5A999999'])
+
+    assert set(differences) == {'H5A123416', 'H5A413492', 'H5A223415', 'H5A153479'}
+    assert all(problems == [] for problems in differences.values())
+    assert generator.backend == 'openpyxl'
+
+
+def test_backend_selection_and_reproducible_output(source_file, monkeypatch):
+    """测试通过环境变量选择后端；可复现模式下 xlsxwriter 输出逐字节相同"""
+    monkeypatch.setenv('BOM_WRITE_BACKEND', 'xlsxwriter')
+    generator = BomGenerator(source_file, timestamp=datetime(2025, 1, 1, 8, 0))
+    assert generator.backend == 'xlsxwriter'
+    first = generator.generate_bom_file_to_buffer('H5A413492')
+    assert first == generator.generate_bom_file_to_buffer('H5A413492')
+
+    monkeypatch.setenv('BOM_WRITE_BACKEND', 'unknown')
+    with pytest.raises(ValueError):
+        BomGenerator(source_file)
+
+
+def test_cli_backend_option_does_not_touch_environment(source_file, tmp_path, monkeypatch):
+    """测试命令行 --backend 只作用于命令创建的生成器，不写入环境变量"""
+    monkeypatch.delenv('BOM_WRITE_BACKEND', raising=False)
+    rendered = []
+    original = bom_generator.render_with_xlsxwriter
+    monkeypatch.setattr(bom_generator, 'render_with_xlsxwriter',
+                        lambda generator, code: rendered.append(code) or original(generator, code))
+
+    assert main(['--backend', 'xlsxwriter', 'merge', source_file, '--generate', str(tmp_path / 'output')]) == 0
+    assert rendered == ['H5A123416', 'H5A413492', 'H5A223415', 'H5A153479']
+    assert 'BOM_WRITE_BACKEND' not in os.environ
+    assert BomGenerator(source_file).backend == 'openpyxl'